@@ -39,7 +39,7 @@ async def process_agent_chat(
         包含结果和工具调用信息的字典
     """
     logger.info(f"process_agent_chat 调用: question={question[:50] if question else None}, selected_tool_ids={selected_tool_ids}, model_id={model_id}")
-    
+
     if not selected_tool_ids:
         logger.warning("Agent模式开启但没有选择工具")
         return {
@@ -47,58 +47,51 @@ async def process_agent_chat(
             "tool_calls": [],
             "sources": []
         }
-    
+
     try:
         # 构建工作流节点
         nodes = []
         connections = []
-        
+
+        # 节点配置中不写入问题本身（问题经 execute_workflow 传入），
+        # 同一组工具/模型的工作流定义不变，可复用已编译的图
+
         # 1. 输入节点
         input_node_id = "input_1"
-        nodes.append({
-            "id": input_node_id,
-            "type": "input",
-            "config": {
-                "user_input": question
-            }
-        })
-        
-        # 2. 为每个工具创建工具节点（串行执行，避免并发写入 state）
+        nodes.append({"id": input_node_id, "type": "input", "config": {}})
+
+        # 2. 为每个工具创建工具节点：各工具相互独立，从输入节点并行扇出，
+        #    结果经 state 的 reducer 合并
         tool_nodes = []
-        last_node_id = input_node_id
-        
+
         for idx, tool_id in enumerate(selected_tool_ids):
             tool_node_id = f"tool_{idx + 1}"
             tool_nodes.append(tool_node_id)
-            
+
             # 创建工具节点
-            nodes.append({
-                "id": tool_node_id,
-                "type": "tool",
-                "config": {
-                    "tool_id": tool_id,
-                    # 提前设置可读名称，至少用 tool_id 兜底，避免前端显示 undefined
-                    "tool_name": tool_id,
-                    "tool_params": {
-                        # 将问题作为参数传递给工具
-                        "question": question
+            nodes.append(
+                {
+                    "id": tool_node_id,
+                    "type": "tool",
+                    "config": {
+                        "tool_id": tool_id,
+                        # 提前设置可读名称，至少用 tool_id 兜底，避免前端显示 undefined
+                        "tool_name": tool_id,
+                        # 问题由 ToolNode 从 state.question 注入
+                        "tool_params": {},
+                        "input_bindings": {
+                            # 从输入节点获取问题作为参数（如果需要）
+                            "params": f"{input_node_id}.user"
+                        },
                     },
-                    "input_bindings": {
-                        # 从输入节点获取问题作为参数（如果需要）
-                        "params": f"{input_node_id}.user"
-                    }
                 }
-            })
-            
-            # 串行连接：上一节点 -> 当前工具
-            connections.append({
-                "from": last_node_id,
-                "to": tool_node_id,
-                "type": "unidirectional"
-            })
-            last_node_id = tool_node_id
-        
-        # 3. LLM节点：基于工具结果生成回答（仅依赖最后一个工具节点）
+            )
+
+            connections.append(
+                {"from": input_node_id, "to": tool_node_id, "type": "unidirectional"}
+            )
+
+        # 3. LLM节点：等待所有工具节点完成后，基于工具结果生成回答
         llm_node_id = "llm_1"
         nodes.append({
             "id": llm_node_id,
@@ -119,16 +112,14 @@ async def process_agent_chat(
 """
             }
         })
-        
+
         # 工具结果将通过 LLMNode 自动收集
-        
-        # 仅连接最后一个节点到 LLM（避免并发更新 state）
-        connections.append({
-            "from": last_node_id,
-            "to": llm_node_id,
-            "type": "unidirectional"
-        })
-        
+
+        for tool_node_id in tool_nodes:
+            connections.append(
+                {"from": tool_node_id, "to": llm_node_id, "type": "unidirectional"}
+            )
+
         # 4. 输出节点
         output_node_id = "output_1"
         nodes.append({
@@ -140,16 +131,16 @@ async def process_agent_chat(
                 }
             }
         })
-        
+
         # 连接LLM节点到输出节点
         connections.append({
             "from": llm_node_id,
             "to": output_node_id,
             "type": "unidirectional"
         })
-        
+
         logger.info(f"开始执行工作流: 节点数={len(nodes)}, 连接数={len(connections)}")
-        
+
         # 执行工作流
         workflow_state = await execute_workflow(
             question=question,
@@ -159,26 +150,26 @@ async def process_agent_chat(
             user=user,  # 传递用户对象，便于下游按属性访问（user.id 等）
             event_emitter=event_emitter
         )
-        
+
         logger.info(f"工作流执行完成: execution_path={workflow_state.execution_path}")
-        
+
         # 提取结果
         answer = workflow_state.llm_output or ""
-        
+
         logger.info(f"Agent回答: {answer[:100] if answer else 'None'}...")
-        
+
         # 收集工具调用结果
         tool_calls = []
         sources = []
-        
+
         for idx, tool_id in enumerate(selected_tool_ids):
             tool_node_id = f"tool_{idx + 1}"
             tool_messages = workflow_state.messages.get(tool_node_id, {})
-            
+
             # 获取工具结果
             tool_result_msg = tool_messages.get("result")
             tool_error_msg = tool_messages.get("error")
-            
+
             if tool_result_msg:
                 tool_result = tool_result_msg.payload
                 tool_calls.append({
@@ -201,7 +192,7 @@ async def process_agent_chat(
                     "result": tool_error,
                     "success": False
                 })
-        
+
         # 生成可读的步骤标签
         try:
             node_meta = { n["id"]: n for n in nodes }
@@ -237,14 +228,17 @@ async def process_agent_chat(
                 "execution_path": workflow_state.execution_path,
                 "timings": workflow_state.timings,
                 "total": workflow_state.total,
+                "partial": workflow_state.partial,
             },
             "agent_meta": {
                 "execution_path": workflow_state.execution_path,
                 "timings": workflow_state.timings,
+                "critical_path": workflow_state.critical_path,
+                "partial": workflow_state.partial,
                 "steps": readable_steps,
-            }
+            },
         }
-        
+
     except Exception as e:
         logger.error(f"Agent模式处理失败: {e}", exc_info=True)
         return {
@@ -252,4 +246,3 @@ async def process_agent_chat(
             "tool_calls": [],
             "sources": []
         }
-
@@ -1,226 +1,173 @@
 """
 基于 LangGraph 的工作流图构建和执行
 
-使用 LangGraph StateGraph 实现工作流的节点执行、条件路由和状态管理
+使用 LangGraph StateGraph 实现工作流的节点执行、条件路由和状态管理。
+
+编译后的图按工作流定义（节点 + 连接）的哈希缓存，请求相关的 request / user /
+event_emitter 随 WorkflowState 传入，不进入图结构；所有节点原地修改同一个
+WorkflowState 对象，不做逐节点的状态转换。检查点默认关闭。
 """
-from typing import Dict, Any, List, Optional, TypedDict
+
+from collections import OrderedDict
+from typing import Annotated, Dict, Any, List, Optional, TypedDict
+import hashlib
+import json
+import os
 import time
+import uuid
 import logging
 
 from langgraph.graph import StateGraph, END, START
-from langgraph.checkpoint.memory import MemorySaver
 
-from .state import WorkflowState, Message
+from .state import WorkflowState
 from .nodes import InputNode, DataSourceNode, RetrievalNode, LLMNode, ToolNode, OutputNode
 
 logger = logging.getLogger(__name__)
 
+# 缓存的已编译工作流数量上限
+WORKFLOW_CACHE_SIZE = int(os.environ.get("AGENT_WORKFLOW_CACHE_SIZE", "64"))
+
+NODE_CLASSES = {
+    "input": InputNode,
+    "dataSource": DataSourceNode,
+    "retrieval": RetrievalNode,
+    "llm": LLMNode,
+    "tool": ToolNode,
+    "output": OutputNode,
+}
+
+NODE_LABELS = {
+    "llm": "LLM",
+    "retrieval": "Retrieval",
+    "dataSource": "DataSource",
+    "input": "Input",
+    "output": "Output",
+}
+
+
+def _shared_state(current: WorkflowState, update: WorkflowState) -> WorkflowState:
+    # 节点返回的都是同一个对象；并行分支同一步多次写入时取最后一次即可
+    return update
+
 
 class WorkflowGraphState(TypedDict):
-    """LangGraph 状态定义（兼容 LangGraph 的 TypedDict 格式）"""
-    messages: Dict[str, Dict[str, Any]]
-    execution_path: List[str]
-    question: str
-    start_time: Optional[float]
-    timings: Dict[str, float]
-    retrieved_context: Optional[str]
-    llm_output: Optional[str]
-    total: int
-    documents: List[Dict[str, Any]]
-    scores: List[float]
-
-
-def _convert_to_langgraph_state(state: WorkflowState) -> WorkflowGraphState:
-    """将 WorkflowState 转换为 LangGraph 状态格式"""
-    return {
-        "messages": {
-            node_id: {
-                port: {
-                    "type": msg.type,
-                    "payload": msg.payload
-                } for port, msg in ports.items()
-            } for node_id, ports in state.messages.items()
-        },
-        "execution_path": state.execution_path,
-        "question": state.question,
-        "start_time": state.start_time,
-        "timings": state.timings,
-        "retrieved_context": state.retrieved_context,
-        "llm_output": state.llm_output,
-        "total": state.total,
-        "documents": state.documents,
-        "scores": state.scores,
-    }
+    """LangGraph 状态：整个执行过程共享一个可变的 WorkflowState"""
+    workflow: Annotated[WorkflowState, _shared_state]
 
 
-def _convert_from_langgraph_state(graph_state: WorkflowGraphState) -> WorkflowState:
-    """从 LangGraph 状态格式转换回 WorkflowState"""
-    state = WorkflowState(
-        messages={
-            node_id: {
-                port: Message(type=msg["type"], payload=msg["payload"])
-                for port, msg in ports.items()
-            } for node_id, ports in graph_state["messages"].items()
-        },
-        execution_path=graph_state["execution_path"],
-        question=graph_state["question"],
-        start_time=graph_state.get("start_time"),
-        timings=graph_state.get("timings", {}),
-        retrieved_context=graph_state.get("retrieved_context"),
-        llm_output=graph_state.get("llm_output"),
-        total=graph_state.get("total", 0),
-        documents=graph_state.get("documents", []),
-        scores=graph_state.get("scores", []),
+def _describe_node(node_instance: Any, node_id: str) -> tuple:
+    """节点类型与可读标签（用于前端状态事件），构图时计算一次"""
+    node_type = next(
+        (t for t, cls in NODE_CLASSES.items() if type(node_instance) is cls),
+        type(node_instance).__name__ or "node",
     )
-    return state
+    if node_type == "tool":
+        cfg = getattr(node_instance, "config", {}) or {}
+        return node_type, cfg.get("tool_name") or cfg.get("tool_id") or "Tool"
+    return node_type, NODE_LABELS.get(node_type, node_type or node_id)
 
 
-def create_node_function(node_instance: Any, node_id: str, request: Optional[Any] = None, user: Optional[Any] = None, event_emitter: Optional[Any] = None) -> callable:
-    """创建 LangGraph 节点函数"""
-    async def node_func(state: WorkflowGraphState) -> WorkflowGraphState:
+async def _emit(event_emitter: Optional[Any], event: Dict[str, Any]):
+    if not event_emitter:
+        return
+    try:
+        await event_emitter(event)
+    except Exception:
+        pass
+
+
+def create_node_function(node_instance: Any, node_id: str) -> callable:
+    """创建 LangGraph 节点函数（request / user / event_emitter 随 WorkflowState 传入）"""
+    node_type, node_label = _describe_node(node_instance, node_id)
+    timing_key = f"node_{node_id}"
+
+    async def node_func(state: WorkflowGraphState) -> Dict[str, Any]:
         """节点执行函数"""
         t0 = time.time()
-        
-        # 转换为 WorkflowState
-        workflow_state = _convert_from_langgraph_state(state)
-        
-        # 传递 request 和 user（用于工具节点）
-        workflow_state._request = request
-        workflow_state._user = user
-
-        # 计算节点类型与可读标签
-        try:
-            node_type = None
-            node_label = None
-            cfg = getattr(node_instance, "config", {}) or {}
-            cls_name = getattr(getattr(node_instance, "__class__", None), "__name__", "")
-            # 映射类名到类型
-            cls_map = {
-                "InputNode": "input",
-                "DataSourceNode": "dataSource",
-                "RetrievalNode": "retrieval",
-                "LLMNode": "llm",
-                "ToolNode": "tool",
-                "OutputNode": "output",
-            }
-            node_type = cls_map.get(cls_name, cls_name or "node")
-            if node_type == "tool":
-                node_label = cfg.get("tool_name") or cfg.get("tool_id") or "Tool"
-            elif node_type == "llm":
-                node_label = "LLM"
-            elif node_type == "retrieval":
-                node_label = "Retrieval"
-            elif node_type == "dataSource":
-                node_label = "DataSource"
-            elif node_type == "input":
-                node_label = "Input"
-            elif node_type == "output":
-                node_label = "Output"
-            else:
-                node_label = node_type
-        except Exception:
-            node_type = "node"
-            node_label = node_id
-        
-        # 发送开始事件
-        try:
-            if event_emitter:
-                await event_emitter({
-                    "type": "status",
-                    "data": {
-                        "action": "agent_node_start",
-                        "node_id": node_id,
-                        "node_type": node_type,
-                        "node_label": node_label,
-                        "done": False,
-                    },
-                })
-        except Exception:
-            pass
+        workflow_state = state["workflow"]
+        event_emitter = getattr(workflow_state, "_event_emitter", None)
+
+        await _emit(
+            event_emitter,
+            {
+                "type": "status",
+                "data": {
+                    "action": "agent_node_start",
+                    "node_id": node_id,
+                    "node_type": node_type,
+                    "node_label": node_label,
+                    "done": False,
+                },
+            },
+        )
 
         # 执行节点
         workflow_state = await node_instance.execute(workflow_state)
-        
+
         # 记录执行时间
-        workflow_state.timings[f"node_{node_id}"] = (time.time() - t0) * 1000  # 毫秒
-        
-        # 发送结束事件
-        try:
-            if event_emitter:
-                await event_emitter({
-                    "type": "status",
-                    "data": {
-                        "action": "agent_node_end",
-                        "node_id": node_id,
-                        "node_type": node_type,
-                        "node_label": node_label,
-                        "elapsed_ms": workflow_state.timings.get(f"node_{node_id}"),
-                        "done": False,
-                    },
-                })
-        except Exception:
-            pass
-
-        # 转换回 LangGraph 状态
-        return _convert_to_langgraph_state(workflow_state)
-    
+        workflow_state.timings[timing_key] = (time.time() - t0) * 1000  # 毫秒
+
+        await _emit(
+            event_emitter,
+            {
+                "type": "status",
+                "data": {
+                    "action": "agent_node_end",
+                    "node_id": node_id,
+                    "node_type": node_type,
+                    "node_label": node_label,
+                    "elapsed_ms": workflow_state.timings.get(timing_key),
+                    "done": False,
+                },
+            },
+        )
+
+        return {"workflow": workflow_state}
+
     return node_func
 
 
 def create_workflow_graph(
     nodes: List[Dict[str, Any]],
     connections: List[Dict[str, Any]],
-    request: Optional[Any] = None,
-    user: Optional[Any] = None,
-    event_emitter: Optional[Any] = None
 ) -> StateGraph:
     """
     创建工作流图
-    
+
     Args:
         nodes: 节点列表，每个节点包含 id, type, config
         connections: 连接列表，每个连接包含 from, to, type
-    
+
     Returns:
-        LangGraph StateGraph 实例
+        LangGraph StateGraph 实例（与请求无关，可编译后复用）
     """
     # 创建图
     workflow = StateGraph(WorkflowGraphState)
-    
-    # 节点类型映射
-    node_classes = {
-        "input": InputNode,
-        "dataSource": DataSourceNode,
-        "retrieval": RetrievalNode,
-        "llm": LLMNode,
-        "tool": ToolNode,
-        "output": OutputNode,
-    }
-    
+
     # 创建节点实例并添加到图
     node_instances = {}
     for node_data in nodes:
         node_id = node_data["id"]
         node_type = node_data["type"]
         node_config = node_data.get("config", {})
-        
-        if node_type not in node_classes:
+
+        if node_type not in NODE_CLASSES:
             logger.warning(f"未知节点类型: {node_type}, 跳过节点 {node_id}")
             continue
-        
+
         # 创建节点实例
-        node_class = node_classes[node_type]
+        node_class = NODE_CLASSES[node_type]
         node_instance = node_class(node_id, node_config)
         node_instances[node_id] = node_instance
-        
+
         # 创建节点函数并添加到图
-        node_func = create_node_function(node_instance, node_id, request, user, event_emitter)
+        node_func = create_node_function(node_instance, node_id)
         workflow.add_node(node_id, node_func)
-    
+
     # 构建连接关系（拓扑排序）
     graph_edges = {}
     in_degree = {node["id"]: 0 for node in nodes}
-    
+
     for conn in connections:
         if conn.get("type") == "unidirectional" and conn.get("from") and conn.get("to"):
             from_id = conn["from"]
@@ -230,17 +177,17 @@ def create_workflow_graph(
             graph_edges[from_id].append(to_id)
             if to_id in in_degree:
                 in_degree[to_id] += 1
-    
+
     # 找到起始节点（入度为 0 的节点）
     start_nodes = [node_id for node_id, degree in in_degree.items() if degree == 0]
-    
+
     # 如果没有起始节点，选择 input 和 dataSource 节点
     if not start_nodes:
         start_nodes = [
             node["id"] for node in nodes
             if node.get("type") in ["input", "dataSource"]
         ]
-    
+
     # 设置入口点
     if start_nodes:
         # 从 START 连接到所有起始节点
@@ -252,13 +199,16 @@ def create_workflow_graph(
         if nodes and nodes[0]["id"] in node_instances:
             first_node_id = nodes[0]["id"]
             workflow.add_edge(START, first_node_id)
-    
-    # 添加连接边
+
+    # 添加连接边：多个上游的节点等所有上游（并行分支）完成后执行一次
+    incoming = {}
     for from_id, to_ids in graph_edges.items():
         for to_id in to_ids:
             if from_id in node_instances and to_id in node_instances:
-                workflow.add_edge(from_id, to_id)
-    
+                incoming.setdefault(to_id, []).append(from_id)
+    for to_id, from_ids in incoming.items():
+        workflow.add_edge(from_ids if len(from_ids) > 1 else from_ids[0], to_id)
+
     # 设置结束节点
     output_nodes = [node["id"] for node in nodes if node.get("type") == "output"]
     if output_nodes:
@@ -275,10 +225,83 @@ def create_workflow_graph(
         for leaf_node in leaf_nodes:
             if leaf_node in node_instances:
                 workflow.add_edge(leaf_node, END)
-    
+
     return workflow
 
 
+def critical_path(
+    connections: List[Dict[str, Any]], timings: Dict[str, float]
+) -> tuple:
+    """
+    关键路径：按节点耗时加权的最长执行路径
+
+    并行执行时总耗时取决于这条路径，而不是各节点耗时之和。
+    Returns: (节点ID列表, 耗时毫秒)
+    """
+    durations = {
+        key[len("node_") :]: value
+        for key, value in timings.items()
+        if key.startswith("node_")
+    }
+    predecessors = {}
+    for conn in connections:
+        if (
+            conn.get("type") == "unidirectional"
+            and conn.get("from") in durations
+            and conn.get("to") in durations
+        ):
+            predecessors.setdefault(conn["to"], []).append(conn["from"])
+
+    memo = {}
+
+    def longest(node_id, visiting):
+        if node_id in memo:
+            return memo[node_id]
+        best = ([], 0.0)
+        for pred in predecessors.get(node_id, []):
+            if pred in visiting:
+                continue
+            candidate = longest(pred, visiting | {node_id})
+            if candidate[1] > best[1]:
+                best = candidate
+        memo[node_id] = (best[0] + [node_id], best[1] + durations[node_id])
+        return memo[node_id]
+
+    paths = [longest(node_id, frozenset()) for node_id in durations]
+    return max(paths, key=lambda p: p[1]) if paths else ([], 0.0)
+
+
+def workflow_key(nodes: List[Dict[str, Any]], connections: List[Dict[str, Any]]) -> str:
+    """工作流定义的哈希（节点配置 + 连接）"""
+    payload = json.dumps(
+        {"nodes": nodes, "connections": connections},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_compiled_workflows: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def get_compiled_workflow(
+    nodes: List[Dict[str, Any]], connections: List[Dict[str, Any]]
+):
+    """按定义哈希取已编译的工作流（LRU），未命中时构图并编译"""
+    key = workflow_key(nodes, connections)
+    app = _compiled_workflows.get(key)
+    if app is not None:
+        _compiled_workflows.move_to_end(key)
+        return app
+
+    app = create_workflow_graph(nodes, connections).compile()
+    _compiled_workflows[key] = app
+    while len(_compiled_workflows) > WORKFLOW_CACHE_SIZE:
+        _compiled_workflows.popitem(last=False)
+    return app
+
+
 async def execute_workflow(
     question: str,
     nodes: List[Dict[str, Any]],
@@ -290,64 +313,41 @@ async def execute_workflow(
 ) -> WorkflowState:
     """
     执行工作流
-    
+
     Args:
         question: 用户问题
         nodes: 节点列表
         connections: 连接列表
-        checkpoint: 可选检查点（用于恢复执行）
+        checkpoint: 可选检查点存储（如 MemorySaver），默认不启用；
+            启用时图单独编译，不走缓存
         request: FastAPI Request 对象（用于工具调用）
         user: 用户对象（用于工具调用）
-    
+
     Returns:
         执行完成后的 WorkflowState
     """
-    # 创建图
-    workflow = create_workflow_graph(nodes, connections, request, user, event_emitter)
-    
-    # 创建检查点存储（如果提供）
-    if checkpoint is None:
-        checkpoint = MemorySaver()
-    
-    # 编译图
-    app = workflow.compile(checkpointer=checkpoint)
-    
-    # 初始化状态
-    initial_state = WorkflowGraphState(
-        messages={},
-        execution_path=[],
-        question=question,
-        start_time=time.time(),
-        timings={},
-        retrieved_context=None,
-        llm_output=None,
-        total=0,
-        documents=[],
-        scores=[],
-    )
-    
-    # request 和 user 已通过 create_node_function 传递到节点
-    
-    # 执行图
-    config = {"configurable": {"thread_id": "1"}}
-    final_state = None
-    
-    # 流式执行，收集最后一个状态
-    async for state in app.astream(initial_state, config):
-        # LangGraph 返回的是 {node_id: state} 格式
-        if isinstance(state, dict) and state:
-            final_state = list(state.values())[-1]
-        else:
-            final_state = state
-    
-    # 转换为 WorkflowState
-    if final_state:
-        workflow_state = _convert_from_langgraph_state(final_state)
-        # 计算总时间
-        if workflow_state.start_time:
-            workflow_state.timings["total"] = (time.time() - workflow_state.start_time) * 1000
-        return workflow_state
-    
-    # 如果执行失败，返回初始状态
-    return _convert_from_langgraph_state(initial_state)
+    if checkpoint is not None:
+        app = create_workflow_graph(nodes, connections).compile(checkpointer=checkpoint)
+    else:
+        app = get_compiled_workflow(nodes, connections)
 
+    # 初始化状态（所有节点共享并原地修改）
+    workflow_state = WorkflowState(question=question, start_time=time.time())
+    workflow_state._request = request
+    workflow_state._user = user
+    workflow_state._event_emitter = event_emitter
+
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    result = await app.ainvoke({"workflow": workflow_state}, config)
+    if isinstance(result, dict) and isinstance(result.get("workflow"), WorkflowState):
+        workflow_state = result["workflow"]
+
+    # 关键路径与总时间
+    workflow_state.critical_path, workflow_state.timings["critical_path"] = (
+        critical_path(connections, workflow_state.timings)
+    )
+    if workflow_state.start_time:
+        workflow_state.timings["total"] = (
+            time.time() - workflow_state.start_time
+        ) * 1000
+    return workflow_state
@@ -5,12 +5,62 @@ LangGraph 节点实现
 """
 from typing import Dict, Any, List, Optional
 from .state import WorkflowState, Message
+import asyncio
 import logging
 import json
 import inspect
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# 单个工具调用的默认超时（秒），可由节点配置 timeout 覆盖
+DEFAULT_TOOL_TIMEOUT = float(os.environ.get("AGENT_TOOL_TIMEOUT", "60"))
+
+# LLM 流式输出推送给前端的最小间隔（秒）
+STREAM_EMIT_INTERVAL = float(os.environ.get("AGENT_STREAM_EMIT_INTERVAL", "0.05"))
+
+# model_id -> (MODELS 字典, base urls, keys, (base_url, key, upstream_model_id))
+_endpoint_cache: Dict[str, tuple] = {}
+
+
+def resolve_model_endpoint(request, model_id: str) -> Optional[tuple]:
+    """
+    解析模型对应的 OpenAI 兼容接口：(base_url, key, 上游模型ID)
+
+    结果按 model_id 缓存；app.state.MODELS 重建或连接配置变化后自动失效。
+    """
+    models = request.app.state.MODELS
+    base_urls = request.app.state.config.OPENAI_API_BASE_URLS
+    keys = request.app.state.config.OPENAI_API_KEYS
+
+    cached = _endpoint_cache.get(model_id)
+    if cached and cached[0] is models and cached[1] == base_urls and cached[2] == keys:
+        return cached[3]
+
+    endpoint = None
+    model = models.get(model_id)
+    upstream_model_id = model_id
+    if model:
+        # 工作区自定义模型：使用其基础模型的连接
+        base_model_id = (model.get("info") or {}).get("base_model_id")
+        if base_model_id and "urlIdx" not in model and base_model_id in models:
+            model = models[base_model_id]
+            upstream_model_id = base_model_id
+
+        url_idx = model.get("urlIdx", 0)
+        if url_idx < len(base_urls):
+            endpoint = (
+                base_urls[url_idx].rstrip("/"),
+                keys[url_idx] if url_idx < len(keys) else None,
+                upstream_model_id,
+            )
+        else:
+            logger.warning(f"API URL 索引 {url_idx} 超出范围")
+
+    _endpoint_cache[model_id] = (models, list(base_urls), list(keys), endpoint)
+    return endpoint
+
 
 class BaseNode:
     """节点基类"""
@@ -26,9 +76,10 @@ class BaseNode:
 
 class InputNode(BaseNode):
     """输入节点：接收用户输入"""
-    
+
     async def execute(self, state: WorkflowState) -> WorkflowState:
-        input_text = str(self.config.get("user_input", "")).strip()
+        # 未配置固定输入时使用本次请求的问题（问题不写进节点配置，编译后的图可复用）
+        input_text = str(self.config.get("user_input") or state.question or "").strip()
         if input_text:
             if not state.messages.get(self.node_id):
                 state.messages[self.node_id] = {}
@@ -69,7 +120,7 @@ class DataSourceNode(BaseNode):
 
 class RetrievalNode(BaseNode):
     """检索节点：执行向量检索"""
-    
+
     async def execute(self, state: WorkflowState) -> WorkflowState:
         # 获取 question
         question = self._get_input_value(state, "question", None)
@@ -78,118 +129,177 @@ class RetrievalNode(BaseNode):
             question = state.question or ""
         else:
             question = str(question).strip()
-        
+
         # 获取 datasets
         dataset_ids = self._get_input_value(state, "datasets", None)
         if not dataset_ids or not isinstance(dataset_ids, list):
             # 从上游 dataSource 节点获取（通过连接）
             dataset_ids = []
-        
-        if not dataset_ids:
+
+        cfg = self.config
+        # 本地知识库（向量库集合），可与 RAGFlow 数据集同时检索；
+        # 节点配置由工作流作者决定，只检索当前用户有读权限的知识库
+        knowledge_ids = cfg.get("knowledge_ids") or []
+        if knowledge_ids:
+            knowledge_ids = await asyncio.to_thread(
+                self._get_readable_knowledge_ids,
+                knowledge_ids,
+                getattr(state, "_user", None),
+            )
+
+        if not dataset_ids and not knowledge_ids:
             logger.warning(f"检索节点 {self.node_id} 没有找到数据源")
             state.execution_path.append(self.node_id)
             return state
-        
-        # 执行检索（调用实际的检索服务）
-        from open_webui.services.ragflow.chunk_management import get_client as get_ragflow_chunk_client
-        from open_webui.services.ragflow import get_base_url, get_api_key
-        
-        cfg = self.config
-        
-        # 创建检索客户端（需要从配置获取 base_url 和 api_key）
-        # 这里简化处理，实际应该从请求上下文获取
-        base_url = get_base_url(None)  # TODO: 传入 Request 对象
-        api_key = get_api_key(None)
-        chunk_client = get_ragflow_chunk_client(base_url, api_key)
-        
-        # 执行检索
-        documents, scores = await chunk_client.retrieve(
-            question=question,
-            dataset_ids=dataset_ids,
-            similarity_threshold=cfg.get("similarity_threshold"),
-            vector_similarity_weight=cfg.get("vector_similarity_weight"),
-            top_k=cfg.get("top_k", 5),
-            keyword=cfg.get("keyword", True),
-            highlight=cfg.get("highlight", False)
+
+        # 执行检索：并发查询各后端，各自有截止时间，多后端时RRF融合
+        from open_webui.services.federated_retrieval import (
+            DEFAULT_BACKEND_TIMEOUT,
+            LocalVectorBackend,
+            RagFlowBackend,
+            federated_search,
         )
-        
+
+        request = getattr(state, "_request", None)
+        backends = []
+        if dataset_ids:
+            from open_webui.services.ragflow.chunk_management import (
+                get_client as get_ragflow_chunk_client,
+            )
+
+            backends.append(
+                RagFlowBackend(
+                    get_ragflow_chunk_client(request),
+                    dataset_ids,
+                    retrieve_kwargs={
+                        "similarity_threshold": cfg.get("similarity_threshold"),
+                        "vector_similarity_weight": cfg.get("vector_similarity_weight"),
+                        "top_k": cfg.get("top_k", 5),
+                        "keyword": cfg.get("keyword", True),
+                        "highlight": cfg.get("highlight", False),
+                    },
+                    timeout=cfg.get("ragflow_timeout", DEFAULT_BACKEND_TIMEOUT),
+                )
+            )
+        if knowledge_ids:
+            from open_webui.services.langchain_rag_service import (
+                get_langchain_rag_service,
+            )
+
+            backends.append(
+                LocalVectorBackend(
+                    get_langchain_rag_service(request),
+                    knowledge_ids,
+                    timeout=cfg.get("local_timeout", DEFAULT_BACKEND_TIMEOUT),
+                )
+            )
+
+        result = await federated_search(question, backends, top_k=cfg.get("top_k", 5))
+        documents, scores = result.documents, result.scores
+        if result.partial:
+            logger.warning(
+                f"检索节点 {self.node_id} 部分后端未返回: {[vars(b) for b in result.backends if b.status != 'ok']}"
+            )
+
         # 组装上下文
         context = self._assemble_context(cfg, {"documents": documents, "scores": scores})
-        
-        # 存储结果
-        if not state.messages.get(self.node_id):
-            state.messages[self.node_id] = {}
-        state.messages[self.node_id]["context"] = Message(
-            type="context",
-            payload=context
-        )
-        state.messages[self.node_id]["retrieval_result"] = Message(
-            type="json",
-            payload={
-                "total": len(documents),
-                "documents": documents,
-                "scores": scores
-            }
+
+        # 存储结果（并行的多个检索节点结果经 reducer 合并）
+        state.add_messages(
+            self.node_id,
+            context=Message(type="context", payload=context),
+            retrieval_result=Message(
+                type="json",
+                payload={
+                    "total": len(documents),
+                    "documents": documents,
+                    "scores": scores,
+                    "partial": result.partial,
+                    "backends": [vars(b) for b in result.backends],
+                },
+            ),
         )
-        
+
         state.retrieved_context = context
-        state.total = len(documents)
-        state.documents = documents
-        state.scores = scores
-        
+        state.add_documents(documents, scores)
+        if result.partial:
+            state.partial = True
+
         state.execution_path.append(self.node_id)
         return state
-    
+
+    def _get_readable_knowledge_ids(self, knowledge_ids: List[str], user) -> List[str]:
+        """过滤掉用户无读权限的知识库（管理员不受限，无用户时不检索本地知识库）"""
+        if user is None:
+            logger.warning(f"检索节点 {self.node_id} 没有用户上下文，跳过本地知识库")
+            return []
+        if getattr(user, "role", None) == "admin":
+            return list(knowledge_ids)
+
+        from open_webui.models.knowledge import Knowledges
+
+        readable = [
+            knowledge_id
+            for knowledge_id in knowledge_ids
+            if Knowledges.check_access_by_user_id(
+                knowledge_id, user.id, permission="read"
+            )
+        ]
+        if len(readable) < len(knowledge_ids):
+            denied = [k for k in knowledge_ids if k not in readable]
+            logger.warning(f"检索节点 {self.node_id} 无权访问知识库，已跳过: {denied}")
+        return readable
+
     def _get_input_value(self, state: WorkflowState, port_key: str, default: Any) -> Any:
         """获取输入值（优先从 input_bindings，否则从上游节点）"""
         bindings = self.config.get("input_bindings", {})
         binding = bindings.get(port_key)
-        
+
         if binding and "." in binding:
             source_node_id, source_port = binding.split(".", 1)
             source_msg = state.messages.get(source_node_id, {}).get(source_port)
             if source_msg:
                 return source_msg.payload
-        
+
         return default
-    
+
     def _assemble_context(self, cfg: Dict[str, Any], ret: Dict[str, Any]) -> str:
         """组装检索上下文"""
         documents = ret.get("documents", [])
         scores = ret.get("scores", [])
-        
+
         ctx_top_k = cfg.get("context_top_k", 3)
         ctx_join = cfg.get("context_join", "\n---\n")
         ctx_max = cfg.get("context_max_chars", 2000)
         use_hl = cfg.get("context_use_highlight", False)
         inc_src = cfg.get("context_include_source", True)
         inc_score = cfg.get("context_include_score", False)
-        
+
         picked = documents[:ctx_top_k]
         assembled_parts = []
-        
+
         for i, doc in enumerate(picked):
             meta = doc.get("metadata", {})
             content = meta.get("highlight") if use_hl and meta.get("highlight") else doc.get("content", "")
-            
+
             parts = [content]
             if inc_src and meta.get("document_name"):
                 parts.append(f"【来源】{meta.get('document_name')}")
             if inc_score and i < len(scores):
                 parts.append(f"【分数】{scores[i]:.3f}")
-            
+
             assembled_parts.append("\n".join(parts))
-        
+
         assembled = ctx_join.join(assembled_parts)
         if len(assembled) > ctx_max:
             assembled = assembled[:ctx_max] + "..."
-        
+
         return assembled
 
 
 class LLMNode(BaseNode):
     """LLM 节点：执行大语言模型生成"""
-    
+
     async def execute(self, state: WorkflowState) -> WorkflowState:
         # 获取 Request 和 user（从 state 中传递）
         request = getattr(state, "_request", None)
@@ -206,44 +316,55 @@ class LLMNode(BaseNode):
                 )
         except Exception:
             pass
-        
-        # 保存到实例中供 _call_llm 使用
-        self._request = request
-        self._user = user
-        
+
         # 获取输入
         question = self._get_input_value(state, "question", state.question) or state.question
         context = self._get_input_value(state, "context", "") or ""
-        
-        # 收集所有工具节点的结果
+
+        # 收集所有工具节点的结果（超时/失败的工具也注明，便于模型判断结果不完整）
         tool_results = []
-        for node_id, node_messages in state.messages.items():
-            if node_id.startswith("tool_") and "result" in node_messages:
+        for node_id, node_messages in sorted(state.messages.items()):
+            if not node_id.startswith("tool_"):
+                continue
+            if "result" in node_messages:
                 tool_result = node_messages["result"].payload
                 tool_results.append(f"工具 {node_id} 的结果:\n{tool_result}")
-        
+            elif "error" in node_messages:
+                tool_results.append(
+                    f"工具 {node_id} 未返回结果: {node_messages['error'].payload}"
+                )
+
         # 构建工具结果文本
         tool_results_text = "\n\n".join(tool_results) if tool_results else "无工具结果"
-        
+
         # 渲染提示词模板
         template = str(
             self.config.get("prompt_template") or
             "请基于上下文和工具结果回答问题\n问题: {question}\n上下文:\n{retrieved_context}\n\n工具结果:\n{tool_results}"
         )
-        
+
         prompt = template.format(
             question=str(question),
             retrieved_context=str(context) if context else "无上下文",
             tool_results=tool_results_text
         )
-        
+
         # 调用 LLM
         model_id = str(self.config.get("model", ""))
         temperature = float(self.config.get("temperature", 0.7))
         max_tokens = int(self.config.get("max_tokens", 2000))
-        
-        output = await self._call_llm(model_id, prompt, temperature, max_tokens)
-        
+
+        # 节点实例随编译后的图跨请求复用，request / user 只能按调用传递
+        output = await self._call_llm(
+            model_id,
+            prompt,
+            temperature,
+            max_tokens,
+            request,
+            user,
+            event_emitter=getattr(state, "_event_emitter", None),
+        )
+
         if output:
             if not state.messages.get(self.node_id):
                 state.messages[self.node_id] = {}
@@ -252,110 +373,149 @@ class LLMNode(BaseNode):
                 payload=output
             )
             state.llm_output = output
-        
+
         state.execution_path.append(self.node_id)
         return state
-    
+
     def _get_input_value(self, state: WorkflowState, port_key: str, default: Any) -> Any:
         """获取输入值"""
         bindings = self.config.get("input_bindings", {})
         binding = bindings.get(port_key)
-        
+
         if binding and "." in binding:
             source_node_id, source_port = binding.split(".", 1)
             source_msg = state.messages.get(source_node_id, {}).get(source_port)
             if source_msg:
                 return source_msg.payload
-        
+
         return default
-    
-    async def _call_llm(self, model_id: str, prompt: str, temperature: float, max_tokens: int) -> str:
-        """调用 LLM 生成"""
+
+    async def _call_llm(
+        self,
+        model_id: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        request: Optional[Any] = None,
+        user: Optional[Any] = None,
+        event_emitter: Optional[Any] = None,
+    ) -> str:
+        """调用 LLM 生成（流式，经 event_emitter 逐步推送内容）"""
+        if not request:
+            logger.warning("缺少 Request 对象，无法调用 LLM")
+            return ""
+
         try:
-            # 获取 Request 和 user（从 state 中传递）
-            request = getattr(self, "_request", None)
-            user = getattr(self, "_user", None)
-            
-            if not request:
-                logger.warning("缺少 Request 对象，无法调用 LLM")
+            import aiohttp
+            from open_webui.env import (
+                AIOHTTP_CLIENT_TIMEOUT,
+                AIOHTTP_CLIENT_SESSION_SSL,
+            )
+            from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+
+            endpoint = resolve_model_endpoint(request, model_id)
+            if endpoint is None:
+                logger.warning(f"模型 {model_id} 未找到可用的 OpenAI 兼容接口")
                 return ""
-            
-            # 使用 OpenAI 客户端直接调用
-            try:
-                import aiohttp
-                from open_webui.models.models import Models
-                
-                # 获取模型信息
-                model_info = Models.get_model_by_id(model_id)
-                if not model_info:
-                    logger.warning(f"模型 {model_id} 未找到")
-                    return ""
-                
-                # 从 request.app.state 获取 API 配置
-                models_dict = request.app.state.MODELS
-                model_config = models_dict.get(model_id, {})
-                
-                if not model_config:
-                    logger.warning(f"模型配置 {model_id} 未找到")
-                    return ""
-                
-                # 获取 API URL 和 Key
-                url_idx = model_config.get("urlIdx", 0)
-                api_base_urls = request.app.state.config.OPENAI_API_BASE_URLS
-                api_keys = request.app.state.config.OPENAI_API_KEYS
-                
-                if url_idx >= len(api_base_urls):
-                    logger.warning(f"API URL 索引 {url_idx} 超出范围")
+            base_url, key, upstream_model_id = endpoint
+
+            headers = {"Content-Type": "application/json"}
+            if key:
+                headers["Authorization"] = f"Bearer {key}"
+
+            stream = bool(self.config.get("stream", True))
+            payload = {
+                "model": upstream_model_id,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": stream,
+            }
+
+            # 复用连接池中的长连接会话，不为每次调用新建 ClientSession
+            session = UPSTREAM_SESSION_POOL.get_session(base_url)
+            async with session.post(
+                f"{base_url}/chat/completions",
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+                ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"LLM API 调用失败: {response.status} - {error_text}")
                     return ""
-                
-                url = api_base_urls[url_idx]
-                key = api_keys[url_idx] if url_idx < len(api_keys) else None
-                
-                # 构建请求
-                api_url = f"{url}/chat/completions"
-                headers = {
-                    "Content-Type": "application/json"
-                }
-                if key:
-                    headers["Authorization"] = f"Bearer {key}"
-                
-                payload = {
-                    "model": model_id,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": temperature,
-                    "max_tokens": max_tokens
-                }
-                
-                # 发送请求
-                timeout = aiohttp.ClientTimeout(total=300)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(api_url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                            return content
-                        else:
-                            error_text = await response.text()
-                            logger.error(f"LLM API 调用失败: {response.status} - {error_text}")
-                            return ""
-                
-            except Exception as e:
-                logger.error(f"LLM 调用失败: {e}", exc_info=True)
-                return ""
+
+                if "text/event-stream" in response.headers.get("Content-Type", ""):
+                    return await self._read_stream(response, event_emitter)
+
+                # 后端不支持流式时按普通响应处理
+                result = await response.json()
+                return (
+                    result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    or ""
+                )
         except Exception as e:
             logger.error(f"LLM 调用失败: {e}", exc_info=True)
             return ""
 
+    async def _read_stream(self, response, event_emitter: Optional[Any]) -> str:
+        """解析 SSE 流，按时间间隔合并推送（避免每个 token 一次推送）"""
+        parts: List[str] = []
+        emitted = 0
+        last_emit = 0.0
+
+        async def emit():
+            nonlocal emitted, last_emit
+            if not event_emitter or len(parts) == emitted:
+                return
+            emitted = len(parts)
+            last_emit = time.monotonic()
+            try:
+                await event_emitter(
+                    {
+                        "type": "chat:completion",
+                        "data": {"content": "".join(parts)},
+                    }
+                )
+            except Exception:
+                pass
+
+        buffer = b""
+        async for chunk in response.content.iter_any():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta") or {}
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta.get("content"):
+                    parts.append(delta["content"])
+
+            if time.monotonic() - last_emit >= STREAM_EMIT_INTERVAL:
+                await emit()
+
+        await emit()
+        return "".join(parts)
+
 
 class ToolNode(BaseNode):
     """工具节点：调用 OpenWebUI Tools 系统"""
-    
+
     async def execute(self, state: WorkflowState) -> WorkflowState:
         # 获取工具配置
         tool_id = self.config.get("tool_id", "")
         tool_name = self.config.get("tool_name", "")
-        tool_params = self.config.get("tool_params", {})
-        
+        # 编译后的节点在请求间复用，参数按次复制，不能写回节点配置
+        tool_params = dict(self.config.get("tool_params") or {})
+
         # 从输入端口获取参数（优先使用 input_bindings）
         input_params = self._get_input_value(state, "params", {})
         if isinstance(input_params, dict):
@@ -366,25 +526,26 @@ class ToolNode(BaseNode):
                 tool_params = {**tool_params, **input_params}
             except:
                 pass
-        
+
         # 如果没有 question 参数，尝试从 state.question 获取
         if "question" not in tool_params and state.question:
             tool_params["question"] = state.question
-        
+
         # 如果输入是字符串，尝试解析为 question
         question_input = self._get_input_value(state, "question", None)
         if question_input and isinstance(question_input, str):
             if "question" not in tool_params:
                 tool_params["question"] = question_input
-        
+
         # 获取 Request 和 user（从 state 中传递）
         request = getattr(state, "_request", None)
         user = getattr(state, "_user", None)
-        
+        timeout = float(self.config.get("timeout") or DEFAULT_TOOL_TIMEOUT)
+
         try:
             # 调用工具系统
             from open_webui.utils.tools import get_tools
-            
+
             # 构建 extra_params
             # 构建 extra_params（保留字典形式给工具侧）
             extra_params = {
@@ -398,15 +559,15 @@ class ToolNode(BaseNode):
                 "__metadata__": {},
                 "__event_call__": None,  # TODO: 实现事件调用（用于 direct 工具）
             }
-            
+
             # 获取工具
             tool_ids = [tool_id] if tool_id else []
             tools_dict = await get_tools(request, tool_ids, user, extra_params)
-            
+
             # 查找工具函数
             tool_function = None
             tool_info = None
-            
+
             if tool_name and tool_name in tools_dict:
                 tool_info = tools_dict[tool_name]
                 tool_function = tool_info.get("callable")
@@ -418,19 +579,17 @@ class ToolNode(BaseNode):
                         tool_function = tool_dict.get("callable")
                         tool_name = name
                         break
-            
+
             if not tool_function:
                 logger.warning(f"工具节点 {self.node_id} 未找到工具: tool_id={tool_id}, tool_name={tool_name}")
                 error_msg = f"工具未找到: tool_id={tool_id}, tool_name={tool_name}"
-                if not state.messages.get(self.node_id):
-                    state.messages[self.node_id] = {}
-                state.messages[self.node_id]["error"] = Message(
-                    type="text",
-                    payload=error_msg
+                state.add_messages(
+                    self.node_id, error=Message(type="text", payload=error_msg)
                 )
+                state.partial = True
                 state.execution_path.append(self.node_id)
                 return state
-            
+
             # 根据函数签名过滤/映射参数，避免意外参数报错
             try:
                 sig = inspect.signature(tool_function)
@@ -446,7 +605,7 @@ class ToolNode(BaseNode):
                         if alt in param_names:
                             filtered_params[alt] = q
                             break
-                        
+
                 # 注入 __request__/__user__ 如果函数接受
                 if "__request__" in param_names:
                     filtered_params["__request__"] = request
@@ -462,15 +621,15 @@ class ToolNode(BaseNode):
                     if param_name in sig.parameters:
                         param = sig.parameters[param_name]
                         param_type = param.annotation
-                        
+
                         # 跳过没有类型注解或类型为 inspect.Parameter.empty 的参数
                         if param_type == inspect.Parameter.empty:
                             continue
-                        
+
                         # 如果参数已经是正确类型，跳过
                         if isinstance(param_value, param_type):
                             continue
-                        
+
                         try:
                             # 尝试类型转换
                             if param_type == int:
@@ -507,54 +666,57 @@ class ToolNode(BaseNode):
                             logger.warning(f"参数 {param_name} 类型转换失败: {e}，使用原始值")
                             # 转换失败时保持原值
 
-                # 执行工具
+                # 执行工具（同步函数放到线程中，不阻塞并行的其它分支）
                 if inspect.iscoroutinefunction(tool_function):
-                    tool_result = await tool_function(**filtered_params)
+                    call = tool_function(**filtered_params)
                 else:
-                    tool_result = tool_function(**filtered_params)
+                    call = asyncio.to_thread(tool_function, **filtered_params)
+                tool_result = await asyncio.wait_for(call, timeout)
             except Exception as e:
                 raise e
-            
+
             # 格式化结果
             if isinstance(tool_result, (dict, list)):
                 tool_result = json.dumps(tool_result, indent=2, ensure_ascii=False)
             elif not isinstance(tool_result, str):
                 tool_result = str(tool_result)
-            
+
             # 存储结果
-            if not state.messages.get(self.node_id):
-                state.messages[self.node_id] = {}
-            state.messages[self.node_id]["result"] = Message(
-                type="text",
-                payload=tool_result
+            state.add_messages(
+                self.node_id, result=Message(type="text", payload=tool_result)
             )
-            
+
             logger.info(f"工具节点 {self.node_id} 执行成功: {tool_name}")
-            
+
+        except asyncio.TimeoutError:
+            logger.warning(f"工具节点 {self.node_id} 超时: {tool_name}")
+            state.add_messages(
+                self.node_id,
+                error=Message(type="text", payload=f"工具调用超时（{timeout}s）"),
+            )
+            state.partial = True
         except Exception as e:
             logger.error(f"工具节点 {self.node_id} 执行失败: {e}", exc_info=True)
             error_msg = f"工具调用失败: {str(e)}"
-            if not state.messages.get(self.node_id):
-                state.messages[self.node_id] = {}
-            state.messages[self.node_id]["error"] = Message(
-                type="text",
-                payload=error_msg
+            state.add_messages(
+                self.node_id, error=Message(type="text", payload=error_msg)
             )
-        
+            state.partial = True
+
         state.execution_path.append(self.node_id)
         return state
-    
+
     def _get_input_value(self, state: WorkflowState, port_key: str, default: Any) -> Any:
         """获取输入值"""
         bindings = self.config.get("input_bindings", {})
         binding = bindings.get(port_key)
-        
+
         if binding and "." in binding:
             source_node_id, source_port = binding.split(".", 1)
             source_msg = state.messages.get(source_node_id, {}).get(source_port)
             if source_msg:
                 return source_msg.payload
-        
+
         return default
 
 
@@ -586,4 +748,3 @@ class OutputNode(BaseNode):
                 return source_msg.payload
         
         return default
-
@@ -13,6 +13,7 @@ from open_webui.services.ragflow.dataset_management import get_client as get_rag
 from open_webui.services.ragflow.file_management import get_client as get_ragflow_file_client
 from open_webui.models.knowledge import Knowledges
 from open_webui.models.files import Files, FileForm
+from open_webui.models.excel_segments import ExcelSegments, SEGMENTS_INDEXED_KEY
 from open_webui.utils.auth import get_verified_user
 from open_webui.routers.retrieval import save_docs_to_vector_db
 from langchain_core.documents import Document
@@ -284,7 +285,9 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
 
             workbook_total_segments = 0
             sheet_summaries: List[Dict[str, Any]] = []
-            sheets_data: List[Dict[str, Any]] = []  # 保存完整的结构化数据
+            sheets_data: List[Dict[str, Any]] = (
+                []
+            )  # 完整的结构化数据，写入 excel_segment 表
             parts: List[str] = []
 
             for sheet_name in excel_file.sheet_names:
@@ -296,7 +299,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
 
                 # 识别常见列名（优先级：精确匹配 > 包含关键词）
                 cols = [str(c).strip() for c in df.columns]
-                
+
                 # 分段标题列：优先匹配"分段标题"，然后是包含"标题"的列
                 title_cols = []
                 for c in cols:
@@ -304,7 +307,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         title_cols.insert(0, c)  # 精确匹配优先
                     elif "标题" in c or "title" in c.lower():
                         title_cols.append(c)
-                
+
                 # 分段内容列：优先匹配"分段内容"，然后是包含"内容"的列
                 content_cols = []
                 for c in cols:
@@ -312,7 +315,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         content_cols.insert(0, c)  # 精确匹配优先
                     elif "内容" in c or "content" in c.lower():
                         content_cols.append(c)
-                
+
                 # 问题（选填，单元格内一行一个）列：优先匹配"问题（选填，单元格内一行一个）"，然后是包含"问题"的列
                 question_cols = []
                 for c in cols:
@@ -320,7 +323,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         question_cols.insert(0, c)  # 精确匹配优先
                     elif "问题" in c or "question" in c.lower():
                         question_cols.append(c)
-                
+
                 # 日志：记录识别到的列
                 if not title_cols or not content_cols:
                     logger.warning(f"Sheet {f.name}:{sheet_name} 列识别不完整 - 所有列: {cols}, 标题列: {title_cols}, 内容列: {content_cols}, 问题列: {question_cols}")
@@ -349,11 +352,11 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         })
 
                 if not segments_content:
-                            continue
-        
+                    continue
+
                 segments_content.sort(key=lambda s: s.get("row", 0))
                 workbook_total_segments += len(segments_content)
-                
+
                 # 保存完整的结构化数据
                 sheet_data = {
                     "name": sheet_name,
@@ -361,7 +364,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     "segments": segments_content  # 保存完整的分段数据
                 }
                 sheets_data.append(sheet_data)
-                
+
                 # 同时生成Markdown格式用于展示（兼容性）
                 # 注意：为避免把“问题（选填，单元格内一行一个）”混入分段内容，此处仅输出标题与内容，不再拼接问题到内容文本
                 sheet_block = [f"# {sheet_name}"]
@@ -370,7 +373,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     content_block = f"## {seg_title}\n{s['content']}"
                     sheet_block.append(content_block)
                 parts.append("\n\n".join(sheet_block))
-                
+
                 # 保留summary用于兼容
                 sheet_summaries.append({
                     "name": sheet_name,
@@ -388,6 +391,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
             if old_id:
                 try:
                     Files.delete_file_by_id(old_id)
+                    ExcelSegments.delete_by_file_id(old_id)
                 except Exception:
                     pass
             file_id = str(uuid.uuid4())
@@ -400,21 +404,23 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     "type": "excel_segment_aggregated",
                     "source_file": f.stem,
                     "sheets": sheet_summaries,  # 保留用于兼容
-                    "sheets_data": sheets_data,  # 新增：完整的结构化数据
                     "segment_count": workbook_total_segments,
-                    "content": file_content  # Markdown格式，用于兼容
+                    "content": file_content,  # Markdown格式，用于兼容（分段读取不加载此字段）
+                    SEGMENTS_INDEXED_KEY: True,
                 },
                 meta={
                     "name": filename,
                     "content_type": "text/plain",
-                    "size": len(file_content.encode('utf-8')),
+                    "size": len(file_content.encode("utf-8")),
                     "source": "excel_extraction",
-                    "original_file": f.stem
+                    "original_file": f.stem,
                 },
-                access_control=None
+                access_control=None,
             )
             rec = Files.insert_new_file(user.id, file_form)
             if rec:
+                # 结构化分段批量写入 excel_segment 表（与 routers/rag_api 共用）
+                ExcelSegments.insert_sheets(file_id, sheets_data)
                 file_ids.append(file_id)
 
         # 更新knowledge.data.file_ids（去重）
@@ -1002,97 +1008,31 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
 
 @router.get("/saved-excel-file/{file_id}/segments", response_model=SavedFileSegmentsResponse)
 async def get_saved_excel_file_segments(file_id: str, user=Depends(get_verified_user)):
-    """根据聚合后的文件ID，解析并返回 Sheet 与分段层级结构。"""
+    """根据聚合后的文件ID，返回 Sheet 与分段层级结构（读取 excel_segment 表）。"""
     try:
-        file_record = Files.get_file_by_id(file_id)
+        file_record = ExcelSegments.get_file(file_id)
         if not file_record:
             raise HTTPException(status_code=404, detail="文件不存在")
         if file_record.user_id != user.id:
             raise HTTPException(status_code=403, detail="无权访问该文件")
 
-        # 优先使用保存的结构化数据，如果没有则从Markdown解析
+        # 旧版文件（file.data 中的 sheets_data 或 Markdown）首次读取时回填到表中
+        file_record = ExcelSegments.ensure_indexed(file_record)
         data = file_record.data or {}
         original_file = data.get("source_file") or (file_record.meta or {}).get("original_file", "")
-        
-        # 优先使用结构化数据（sheets_data）
-        if "sheets_data" in data and data["sheets_data"]:
-            sheets_result = []
-            for sheet in data["sheets_data"]:
-                # 转换格式以匹配前端期望（与提取时的格式完全一致）
-                segments = []
-                for seg in sheet.get("segments", []):
-                    segments.append({
-                        "title": seg.get("title", ""),
-                        "content": seg.get("content", ""),
-                        "questions": seg.get("questions", ""),
-                        "row": seg.get("row", 0)  # 保留行号信息
-                    })
-                sheets_result.append({
-                    "name": sheet.get("name", ""),
-                    "segments": segments
-                })
-            return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=sheets_result)
-        
-        # Fallback: 从Markdown解析（兼容旧数据）
-        content = data.get("content", "")
-        if not content:
-            return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=[])
-
-        lines = content.splitlines()
-        sheets_flat = []
-        current_sheet = None
-        current_seg = None
-
-        def push_seg():
-            nonlocal current_seg, current_sheet
-            if current_sheet is not None and current_seg is not None:
-                # 结束一段
-                current_sheet["segments"].append(current_seg)
-                current_seg = None
-
-        def push_sheet():
-            nonlocal current_sheet
-            if current_sheet is not None:
-                sheets_flat.append(current_sheet)
-                current_sheet = None
-
-        for line in lines:
-            if line.startswith("# ") and not line.startswith("## "):
-                # 新 sheet
-                push_seg()
-                push_sheet()
-                name = line[2:].strip()
-                current_sheet = {"name": name, "segments": []}
-                continue
-            if line.startswith("## "):
-                # 新分段
-                push_seg()
-                title = line[3:].strip()
-                current_seg = {"title": title, "content": "", "questions": ""}
-                continue
-            if current_seg is None:
-                # 忽略 sheet 标题下的空行等
-                continue
-            # 累积内容或问题
-            # 注意：只有当整行严格以"问题（选填，单元格内一行一个）:"开头时才识别为问题标记
-            # 如果内容中包含"问题（选填，单元格内一行一个）:"应该作为内容的一部分
-            stripped_line = line.strip()
-            if stripped_line.startswith("问题（选填，单元格内一行一个）:") and len(stripped_line.split(":", 1)) == 2:
-                # 这是问题行，提取问题内容
-                question_text = stripped_line.split(":", 1)[1].strip()
-                if question_text:
-                    current_seg["questions"] = question_text
-                # 问题行不添加到content中
-            else:
-                # 这是内容行
-                current_seg["content"] += ("\n" if current_seg["content"] else "") + line
 
-        # 收尾
-        push_seg()
-        push_sheet()
+        sheet_names = [s.get("name", "") for s in data.get("sheets") or []]
+        sheets = {
+            s.name: {"name": s.name, "segments": []}
+            for s in ExcelSegments.get_sheets(file_id, sheet_names)
+        }
+        for segment in ExcelSegments.iter_segments(file_id):
+            sheets[segment.sheet]["segments"].append(segment.to_segment())
 
         # 直接按Sheet返回，不做分组
-        return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=sheets_flat)
+        return SavedFileSegmentsResponse(
+            file_id=file_id, original_file=original_file, sheets=list(sheets.values())
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -1109,14 +1049,15 @@ async def delete_saved_excel_file(file_id: str, user=Depends(get_verified_user))
             raise HTTPException(status_code=404, detail="文件不存在")
         if file_record.user_id != user.id:
             raise HTTPException(status_code=403, detail="无权删除该文件")
-        
+
         meta = file_record.meta or {}
         if meta.get("source") != "excel_extraction":
             raise HTTPException(status_code=400, detail="只能删除Excel提取的文件")
-        
+
         # 删除文件
         Files.delete_file_by_id(file_id)
-        
+        ExcelSegments.delete_by_file_id(file_id)
+
         # 从所有知识库的file_ids中移除该文件ID
         from open_webui.models.knowledge import Knowledges
         all_knowledges = Knowledges.get_knowledges_by_user_id(user.id)
@@ -1127,7 +1068,7 @@ async def delete_saved_excel_file(file_id: str, user=Depends(get_verified_user))
                 file_ids.remove(file_id)
                 data["file_ids"] = file_ids
                 Knowledges.update_knowledge_data_by_id(id=kb.id, data=data)
-        
+
         return {"success": True, "message": "文件已删除", "file_id": file_id}
     except HTTPException:
         raise
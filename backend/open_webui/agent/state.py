@@ -11,26 +11,67 @@ class Message(BaseModel):
     payload: Any
 
 
+# ---- reducers ----
+# 并行分支在同一步内写入同一个状态，以下归并函数决定如何合并，
+# 而不是后写覆盖先写
+
+
+def merge_messages(
+    left: Dict[str, Dict[str, Message]], right: Dict[str, Dict[str, Message]]
+) -> Dict[str, Dict[str, Message]]:
+    """按节点、端口合并消息"""
+    for node_id, ports in right.items():
+        left.setdefault(node_id, {}).update(ports)
+    return left
+
+
+def merge_documents(
+    left_documents: List[Dict[str, Any]],
+    left_scores: List[float],
+    right_documents: List[Dict[str, Any]],
+    right_scores: List[float],
+) -> tuple:
+    """合并检索结果并按分数降序排列"""
+    pairs = list(zip(left_documents, left_scores)) + list(
+        zip(right_documents, right_scores)
+    )
+    pairs.sort(key=lambda pair: pair[1], reverse=True)
+    return [doc for doc, _ in pairs], [score for _, score in pairs]
+
+
 class WorkflowState(BaseModel):
     """工作流全局状态"""
     # 节点ID -> 端口 -> 消息
     messages: Dict[str, Dict[str, Message]] = {}
-    
+
     # 当前执行路径（用于调试）
     execution_path: List[str] = []
-    
+
     # 元数据
     question: str = ""
     start_time: Optional[float] = None
     timings: Dict[str, float] = {}
-    
+
     # 最终结果
     retrieved_context: Optional[str] = None
     llm_output: Optional[str] = None
     total: int = 0
     documents: List[Dict[str, Any]] = []
     scores: List[float] = []
-    
+
+    # 有节点超时或失败、结果不完整
+    partial: bool = False
+    # 耗时最长的执行路径（节点ID），对应 timings["critical_path"]
+    critical_path: List[str] = []
+
+    def add_messages(self, node_id: str, **ports: Message):
+        merge_messages(self.messages, {node_id: ports})
+
+    def add_documents(self, documents: List[Dict[str, Any]], scores: List[float]):
+        self.documents, self.scores = merge_documents(
+            self.documents, self.scores, documents, scores
+        )
+        self.total = len(self.documents)
+
     class Config:
         arbitrary_types_allowed = True
-
@@ -939,6 +939,39 @@ CACHE_DIR = DATA_DIR / "cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+####################################
+# PDF page rendering
+####################################
+
+PDF_RENDER_CACHE_DIR = Path(
+    os.environ.get("PDF_RENDER_CACHE_DIR", CACHE_DIR / "pdf_pages")
+)
+PDF_RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+try:
+    PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+except ValueError:
+    PDF_RENDER_WORKERS = 2
+
+try:
+    PDF_RENDER_MAX_OPEN_DOCUMENTS = int(
+        os.environ.get("PDF_RENDER_MAX_OPEN_DOCUMENTS", "8")
+    )
+except ValueError:
+    PDF_RENDER_MAX_OPEN_DOCUMENTS = 8
+
+try:
+    PDF_RENDER_PREFETCH_PAGES = int(os.environ.get("PDF_RENDER_PREFETCH_PAGES", "2"))
+except ValueError:
+    PDF_RENDER_PREFETCH_PAGES = 2
+
+# Rendered pages beyond this size are evicted, least recently served first
+try:
+    PDF_RENDER_CACHE_MAX_MB = int(os.environ.get("PDF_RENDER_CACHE_MAX_MB", "1024"))
+except ValueError:
+    PDF_RENDER_CACHE_MAX_MB = 1024
+
+
 ####################################
 # DIRECT CONNECTIONS
 ####################################
@@ -386,6 +386,12 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Store chat messages as rows in chat_message instead of the chat JSON column;
+# existing chats move over on their next write
+ENABLE_CHAT_MESSAGE_TABLE = (
+    os.environ.get("ENABLE_CHAT_MESSAGE_TABLE", "False").lower() == "true"
+)
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 ####################################
@@ -586,6 +592,21 @@ else:
     except Exception:
         CHAT_RESPONSE_MAX_TOOL_CALL_RETRIES = 30
 
+try:
+    CHAT_STATUS_FLUSH_INTERVAL = float(
+        os.environ.get("CHAT_STATUS_FLUSH_INTERVAL", "2")
+    )
+except Exception:
+    CHAT_STATUS_FLUSH_INTERVAL = 2.0
+
+# Streamed chat:completion updates of a message are coalesced into one frame per interval
+try:
+    CHAT_EVENT_FRAME_INTERVAL = float(
+        os.environ.get("CHAT_EVENT_FRAME_INTERVAL", "0.05")
+    )
+except Exception:
+    CHAT_EVENT_FRAME_INTERVAL = 0.05
+
 
 ####################################
 # WEBSOCKET SUPPORT
@@ -610,6 +631,12 @@ try:
 except ValueError:
     WEBSOCKET_REDIS_LOCK_TIMEOUT = 60
 
+# Number of collaborative document updates kept before they are merged into a snapshot
+try:
+    YDOC_COMPACT_THRESHOLD = int(os.environ.get("YDOC_COMPACT_THRESHOLD", "500"))
+except ValueError:
+    YDOC_COMPACT_THRESHOLD = 500
+
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 
@@ -629,6 +656,26 @@ AIOHTTP_CLIENT_SESSION_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_SSL", "True").lower() == "true"
 )
 
+# Connection pool of the long-lived upstream sessions (see utils/http_pool.py)
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100"))
+except Exception:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+try:
+    AIOHTTP_CLIENT_POOL_SIZE_PER_HOST = int(
+        os.environ.get("AIOHTTP_CLIENT_POOL_SIZE_PER_HOST", "32")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_SIZE_PER_HOST = 32
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(
+        os.environ.get("AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30")
+    )
+except Exception:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
 AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST = os.environ.get(
     "AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST",
     os.environ.get("AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST", "10"),
@@ -662,6 +709,73 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+try:
+    TOOL_SERVER_SPEC_CACHE_TTL = float(
+        os.environ.get("TOOL_SERVER_SPEC_CACHE_TTL", "300")
+    )
+except Exception:
+    TOOL_SERVER_SPEC_CACHE_TTL = 300.0
+
+try:
+    TOOL_RESULT_CACHE_SIZE = int(os.environ.get("TOOL_RESULT_CACHE_SIZE", "1024"))
+except Exception:
+    TOOL_RESULT_CACHE_SIZE = 1024
+
+try:
+    TOOL_RESULT_CACHE_MAX_ITEM_SIZE = int(
+        os.environ.get("TOOL_RESULT_CACHE_MAX_ITEM_SIZE", str(256 * 1024))
+    )
+except Exception:
+    TOOL_RESULT_CACHE_MAX_ITEM_SIZE = 256 * 1024
+
+####################################
+# WEB SEARCH PIPELINE
+####################################
+
+try:
+    WEB_LOADER_PER_DOMAIN_CONCURRENCY = int(
+        os.environ.get("WEB_LOADER_PER_DOMAIN_CONCURRENCY", "2")
+    )
+except Exception:
+    WEB_LOADER_PER_DOMAIN_CONCURRENCY = 2
+
+# Seconds; web search returns the pages loaded so far once it passes (0 disables)
+try:
+    WEB_LOADER_DEADLINE = float(os.environ.get("WEB_LOADER_DEADLINE", "15"))
+except Exception:
+    WEB_LOADER_DEADLINE = 15.0
+
+try:
+    WEB_PAGE_CACHE_SIZE = int(os.environ.get("WEB_PAGE_CACHE_SIZE", "512"))
+except Exception:
+    WEB_PAGE_CACHE_SIZE = 512
+
+try:
+    WEB_PAGE_CACHE_TTL = float(os.environ.get("WEB_PAGE_CACHE_TTL", "3600"))
+except Exception:
+    WEB_PAGE_CACHE_TTL = 3600.0
+
+try:
+    WEB_SEARCH_RESULT_CACHE_TTL = float(
+        os.environ.get("WEB_SEARCH_RESULT_CACHE_TTL", "300")
+    )
+except Exception:
+    WEB_SEARCH_RESULT_CACHE_TTL = 300.0
+
+try:
+    WEB_SEARCH_RESULT_CACHE_SIZE = int(
+        os.environ.get("WEB_SEARCH_RESULT_CACHE_SIZE", "512")
+    )
+except Exception:
+    WEB_SEARCH_RESULT_CACHE_SIZE = 512
+
+# Chunk embeddings are kept as float32 arrays: about 6 KB per entry for a
+# 1536-dimension model, so ~50 MB per worker at the default size
+try:
+    WEB_EMBEDDING_CACHE_SIZE = int(os.environ.get("WEB_EMBEDDING_CACHE_SIZE", "8192"))
+except Exception:
+    WEB_EMBEDDING_CACHE_SIZE = 8192
+
 
 ####################################
 # SENTENCE TRANSFORMERS
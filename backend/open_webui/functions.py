@@ -31,6 +31,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 from open_webui.utils.plugin import (
+    PLUGIN_REGISTRY,
     load_function_module_by_id,
     get_function_module_from_cache,
 )
@@ -62,7 +63,7 @@ def get_function_module_by_id(request: Request, pipe_id: str):
 
     if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
         Valves = function_module.Valves
-        valves = Functions.get_function_valves_by_id(pipe_id)
+        valves = PLUGIN_REGISTRY.get_function_valves(pipe_id)
 
         if valves:
             try:
@@ -79,7 +80,7 @@ def get_function_module_by_id(request: Request, pipe_id: str):
 
 
 async def get_function_models(request):
-    pipes = Functions.get_functions_by_type("pipe", active_only=True)
+    pipes = PLUGIN_REGISTRY.get_functions_by_type("pipe", active_only=True)
     pipe_models = []
 
     for pipe in pipes:
@@ -65,6 +65,8 @@ from open_webui.socket.main import (
     get_event_emitter,
     get_models_in_use,
     get_active_user_ids,
+    CHAT_EVENT_FRAMER,
+    STATUS_EVENT_BUFFER,
 )
 from open_webui.routers import (
     audio,
@@ -477,7 +479,16 @@ from open_webui.utils.auth import (
     get_admin_user,
     get_verified_user,
 )
-from open_webui.utils.plugin import install_tool_and_function_dependencies
+from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+from open_webui.utils.plugin import (
+    PLUGIN_REGISTRY,
+    install_tool_and_function_dependencies,
+    redis_plugin_change_listener,
+)
+from open_webui.utils.model_registry import (
+    MODEL_REGISTRY,
+    redis_model_change_listener,
+)
 from open_webui.utils.oauth import (
     OAuthManager,
     OAuthClientManager,
@@ -486,6 +497,8 @@ from open_webui.utils.oauth import (
 )
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
 from open_webui.utils.redis import get_redis_connection
+from open_webui.utils.pdf_render import PDF_RENDER_POOL
+from open_webui.services.ragflow.transport import RAGFLOW_TRANSPORT
 
 from open_webui.tasks import (
     redis_task_command_listener,
@@ -567,10 +580,33 @@ async def lifespan(app: FastAPI):
         async_mode=True,
     )
 
+    sync_redis = (
+        get_redis_connection(
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+            redis_cluster=REDIS_CLUSTER,
+        )
+        if app.state.redis is not None
+        else None
+    )
+    PLUGIN_REGISTRY.bind(app, redis=sync_redis)
+    MODEL_REGISTRY.bind(app, redis=sync_redis)
+
     if app.state.redis is not None:
         app.state.redis_task_command_listener = asyncio.create_task(
             redis_task_command_listener(app)
         )
+        app.state.redis_plugin_change_listener = asyncio.create_task(
+            redis_plugin_change_listener(app)
+        )
+        app.state.redis_model_change_listener = asyncio.create_task(
+            redis_model_change_listener(app)
+        )
+
+    # Execute function modules now rather than inside the first chat request
+    await asyncio.to_thread(PLUGIN_REGISTRY.warmup)
 
     if THREAD_POOL_SIZE and THREAD_POOL_SIZE > 0:
         limiter = anyio.to_thread.current_default_thread_limiter()
@@ -604,6 +640,19 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if hasattr(app.state, "redis_plugin_change_listener"):
+        app.state.redis_plugin_change_listener.cancel()
+
+    if hasattr(app.state, "redis_model_change_listener"):
+        app.state.redis_model_change_listener.cancel()
+
+    await CHAT_EVENT_FRAMER.flush_all()
+    await STATUS_EVENT_BUFFER.flush_all()
+
+    PDF_RENDER_POOL.shutdown()
+    await RAGFLOW_TRANSPORT.close()
+    await UPSTREAM_SESSION_POOL.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -793,8 +842,6 @@ app.state.USER_COUNT = None
 app.state.TOOLS = {}
 app.state.TOOL_CONTENTS = {}
 
-app.state.FUNCTIONS = {}
-app.state.FUNCTION_CONTENTS = {}
 
 ########################################
 #
@@ -1432,7 +1479,7 @@ async def chat_completion(
                 raise Exception("Model not found")
 
             model = request.app.state.MODELS[model_id]
-            model_info = Models.get_model_by_id(model_id)
+            model_info = MODEL_REGISTRY.get_model_info(model_id)
 
             # Check if user has access to the model
             if not BYPASS_MODEL_ACCESS_CONTROL and (
@@ -1888,12 +1935,23 @@ async def get_current_usage(user=Depends(get_verified_user)):
     This is an experimental endpoint and subject to change.
     """
     try:
-        return {"model_ids": get_models_in_use(), "user_ids": get_active_user_ids()}
+        return {
+            "model_ids": await get_models_in_use(),
+            "user_ids": await get_active_user_ids(),
+        }
     except Exception as e:
         log.error(f"Error getting usage statistics: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@app.get("/api/socket/metrics")
+async def get_socket_metrics(user=Depends(get_admin_user)):
+    """
+    Chat event fan-out metrics of this worker (emit rate, pending frames).
+    """
+    return CHAT_EVENT_FRAMER.get_metrics()
+
+
 ############################
 # OAuth Login & Callback
 ############################
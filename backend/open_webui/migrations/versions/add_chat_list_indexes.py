@@ -0,0 +1,48 @@
+"""Add indexes for chat list projections and feedback aggregation
+
+Revision ID: add_chat_list_indexes
+Revises: add_excel_segment_table
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "add_chat_list_indexes"
+down_revision = "add_excel_segment_table"
+branch_labels = None
+depends_on = None
+
+
+def _has_index(bind, table_name: str, index_name: str) -> bool:
+    try:
+        inspector = inspect(bind)
+        return index_name in [i["name"] for i in inspector.get_indexes(table_name)]
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # WHERE user_id = ... ORDER BY updated_at DESC, id DESC (keyset pagination)
+    if not _has_index(bind, "chat", "user_id_updated_at_id_idx"):
+        op.create_index(
+            "user_id_updated_at_id_idx", "chat", ["user_id", "updated_at", "id"]
+        )
+
+    # feedback counts GROUP BY chat_id
+    if not _has_index(bind, "feedback", "feedback_chat_id_idx"):
+        op.create_index("feedback_chat_id_idx", "feedback", ["chat_id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if _has_index(bind, "feedback", "feedback_chat_id_idx"):
+        op.drop_index("feedback_chat_id_idx", table_name="feedback")
+    if _has_index(bind, "chat", "user_id_updated_at_id_idx"):
+        op.drop_index("user_id_updated_at_id_idx", table_name="chat")
@@ -0,0 +1,57 @@
+"""Add chat_message table (normalized per-message chat storage)
+
+Revision ID: add_chat_message_table
+Revises: add_chat_search_table
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "add_chat_message_table"
+down_revision = "add_chat_search_table"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(bind, table_name: str) -> bool:
+    """Check if a table exists"""
+    try:
+        inspector = inspect(bind)
+        return table_name in inspector.get_table_names()
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Only used when ENABLE_CHAT_MESSAGE_TABLE is on; chats move over on their
+    # next write, so no data is copied here
+    if not _table_exists(bind, "chat_message"):
+        op.create_table(
+            "chat_message",
+            sa.Column("chat_id", sa.String(), primary_key=True),
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("parent_id", sa.String(), nullable=True),
+            sa.Column("role", sa.String(), nullable=True),
+            sa.Column("data", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.BigInteger(), nullable=True),
+            sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        )
+        op.create_index(
+            "chat_message_chat_id_created_at_idx",
+            "chat_message",
+            ["chat_id", "created_at"],
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if _table_exists(bind, "chat_message"):
+        op.drop_table("chat_message")
@@ -0,0 +1,103 @@
+"""Add chat_search table (full-text chat search index)
+
+Revision ID: add_chat_search_table
+Revises: add_chat_list_indexes
+Create Date: 2026-10-19
+
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "add_chat_search_table"
+down_revision = "add_chat_list_indexes"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+# Must match POSTGRES_DOCUMENT_SQL / POSTGRES_TAGS_SQL in models/chat_search.py,
+# otherwise the planner cannot use the expression indexes.
+POSTGRES_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce(chat_search.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(chat_search.content, '')), 'B')"
+)
+POSTGRES_TAGS_SQL = "to_tsvector('simple', coalesce(chat_search.tags, ''))"
+
+# External-content FTS5 table kept in sync with chat_search by triggers
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_search_fts USING fts5("
+    "title, content, tags, content='chat_search', content_rowid='rowid', "
+    "tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS chat_search_ai AFTER INSERT ON chat_search BEGIN "
+    "INSERT INTO chat_search_fts(rowid, title, content, tags) "
+    "VALUES (new.rowid, new.title, new.content, new.tags); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_search_ad AFTER DELETE ON chat_search BEGIN "
+    "INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content, tags) "
+    "VALUES ('delete', old.rowid, old.title, old.content, old.tags); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_search_au AFTER UPDATE ON chat_search BEGIN "
+    "INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content, tags) "
+    "VALUES ('delete', old.rowid, old.title, old.content, old.tags); "
+    "INSERT INTO chat_search_fts(rowid, title, content, tags) "
+    "VALUES (new.rowid, new.title, new.content, new.tags); END",
+]
+
+
+def _table_exists(bind, table_name: str) -> bool:
+    """Check if a table exists"""
+    try:
+        inspector = inspect(bind)
+        return table_name in inspector.get_table_names()
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if not _table_exists(bind, "chat_search"):
+        # Rows are backfilled lazily per user on first search
+        op.create_table(
+            "chat_search",
+            sa.Column("chat_id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("title", sa.Text(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("tags", sa.Text(), nullable=False),
+            sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        )
+        op.create_index("chat_search_user_id_idx", "chat_search", ["user_id"])
+
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS chat_search_document_idx "
+            f"ON chat_search USING GIN (({POSTGRES_DOCUMENT_SQL}))"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS chat_search_tags_idx "
+            f"ON chat_search USING GIN (({POSTGRES_TAGS_SQL}))"
+        )
+    elif bind.dialect.name == "sqlite":
+        try:
+            for statement in SQLITE_FTS_DDL:
+                op.execute(statement)
+        except Exception as e:
+            # SQLite built without FTS5: search falls back to LIKE on chat_search
+            log.warning(f"FTS5 unavailable, chat search will not be ranked: {e}")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == "sqlite":
+        for trigger in ("chat_search_ai", "chat_search_ad", "chat_search_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS chat_search_fts")
+
+    if _table_exists(bind, "chat_search"):
+        op.drop_table("chat_search")
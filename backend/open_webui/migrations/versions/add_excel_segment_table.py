@@ -0,0 +1,68 @@
+"""Add excel_segment table (indexed Excel segment storage)
+
+Revision ID: add_excel_segment_table
+Revises: add_ocr_segment_table
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "add_excel_segment_table"
+down_revision = "add_ocr_segment_table"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(bind, table_name: str) -> bool:
+    """Check if a table exists"""
+    try:
+        inspector = inspect(bind)
+        return table_name in inspector.get_table_names()
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if not _table_exists(bind, "excel_segment"):
+        op.create_table(
+            "excel_segment",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("file_id", sa.String(), nullable=False),
+            sa.Column("sheet", sa.Text(), nullable=False),
+            sa.Column("sheet_index", sa.Integer(), nullable=False),
+            sa.Column("row", sa.Integer(), nullable=False),
+            sa.Column("title", sa.Text(), nullable=True),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("questions", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.BigInteger(), nullable=False),
+        )
+
+        op.create_index(
+            "ix_excel_segment_file_sheet_row",
+            "excel_segment",
+            ["file_id", "sheet", "row"],
+            unique=False,
+        )
+
+        op.create_index(
+            "ix_excel_segment_file_sheet_index",
+            "excel_segment",
+            ["file_id", "sheet_index"],
+            unique=False,
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if _table_exists(bind, "excel_segment"):
+        op.drop_index("ix_excel_segment_file_sheet_index", table_name="excel_segment")
+        op.drop_index("ix_excel_segment_file_sheet_row", table_name="excel_segment")
+        op.drop_table("excel_segment")
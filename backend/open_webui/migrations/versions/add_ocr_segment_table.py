@@ -0,0 +1,82 @@
+"""Add ocr_segment table (indexed OCR segment manifest)
+
+Revision ID: add_ocr_segment_table
+Revises: d3465c10ebfe
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "add_ocr_segment_table"
+down_revision = "d3465c10ebfe"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(bind, table_name: str) -> bool:
+    """Check if a table exists"""
+    try:
+        inspector = inspect(bind)
+        return table_name in inspector.get_table_names()
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if not _table_exists(bind, "ocr_segment"):
+        op.create_table(
+            "ocr_segment",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("knowledge_id", sa.String(), nullable=False),
+            sa.Column("ocr_task_id", sa.String(), nullable=False),
+            sa.Column("segment_id", sa.String(), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False),
+            sa.Column("heading", sa.Text(), nullable=True),
+            sa.Column("level", sa.Integer(), nullable=True),
+            sa.Column("file", sa.Text(), nullable=False),
+            sa.Column("preview", sa.Text(), nullable=True),
+            sa.Column("source_file", sa.Text(), nullable=True),
+            sa.Column("content_hash", sa.String(), nullable=False),
+            sa.Column("page_start", sa.Integer(), nullable=True),
+            sa.Column("page_end", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.BigInteger(), nullable=False),
+            sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        )
+
+        op.create_index(
+            "ix_ocr_segment_task_position",
+            "ocr_segment",
+            ["knowledge_id", "ocr_task_id", "position"],
+            unique=True,
+        )
+
+        op.create_index(
+            "ix_ocr_segment_task_segment_id",
+            "ocr_segment",
+            ["knowledge_id", "ocr_task_id", "segment_id"],
+            unique=False,
+        )
+
+        op.create_index(
+            "ix_ocr_segment_task_page",
+            "ocr_segment",
+            ["knowledge_id", "ocr_task_id", "page_start", "page_end"],
+            unique=False,
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if _table_exists(bind, "ocr_segment"):
+        op.drop_index("ix_ocr_segment_task_page", table_name="ocr_segment")
+        op.drop_index("ix_ocr_segment_task_segment_id", table_name="ocr_segment")
+        op.drop_index("ix_ocr_segment_task_position", table_name="ocr_segment")
+        op.drop_table("ocr_segment")
@@ -0,0 +1,167 @@
+"""Backfill knowledge_file_link from knowledge.data.file_ids
+
+Revision ID: backfill_knowledge_file_links
+Revises: add_chat_message_table
+Create Date: 2026-10-19
+
+"""
+
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "backfill_knowledge_file_links"
+down_revision = "add_chat_message_table"
+branch_labels = None
+depends_on = None
+
+
+knowledge_table = sa.table(
+    "knowledge",
+    sa.column("id", sa.Text()),
+    sa.column("data", sa.JSON()),
+)
+
+link_table = sa.table(
+    "knowledge_file_link",
+    sa.column("knowledge_id", sa.String()),
+    sa.column("file_id", sa.String()),
+    sa.column("is_indexed", sa.Boolean()),
+    sa.column("created_at", sa.BigInteger()),
+    sa.column("updated_at", sa.BigInteger()),
+)
+
+
+def _table_exists(bind, table_name: str) -> bool:
+    """Check if a table exists"""
+    try:
+        inspector = inspect(bind)
+        return table_name in inspector.get_table_names()
+    except Exception:
+        return False
+
+
+def _has_index(bind, table_name: str, index_name: str) -> bool:
+    try:
+        inspector = inspect(bind)
+        return index_name in [i["name"] for i in inspector.get_indexes(table_name)]
+    except Exception:
+        return False
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if not _table_exists(bind, "knowledge_file_link"):
+        return
+
+    # WHERE knowledge_id = ... ORDER BY created_at
+    if not _has_index(
+        bind, "knowledge_file_link", "ix_knowledge_file_link_knowledge_created"
+    ):
+        op.create_index(
+            "ix_knowledge_file_link_knowledge_created",
+            "knowledge_file_link",
+            ["knowledge_id", "created_at"],
+        )
+
+    if not _table_exists(bind, "knowledge"):
+        return
+
+    # The link table becomes the source of truth. Links were never deleted
+    # when files were removed (or knowledge bases reset/deleted), so make each
+    # knowledge base's links exactly match its file_ids (drop stale ones, add
+    # missing ones), then drop the blob copy
+    existing = {}
+    for knowledge_id, file_id in bind.execute(
+        sa.select(link_table.c.knowledge_id, link_table.c.file_id)
+    ):
+        existing.setdefault(knowledge_id, set()).add(file_id)
+    now = int(time.time())
+
+    for knowledge_id, data in bind.execute(
+        sa.select(knowledge_table.c.id, knowledge_table.c.data)
+    ).fetchall():
+        data = data if isinstance(data, dict) else {}
+        file_ids = dict.fromkeys(data.get("file_ids") or [])
+        linked = existing.pop(knowledge_id, set())
+
+        stale = [file_id for file_id in linked if file_id not in file_ids]
+        if stale:
+            bind.execute(
+                link_table.delete().where(
+                    link_table.c.knowledge_id == knowledge_id,
+                    link_table.c.file_id.in_(stale),
+                )
+            )
+
+        rows = []
+        for file_id in file_ids:
+            if file_id not in linked:
+                rows.append(
+                    {
+                        "knowledge_id": knowledge_id,
+                        "file_id": file_id,
+                        "is_indexed": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                )
+        if rows:
+            op.bulk_insert(link_table, rows)
+
+        if "file_ids" in data:
+            bind.execute(
+                knowledge_table.update()
+                .where(knowledge_table.c.id == knowledge_id)
+                .values(
+                    data={
+                        key: value for key, value in data.items() if key != "file_ids"
+                    }
+                )
+            )
+
+    # Links left over from deleted knowledge bases
+    if existing:
+        bind.execute(
+            link_table.delete().where(link_table.c.knowledge_id.in_(list(existing)))
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if not _table_exists(bind, "knowledge_file_link"):
+        return
+
+    if _table_exists(bind, "knowledge"):
+        file_ids = {}
+        for knowledge_id, file_id in bind.execute(
+            sa.select(link_table.c.knowledge_id, link_table.c.file_id).order_by(
+                link_table.c.created_at, link_table.c.file_id
+            )
+        ):
+            file_ids.setdefault(knowledge_id, []).append(file_id)
+
+        for knowledge_id, data in bind.execute(
+            sa.select(knowledge_table.c.id, knowledge_table.c.data)
+        ).fetchall():
+            bind.execute(
+                knowledge_table.update()
+                .where(knowledge_table.c.id == knowledge_id)
+                .values(
+                    data={**(data or {}), "file_ids": file_ids.get(knowledge_id, [])}
+                )
+            )
+
+    if _has_index(
+        bind, "knowledge_file_link", "ix_knowledge_file_link_knowledge_created"
+    ):
+        op.drop_index(
+            "ix_knowledge_file_link_knowledge_created",
+            table_name="knowledge_file_link",
+        )
@@ -0,0 +1,243 @@
+import logging
+import time
+from typing import Optional
+
+from open_webui.internal.db import Base
+from open_webui.env import SRC_LOG_LEVELS
+
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, Column, Index, JSON, String
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# ChatMessage DB Schema (按消息拆分存储聊天历史)
+#
+# 启用后聊天 JSON 中不再保存 history.messages 与 messages 列表，只保留
+# currentId 等元数据，并以 history.storage = "chat_message" 标记；
+# 读取完整聊天时按需重建旧版 JSON（兼容视图），单条消息的读写只触及一行。
+####################
+
+MESSAGE_STORAGE_KEY = "storage"
+MESSAGE_TABLE_STORAGE = "chat_message"
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+
+    parent_id = Column(String, nullable=True)
+    role = Column(String, nullable=True)
+    data = Column(JSON, nullable=False)  # 完整的消息对象
+
+    created_at = Column(BigInteger)  # 消息的 timestamp
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        # WHERE chat_id = ... ORDER BY created_at
+        Index("chat_message_chat_id_created_at_idx", "chat_id", "created_at"),
+    )
+
+
+class ChatMessagePageResponse(BaseModel):
+    messages: list[dict]  # 由旧到新
+    next_cursor: Optional[str] = None  # 更早一页的起始消息 id，没有则为 None
+
+
+def is_message_table_chat(chat: Optional[dict]) -> bool:
+    return (
+        isinstance(chat, dict)
+        and (chat.get("history") or {}).get(MESSAGE_STORAGE_KEY)
+        == MESSAGE_TABLE_STORAGE
+    )
+
+
+def get_message_thread(
+    parents: dict, message_id: Optional[str], limit: Optional[int] = None
+) -> tuple[list[str], Optional[str]]:
+    """
+    从 message_id 沿 parentId 向上回溯，返回（由旧到新的消息 id 列表, 更早一页的起点）
+    parents 为 {message_id: parent_id}
+    """
+    thread = []
+    seen = set()
+    while message_id and message_id in parents and message_id not in seen:
+        if limit is not None and len(thread) >= limit:
+            break
+        seen.add(message_id)
+        thread.append(message_id)
+        message_id = parents[message_id]
+
+    next_cursor = (
+        message_id if message_id in parents and message_id not in seen else None
+    )
+    return thread[::-1], next_cursor
+
+
+def _to_row(chat_id: str, message_id: str, message: dict, now: int) -> ChatMessage:
+    return ChatMessage(
+        chat_id=chat_id,
+        id=message_id,
+        parent_id=message.get("parentId"),
+        role=message.get("role"),
+        data=message,
+        created_at=message.get("timestamp") or now,
+        updated_at=now,
+    )
+
+
+class ChatMessageTable:
+    ####################
+    # 整体读写（在调用方的事务内执行）
+    ####################
+
+    def store_chat(self, db, chat_id: str, chat: dict) -> dict:
+        """
+        把聊天的消息写入 chat_message，返回应保存在 chat 列中的精简 JSON。
+        只有 history.messages 存在时才同步消息（缺省表示不修改消息）。
+        """
+        history = chat.get("history") or {}
+        messages = history.get("messages")
+        if messages is not None:
+            self.sync_messages(db, chat_id, messages)
+
+        stored = {key: value for key, value in chat.items() if key != "messages"}
+        stored["history"] = {
+            **{key: value for key, value in history.items() if key != "messages"},
+            MESSAGE_STORAGE_KEY: MESSAGE_TABLE_STORAGE,
+        }
+        return stored
+
+    def sync_messages(self, db, chat_id: str, messages: dict) -> None:
+        """只写入有变化的消息，删除不再存在的消息"""
+        now = int(time.time())
+        existing = {
+            row.id: row
+            for row in db.query(ChatMessage).filter(ChatMessage.chat_id == chat_id)
+        }
+
+        for message_id, message in messages.items():
+            row = existing.pop(message_id, None)
+            if row is None:
+                db.add(_to_row(chat_id, message_id, message, now))
+            elif row.data != message:
+                row.parent_id = message.get("parentId")
+                row.role = message.get("role")
+                row.data = message
+                row.updated_at = now
+
+        if existing:
+            db.query(ChatMessage).filter(
+                ChatMessage.chat_id == chat_id, ChatMessage.id.in_(list(existing))
+            ).delete(synchronize_session=False)
+
+    def rebuild_chat(self, chat: dict, messages: dict) -> dict:
+        """兼容视图：由精简 JSON 与消息重建旧版聊天 JSON（不修改入参）"""
+        history = {
+            key: value
+            for key, value in (chat.get("history") or {}).items()
+            if key != MESSAGE_STORAGE_KEY
+        }
+        history["messages"] = messages
+
+        parents = {
+            message_id: message.get("parentId")
+            for message_id, message in messages.items()
+        }
+        thread, _ = get_message_thread(parents, history.get("currentId"))
+
+        return {
+            **chat,
+            "history": history,
+            "messages": [messages[message_id] for message_id in thread],
+        }
+
+    def get_messages_map(self, db, chat_id: str) -> dict:
+        rows = db.query(ChatMessage.id, ChatMessage.data).filter(
+            ChatMessage.chat_id == chat_id
+        )
+        return {row.id: row.data for row in rows}
+
+    def get_messages_maps(self, db, chat_ids: list[str]) -> dict[str, dict]:
+        maps = {chat_id: {} for chat_id in chat_ids}
+        if chat_ids:
+            rows = db.query(
+                ChatMessage.chat_id, ChatMessage.id, ChatMessage.data
+            ).filter(ChatMessage.chat_id.in_(chat_ids))
+            for row in rows:
+                maps[row.chat_id][row.id] = row.data
+        return maps
+
+    def get_message_contents(self, db, chat_id: str) -> list[dict]:
+        """只取消息正文（用于全文检索），不把 sources/files 等大字段读回应用"""
+        db.flush()  # 会话关闭了 autoflush，先写出本事务中待提交的消息
+        rows = db.query(ChatMessage.data["content"]).filter(
+            ChatMessage.chat_id == chat_id
+        )
+        return [{"content": content} for (content,) in rows]
+
+    def delete_by_chat_ids(self, db, chat_ids) -> None:
+        db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    ####################
+    # 单条消息
+    ####################
+
+    def get_message(self, db, chat_id: str, message_id: str) -> Optional[dict]:
+        row = db.get(ChatMessage, (chat_id, message_id))
+        return row.data if row else None
+
+    def upsert_message(self, db, chat_id: str, message_id: str, message: dict) -> dict:
+        now = int(time.time())
+        row = db.get(ChatMessage, (chat_id, message_id))
+        if row is None:
+            row = _to_row(chat_id, message_id, message, now)
+            db.add(row)
+        else:
+            row.data = {**row.data, **message}
+            row.parent_id = row.data.get("parentId")
+            row.role = row.data.get("role")
+            row.updated_at = now
+        return row.data
+
+    def add_statuses(
+        self, db, chat_id: str, message_id: str, statuses: list[dict]
+    ) -> bool:
+        row = db.get(ChatMessage, (chat_id, message_id))
+        if row is None:
+            return False
+
+        row.data = {
+            **row.data,
+            "statusHistory": [*row.data.get("statusHistory", []), *statuses],
+        }
+        row.updated_at = int(time.time())
+        return True
+
+    def get_thread_page(
+        self, db, chat_id: str, message_id: Optional[str], limit: int
+    ) -> ChatMessagePageResponse:
+        """按分支分页：只读取 (id, parent_id) 定位本页，再加载本页消息"""
+        parents = dict(
+            db.query(ChatMessage.id, ChatMessage.parent_id).filter(
+                ChatMessage.chat_id == chat_id
+            )
+        )
+        thread, next_cursor = get_message_thread(parents, message_id, limit)
+
+        rows = db.query(ChatMessage.id, ChatMessage.data).filter(
+            ChatMessage.chat_id == chat_id, ChatMessage.id.in_(thread)
+        )
+        messages = {row.id: row.data for row in rows}
+        return ChatMessagePageResponse(
+            messages=[messages[message_id] for message_id in thread],
+            next_cursor=next_cursor,
+        )
+
+
+ChatMessages = ChatMessageTable()
@@ -0,0 +1,283 @@
+import logging
+import re
+import time
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.models.chat_messages import ChatMessages, is_message_table_chat
+from open_webui.env import SRC_LOG_LEVELS
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Index,
+    String,
+    Text,
+    func,
+    literal,
+    literal_column,
+    select,
+)
+from sqlalchemy.sql import column, table
+from sqlalchemy import text as sql_text
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# ChatSearch DB Schema (聊天全文检索索引)
+#
+# 每个聊天一行，保存归一化后的标题、消息文本与标签 token：
+# - PostgreSQL: 在 tsvector 表达式上建 GIN 索引（见迁移 add_chat_search_table）
+# - SQLite: 以本表为外部内容的 FTS5 虚表 chat_search_fts，由触发器同步
+# 两者都不可用时退化为对归一化文本的 LIKE 匹配（仍然不扫描 chat JSON）
+####################
+
+
+class ChatSearch(Base):
+    __tablename__ = "chat_search"
+
+    chat_id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+
+    title = Column(Text, nullable=False, default="")
+    content = Column(Text, nullable=False, default="")
+    tags = Column(Text, nullable=False, default="")  # 空格分隔的标签 token
+
+    # 建索引时聊天的 updated_at；聊天的 updated_at 更大说明索引已过期
+    updated_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (Index("chat_search_user_id_idx", "user_id"),)
+
+
+# 与迁移中的 GIN 表达式索引保持完全一致，否则 PostgreSQL 不会走索引
+POSTGRES_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce(chat_search.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(chat_search.content, '')), 'B')"
+)
+POSTGRES_TAGS_SQL = "to_tsvector('simple', coalesce(chat_search.tags, ''))"
+
+# 中日韩字符之间没有空格，拆成单字后按相邻字短语匹配
+_CJK = re.compile(
+    r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])"
+)
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize_search_text(text: str) -> str:
+    """小写、去标点，CJK 字符逐字分开；索引与查询使用同一套规则"""
+    return " ".join(_TOKEN.findall(_CJK.sub(r" \1 ", (text or "").lower())))
+
+
+def get_tag_token(tag_id: str) -> str:
+    """标签 id 可能含任意字符，编码成单个字母数字 token"""
+    return "tag" + tag_id.encode("utf-8").hex()
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content", "")
+    if isinstance(content, list):
+        content = " ".join(
+            part.get("text", "")
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return content if isinstance(content, str) else ""
+
+
+def get_chat_search_content(chat: dict) -> str:
+    messages = (chat.get("history") or {}).get("messages") or {}
+    messages = list(messages.values()) if messages else chat.get("messages") or []
+    return normalize_search_text(
+        "\n".join(_message_text(m) for m in messages if isinstance(m, dict))
+    )
+
+
+class ChatSearchTable:
+    def __init__(self):
+        self._fts_available: Optional[bool] = None
+
+    ####################
+    # 索引维护（在调用方的事务内执行）
+    ####################
+
+    def upsert(self, db, chat) -> None:
+        """写入/刷新一个聊天的索引行，chat 为 Chat ORM 对象或 ChatModel"""
+        if chat.user_id.startswith("shared-"):
+            return
+
+        chat_data = chat.chat or {}
+        if is_message_table_chat(chat_data):
+            chat_data = {"messages": ChatMessages.get_message_contents(db, chat.id)}
+
+        tags = (chat.meta or {}).get("tags", []) if chat.meta else []
+        now = int(time.time())
+        db.query(ChatSearch).filter_by(chat_id=chat.id).delete(
+            synchronize_session=False
+        )
+        db.add(
+            ChatSearch(
+                chat_id=chat.id,
+                user_id=chat.user_id,
+                title=normalize_search_text(chat.title),
+                content=get_chat_search_content(chat_data),
+                tags=" ".join(get_tag_token(tag) for tag in tags),
+                # updated_at 精度为秒：同一秒内之后的写入不会改变它，
+                # 因此记早一秒，让下一次搜索再刷新一次
+                updated_at=min(chat.updated_at or now, now - 1),
+            )
+        )
+
+    def update_tags(self, db, chat) -> None:
+        """只改写标签列；尚无索引行的聊天在下一次搜索时整体补建"""
+        tags = (chat.meta or {}).get("tags", []) if chat.meta else []
+        db.query(ChatSearch).filter_by(chat_id=chat.id).update(
+            {"tags": " ".join(get_tag_token(tag) for tag in tags)},
+            synchronize_session=False,
+        )
+
+    def delete_by_chat_ids(self, db, chat_ids) -> None:
+        db.query(ChatSearch).filter(ChatSearch.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    def delete_by_user_id(self, db, user_id: str) -> None:
+        db.query(ChatSearch).filter_by(user_id=user_id).delete(
+            synchronize_session=False
+        )
+
+    def ensure_user_indexed(self, user_id: str, batch_size: int = 200) -> int:
+        """
+        为该用户补建缺失的索引行并刷新过期的行，返回处理的聊天数。
+
+        逐条消息的写入不维护索引（否则每次写入都要重新归一化整个聊天），
+        而是在搜索前按 updated_at 找出变化过的聊天批量刷新。
+        """
+        from open_webui.models.chats import Chat
+
+        with get_db() as db:
+            stale_ids = [
+                id
+                for (id,) in db.query(Chat.id)
+                .outerjoin(ChatSearch, ChatSearch.chat_id == Chat.id)
+                .filter(Chat.user_id == user_id)
+                .filter(
+                    ChatSearch.chat_id.is_(None)
+                    | (Chat.updated_at > ChatSearch.updated_at)
+                )
+                .all()
+            ]
+
+            for start in range(0, len(stale_ids), batch_size):
+                batch = stale_ids[start : start + batch_size]
+                for chat in db.query(Chat).filter(Chat.id.in_(batch)).all():
+                    self.upsert(db, chat)
+                db.commit()
+
+        if stale_ids:
+            log.info(f"Indexed {len(stale_ids)} chats of user {user_id} for search")
+        return len(stale_ids)
+
+    ####################
+    # 查询
+    ####################
+
+    def _has_fts(self, db) -> bool:
+        if self._fts_available is None:
+            self._fts_available = (
+                db.execute(
+                    sql_text(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = 'chat_search_fts'"
+                    )
+                ).first()
+                is not None
+            )
+        return self._fts_available
+
+    def search(self, db, user_id: str, words: list[str], tag_ids: list[str]):
+        """
+        返回 (chat_id, score) 子查询，score 越大越相关。
+        words 中每个词都必须命中标题或内容（词前缀匹配，CJK 按相邻字短语匹配）；
+        tag_ids 中每个标签都必须存在。
+        """
+        terms = [t for t in (normalize_search_text(w).split() for w in words) if t]
+        tag_tokens = [get_tag_token(tag_id) for tag_id in tag_ids]
+        dialect_name = db.bind.dialect.name
+
+        if dialect_name == "postgresql":
+            return self._search_postgres(user_id, terms, tag_tokens)
+        if dialect_name == "sqlite" and self._has_fts(db):
+            return self._search_sqlite(user_id, terms, tag_tokens)
+        return self._search_like(user_id, terms, tag_tokens)
+
+    def _search_postgres(self, user_id, terms, tag_tokens):
+        query = select(ChatSearch.chat_id).where(ChatSearch.user_id == user_id)
+        score = literal(0.0)
+
+        if terms:
+            # 每个词内的 token 相邻匹配，最后一个 token 做前缀匹配
+            tsquery = " & ".join(
+                " <-> ".join(tokens[:-1] + [f"{tokens[-1]}:*"]) for tokens in terms
+            )
+            document = literal_column(f"({POSTGRES_DOCUMENT_SQL})")
+            ts_query = func.to_tsquery("simple", tsquery)
+            query = query.where(document.op("@@")(ts_query))
+            score = func.ts_rank(document, ts_query)
+
+        if tag_tokens:
+            query = query.where(
+                literal_column(f"({POSTGRES_TAGS_SQL})").op("@@")(
+                    func.to_tsquery("simple", " & ".join(tag_tokens))
+                )
+            )
+
+        return query.add_columns(score.label("score")).subquery()
+
+    def _search_sqlite(self, user_id, terms, tag_tokens):
+        match = []
+        if terms:
+            match.append(
+                "{title content} : ("
+                + " AND ".join('"' + " ".join(tokens) + '" *' for tokens in terms)
+                + ")"
+            )
+        match.extend(f"tags : {token}" for token in tag_tokens)
+        if not match:
+            # 只含标点的搜索词归一化后为空，空 MATCH 会触发 fts5 语法错误
+            return self._search_like(user_id, terms, tag_tokens)
+
+        fts = table("chat_search_fts", column("rowid"))
+        # bm25 越小越相关；标题权重高于内容，标签不参与打分
+        return (
+            select(
+                ChatSearch.chat_id,
+                literal_column("-bm25(chat_search_fts, 10.0, 1.0, 0.0)").label("score"),
+            )
+            .join(fts, fts.c.rowid == literal_column("chat_search.rowid"))
+            .where(ChatSearch.user_id == user_id)
+            .where(literal_column("chat_search_fts").op("MATCH")(" AND ".join(match)))
+            .subquery()
+        )
+
+    def _search_like(self, user_id, terms, tag_tokens):
+        query = select(ChatSearch.chat_id, literal(0.0).label("score")).where(
+            ChatSearch.user_id == user_id
+        )
+        for tokens in terms:
+            phrase = " ".join(tokens)
+            query = query.where(
+                ChatSearch.title.contains(phrase) | ChatSearch.content.contains(phrase)
+            )
+        # 标签 token 互为前缀（tag61 / tag6162），按空格分隔的整词匹配
+        padded_tags = literal(" ").concat(ChatSearch.tags).concat(" ")
+        for token in tag_tokens:
+            query = query.where(padded_tags.contains(f" {token} "))
+        return query.subquery()
+
+    def get_untagged_chat_ids(self, user_id: str):
+        return select(ChatSearch.chat_id).where(
+            ChatSearch.user_id == user_id, ChatSearch.tags == ""
+        )
+
+
+ChatSearches = ChatSearchTable()
@@ -7,11 +7,18 @@ from typing import Optional
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.models.folders import Folders
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.models.chat_search import ChatSearches
+from open_webui.models.chat_messages import (
+    ChatMessagePageResponse,
+    ChatMessages,
+    get_message_thread,
+    is_message_table_chat,
+)
+from open_webui.env import ENABLE_CHAT_MESSAGE_TABLE, SRC_LOG_LEVELS
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON, Index
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import or_, func, select, and_, text, case
 from sqlalchemy.sql import exists
 from sqlalchemy.sql.expression import bindparam
 
@@ -51,6 +58,8 @@ class Chat(Base):
         Index("user_id_archived_idx", "user_id", "archived"),
         # WHERE user_id = ... ORDER BY updated_at DESC
         Index("updated_at_user_id_idx", "updated_at", "user_id"),
+        # WHERE user_id = ... ORDER BY updated_at DESC, id DESC (keyset pagination)
+        Index("user_id_updated_at_id_idx", "user_id", "updated_at", "id"),
         # WHERE folder_id = ... AND user_id = ...
         Index("folder_id_user_id_idx", "folder_id", "user_id"),
     )
@@ -120,9 +129,109 @@ class ChatTitleIdResponse(BaseModel):
     title: str
     updated_at: int
     created_at: int
+    pinned: Optional[bool] = None
+    folder_id: Optional[str] = None
+
+
+class ChatFeedbackListResponse(ChatTitleIdResponse):
+    thumbs_up: int = 0
+    thumbs_down: int = 0
+    total_feedback: int = 0
+
+
+# 列表接口只查询这些列，不加载 chat JSON
+CHAT_LIST_COLUMNS = (
+    Chat.id,
+    Chat.title,
+    Chat.updated_at,
+    Chat.created_at,
+    Chat.pinned,
+    Chat.folder_id,
+)
+
+
+def parse_chat_list_cursor(cursor: str) -> tuple[int, str]:
+    """
+    解析列表游标 "<updated_at>:<id>"（即上一页最后一条的 updated_at 与 id）
+    """
+    updated_at, _, id = cursor.partition(":")
+    if not id:
+        raise ValueError(f"Invalid chat list cursor: {cursor}")
+    return int(updated_at), id
 
 
 class ChatTable:
+
+    def _apply_list_filter(self, query, filter: Optional[dict]):
+        """标题搜索与排序；默认按 updated_at、id 倒序（与键集分页一致）"""
+        if filter:
+            query_key = filter.get("query")
+            if query_key:
+                query = query.filter(Chat.title.ilike(f"%{query_key}%"))
+
+            order_by = filter.get("order_by")
+            direction = filter.get("direction")
+
+            if order_by and direction and getattr(Chat, order_by):
+                if direction.lower() == "asc":
+                    return query.order_by(getattr(Chat, order_by).asc())
+                elif direction.lower() == "desc":
+                    return query.order_by(getattr(Chat, order_by).desc())
+                else:
+                    raise ValueError("Invalid direction for ordering")
+
+        return query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+
+    def _apply_list_page(
+        self,
+        query,
+        cursor: Optional[str] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ):
+        """cursor 仅用于默认排序，从上一页最后一条之后继续（键集分页）"""
+        if cursor:
+            updated_at, id = parse_chat_list_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Chat.updated_at < updated_at,
+                    and_(Chat.updated_at == updated_at, Chat.id < id),
+                )
+            )
+        elif skip:
+            query = query.offset(skip)
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    def _to_title_id_list(self, rows) -> list[ChatTitleIdResponse]:
+        return [ChatTitleIdResponse.model_validate(dict(row._mapping)) for row in rows]
+
+    def _set_chat_data(self, db, chat_item: Chat, chat: dict) -> None:
+        """写入聊天 JSON；按消息存储的聊天只保存元数据，消息写入 chat_message"""
+        if is_message_table_chat(chat_item.chat) or (
+            ENABLE_CHAT_MESSAGE_TABLE and not chat_item.user_id.startswith("shared-")
+        ):
+            chat_item.chat = ChatMessages.store_chat(db, chat_item.id, chat)
+        else:
+            chat_item.chat = chat
+
+    def _to_chat_model(self, db, chat) -> ChatModel:
+        return self._to_chat_models(db, [chat])[0]
+
+    def _to_chat_models(self, db, chats) -> list[ChatModel]:
+        """兼容视图：按消息存储的聊天重建旧版完整 JSON（批量读取消息）"""
+        models = [ChatModel.model_validate(chat) for chat in chats]
+        chat_ids = [model.id for model in models if is_message_table_chat(model.chat)]
+        if chat_ids:
+            messages_maps = ChatMessages.get_messages_maps(db, chat_ids)
+            for model in models:
+                if model.id in messages_maps:
+                    model.chat = ChatMessages.rebuild_chat(
+                        model.chat, messages_maps[model.id]
+                    )
+        return models
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -143,10 +252,11 @@ class ChatTable:
             )
 
             result = Chat(**chat.model_dump())
+            self._set_chat_data(db, result, chat.chat)
             db.add(result)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._to_chat_model(db, result) if result else None
 
     def import_chat(
         self, user_id: str, form_data: ChatImportForm
@@ -180,21 +290,27 @@ class ChatTable:
             )
 
             result = Chat(**chat.model_dump())
+            self._set_chat_data(db, result, chat.chat)
             db.add(result)
             db.commit()
             db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            return self._to_chat_model(db, result) if result else None
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = chat
+                self._set_chat_data(db, chat_item, chat)
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
+                # 搜索索引在下一次搜索时按 updated_at 刷新，保存时不重新归一化
                 chat_item.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat_item)
 
+                if is_message_table_chat(chat_item.chat):
+                    return ChatModel.model_validate(chat_item).model_copy(
+                        update={"chat": chat}
+                    )
                 return ChatModel.model_validate(chat_item)
         except Exception:
             return None
@@ -237,33 +353,106 @@ class ChatTable:
         return chat.chat.get("title", "New Chat")
 
     def get_messages_map_by_chat_id(self, id: str) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat = db.get(Chat, id)
+            if chat is None:
+                return None
 
-        return chat.chat.get("history", {}).get("messages", {}) or {}
+            if is_message_table_chat(chat.chat):
+                return ChatMessages.get_messages_map(db, id)
+            return chat.chat.get("history", {}).get("messages", {}) or {}
 
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        with get_db() as db:
+            chat = db.get(Chat, id)
+            if chat is None:
+                return None
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+            if is_message_table_chat(chat.chat):
+                return ChatMessages.get_message(db, id, message_id) or {}
+            return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+
+    def get_message_page_by_chat_id_and_user_id(
+        self,
+        id: str,
+        user_id: str,
+        message_id: Optional[str] = None,
+        limit: int = 50,
+    ) -> Optional[ChatMessagePageResponse]:
+        """
+        按当前分支分页读取消息：从 message_id（默认 currentId）向上取 limit 条，
+        返回的 next_cursor 作为下一次的 message_id 继续读取更早的消息
+        """
+        with get_db() as db:
+            chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
+            if chat is None:
+                return None
+
+            history = chat.chat.get("history", {})
+            message_id = message_id or history.get("currentId")
+            if is_message_table_chat(chat.chat):
+                return ChatMessages.get_thread_page(db, id, message_id, limit)
+
+            messages = history.get("messages", {}) or {}
+            thread, next_cursor = get_message_thread(
+                {
+                    message_id: message.get("parentId")
+                    for message_id, message in messages.items()
+                },
+                message_id,
+                limit,
+            )
+            return ChatMessagePageResponse(
+                messages=[messages[message_id] for message_id in thread],
+                next_cursor=next_cursor,
+            )
 
     def upsert_message_to_chat_by_id_and_message_id(
-        self, id: str, message_id: str, message: dict
+        self, id: str, message_id: str, message: dict, full_history: bool = False
     ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
+        """
+        写入单条消息并把它设为 currentId。
+        按消息存储的聊天只更新这一行，返回的 chat.history.messages 仅包含该消息；
+        full_history 为 True 时返回重建后的完整聊天（供需要完整历史的接口使用）。
+        """
         # Sanitize message content for null characters before upserting
         if isinstance(message.get("content"), str):
             message["content"] = message["content"].replace("\x00", "")
 
-        chat = chat.chat
+        with get_db() as db:
+            chat_item = db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            if is_message_table_chat(chat_item.chat) or (
+                ENABLE_CHAT_MESSAGE_TABLE
+                and not chat_item.user_id.startswith("shared-")
+            ):
+                # 旧聊天在下一次写入时迁移到 chat_message
+                chat_item.chat = ChatMessages.store_chat(db, id, chat_item.chat)
+                db.flush()
+                message = ChatMessages.upsert_message(db, id, message_id, message)
+
+                chat_item.chat = {
+                    **chat_item.chat,
+                    "history": {**chat_item.chat["history"], "currentId": message_id},
+                }
+                # 只更新这条消息；搜索索引在下一次搜索时按 updated_at 刷新
+                chat_item.updated_at = int(time.time())
+                db.commit()
+                db.refresh(chat_item)
+
+                if full_history:
+                    return self._to_chat_model(db, chat_item)
+
+                chat = ChatModel.model_validate(chat_item)
+                chat.chat = ChatMessages.rebuild_chat(chat.chat, {message_id: message})
+                return chat
+
+            chat = chat_item.chat
+
         history = chat.get("history", {})
 
         if message_id in history.get("messages", {}):
@@ -282,16 +471,32 @@ class ChatTable:
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
     ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+        return self.add_message_statuses_to_chat_by_id_and_message_id(
+            id, message_id, [status]
+        )
+
+    def add_message_statuses_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, statuses: list[dict]
+    ) -> Optional[ChatModel]:
+        # 一次读写追加一批状态，避免每个状态事件都重写整个聊天
+        with get_db() as db:
+            chat_item = db.get(Chat, id)
+            if chat_item is None:
+                return None
+
+            if is_message_table_chat(chat_item.chat):
+                # 只改写这一条消息；返回的 chat 不含消息
+                if ChatMessages.add_statuses(db, id, message_id, statuses):
+                    db.commit()
+                return ChatModel.model_validate(chat_item)
+
+            chat = chat_item.chat
 
-        chat = chat.chat
         history = chat.get("history", {})
 
         if message_id in history.get("messages", {}):
             status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
+            status_history.extend(statuses)
             history["messages"][message_id]["statusHistory"] = status_history
 
         chat["history"] = history
@@ -310,7 +515,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_chat_model(db, chat).chat,
                     "meta": chat.meta,
                     "pinned": chat.pinned,
                     "folder_id": chat.folder_id,
@@ -344,7 +549,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._to_chat_model(db, chat).chat
                 shared_chat.meta = chat.meta
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
@@ -375,7 +580,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -387,7 +592,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -399,7 +604,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -418,36 +623,15 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
 
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id, archived=True)
-
-            if filter:
-                query_key = filter.get("query")
-                if query_key:
-                    query = query.filter(Chat.title.ilike(f"%{query_key}%"))
-
-                order_by = filter.get("order_by")
-                direction = filter.get("direction")
-
-                if order_by and direction and getattr(Chat, order_by):
-                    if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
-                    elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
-                    else:
-                        raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
-
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            query = db.query(*CHAT_LIST_COLUMNS).filter(
+                Chat.user_id == user_id, Chat.archived == True
+            )
+            query = self._apply_list_filter(query, filter)
+            query = self._apply_list_page(query, skip=skip, limit=limit)
+            return self._to_title_id_list(query.all())
 
     def get_chat_list_by_user_id(
         self,
@@ -456,37 +640,15 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.user_id == user_id)
             if not include_archived:
-                query = query.filter_by(archived=False)
-
-            if filter:
-                query_key = filter.get("query")
-                if query_key:
-                    query = query.filter(Chat.title.ilike(f"%{query_key}%"))
-
-                order_by = filter.get("order_by")
-                direction = filter.get("direction")
-
-                if order_by and direction and getattr(Chat, order_by):
-                    if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
-                    elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
-                    else:
-                        raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
+                query = query.filter(Chat.archived == False)
 
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
-
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            query = self._apply_list_filter(query, filter)
+            query = self._apply_list_page(query, skip=skip, limit=limit)
+            return self._to_title_id_list(query.all())
 
     def get_chat_list_by_user_id_with_feedback(
         self,
@@ -496,73 +658,57 @@ class ChatTable:
         skip: int = 0,
         limit: int = 50,
     ) -> list[dict]:
-        """获取用户聊天列表及其反馈统计信息"""
+        """获取用户聊天列表及其反馈统计信息（一条查询：分页子查询 + 反馈聚合 LEFT JOIN）"""
+        from open_webui.models.feedbacks import Feedback
+
         with get_db() as db:
-            from sqlalchemy import text
-            from open_webui.models.feedbacks import Feedback
-            
-            # 构建基础查询
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.user_id == user_id)
             if not include_archived:
-                query = query.filter_by(archived=False)
-
-            if filter:
-                query_key = filter.get("query")
-                if query_key:
-                    query = query.filter(Chat.title.ilike(f"%{query_key}%"))
-
-                order_by = filter.get("order_by")
-                direction = filter.get("direction")
-
-                if order_by and direction and getattr(Chat, order_by):
-                    if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
-                    elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
-                    else:
-                        raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+                query = query.filter(Chat.archived == False)
+            query = self._apply_list_filter(query, filter)
+            page = self._apply_list_page(query, skip=skip, limit=limit).subquery()
+
+            rating = Feedback.data["rating"].as_integer()
+            stats = (
+                db.query(
+                    Feedback.chat_id.label("chat_id"),
+                    func.sum(case((rating == 1, 1), else_=0)).label("thumbs_up"),
+                    func.sum(case((rating == -1, 1), else_=0)).label("thumbs_down"),
+                    func.count(Feedback.id).label("total_feedback"),
+                )
+                .filter(Feedback.chat_id.in_(select(page.c.id)))
+                .group_by(Feedback.chat_id)
+                .subquery()
+            )
 
-            all_chats = query.all()
-            
-            # 为每个聊天添加反馈统计
-            result = []
-            for chat in all_chats:
-                chat_dict = ChatModel.model_validate(chat).model_dump()
-                
-                # 获取该聊天的反馈统计
-                try:
-                    feedback_stats = db.execute(text("""
-                        SELECT 
-                            SUM(CASE WHEN JSON_EXTRACT(data, '$.rating') = 1 THEN 1 ELSE 0 END) as thumbs_up,
-                            SUM(CASE WHEN JSON_EXTRACT(data, '$.rating') = -1 THEN 1 ELSE 0 END) as thumbs_down,
-                            COUNT(*) as total_feedback
-                        FROM feedback 
-                        WHERE chat_id = :chat_id
-                    """), {"chat_id": chat.id}).fetchone()
-                    
-                    chat_dict.update({
-                        "thumbs_up": int(feedback_stats[0] or 0),
-                        "thumbs_down": int(feedback_stats[1] or 0),
-                        "total_feedback": int(feedback_stats[2] or 0)
-                    })
-                except Exception as e:
-                    # 如果查询失败，设置默认值
-                    chat_dict.update({
-                        "thumbs_up": 0,
-                        "thumbs_down": 0,
-                        "total_feedback": 0
-                    })
-                
-                result.append(chat_dict)
-            
-            return result
+            # 子查询的顺序不保证保留，外层按同样的规则重新排序
+            order_by = [page.c.updated_at.desc(), page.c.id.desc()]
+            if filter and filter.get("order_by") and filter.get("direction"):
+                column = page.c.get(filter["order_by"])
+                if column is not None:
+                    order_by = [
+                        (
+                            column.asc()
+                            if filter["direction"].lower() == "asc"
+                            else column.desc()
+                        )
+                    ]
+
+            rows = (
+                db.query(
+                    page,
+                    func.coalesce(stats.c.thumbs_up, 0).label("thumbs_up"),
+                    func.coalesce(stats.c.thumbs_down, 0).label("thumbs_down"),
+                    func.coalesce(stats.c.total_feedback, 0).label("total_feedback"),
+                )
+                .outerjoin(stats, stats.c.chat_id == page.c.id)
+                .order_by(*order_by)
+                .all()
+            )
+            return [
+                ChatFeedbackListResponse.model_validate(dict(row._mapping)).model_dump()
+                for row in rows
+            ]
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -571,41 +717,53 @@ class ChatTable:
         include_folders: bool = False,
         skip: Optional[int] = None,
         limit: Optional[int] = None,
+        cursor: Optional[str] = None,
     ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.user_id == user_id)
 
             if not include_folders:
-                query = query.filter_by(folder_id=None)
+                query = query.filter(Chat.folder_id == None)
 
             query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
 
             if not include_archived:
-                query = query.filter_by(archived=False)
-
-            query = query.order_by(Chat.updated_at.desc()).with_entities(
-                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
-            )
+                query = query.filter(Chat.archived == False)
 
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+            query = self._apply_list_page(query, cursor=cursor, skip=skip, limit=limit)
+            return self._to_title_id_list(query.all())
 
-            all_chats = query.all()
+    def get_pinned_chat_title_id_list_by_user_id(
+        self, user_id: str
+    ) -> list[ChatTitleIdResponse]:
+        with get_db() as db:
+            query = (
+                db.query(*CHAT_LIST_COLUMNS)
+                .filter(
+                    Chat.user_id == user_id,
+                    Chat.pinned == True,
+                    Chat.archived == False,
+                )
+                .order_by(Chat.updated_at.desc(), Chat.id.desc())
+            )
+            return self._to_title_id_list(query.all())
 
-            # result has to be destructured from sqlalchemy `row` and mapped to a dict since the `ChatModel`is not the returned dataclass.
-            return [
-                ChatTitleIdResponse.model_validate(
-                    {
-                        "id": chat[0],
-                        "title": chat[1],
-                        "updated_at": chat[2],
-                        "created_at": chat[3],
-                    }
+    def get_chat_title_id_list_by_folder_id_and_user_id(
+        self, folder_id: str, user_id: str
+    ) -> list[ChatTitleIdResponse]:
+        with get_db() as db:
+            query = (
+                db.query(*CHAT_LIST_COLUMNS)
+                .filter(
+                    Chat.folder_id == folder_id,
+                    Chat.user_id == user_id,
+                    or_(Chat.pinned == False, Chat.pinned == None),
+                    Chat.archived == False,
                 )
-                for chat in all_chats
-            ]
+                .order_by(Chat.updated_at.desc(), Chat.id.desc())
+            )
+            return self._to_title_id_list(query.all())
 
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
@@ -618,13 +776,18 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
+
+    def get_chat_user_id_by_id(self, id: str) -> Optional[str]:
+        """只查询聊天所属用户（权限检查用），不读取聊天 JSON 与消息"""
+        with get_db() as db:
+            return db.query(Chat.user_id).filter_by(id=id).scalar()
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -646,7 +809,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -657,7 +820,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -666,7 +829,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -675,7 +838,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -684,7 +847,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -693,9 +856,10 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Filters chats through the full-text search index (chat_search), supporting
+        tag:/folder:/pinned:/archived:/shared: filters and skip/limit pagination.
         """
         search_text = search_text.replace("\u0000", "").lower().strip()
 
@@ -754,10 +918,11 @@ class ChatTable:
             )
         ]
 
-        search_text = " ".join(search_text_words)
+        # 补建旧数据的索引，并刷新消息写入后过期的索引行
+        ChatSearches.ensure_user_indexed(user_id)
 
         with get_db() as db:
-            query = db.query(Chat).filter(Chat.user_id == user_id)
+            query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.user_id == user_id)
 
             if is_archived is not None:
                 query = query.filter(Chat.archived == is_archived)
@@ -776,114 +941,24 @@ class ChatTable:
             if folder_ids:
                 query = query.filter(Chat.folder_id.in_(folder_ids))
 
-            query = query.order_by(Chat.updated_at.desc())
-
-            # Check if the database dialect is either 'sqlite' or 'postgresql'
-            dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                sqlite_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_each(Chat.chat, '$.messages') AS message "
-                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                sqlite_content_clause = text(sqlite_content_sql)
+            if "none" in tag_ids:
                 query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
-
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_each(Chat.meta, '$.tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_each(Chat.meta, '$.tags') AS tag
-                                        WHERE tag.value = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
-
-            elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                postgres_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_array_elements(Chat.chat->'messages') AS message "
-                    "    WHERE LOWER(message->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
+                    Chat.id.in_(ChatSearches.get_untagged_chat_ids(user_id))
                 )
-                postgres_content_clause = text(postgres_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
+                tag_ids = []
+
+            search_text_words = [word for word in search_text_words if word]
+            if search_text_words or tag_ids:
+                # 标题/内容与标签都走全文索引，按相关度排序
+                matches = ChatSearches.search(db, user_id, search_text_words, tag_ids)
+                query = query.join(matches, matches.c.chat_id == Chat.id).order_by(
+                    matches.c.score.desc(), Chat.updated_at.desc(), Chat.id.desc()
                 )
-
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                                        WHERE tag = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
             else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
-                )
+                query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
 
             # Perform pagination at the SQL level
-            all_chats = query.offset(skip).limit(limit).all()
-
-            log.info(f"The number of chats: {len(all_chats)}")
-
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_title_id_list(query.offset(skip).limit(limit).all())
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -896,7 +971,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -911,7 +986,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -924,7 +999,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -936,9 +1011,9 @@ class ChatTable:
 
     def get_chat_list_by_user_id_and_tag_name(
         self, user_id: str, tag_name: str, skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.user_id == user_id)
             tag_id = tag_name.replace(" ", "_").lower()
 
             log.info(f"DB dialect name: {db.bind.dialect.name}")
@@ -961,9 +1036,9 @@ class ChatTable:
                     f"Unsupported dialect: {db.bind.dialect.name}"
                 )
 
-            all_chats = query.all()
-            log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+            query = self._apply_list_page(query, skip=skip, limit=limit)
+            return self._to_title_id_list(query.all())
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -981,10 +1056,11 @@ class ChatTable:
                         **chat.meta,
                         "tags": list(set(chat.meta.get("tags", []) + [tag_id])),
                     }
+                    ChatSearches.update_tags(db, chat)
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -1048,6 +1124,7 @@ class ChatTable:
                     **chat.meta,
                     "tags": list(set(tags)),
                 }
+                ChatSearches.update_tags(db, chat)
                 db.commit()
                 return True
         except Exception:
@@ -1061,6 +1138,7 @@ class ChatTable:
                     **chat.meta,
                     "tags": [],
                 }
+                ChatSearches.update_tags(db, chat)
                 db.commit()
 
                 return True
@@ -1074,9 +1152,9 @@ class ChatTable:
                 chat = db.query(Chat).filter_by(id=id).first()
                 if not chat:
                     return False
-                
+
                 user_id = chat.user_id
-                
+
                 # 删除与该聊天关联的反馈数据（包括有chat_id和没有chat_id的旧数据）
                 from open_webui.models.feedbacks import Feedback
                 # 删除有chat_id的反馈
@@ -1084,9 +1162,11 @@ class ChatTable:
                 # 删除没有chat_id的旧反馈（通过用户ID关联）
                 db.query(Feedback).filter_by(user_id=user_id, chat_id=None).delete()
                 log.info(f"Deleted feedback data for chat {id} and user {user_id}")
-                
+
                 # 删除聊天
                 db.query(Chat).filter_by(id=id).delete()
+                ChatSearches.delete_by_chat_ids(db, [id])
+                ChatMessages.delete_by_chat_ids(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -1104,9 +1184,11 @@ class ChatTable:
                 # 删除没有chat_id的旧反馈（通过用户ID关联）
                 db.query(Feedback).filter_by(user_id=user_id, chat_id=None).delete()
                 log.info(f"Deleted feedback data for chat {id} and user {user_id}")
-                
+
                 # 删除聊天
                 db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                ChatSearches.delete_by_chat_ids(db, [id])
+                ChatMessages.delete_by_chat_ids(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -1118,14 +1200,18 @@ class ChatTable:
         try:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
-                
+
                 # 删除用户的所有反馈数据
                 from open_webui.models.feedbacks import Feedback
                 db.query(Feedback).filter_by(user_id=user_id).delete()
                 log.info(f"Deleted all feedback data for user {user_id}")
 
                 # 删除用户的所有聊天
+                ChatMessages.delete_by_chat_ids(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
+                ChatSearches.delete_by_user_id(db, user_id)
                 db.commit()
 
                 return True
@@ -1138,6 +1224,11 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                chat_ids = select(Chat.id).where(
+                    Chat.user_id == user_id, Chat.folder_id == folder_id
+                )
+                ChatSearches.delete_by_chat_ids(db, chat_ids)
+                ChatMessages.delete_by_chat_ids(db, chat_ids)
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
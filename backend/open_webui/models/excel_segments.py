@@ -0,0 +1,325 @@
+import logging
+import time
+import uuid
+from typing import Iterator, Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.models.files import FileModel, Files
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Index, Integer, String, Text, func
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+# file.data 中的标记：分段已在 excel_segment 表中（新保存的文件，或已回填的旧文件）
+SEGMENTS_INDEXED_KEY = "segments_indexed"
+# 读取分段时只加载 file.data 中的这些键，不加载兼容用的整本 Markdown（content）
+EXCEL_FILE_DATA_KEYS = ["source_file", "sheets", SEGMENTS_INDEXED_KEY]
+
+####################
+# ExcelSegment DB Schema (Excel 聚合文件的分段表)
+####################
+
+
+class ExcelSegment(Base):
+    __tablename__ = "excel_segment"
+
+    id = Column(String, primary_key=True)
+    file_id = Column(String, nullable=False)  # 聚合后的 file.id
+
+    sheet = Column(Text, nullable=False)
+    sheet_index = Column(Integer, nullable=False)  # sheet 在工作簿中的顺序
+    row = Column(Integer, nullable=False)  # Excel 行号（旧数据为 sheet 内序号）
+
+    title = Column(Text, nullable=True)
+    content = Column(Text, nullable=False)
+    questions = Column(Text, nullable=True)
+
+    created_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_excel_segment_file_sheet_row",
+            "file_id",
+            "sheet",
+            "row",
+        ),
+        Index(
+            "ix_excel_segment_file_sheet_index",
+            "file_id",
+            "sheet_index",
+        ),
+    )
+
+
+class ExcelSegmentModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    file_id: str
+
+    sheet: str
+    sheet_index: int
+    row: int
+
+    title: Optional[str] = None
+    content: str
+    questions: Optional[str] = None
+
+    created_at: int  # timestamp in epoch
+
+    def to_segment(self) -> dict:
+        """转换为前端使用的分段结构"""
+        return {
+            "row": self.row,
+            "title": self.title or "",
+            "content": self.content,
+            "questions": self.questions or "",
+        }
+
+
+####################
+# Forms
+####################
+
+
+class ExcelSheetSummary(BaseModel):
+    name: str
+    sheet_index: int
+    segment_count: int
+
+
+def parse_excel_segment_markdown(content: str) -> list[dict]:
+    """从旧版聚合文件的 Markdown 内容解析 Sheet 与分段（仅用于回填旧数据）"""
+    sheets: list[dict] = []
+    current_sheet = None
+    current_seg = None
+
+    def push_seg():
+        nonlocal current_seg
+        if current_sheet is not None and current_seg is not None:
+            # 旧数据没有行号，使用 sheet 内序号
+            current_seg["row"] = len(current_sheet["segments"]) + 1
+            current_sheet["segments"].append(current_seg)
+        current_seg = None
+
+    for line in content.splitlines():
+        if line.startswith("# ") and not line.startswith("## "):
+            # 新 sheet（没有分段的 sheet 也保留）
+            push_seg()
+            current_sheet = {"name": line[2:].strip(), "segments": []}
+            sheets.append(current_sheet)
+            continue
+        if line.startswith("## "):
+            # 新分段
+            push_seg()
+            current_seg = {"title": line[3:].strip(), "content": "", "questions": ""}
+            continue
+        if current_seg is None:
+            # 忽略 sheet 标题下的空行等
+            continue
+        # 注意：只有当整行严格以"问题（选填，单元格内一行一个）:"开头时才识别为问题标记
+        stripped_line = line.strip()
+        if (
+            stripped_line.startswith("问题（选填，单元格内一行一个）:")
+            and len(stripped_line.split(":", 1)) == 2
+        ):
+            question_text = stripped_line.split(":", 1)[1].strip()
+            if question_text:
+                current_seg["questions"] = question_text
+        else:
+            current_seg["content"] += ("\n" if current_seg["content"] else "") + line
+
+    push_seg()
+    return sheets
+
+
+class ExcelSegmentTable:
+    def backfill_from_file_data(self, file_id: str, data: dict) -> Optional[list[dict]]:
+        """
+        旧版文件的分段保存在 file.data（sheets_data 或 Markdown）中，首次读取时写入本表。
+        返回应写回 file.data["sheets"] 的 Sheet 摘要（含没有分段的 Sheet）；
+        已回填或没有旧数据时返回 None
+        """
+        if self.has_segments(file_id):
+            return None
+
+        sheets = data.get("sheets_data") or parse_excel_segment_markdown(
+            data.get("content", "")
+        )
+        if not sheets:
+            return None
+
+        expected = sum(len(sheet.get("segments", [])) for sheet in sheets)
+        if self.insert_sheets(file_id, sheets) != expected:
+            raise Exception(f"Failed to backfill Excel segments of file {file_id}")
+        return [
+            {
+                "name": sheet.get("name", ""),
+                "segment_count": len(sheet.get("segments", [])),
+            }
+            for sheet in sheets
+        ]
+
+    def get_file(self, file_id: str) -> Optional[FileModel]:
+        """读取 file 记录，data 只含 EXCEL_FILE_DATA_KEYS"""
+        return Files.get_file_by_id_with_data_keys(file_id, EXCEL_FILE_DATA_KEYS)
+
+    def ensure_indexed(self, file: FileModel) -> FileModel:
+        """
+        没有标记的旧文件完整读取一次 file.data 并回填本表，再写入标记；
+        之后（包括所有 Sheet 都为空的工作簿）不再读取或改写完整的 file.data
+        """
+        if (file.data or {}).get(SEGMENTS_INDEXED_KEY):
+            return file
+
+        legacy = Files.get_file_by_id(file.id)
+        sheets = self.backfill_from_file_data(file.id, legacy.data or {})
+        update = {SEGMENTS_INDEXED_KEY: True}
+        if sheets is not None:
+            # 没有分段的 Sheet 不会写入表中，Sheet 列表保存在 file.data["sheets"]
+            update["sheets"] = sheets
+        Files.update_file_data_by_id(file.id, update)
+        return self.get_file(file.id) or file
+
+    def insert_sheets(self, file_id: str, sheets: list[dict]) -> int:
+        """
+        批量写入一个文件的全部分段，sheets 为 [{name, segments: [{row, title, content, questions}]}]
+        """
+        now = int(time.time())
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "file_id": file_id,
+                "sheet": sheet.get("name", ""),
+                "sheet_index": sheet_index,
+                "row": int(segment.get("row") or 0),
+                "title": segment.get("title") or "",
+                "content": segment.get("content") or "",
+                "questions": segment.get("questions") or "",
+                "created_at": now,
+            }
+            for sheet_index, sheet in enumerate(sheets)
+            for segment in sheet.get("segments", [])
+        ]
+
+        with get_db() as db:
+            try:
+                db.query(ExcelSegment).filter_by(file_id=file_id).delete(
+                    synchronize_session=False
+                )
+                if rows:
+                    db.bulk_insert_mappings(ExcelSegment, rows)
+                db.commit()
+                return len(rows)
+            except Exception as e:
+                log.exception(f"Error inserting Excel segments: {e}")
+                db.rollback()
+                return 0
+
+    def has_segments(self, file_id: str) -> bool:
+        with get_db() as db:
+            return (
+                db.query(ExcelSegment.id).filter_by(file_id=file_id).first() is not None
+            )
+
+    def get_sheets(
+        self, file_id: str, sheet_names: Optional[list[str]] = None
+    ) -> list[ExcelSheetSummary]:
+        """
+        按 sheet 聚合分段数量，只查询索引列。
+        sheet_names 为 file.data["sheets"] 中的工作簿顺序，其中没有分段的 Sheet 以 0 条返回
+        """
+        with get_db() as db:
+            rows = (
+                db.query(
+                    ExcelSegment.sheet_index,
+                    ExcelSegment.sheet,
+                    func.count(ExcelSegment.id),
+                )
+                .filter_by(file_id=file_id)
+                .group_by(ExcelSegment.sheet_index, ExcelSegment.sheet)
+                .order_by(ExcelSegment.sheet_index.asc())
+                .all()
+            )
+        sheets = [
+            ExcelSheetSummary(name=sheet, sheet_index=sheet_index, segment_count=count)
+            for sheet_index, sheet, count in rows
+        ]
+        if not sheet_names:
+            return sheets
+
+        stored = {sheet.name: sheet for sheet in sheets}
+        ordered = [
+            stored.pop(name, None)
+            or ExcelSheetSummary(name=name, sheet_index=sheet_index, segment_count=0)
+            for sheet_index, name in enumerate(dict.fromkeys(sheet_names))
+        ]
+        return ordered + list(stored.values())
+
+    def get_segments(
+        self,
+        file_id: str,
+        sheet: str,
+        skip: int = 0,
+        limit: Optional[int] = None,
+    ) -> list[ExcelSegmentModel]:
+        """按行号分页获取某个 sheet 的分段"""
+        with get_db() as db:
+            query = (
+                db.query(ExcelSegment)
+                .filter_by(file_id=file_id, sheet=sheet)
+                .order_by(ExcelSegment.row.asc(), ExcelSegment.id.asc())
+            )
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            return [
+                ExcelSegmentModel.model_validate(segment) for segment in query.all()
+            ]
+
+    def get_segment(
+        self, file_id: str, sheet: str, row: int
+    ) -> Optional[ExcelSegmentModel]:
+        with get_db() as db:
+            segment = (
+                db.query(ExcelSegment)
+                .filter_by(file_id=file_id, sheet=sheet, row=row)
+                .first()
+            )
+            return ExcelSegmentModel.model_validate(segment) if segment else None
+
+    def iter_segments(
+        self, file_id: str, batch_size: int = 500
+    ) -> Iterator[ExcelSegmentModel]:
+        """按 sheet/行号顺序流式读取整个文件的分段"""
+        with get_db() as db:
+            query = (
+                db.query(ExcelSegment)
+                .filter_by(file_id=file_id)
+                .order_by(
+                    ExcelSegment.sheet_index.asc(),
+                    ExcelSegment.row.asc(),
+                    ExcelSegment.id.asc(),
+                )
+                .yield_per(batch_size)
+            )
+            for segment in query:
+                yield ExcelSegmentModel.model_validate(segment)
+
+    def delete_by_file_id(self, file_id: str) -> bool:
+        with get_db() as db:
+            try:
+                db.query(ExcelSegment).filter_by(file_id=file_id).delete()
+                db.commit()
+                return True
+            except Exception as e:
+                log.exception(f"Error deleting Excel segments: {e}")
+                db.rollback()
+                return False
+
+
+ExcelSegments = ExcelSegmentTable()
@@ -130,6 +130,42 @@ class FilesTable:
             except Exception:
                 return None
 
+    def get_file_by_id_with_data_keys(
+        self, id: str, keys: list[str]
+    ) -> Optional[FileModel]:
+        """Like get_file_by_id, but only loads the given top-level keys of `data`."""
+        with get_db() as db:
+            try:
+                row = (
+                    db.query(
+                        File.id,
+                        File.user_id,
+                        File.hash,
+                        File.filename,
+                        File.path,
+                        File.meta,
+                        File.access_control,
+                        File.created_at,
+                        File.updated_at,
+                        *(File.data[key].label(f"data_{key}") for key in keys),
+                    )
+                    .filter_by(id=id)
+                    .first()
+                )
+                if row is None:
+                    return None
+
+                fields = row._asdict()
+                data = {key: fields.pop(f"data_{key}") for key in keys}
+                return FileModel(
+                    **fields,
+                    data={
+                        key: value for key, value in data.items() if value is not None
+                    },
+                )
+            except Exception:
+                return None
+
     def get_file_by_id_and_user_id(self, id: str, user_id: str) -> Optional[FileModel]:
         with get_db() as db:
             try:
@@ -162,36 +198,36 @@ class FilesTable:
         file = self.get_file_by_id(id)
         if not file:
             return False
-        
+
         # 获取当前用户信息
         from open_webui.models.users import Users
         current_user = Users.get_user_by_id(user_id)
         if not current_user:
             return False
-        
+
         # 1. 检查是否是管理员（最高权限）
         if current_user.role == "admin":
             return True
-        
+
         # 2. 检查是否是文件负责人（个人）
         file_meta = file.meta or {}
         file_data = file_meta.get("data", {})
-        
+
         # 检查两个位置的owner：meta.owner 和 meta.data.owner
         file_owner = file_meta.get("owner", "") or file_data.get("owner", "")
-        
+
         if file_owner and current_user.name == file_owner:
             return True
-        
+
         # 3. 检查是否是文件负责部门成员
         if file_owner:
             from open_webui.models.groups import Groups
             groups = Groups.get_groups_by_member_id(user_id)
-            
+
             for group in groups:
                 if group.name == file_owner:
                     return True
-        
+
         # 4. 检查是否是知识库所有者
         collection_name = file_data.get("collection_name")
         if collection_name:
@@ -199,11 +235,11 @@ class FilesTable:
             knowledge = Knowledges.get_knowledge_by_id(collection_name)
             if knowledge and knowledge.user_id == user_id:
                 return True
-        
+
         # 5. 检查是否是文件上传者（最低权限）
         if file.user_id == user_id:
             return True
-        
+
         return False
 
     def get_files_by_ids(self, ids: list[str]) -> list[FileModel]:
@@ -277,7 +313,7 @@ class FilesTable:
                 file = db.query(File).filter_by(id=id).first()
                 if not file:
                     return False
-                
+
                 # 删除物理文件
                 try:
                     import os
@@ -286,7 +322,7 @@ class FilesTable:
                         os.remove(file.path)
                 except Exception as e:
                     pass
-                
+
                 # 删除数据库记录
                 db.query(File).filter_by(id=id).delete()
                 db.commit()
@@ -6,7 +6,7 @@ from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, Index
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, Index, func
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -100,6 +100,23 @@ class FunctionValves(BaseModel):
 
 
 class FunctionsTable:
+    def __init__(self):
+        self._change_listeners = []
+
+    def add_change_listener(self, callback):
+        """Register `callback(function_id)` to run after a committed write.
+
+        `function_id` is None when the write touched every function.
+        """
+        self._change_listeners.append(callback)
+
+    def _notify_change(self, id: Optional[str] = None):
+        for callback in self._change_listeners:
+            try:
+                callback(id)
+            except Exception as e:
+                log.exception(f"Error notifying function change {id}: {e}")
+
     def insert_new_function(
         self, user_id: str, type: str, form_data: FunctionForm
     ) -> Optional[FunctionModel]:
@@ -119,6 +136,7 @@ class FunctionsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                self._notify_change(result.id)
                 if result:
                     return FunctionModel.model_validate(result)
                 else:
@@ -166,6 +184,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                self._notify_change()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -203,6 +222,14 @@ class FunctionsTable:
                     FunctionModel.model_validate(function) for function in functions
                 ]
 
+    def get_functions_version(self) -> tuple[int, int]:
+        """(row count, latest updated_at): changes whenever a function is written or deleted."""
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Function.id), func.max(Function.updated_at)
+            ).one()
+            return count, updated_at or 0
+
     def get_functions_by_type(
         self, type: str, active_only=False
     ) -> list[FunctionModel]:
@@ -257,6 +284,7 @@ class FunctionsTable:
                 function.updated_at = int(time.time())
                 db.commit()
                 db.refresh(function)
+                self._notify_change(id)
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -277,6 +305,7 @@ class FunctionsTable:
                     function.updated_at = int(time.time())
                     db.commit()
                     db.refresh(function)
+                    self._notify_change(id)
                     return self.get_function_by_id(id)
                 else:
                     return None
@@ -337,6 +366,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._notify_change(id)
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -351,6 +381,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self._notify_change()
                 return True
             except Exception:
                 return None
@@ -360,6 +391,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                self._notify_change(id)
 
                 return True
             except Exception:
@@ -9,6 +9,7 @@ from open_webui.env import SRC_LOG_LEVELS
 
 from open_webui.models.files import FileMetadataResponse
 from open_webui.models.groups import Groups
+from open_webui.models.knowledge_file_link import KnowledgeFileLink, KnowledgeFileLinks
 from open_webui.models.users import Users, UserResponse
 
 
@@ -101,6 +102,23 @@ class KnowledgeForm(BaseModel):
 
 
 class KnowledgeTable:
+    ####################
+    # 知识库的成员文件以 knowledge_file_link 为准；data["file_ids"] 不再落库，
+    # 读取时由关联表派生（一次索引查询），写入 data["file_ids"] 会同步到关联表
+    ####################
+
+    def _with_file_ids(self, knowledge: KnowledgeModel) -> KnowledgeModel:
+        file_ids = KnowledgeFileLinks.get_file_ids_by_knowledge_ids([knowledge.id])
+        knowledge.data = {**(knowledge.data or {}), "file_ids": file_ids[knowledge.id]}
+        return knowledge
+
+    def _split_file_ids(self, id: str, data: Optional[dict]) -> Optional[dict]:
+        """把 data 中的 file_ids 写入关联表，返回需要落库的其余字段"""
+        if not data or "file_ids" not in data:
+            return data
+        KnowledgeFileLinks.set_file_ids(id, data["file_ids"] or [])
+        return {key: value for key, value in data.items() if key != "file_ids"}
+
     def insert_new_knowledge(
         self, user_id: str, form_data: KnowledgeForm
     ) -> Optional[KnowledgeModel]:
@@ -116,12 +134,17 @@ class KnowledgeTable:
             )
 
             try:
-                result = Knowledge(**knowledge.model_dump())
+                result = Knowledge(
+                    **{
+                        **knowledge.model_dump(),
+                        "data": self._split_file_ids(knowledge.id, knowledge.data),
+                    }
+                )
                 db.add(result)
                 db.commit()
                 db.refresh(result)
                 if result:
-                    return KnowledgeModel.model_validate(result)
+                    return self._with_file_ids(KnowledgeModel.model_validate(result))
                 else:
                     return None
             except Exception:
@@ -138,6 +161,10 @@ class KnowledgeTable:
             users = Users.get_users_by_user_ids(user_ids) if user_ids else []
             users_dict = {user.id: user for user in users}
 
+            file_ids = KnowledgeFileLinks.get_file_ids_by_knowledge_ids(
+                [knowledge.id for knowledge in all_knowledge]
+            )
+
             knowledge_bases = []
             for knowledge in all_knowledge:
                 user = users_dict.get(knowledge.user_id)
@@ -145,6 +172,10 @@ class KnowledgeTable:
                     KnowledgeUserModel.model_validate(
                         {
                             **KnowledgeModel.model_validate(knowledge).model_dump(),
+                            "data": {
+                                **(knowledge.data or {}),
+                                "file_ids": file_ids[knowledge.id],
+                            },
                             "user": user.model_dump() if user else None,
                         }
                     )
@@ -178,7 +209,9 @@ class KnowledgeTable:
         try:
             with get_db() as db:
                 knowledge = db.query(Knowledge).filter_by(id=id).first()
-                return KnowledgeModel.model_validate(knowledge) if knowledge else None
+                if knowledge is None:
+                    return None
+                return self._with_file_ids(KnowledgeModel.model_validate(knowledge))
         except Exception:
             return None
 
@@ -191,6 +224,7 @@ class KnowledgeTable:
                 db.query(Knowledge).filter_by(id=id).update(
                     {
                         **form_data.model_dump(),
+                        "data": self._split_file_ids(id, form_data.data),
                         "updated_at": int(time.time()),
                     }
                 )
@@ -208,7 +242,7 @@ class KnowledgeTable:
                 knowledge = self.get_knowledge_by_id(id=id)
                 db.query(Knowledge).filter_by(id=id).update(
                     {
-                        "data": data,
+                        "data": self._split_file_ids(id, data),
                         "updated_at": int(time.time()),
                     }
                 )
@@ -218,12 +252,43 @@ class KnowledgeTable:
             log.exception(e)
             return None
 
+    def add_file_to_knowledge_by_id(self, id: str, file_id: str) -> bool:
+        """添加单个文件：只插入一条关联并更新时间戳；已在知识库中视为成功"""
+        if KnowledgeFileLinks.add_links(id, [file_id]):
+            self._touch(id)
+            return True
+        return KnowledgeFileLinks.get_link(id, file_id) is not None
+
+    def add_files_to_knowledge_by_id(self, id: str, file_ids: list[str]) -> list[str]:
+        """批量添加文件：只插入缺少的关联，返回新加入的 file_id"""
+        added = KnowledgeFileLinks.add_links(id, file_ids, is_indexed=True)
+        if added:
+            self._touch(id)
+        return added
+
+    def remove_file_from_knowledge_by_id(self, id: str, file_id: str) -> bool:
+        """移除单个文件：只删除一条关联并更新时间戳；不在知识库中返回 False"""
+        if not KnowledgeFileLinks.get_link(id, file_id):
+            return False
+        if not KnowledgeFileLinks.delete_link(id, file_id):
+            return False
+        self._touch(id)
+        return True
+
+    def _touch(self, id: str) -> None:
+        with get_db() as db:
+            db.query(Knowledge).filter_by(id=id).update(
+                {"updated_at": int(time.time())}
+            )
+            db.commit()
+
     def delete_knowledge_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
                 db.query(Knowledge).filter_by(id=id).delete()
                 db.commit()
-                return True
+            KnowledgeFileLinks.delete_links_by_knowledge_id(id)
+            return True
         except Exception:
             return False
 
@@ -231,6 +296,7 @@ class KnowledgeTable:
         with get_db() as db:
             try:
                 db.query(Knowledge).delete()
+                db.query(KnowledgeFileLink).delete()
                 db.commit()
 
                 return True
@@ -5,8 +5,9 @@ from sqlalchemy import PrimaryKeyConstraint
 
 from open_webui.internal.db import Base, get_db
 from open_webui.env import SRC_LOG_LEVELS
+from open_webui.models.files import File, FileMetadataResponse
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, Boolean, String
+from sqlalchemy import BigInteger, Column, Boolean, Index, String, func
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -18,18 +19,21 @@ log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 class KnowledgeFileLink(Base):
     __tablename__ = "knowledge_file_link"
-    
+
     knowledge_id = Column(String, nullable=False)
     file_id = Column(String, nullable=False)
-    
+
     is_indexed = Column(Boolean, default=False, nullable=False)  # 标记文件是否已成功索引到该知识库
-    
+
     created_at = Column(BigInteger, nullable=False)
     updated_at = Column(BigInteger, nullable=False)
-    
+
     # 复合主键：knowledge_id + file_id
     __table_args__ = (
         PrimaryKeyConstraint("knowledge_id", "file_id", name="pk_knowledge_file"),
+        Index("ix_knowledge_file_link_file_id", "file_id"),
+        # WHERE knowledge_id = ... ORDER BY created_at（file_ids 的顺序）
+        Index("ix_knowledge_file_link_knowledge_created", "knowledge_id", "created_at"),
     )
 
 
@@ -68,7 +72,7 @@ class KnowledgeFileLinkTable:
                     .filter_by(knowledge_id=knowledge_id, file_id=file_id)
                     .first()
                 )
-                
+
                 if existing:
                     # 如果已存在，更新 is_indexed 状态
                     existing.is_indexed = is_indexed
@@ -76,7 +80,7 @@ class KnowledgeFileLinkTable:
                     db.commit()
                     db.refresh(existing)
                     return KnowledgeFileLinkModel.model_validate(existing)
-                
+
                 # 创建新关联
                 link = KnowledgeFileLink(
                     knowledge_id=knowledge_id,
@@ -85,11 +89,11 @@ class KnowledgeFileLinkTable:
                     created_at=int(time.time()),
                     updated_at=int(time.time()),
                 )
-                
+
                 db.add(link)
                 db.commit()
                 db.refresh(link)
-                
+
                 return KnowledgeFileLinkModel.model_validate(link)
             except Exception as e:
                 log.exception(f"Error creating knowledge-file link: {e}")
@@ -119,10 +123,10 @@ class KnowledgeFileLinkTable:
         with get_db() as db:
             try:
                 query = db.query(KnowledgeFileLink).filter_by(knowledge_id=knowledge_id)
-                
+
                 if only_indexed:
                     query = query.filter_by(is_indexed=True)
-                
+
                 links = query.order_by(KnowledgeFileLink.created_at.desc()).all()
                 return [KnowledgeFileLinkModel.model_validate(link) for link in links]
             except Exception as e:
@@ -155,16 +159,16 @@ class KnowledgeFileLinkTable:
                     .filter_by(knowledge_id=knowledge_id, file_id=file_id)
                     .first()
                 )
-                
+
                 if not link:
                     return None
-                
+
                 link.is_indexed = is_indexed
                 link.updated_at = int(time.time())
-                
+
                 db.commit()
                 db.refresh(link)
-                
+
                 return KnowledgeFileLinkModel.model_validate(link)
             except Exception as e:
                 log.exception(f"Error updating indexed status: {e}")
@@ -216,15 +220,186 @@ class KnowledgeFileLinkTable:
         with get_db() as db:
             try:
                 query = db.query(KnowledgeFileLink).filter_by(knowledge_id=knowledge_id)
-                
+
                 if only_indexed:
                     query = query.filter_by(is_indexed=True)
-                
+
                 return query.count()
             except Exception as e:
                 log.exception(f"Error counting files by knowledge_id: {e}")
                 return 0
 
+    ####################
+    # 知识库成员关系（knowledge.data["file_ids"] 由此派生）
+    ####################
 
-KnowledgeFileLinks = KnowledgeFileLinkTable()
+    def add_links(
+        self, knowledge_id: str, file_ids: list[str], is_indexed: bool = False
+    ) -> list[str]:
+        """批量添加关联，已存在的跳过；返回新加入的 file_id"""
+        with get_db() as db:
+            try:
+                existing = {
+                    file_id
+                    for (file_id,) in db.query(KnowledgeFileLink.file_id).filter(
+                        KnowledgeFileLink.knowledge_id == knowledge_id,
+                        KnowledgeFileLink.file_id.in_(file_ids),
+                    )
+                }
+                added = [
+                    file_id
+                    for file_id in dict.fromkeys(file_ids)
+                    if file_id not in existing
+                ]
+
+                now = int(time.time())
+                db.add_all(
+                    KnowledgeFileLink(
+                        knowledge_id=knowledge_id,
+                        file_id=file_id,
+                        is_indexed=is_indexed,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    for file_id in added
+                )
+                db.commit()
+                return added
+            except Exception as e:
+                log.exception(f"Error adding knowledge-file links: {e}")
+                db.rollback()
+                return []
+
+    def set_file_ids(self, knowledge_id: str, file_ids: list[str]) -> bool:
+        """把知识库的成员设置为 file_ids（只增删差异部分），兼容整体写入 file_ids 的旧调用"""
+        with get_db() as db:
+            try:
+                existing = {
+                    file_id
+                    for (file_id,) in db.query(KnowledgeFileLink.file_id).filter_by(
+                        knowledge_id=knowledge_id
+                    )
+                }
+                target = dict.fromkeys(file_ids)
+
+                removed = [file_id for file_id in existing if file_id not in target]
+                if removed:
+                    db.query(KnowledgeFileLink).filter(
+                        KnowledgeFileLink.knowledge_id == knowledge_id,
+                        KnowledgeFileLink.file_id.in_(removed),
+                    ).delete(synchronize_session=False)
+
+                now = int(time.time())
+                db.add_all(
+                    KnowledgeFileLink(
+                        knowledge_id=knowledge_id,
+                        file_id=file_id,
+                        is_indexed=True,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    for file_id in target
+                    if file_id not in existing
+                )
+                db.commit()
+                return True
+            except Exception as e:
+                log.exception(f"Error setting knowledge file ids: {e}")
+                db.rollback()
+                return False
+
+    def get_file_ids_by_knowledge_ids(
+        self, knowledge_ids: list[str]
+    ) -> dict[str, list[str]]:
+        """按添加顺序返回各知识库的 file_id（仅包含仍存在的文件），一次查询"""
+        file_ids = {knowledge_id: [] for knowledge_id in knowledge_ids}
+        if not knowledge_ids:
+            return file_ids
+
+        with get_db() as db:
+            rows = (
+                db.query(KnowledgeFileLink.knowledge_id, KnowledgeFileLink.file_id)
+                .join(File, File.id == KnowledgeFileLink.file_id)
+                .filter(KnowledgeFileLink.knowledge_id.in_(knowledge_ids))
+                .order_by(KnowledgeFileLink.created_at, KnowledgeFileLink.file_id)
+            )
+            for knowledge_id, file_id in rows:
+                file_ids[knowledge_id].append(file_id)
+        return file_ids
+
+    def get_file_metadatas_by_knowledge_ids(
+        self, knowledge_ids: list[str]
+    ) -> dict[str, list[FileMetadataResponse]]:
+        """各知识库的文件元数据（按文件更新时间倒序），一次 JOIN 查询"""
+        files = {knowledge_id: [] for knowledge_id in knowledge_ids}
+        if not knowledge_ids:
+            return files
+
+        with get_db() as db:
+            rows = (
+                db.query(
+                    KnowledgeFileLink.knowledge_id,
+                    File.id,
+                    File.meta,
+                    File.created_at,
+                    File.updated_at,
+                )
+                .join(File, File.id == KnowledgeFileLink.file_id)
+                .filter(KnowledgeFileLink.knowledge_id.in_(knowledge_ids))
+                .order_by(File.updated_at.desc(), File.id)
+            )
+            for row in rows:
+                files[row.knowledge_id].append(
+                    FileMetadataResponse(
+                        id=row.id,
+                        meta=row.meta,
+                        created_at=row.created_at,
+                        updated_at=row.updated_at,
+                    )
+                )
+        return files
+
+    def get_file_metadatas_by_knowledge_id(
+        self,
+        knowledge_id: str,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[FileMetadataResponse]:
+        if skip is None and limit is None:
+            return self.get_file_metadatas_by_knowledge_ids([knowledge_id])[
+                knowledge_id
+            ]
 
+        with get_db() as db:
+            query = (
+                db.query(File.id, File.meta, File.created_at, File.updated_at)
+                .join(KnowledgeFileLink, KnowledgeFileLink.file_id == File.id)
+                .filter(KnowledgeFileLink.knowledge_id == knowledge_id)
+                .order_by(File.updated_at.desc(), File.id)
+            )
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+            return [
+                FileMetadataResponse(
+                    id=row.id,
+                    meta=row.meta,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at,
+                )
+                for row in query
+            ]
+
+    def count_existing_files_by_knowledge_id(self, knowledge_id: str) -> int:
+        """统计知识库中仍存在的文件数量（与列表结果一致）"""
+        with get_db() as db:
+            return (
+                db.query(func.count(KnowledgeFileLink.file_id))
+                .join(File, File.id == KnowledgeFileLink.file_id)
+                .filter(KnowledgeFileLink.knowledge_id == knowledge_id)
+                .scalar()
+            )
+
+
+KnowledgeFileLinks = KnowledgeFileLinkTable()
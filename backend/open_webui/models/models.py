@@ -144,6 +144,23 @@ class ModelForm(BaseModel):
 
 
 class ModelsTable:
+    def __init__(self):
+        self._change_listeners = []
+
+    def add_change_listener(self, callback):
+        """Register `callback(model_id)` to run after a committed write.
+
+        `model_id` is None when the write touched every model.
+        """
+        self._change_listeners.append(callback)
+
+    def _notify_change(self, id: Optional[str] = None):
+        for callback in self._change_listeners:
+            try:
+                callback(id)
+            except Exception as e:
+                log.exception(f"Error notifying model change {id}: {e}")
+
     def insert_new_model(
         self, form_data: ModelForm, user_id: str
     ) -> Optional[ModelModel]:
@@ -161,6 +178,7 @@ class ModelsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                self._notify_change(result.id)
 
                 if result:
                     return ModelModel.model_validate(result)
@@ -174,6 +192,14 @@ class ModelsTable:
         with get_db() as db:
             return [ModelModel.model_validate(model) for model in db.query(Model).all()]
 
+    def get_models_version(self) -> tuple[int, int]:
+        """(row count, latest updated_at): changes whenever a model is written or deleted."""
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Model.id), func.max(Model.updated_at)
+            ).one()
+            return count, updated_at or 0
+
     def get_models(self) -> list[ModelUserResponse]:
         with get_db() as db:
             all_models = db.query(Model).filter(Model.base_model_id != None).all()
@@ -235,6 +261,7 @@ class ModelsTable:
                     }
                 )
                 db.commit()
+                self._notify_change(id)
 
                 return self.get_model_by_id(id)
             except Exception:
@@ -250,6 +277,7 @@ class ModelsTable:
                     .update(model.model_dump(exclude={"id"}))
                 )
                 db.commit()
+                self._notify_change(id)
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -263,6 +291,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                self._notify_change(id)
 
                 return True
         except Exception:
@@ -273,6 +302,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).delete()
                 db.commit()
+                self._notify_change()
 
                 return True
         except Exception:
@@ -314,6 +344,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                self._notify_change()
 
                 return [
                     ModelModel.model_validate(model) for model in db.query(Model).all()
@@ -0,0 +1,286 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Index, Integer, String, Text, func, or_
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# OcrSegment DB Schema (OCR 分段 manifest 索引表)
+####################
+
+
+class OcrSegment(Base):
+    __tablename__ = "ocr_segment"
+
+    id = Column(String, primary_key=True)
+    knowledge_id = Column(String, nullable=False)
+    ocr_task_id = Column(String, nullable=False)
+
+    segment_id = Column(String, nullable=False)  # segment_001
+    position = Column(Integer, nullable=False)  # 1-based 顺序
+    heading = Column(Text, nullable=True)
+    level = Column(Integer, nullable=True)
+    file = Column(Text, nullable=False)  # 相对知识库目录的路径
+    preview = Column(Text, nullable=True)
+    source_file = Column(Text, nullable=True)
+
+    content_hash = Column(String, nullable=False)  # sha256(content)，用于增量重分段
+    page_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
+
+    created_at = Column(BigInteger, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_ocr_segment_task_position",
+            "knowledge_id",
+            "ocr_task_id",
+            "position",
+            unique=True,
+        ),
+        Index(
+            "ix_ocr_segment_task_segment_id",
+            "knowledge_id",
+            "ocr_task_id",
+            "segment_id",
+        ),
+        Index(
+            "ix_ocr_segment_task_page",
+            "knowledge_id",
+            "ocr_task_id",
+            "page_start",
+            "page_end",
+        ),
+    )
+
+
+class OcrSegmentModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    knowledge_id: str
+    ocr_task_id: str
+
+    segment_id: str
+    position: int
+    heading: Optional[str] = None
+    level: Optional[int] = None
+    file: str
+    preview: Optional[str] = None
+    source_file: Optional[str] = None
+
+    content_hash: str
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+    def to_manifest_entry(self) -> dict:
+        """转换为旧版 index.json 中的 segment 结构"""
+        return {
+            "id": self.segment_id,
+            "heading": self.heading,
+            "level": self.level,
+            "file": self.file,
+            "preview": self.preview,
+            "order": self.position,
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "content_hash": self.content_hash,
+        }
+
+
+####################
+# Forms
+####################
+
+
+class OcrSegmentForm(BaseModel):
+    segment_id: str
+    position: int
+    heading: Optional[str] = None
+    level: Optional[int] = None
+    file: str
+    preview: Optional[str] = None
+    source_file: Optional[str] = None
+    content_hash: str
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+class OcrSegmentSummary(BaseModel):
+    knowledge_id: str
+    ocr_task_id: str
+    source_file: Optional[str] = None
+    segment_count: int
+    page_count: Optional[int] = None
+    updated_at: Optional[int] = None
+
+
+class OcrSegmentTable:
+    def get_segment_hashes(
+        self, knowledge_id: str, ocr_task_id: str
+    ) -> dict[int, tuple[str, str]]:
+        """获取已有分段的 position -> (id, content_hash)，只查询需要的列"""
+        with get_db() as db:
+            rows = (
+                db.query(OcrSegment.position, OcrSegment.id, OcrSegment.content_hash)
+                .filter_by(knowledge_id=knowledge_id, ocr_task_id=ocr_task_id)
+                .all()
+            )
+            return {position: (id, content_hash) for position, id, content_hash in rows}
+
+    def sync_segments(
+        self,
+        knowledge_id: str,
+        ocr_task_id: str,
+        changed: list[OcrSegmentForm],
+        existing: dict[int, tuple[str, str]],
+        segment_count: int,
+        delete_stale: bool = True,
+    ) -> bool:
+        """
+        增量同步分段索引：只写入内容变化的分段，并删除超出新分段数量的旧分段
+        """
+        now = int(time.time())
+        with get_db() as db:
+            try:
+                inserts = []
+                for form in changed:
+                    values = {**form.model_dump(), "updated_at": now}
+                    if form.position in existing:
+                        db.query(OcrSegment).filter_by(
+                            id=existing[form.position][0]
+                        ).update(values, synchronize_session=False)
+                    else:
+                        inserts.append(
+                            {
+                                **values,
+                                "id": str(uuid.uuid4()),
+                                "knowledge_id": knowledge_id,
+                                "ocr_task_id": ocr_task_id,
+                                "created_at": now,
+                            }
+                        )
+
+                if inserts:
+                    db.bulk_insert_mappings(OcrSegment, inserts)
+
+                if delete_stale:
+                    db.query(OcrSegment).filter(
+                        OcrSegment.knowledge_id == knowledge_id,
+                        OcrSegment.ocr_task_id == ocr_task_id,
+                        OcrSegment.position > segment_count,
+                    ).delete(synchronize_session=False)
+
+                db.commit()
+                return True
+            except Exception as e:
+                log.exception(f"Error syncing OCR segments: {e}")
+                db.rollback()
+                return False
+
+    def get_summary(
+        self, knowledge_id: str, ocr_task_id: str
+    ) -> Optional[OcrSegmentSummary]:
+        with get_db() as db:
+            count, page_count, updated_at, source_file = (
+                db.query(
+                    func.count(OcrSegment.id),
+                    func.max(OcrSegment.page_end),
+                    func.max(OcrSegment.updated_at),
+                    func.max(OcrSegment.source_file),
+                )
+                .filter_by(knowledge_id=knowledge_id, ocr_task_id=ocr_task_id)
+                .one()
+            )
+            if not count:
+                return None
+
+            return OcrSegmentSummary(
+                knowledge_id=knowledge_id,
+                ocr_task_id=ocr_task_id,
+                source_file=source_file,
+                segment_count=count,
+                page_count=page_count,
+                updated_at=updated_at,
+            )
+
+    def get_segments(
+        self,
+        knowledge_id: str,
+        ocr_task_id: str,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        page: Optional[int] = None,
+    ) -> list[OcrSegmentModel]:
+        """按顺序分页获取分段；指定 page 时只返回覆盖该页的分段"""
+        with get_db() as db:
+            query = db.query(OcrSegment).filter_by(
+                knowledge_id=knowledge_id, ocr_task_id=ocr_task_id
+            )
+
+            if page is not None:
+                query = query.filter(
+                    OcrSegment.page_start <= page,
+                    or_(OcrSegment.page_end >= page, OcrSegment.page_end.is_(None)),
+                )
+
+            query = query.order_by(OcrSegment.position.asc())
+            if skip:
+                query = query.offset(skip)
+            if limit:
+                query = query.limit(limit)
+
+            return [OcrSegmentModel.model_validate(segment) for segment in query.all()]
+
+    def get_segment_by_id(
+        self, knowledge_id: str, ocr_task_id: str, segment_id: str
+    ) -> Optional[OcrSegmentModel]:
+        with get_db() as db:
+            segment = (
+                db.query(OcrSegment)
+                .filter_by(
+                    knowledge_id=knowledge_id,
+                    ocr_task_id=ocr_task_id,
+                    segment_id=segment_id,
+                )
+                .first()
+            )
+            return OcrSegmentModel.model_validate(segment) if segment else None
+
+    def delete_segments(self, knowledge_id: str, ocr_task_id: str) -> bool:
+        with get_db() as db:
+            try:
+                db.query(OcrSegment).filter_by(
+                    knowledge_id=knowledge_id, ocr_task_id=ocr_task_id
+                ).delete()
+                db.commit()
+                return True
+            except Exception as e:
+                log.exception(f"Error deleting OCR segments: {e}")
+                db.rollback()
+                return False
+
+    def delete_segments_by_knowledge_id(self, knowledge_id: str) -> bool:
+        with get_db() as db:
+            try:
+                db.query(OcrSegment).filter_by(knowledge_id=knowledge_id).delete()
+                db.commit()
+                return True
+            except Exception as e:
+                log.exception(f"Error deleting OCR segments by knowledge_id: {e}")
+                db.rollback()
+                return False
+
+
+OcrSegments = OcrSegmentTable()
@@ -125,6 +125,21 @@ class ToolValves(BaseModel):
 
 
 class ToolsTable:
+
+    def __init__(self):
+        self._change_listeners = []
+
+    def add_change_listener(self, callback):
+        """Register `callback(tool_id)` to run after a tool is created, updated or deleted."""
+        self._change_listeners.append(callback)
+
+    def _notify_change(self, id: Optional[str] = None):
+        for callback in self._change_listeners:
+            try:
+                callback(id)
+            except Exception as e:
+                log.exception(f"Error notifying tool change {id}: {e}")
+
     def insert_new_tool(
         self, user_id: str, form_data: ToolForm, specs: list[dict]
     ) -> Optional[ToolModel]:
@@ -144,6 +159,7 @@ class ToolsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                self._notify_change(result.id)
                 if result:
                     return ToolModel.model_validate(result)
                 else:
@@ -167,7 +183,7 @@ class ToolsTable:
                         'updated_at': tool.updated_at,
                         'created_at': tool.created_at,
                     }
-                    
+
                     # Parse specs
                     specs = getattr(tool, 'specs', None)
                     if specs is None:
@@ -179,7 +195,7 @@ class ToolsTable:
                             tool_data['specs'] = []
                     else:
                         tool_data['specs'] = specs
-                    
+
                     # Parse meta
                     meta = getattr(tool, 'meta', None)
                     if meta is None:
@@ -191,7 +207,7 @@ class ToolsTable:
                             tool_data['meta'] = {}
                     else:
                         tool_data['meta'] = meta
-                    
+
                     # Parse access_control
                     access_control = getattr(tool, 'access_control', None)
                     if access_control is None:
@@ -203,14 +219,14 @@ class ToolsTable:
                             tool_data['access_control'] = None
                     else:
                         tool_data['access_control'] = access_control
-                    
+
                     tool_dict = ToolModel.model_validate(tool_data).model_dump()
                     # Ensure is_default_for_all_users is included
                     is_default = getattr(tool, 'is_default_for_all_users', False)
                     if is_default is None:
                         is_default = False
                     tool_dict['is_default_for_all_users'] = bool(is_default)
-                    
+
                     # Ensure default_for_group_ids is included
                     default_group_ids = getattr(tool, 'default_for_group_ids', None)
                     if default_group_ids is None:
@@ -223,7 +239,7 @@ class ToolsTable:
                     if not isinstance(default_group_ids, list):
                         default_group_ids = []
                     tool_dict['default_for_group_ids'] = default_group_ids
-                    
+
                     return ToolModel(**tool_dict)
                 return None
         except Exception as e:
@@ -241,7 +257,7 @@ class ToolsTable:
                     from sqlalchemy import inspect, text
                     inspector = inspect(db.bind)
                     cols = [c["name"] for c in inspector.get_columns("tool")]
-                    
+
                     # Add is_default_for_all_users if missing
                     if "is_default_for_all_users" not in cols:
                         if db.bind.dialect.name == "sqlite":
@@ -251,7 +267,7 @@ class ToolsTable:
                         db.commit()
                         log.info("Added is_default_for_all_users column to tool table")
                         cols.append("is_default_for_all_users")
-                    
+
                     # Add default_for_group_ids if missing
                     if "default_for_group_ids" not in cols:
                         if db.bind.dialect.name == "sqlite":
@@ -261,7 +277,7 @@ class ToolsTable:
                             db.execute(text("ALTER TABLE tool ADD COLUMN default_for_group_ids JSON DEFAULT '[]'::json"))
                         db.commit()
                         log.info("Added default_for_group_ids column to tool table")
-                    
+
                     # Retry the query
                     all_tools = db.query(Tool).order_by(Tool.updated_at.desc()).all()
                 except Exception as e2:
@@ -324,7 +340,7 @@ class ToolsTable:
                 if is_default is None:
                     is_default = False
                 is_default = bool(is_default)
-                
+
                 # Handle default_for_group_ids
                 default_group_ids = getattr(tool, 'default_for_group_ids', None)
                 if default_group_ids is None:
@@ -337,7 +353,7 @@ class ToolsTable:
                         default_group_ids = []
                 if not isinstance(default_group_ids, list):
                     default_group_ids = []
-                
+
                 # Parse JSON fields that might be stored as strings in SQLite
                 tool_data = {
                     'id': tool.id,
@@ -347,7 +363,7 @@ class ToolsTable:
                     'updated_at': tool.updated_at,
                     'created_at': tool.created_at,
                 }
-                
+
                 # Parse specs (JSONField)
                 specs = getattr(tool, 'specs', None)
                 if specs is None:
@@ -359,7 +375,7 @@ class ToolsTable:
                         tool_data['specs'] = []
                 else:
                     tool_data['specs'] = specs
-                
+
                 # Parse meta (JSONField)
                 meta = getattr(tool, 'meta', None)
                 if meta is None:
@@ -371,7 +387,7 @@ class ToolsTable:
                         tool_data['meta'] = {}
                 else:
                     tool_data['meta'] = meta
-                
+
                 # Parse access_control (JSON)
                 access_control = getattr(tool, 'access_control', None)
                 if access_control is None:
@@ -383,7 +399,7 @@ class ToolsTable:
                         tool_data['access_control'] = None
                 else:
                     tool_data['access_control'] = access_control
-                
+
                 # Now validate with properly parsed data
                 tool_dict = ToolModel.model_validate(tool_data).model_dump()
                 tool_dict['is_default_for_all_users'] = is_default
@@ -405,31 +421,31 @@ class ToolsTable:
         user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user_id)}
 
         log.info(f"get_tools_by_user_id: Total tools in DB: {len(tools)}")
-        
+
         result = [
             tool
             for tool in tools
             if tool.user_id == user_id
             or has_access(user_id, permission, tool.access_control, user_group_ids)
         ]
-        
+
         log.info(f"get_tools_by_user_id: Tools with access: {len(result)}")
         log.info(f"get_tools_by_user_id: Tool IDs with access: {[t.id for t in result]}")
-        
+
         # 添加所有默认工具（即使没有直接访问权限，默认工具也应该可见）
         # 使用工具ID集合来避免重复
         result_ids = {tool.id for tool in result}
-        
+
         # 互斥逻辑：优先检查 for all users，如果设置了则忽略 groups
         # 如果 for all users 未设置，则检查 groups
-        
+
         # 检查全局默认工具（for all users）
         default_tools = [
             tool
             for tool in tools
             if tool.is_default_for_all_users and tool.id not in result_ids
         ]
-        
+
         # 检查按组设置的默认工具（只在 for all users 未设置时检查）
         # 如果工具设置了 for all users，则不再检查 groups
         group_default_tools = [
@@ -440,12 +456,12 @@ class ToolsTable:
             and any(group_id in tool.default_for_group_ids for group_id in user_group_ids)
             and tool.id not in result_ids
         ]
-        
+
         log.info(f"get_tools_by_user_id: Default tools (all users): {len(default_tools)}")
         log.info(f"get_tools_by_user_id: Default tools (groups): {len(group_default_tools)}")
         log.info(f"get_tools_by_user_id: Default tool IDs: {[t.id for t in default_tools + group_default_tools]}")
         log.info(f"get_tools_by_user_id: Total returned: {len(result + default_tools + group_default_tools)}")
-        
+
         return result + default_tools + group_default_tools
 
     def get_tool_valves_by_id(self, id: str) -> Optional[dict]:
@@ -523,11 +539,12 @@ class ToolsTable:
                     import json
                     if isinstance(updated["default_for_group_ids"], (list, dict)):
                         updated["default_for_group_ids"] = json.dumps(updated["default_for_group_ids"])
-                
+
                 db.query(Tool).filter_by(id=id).update(
                     {**updated, "updated_at": int(time.time())}
                 )
                 db.commit()
+                self._notify_change(id)
 
                 # Use get_tool_by_id to properly parse JSON fields
                 return self.get_tool_by_id(id)
@@ -540,6 +557,7 @@ class ToolsTable:
             with get_db() as db:
                 db.query(Tool).filter_by(id=id).delete()
                 db.commit()
+                self._notify_change(id)
 
                 return True
         except Exception:
@@ -0,0 +1,326 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from langchain_core.documents import Document
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    WEB_EMBEDDING_CACHE_SIZE,
+    WEB_PAGE_CACHE_SIZE,
+    WEB_PAGE_CACHE_TTL,
+    WEB_SEARCH_RESULT_CACHE_SIZE,
+    WEB_SEARCH_RESULT_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+# Loaders that fetch each URL on its own, so splitting a batch per URL costs
+# nothing; the others (playwright, tavily, external) are fed one batch
+PER_URL_WEB_LOADER_ENGINES = ("", "safe_web", "firecrawl")
+
+TRACKING_QUERY_PARAMS = {"fbclid", "gclid", "msclkid", "ref_src", "spm"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key for a URL: lowercased scheme and host, default port, fragment
+    and tracking parameters dropped, remaining query parameters sorted.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{port}"
+    if "@" in parts.netloc:
+        netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in TRACKING_QUERY_PARAMS
+        )
+    )
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def get_url_domain(url: str) -> str:
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU whose entries expire after ``ttl`` seconds.
+
+    Shared by every request in the worker, so repeated or overlapping web
+    searches from different users reuse each other's results. A ``ttl`` or
+    ``size`` of 0 disables the cache.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class WebPageCache(TTLCache):
+    """Loaded page documents keyed by normalized URL."""
+
+    def get_documents(self, url: str) -> Optional[list[Document]]:
+        key = normalize_url(url)
+        pages = self.get(key)
+        if pages is None:
+            return None
+
+        docs = []
+        for page_content, metadata in pages:
+            metadata = dict(metadata)
+            # Report the URL as the caller asked for it unless the loader
+            # ended up somewhere else (e.g. a redirect)
+            if normalize_url(metadata.get("source") or url) == key:
+                metadata["source"] = url
+            docs.append(Document(page_content=page_content, metadata=metadata))
+        return docs
+
+    def set_documents(self, url: str, docs: list[Document]):
+        pages = [
+            (doc.page_content, dict(doc.metadata)) for doc in docs if doc.page_content
+        ]
+        if pages:
+            self.set(normalize_url(url), pages)
+
+
+WEB_PAGE_CACHE = WebPageCache(WEB_PAGE_CACHE_SIZE, WEB_PAGE_CACHE_TTL)
+WEB_SEARCH_RESULT_CACHE = TTLCache(
+    WEB_SEARCH_RESULT_CACHE_SIZE, WEB_SEARCH_RESULT_CACHE_TTL
+)
+
+
+async def load_web_pages(
+    urls: Sequence[str],
+    get_loader: Callable[[list[str]], Any],
+    concurrency: int = 10,
+    per_domain_limit: int = 2,
+    deadline: Optional[float] = None,
+    per_url: bool = True,
+    cache: Optional[WebPageCache] = None,
+) -> list[Document]:
+    """
+    Load ``urls`` with ``get_loader(urls)`` loaders, serving cached pages first.
+
+    With ``per_url`` every URL gets its own loader and task, limited to
+    ``concurrency`` fetches overall and ``per_domain_limit`` per host, so one
+    slow or failing page no longer holds up or fails the rest. Once
+    ``deadline`` seconds have passed the remaining fetches are cancelled and
+    whatever has arrived is returned. Documents come back in ``urls`` order.
+    """
+    cache = WEB_PAGE_CACHE if cache is None else cache
+    urls = list(dict.fromkeys(urls))
+
+    loaded: dict[str, list[Document]] = {}
+    pending_urls = []
+    for url in urls:
+        docs = cache.get_documents(url)
+        if docs is None:
+            pending_urls.append(url)
+        else:
+            loaded[url] = docs
+
+    if pending_urls:
+        log.debug(
+            f"web page cache: {len(urls) - len(pending_urls)} hits, "
+            f"{len(pending_urls)} to load"
+        )
+        fetched = await _fetch_web_pages(
+            pending_urls,
+            get_loader,
+            concurrency=concurrency,
+            per_domain_limit=per_domain_limit,
+            deadline=deadline,
+            per_url=per_url,
+        )
+        for url, docs in fetched.items():
+            cache.set_documents(url, docs)
+            loaded[url] = docs
+
+    return [doc for url in urls for doc in loaded.get(url, [])]
+
+
+async def _fetch_web_pages(
+    urls: list[str],
+    get_loader: Callable[[list[str]], Any],
+    concurrency: int,
+    per_domain_limit: int,
+    deadline: Optional[float],
+    per_url: bool,
+) -> dict[str, list[Document]]:
+    fetched: dict[str, list[Document]] = {}
+    requested = {normalize_url(url): url for url in urls}
+
+    async def stream(batch: list[str]):
+        # Loader construction validates the URLs (DNS lookups), keep it off the loop
+        loader = await asyncio.to_thread(get_loader, batch)
+        async for doc in loader.alazy_load():
+            if per_url:
+                url = batch[0]
+            else:
+                source = doc.metadata.get("source") or ""
+                url = requested.get(normalize_url(source), source)
+            fetched.setdefault(url, []).append(doc)
+
+    if per_url:
+        limit = asyncio.Semaphore(max(concurrency or 1, 1))
+        domain_limits: dict[str, asyncio.Semaphore] = {}
+
+        async def fetch(url: str):
+            domain = get_url_domain(url)
+            if domain not in domain_limits:
+                domain_limits[domain] = asyncio.Semaphore(max(per_domain_limit, 1))
+            # Take the per-domain slot first so a busy host does not hold global slots
+            async with domain_limits[domain], limit:
+                try:
+                    await stream([url])
+                except Exception as e:
+                    log.warning(f"Error loading {url}: {e}")
+
+        tasks = [asyncio.create_task(fetch(url)) for url in urls]
+    else:
+
+        async def fetch_batch():
+            try:
+                await stream(urls)
+            except Exception as e:
+                log.warning(f"Error loading {len(urls)} urls: {e}")
+
+        tasks = [asyncio.create_task(fetch_batch())]
+
+    _, pending = await asyncio.wait(tasks, timeout=deadline or None)
+    if pending:
+        log.info(
+            f"web loader deadline of {deadline}s reached, "
+            f"returning {len(fetched)}/{len(urls)} pages"
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return fetched
+
+
+class EmbeddingCache:
+    """
+    LRU of chunk embeddings keyed by the embedding model and the chunk text.
+
+    Web pages that show up again (same page, or the same chunk on another
+    search) are split into the same chunks, so only unseen chunks are sent
+    to the embedding backend. Embeddings are stored as float32 arrays, which
+    take about an eighth of the memory of a list of Python floats.
+    """
+
+    def __init__(self, size: int = WEB_EMBEDDING_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed(
+        self,
+        texts: list[str],
+        embedding_function: Callable,
+        namespace: str,
+        **kwargs,
+    ) -> list:
+        keys = [self.get_key(namespace, text) for text in texts]
+
+        embeddings = [None] * len(texts)
+        missing: dict[str, list[int]] = {}
+        with self._lock:
+            for idx, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    embeddings[idx] = self._entries[key].tolist()
+                else:
+                    missing.setdefault(key, []).append(idx)
+
+        if missing:
+            log.debug(
+                f"embedding cache: {len(texts) - sum(map(len, missing.values()))} "
+                f"hits, {len(missing)} to embed"
+            )
+            new_embeddings = embedding_function(
+                [texts[indexes[0]] for indexes in missing.values()], **kwargs
+            )
+            if len(new_embeddings) != len(missing):
+                raise ValueError(
+                    f"Expected {len(missing)} embeddings, got {len(new_embeddings)}"
+                )
+            with self._lock:
+                for (key, indexes), embedding in zip(missing.items(), new_embeddings):
+                    for idx in indexes:
+                        embeddings[idx] = embedding
+                    if self.size > 0:
+                        self._entries[key] = array("f", embedding)
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+
+        return embeddings
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+WEB_EMBEDDING_CACHE = EmbeddingCache()
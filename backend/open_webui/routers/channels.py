@@ -482,7 +482,7 @@ async def post_new_message(
 
     try:
         message, channel = await new_message_handler(request, id, form_data, user)
-        active_user_ids = get_user_ids_from_room(f"channel:{channel.id}")
+        active_user_ids = await get_user_ids_from_room(f"channel:{channel.id}")
 
         async def background_handler():
             await model_response_handler(request, channel, message, user)
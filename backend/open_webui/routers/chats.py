@@ -11,6 +11,7 @@ from open_webui.models.chats import (
     Chats,
     ChatTitleIdResponse,
 )
+from open_webui.models.chat_messages import ChatMessagePageResponse
 from open_webui.models.tags import TagModel, Tags
 from open_webui.models.folders import Folders
 
@@ -40,9 +41,15 @@ def get_session_user_chat_list(
     user=Depends(get_verified_user),
     page: Optional[int] = None,
     include_folders: Optional[bool] = False,
+    cursor: Optional[str] = None,
 ):
     try:
-        if page is not None:
+        if cursor is not None:
+            # 键集分页：cursor 为上一页最后一条的 "<updated_at>:<id>"
+            return Chats.get_chat_title_id_list_by_user_id(
+                user.id, include_folders=include_folders, cursor=cursor, limit=60
+            )
+        elif page is not None:
             limit = 60
             skip = (page - 1) * limit
 
@@ -261,10 +268,7 @@ async def get_chats_by_folder_id(folder_id: str, user=Depends(get_verified_user)
 
 @router.get("/pinned", response_model=list[ChatTitleIdResponse])
 async def get_user_pinned_chats(user=Depends(get_verified_user)):
-    return [
-        ChatTitleIdResponse(**chat.model_dump())
-        for chat in Chats.get_pinned_chats_by_user_id(user.id)
-    ]
+    return Chats.get_pinned_chat_title_id_list_by_user_id(user.id)
 
 
 ############################
@@ -494,7 +498,11 @@ async def get_user_chat_list_by_tag_name(
     chats = Chats.get_chat_list_by_user_id_and_tag_name(
         user.id, form_data.name, form_data.skip, form_data.limit
     )
-    if len(chats) == 0:
+    # 分页越界时本页也为空，只有确实没有聊天使用该标签时才删除
+    if (
+        len(chats) == 0
+        and Chats.count_chats_by_tag_name_and_user_id(form_data.name, user.id) == 0
+    ):
         Tags.delete_tag_by_name_and_user_id(form_data.name, user.id)
 
     return chats
@@ -539,6 +547,30 @@ async def update_chat_by_id(
         )
 
 
+############################
+# GetChatMessagesById
+############################
+
+
+@router.get("/{id}/messages", response_model=ChatMessagePageResponse)
+async def get_chat_messages_by_id(
+    id: str,
+    message_id: Optional[str] = None,
+    limit: int = 50,
+    user=Depends(get_verified_user),
+):
+    # 按分支分页加载历史消息：不传 message_id 时从 currentId 开始，
+    # 用返回的 next_cursor 作为 message_id 继续向前翻页
+    page = Chats.get_message_page_by_chat_id_and_user_id(
+        id, user.id, message_id, min(max(limit, 1), 200)
+    )
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=ERROR_MESSAGES.NOT_FOUND
+        )
+    return page
+
+
 ############################
 # UpdateChatMessageById
 ############################
@@ -550,15 +582,16 @@ class MessageForm(BaseModel):
 async def update_chat_message_by_id(
     id: str, message_id: str, form_data: MessageForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id(id)
+    # 只查所属用户，不重建整段聊天历史
+    chat_user_id = Chats.get_chat_user_id_by_id(id)
 
-    if not chat:
+    if not chat_user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    if chat.user_id != user.id and user.role != "admin":
+    if chat_user_id != user.id and user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
@@ -570,6 +603,7 @@ async def update_chat_message_by_id(
         {
             "content": form_data.content,
         },
+        full_history=True,
     )
 
     # 记录分析事件
@@ -622,15 +656,16 @@ class EventForm(BaseModel):
 async def send_chat_message_event_by_id(
     id: str, message_id: str, form_data: EventForm, user=Depends(get_verified_user)
 ):
-    chat = Chats.get_chat_by_id(id)
+    # 只查所属用户，不重建整段聊天历史
+    chat_user_id = Chats.get_chat_user_id_by_id(id)
 
-    if not chat:
+    if not chat_user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    if chat.user_id != user.id and user.role != "admin":
+    if chat_user_id != user.id and user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
@@ -79,7 +79,7 @@ async def get_folders(user=Depends(get_verified_user)):
             "items": {
                 "chats": [
                     {"title": chat.title, "id": chat.id, "updated_at": chat.updated_at}
-                    for chat in Chats.get_chats_by_folder_id_and_user_id(
+                    for chat in Chats.get_chat_title_id_list_by_folder_id_and_user_id(
                         folder.id, user.id
                     )
                 ]
@@ -14,6 +14,7 @@ from open_webui.models.functions import (
     Functions,
 )
 from open_webui.utils.plugin import (
+    PLUGIN_REGISTRY,
     load_function_module_by_id,
     replace_imports,
     get_function_module_from_cache,
@@ -196,8 +197,9 @@ async def create_new_function(
             )
             form_data.meta.manifest = frontmatter
 
-            FUNCTIONS = request.app.state.FUNCTIONS
-            FUNCTIONS[form_data.id] = function_module
+            PLUGIN_REGISTRY.set_function_module(
+                form_data.id, form_data.content, function_module
+            )
 
             function = Functions.insert_new_function(user.id, function_type, form_data)
 
@@ -315,8 +317,7 @@ async def update_function_by_id(
         )
         form_data.meta.manifest = frontmatter
 
-        FUNCTIONS = request.app.state.FUNCTIONS
-        FUNCTIONS[id] = function_module
+        PLUGIN_REGISTRY.set_function_module(id, form_data.content, function_module)
 
         updated = {**form_data.model_dump(exclude={"id"}), "type": function_type}
         log.debug(updated)
@@ -353,9 +354,7 @@ async def delete_function_by_id(
     result = Functions.delete_function_by_id(id)
 
     if result:
-        FUNCTIONS = request.app.state.FUNCTIONS
-        if id in FUNCTIONS:
-            del FUNCTIONS[id]
+        PLUGIN_REGISTRY.drop_function_module(id)
 
     return result
 
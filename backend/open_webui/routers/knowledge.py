@@ -1,12 +1,17 @@
-from typing import List, Optional
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional
 from pathlib import Path
 from datetime import datetime
+import asyncio
+import base64
+import hashlib
 import json
 import logging
 import re
 import shutil
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Query, status, Body
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 
 from open_webui.models.knowledge import (
@@ -19,6 +24,7 @@ from open_webui.models.files import Files, FileModel, FileMetadataResponse
 from open_webui.models.knowledge_logs import KnowledgeLogs, KnowledgeLogForm
 from open_webui.models.knowledge_file_link import KnowledgeFileLinks
 from open_webui.models.file_version import FileVersions
+from open_webui.models.ocr_segments import OcrSegments, OcrSegmentForm
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 from open_webui.routers.retrieval import (
     process_file,
@@ -31,6 +37,11 @@ from open_webui.storage.provider import Storage
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.utils.auth import get_verified_user
 from open_webui.utils.access_control import has_access, has_permission
+from open_webui.utils.pdf_render import (
+    PDF_RENDER_POOL,
+    DEFAULT_RENDER_DPI,
+    PdfPageNotFound,
+)
 
 
 from open_webui.env import SRC_LOG_LEVELS
@@ -131,22 +142,22 @@ def clear_knowledge_logs(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="请确认删除操作，输入'确定删除'"
         )
-    
+
     knowledge = Knowledges.get_knowledge_by_id(id=id)
-    
+
     if not knowledge:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
-    
+
     # 只有知识库所有者或管理员可以清空日志
     if knowledge.user_id != user.id and user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
-    
+
     # 记录清除日志操作
     print(f"🔍 DEBUG: 清除知识库日志 - knowledge_id: {id}, name: {knowledge.name}")
     log_knowledge_action(
@@ -162,7 +173,7 @@ def clear_knowledge_logs(
             "confirmed_by": user.name
         }
     )
-    
+
     success = KnowledgeLogs.delete_logs_by_knowledge_id(id)
     if success:
         return {"message": "日志已清空"}
@@ -178,6 +189,21 @@ def clear_knowledge_logs(
 ############################
 
 
+def _with_files(knowledge_bases) -> list[KnowledgeUserResponse]:
+    # 成员关系来自 knowledge_file_link，所有知识库的文件元数据一次 JOIN 取回；
+    # 已删除的文件不会出现在结果中，无需再回写 file_ids
+    files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_ids(
+        [knowledge_base.id for knowledge_base in knowledge_bases]
+    )
+    return [
+        KnowledgeUserResponse(
+            **knowledge_base.model_dump(),
+            files=files[knowledge_base.id],
+        )
+        for knowledge_base in knowledge_bases
+    ]
+
+
 @router.get("/", response_model=list[KnowledgeUserResponse])
 async def get_knowledge(user=Depends(get_verified_user)):
     knowledge_bases = []
@@ -187,43 +213,7 @@ async def get_knowledge(user=Depends(get_verified_user)):
     else:
         knowledge_bases = Knowledges.get_knowledge_bases_by_user_id(user.id, "read")
 
-    # Get files for each knowledge base
-    knowledge_with_files = []
-    for knowledge_base in knowledge_bases:
-        files = []
-        if knowledge_base.data:
-            files = Files.get_file_metadatas_by_ids(
-                knowledge_base.data.get("file_ids", [])
-            )
-
-            # Check if all files exist
-            if len(files) != len(knowledge_base.data.get("file_ids", [])):
-                missing_files = list(
-                    set(knowledge_base.data.get("file_ids", []))
-                    - set([file.id for file in files])
-                )
-                if missing_files:
-                    data = knowledge_base.data or {}
-                    file_ids = data.get("file_ids", [])
-
-                    for missing_file in missing_files:
-                        file_ids.remove(missing_file)
-
-                    data["file_ids"] = file_ids
-                    Knowledges.update_knowledge_data_by_id(
-                        id=knowledge_base.id, data=data
-                    )
-
-                    files = Files.get_file_metadatas_by_ids(file_ids)
-
-        knowledge_with_files.append(
-            KnowledgeUserResponse(
-                **knowledge_base.model_dump(),
-                files=files,
-            )
-        )
-
-    return knowledge_with_files
+    return _with_files(knowledge_bases)
 
 
 @router.get("/list", response_model=list[KnowledgeUserResponse])
@@ -235,42 +225,7 @@ async def get_knowledge_list(user=Depends(get_verified_user)):
     else:
         knowledge_bases = Knowledges.get_knowledge_bases_by_user_id(user.id, "write")
 
-    # Get files for each knowledge base
-    knowledge_with_files = []
-    for knowledge_base in knowledge_bases:
-        files = []
-        if knowledge_base.data:
-            files = Files.get_file_metadatas_by_ids(
-                knowledge_base.data.get("file_ids", [])
-            )
-
-            # Check if all files exist
-            if len(files) != len(knowledge_base.data.get("file_ids", [])):
-                missing_files = list(
-                    set(knowledge_base.data.get("file_ids", []))
-                    - set([file.id for file in files])
-                )
-                if missing_files:
-                    data = knowledge_base.data or {}
-                    file_ids = data.get("file_ids", [])
-
-                    for missing_file in missing_files:
-                        file_ids.remove(missing_file)
-
-                    data["file_ids"] = file_ids
-                    Knowledges.update_knowledge_data_by_id(
-                        id=knowledge_base.id, data=data
-                    )
-
-                    files = Files.get_file_metadatas_by_ids(file_ids)
-
-        knowledge_with_files.append(
-            KnowledgeUserResponse(
-                **knowledge_base.model_dump(),
-                files=files,
-            )
-        )
-    return knowledge_with_files
+    return _with_files(knowledge_bases)
 
 
 ############################
@@ -419,6 +374,21 @@ class KnowledgeFilesResponse(KnowledgeResponse):
     files: list[FileMetadataResponse]
 
 
+class KnowledgeFileResponse(KnowledgeResponse):
+    """添加/移除单个文件的响应：只返回变更的文件，完整列表请分页获取（/{id}/files）"""
+
+    file: FileMetadataResponse
+
+
+def _get_file_metadata(file) -> FileMetadataResponse:
+    return FileMetadataResponse(
+        id=file.id,
+        meta=file.meta or {},
+        created_at=file.created_at,
+        updated_at=file.updated_at,
+    )
+
+
 @router.get("/{id}", response_model=Optional[KnowledgeFilesResponse])
 async def get_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     knowledge = Knowledges.get_knowledge_by_id(id=id)
@@ -431,8 +401,7 @@ async def get_knowledge_by_id(id: str, user=Depends(get_verified_user)):
             or has_access(user.id, "read", knowledge.access_control)
         ):
 
-            file_ids = knowledge.data.get("file_ids", []) if knowledge.data else []
-            files = Files.get_file_metadatas_by_ids(file_ids)
+            files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(id)
 
             return KnowledgeFilesResponse(
                 **knowledge.model_dump(),
@@ -445,6 +414,49 @@ async def get_knowledge_by_id(id: str, user=Depends(get_verified_user)):
         )
 
 
+############################
+# GetKnowledgeFilesById
+############################
+
+
+class KnowledgeFileListResponse(BaseModel):
+    items: list[FileMetadataResponse]
+    total: int
+
+
+@router.get("/{id}/files", response_model=KnowledgeFileListResponse)
+async def get_knowledge_files_by_id(
+    id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    user=Depends(get_verified_user),
+):
+    """分页获取知识库文件（按关联表查询，不加载整个 file_ids 列表）"""
+    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    if not knowledge:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+    if not (
+        user.role == "admin"
+        or knowledge.user_id == user.id
+        or has_access(user.id, "read", knowledge.access_control)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
+        )
+
+    return KnowledgeFileListResponse(
+        items=KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(
+            id, skip=skip, limit=limit
+        ),
+        total=KnowledgeFileLinks.count_existing_files_by_knowledge_id(id),
+    )
+
+
 ############################
 # UpdateKnowledgeById
 ############################
@@ -504,9 +516,8 @@ async def update_knowledge_by_id(
                 "description": knowledge.description
             }
         )
-        
-        file_ids = knowledge.data.get("file_ids", []) if knowledge.data else []
-        files = Files.get_file_metadatas_by_ids(file_ids)
+
+        files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(id)
 
         return KnowledgeFilesResponse(
             **knowledge.model_dump(),
@@ -528,7 +539,7 @@ class KnowledgeFileIdForm(BaseModel):
     file_id: str
 
 
-@router.post("/{id}/file/add", response_model=Optional[KnowledgeFilesResponse])
+@router.post("/{id}/file/add", response_model=Optional[KnowledgeFileResponse])
 def add_file_to_knowledge_by_id(
     request: Request,
     id: str,
@@ -579,74 +590,43 @@ def add_file_to_knowledge_by_id(
             detail=str(e),
         )
 
-    if knowledge:
-        data = knowledge.data or {}
-        file_ids = data.get("file_ids", [])
-
-        if form_data.file_id not in file_ids:
-            file_ids.append(form_data.file_id)
-            data["file_ids"] = file_ids
-
-            knowledge = Knowledges.update_knowledge_data_by_id(id=id, data=data)
-
-            if knowledge:
-                # 确保文件的 collection_name 被正确设置
-                Files.update_file_metadata_by_id(
-                    form_data.file_id,
-                    {
-                        "collection_name": id,
-                    },
-                )
-                
-                # 创建知识库-文件关联记录（使用新的规范化表）
-                try:
-                    link = KnowledgeFileLinks.create_link(
-                        knowledge_id=id,
-                        file_id=form_data.file_id,
-                        is_indexed=False  # 默认未索引，后续处理完成后更新
-                    )
-                    if link:
-                        print(f"✅ 已创建知识库-文件关联: knowledge_id={id}, file_id={form_data.file_id}")
-                except Exception as e:
-                    # 如果关联已存在，忽略错误
-                    log.debug(f"创建知识库-文件关联时出错（可能已存在）: {e}")
-                
-                # 记录文件添加日志
-                print(f"🔍 DEBUG: 文件添加 - knowledge_id: {id}, file_id: {form_data.file_id}")
-                log_knowledge_action(
-                    knowledge_id=id,
-                    user_id=user.id,
-                    user_name=user.name,
-                    user_email=user.email,
-                    action_type="file_add",
-                    action="添加文件到知识库",
-                    description=f"文件 {file.filename} 已添加到知识库 {knowledge.name}",
-                    file_id=form_data.file_id,
-                    file_name=file.filename,
-                    file_size=file.meta.get("size") if file.meta else None,
-                    extra_data={"collection_name": id}
-                )
-                
-                files = Files.get_file_metadatas_by_ids(file_ids)
+    # 只插入一条关联记录；上传时已关联（collection_name）的文件视为添加成功
+    if Knowledges.add_file_to_knowledge_by_id(id=id, file_id=form_data.file_id):
+        # 确保文件的 collection_name 被正确设置
+        Files.update_file_metadata_by_id(
+            form_data.file_id,
+            {
+                "collection_name": id,
+            },
+        )
 
-                return KnowledgeFilesResponse(
-                    **knowledge.model_dump(),
-                    files=files,
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=ERROR_MESSAGES.DEFAULT("knowledge"),
-                )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ERROR_MESSAGES.DEFAULT("file_id"),
-            )
+        # 记录文件添加日志
+        log.debug(f"文件添加 - knowledge_id: {id}, file_id: {form_data.file_id}")
+        log_knowledge_action(
+            knowledge_id=id,
+            user_id=user.id,
+            user_name=user.name,
+            user_email=user.email,
+            action_type="file_add",
+            action="添加文件到知识库",
+            description=f"文件 {file.filename} 已添加到知识库 {knowledge.name}",
+            file_id=form_data.file_id,
+            file_name=file.filename,
+            file_size=file.meta.get("size") if file.meta else None,
+            extra_data={"collection_name": id},
+        )
+
+        knowledge = Knowledges.get_knowledge_by_id(id=id)
+        file = Files.get_file_by_id(form_data.file_id) or file
+
+        return KnowledgeFileResponse(
+            **knowledge.model_dump(),
+            file=_get_file_metadata(file),
+        )
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.NOT_FOUND,
+            detail=ERROR_MESSAGES.DEFAULT("knowledge"),
         )
 
 
@@ -700,21 +680,12 @@ def update_file_from_knowledge_by_id(
             detail=str(e),
         )
 
-    if knowledge:
-        data = knowledge.data or {}
-        file_ids = data.get("file_ids", [])
+    files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(id)
 
-        files = Files.get_file_metadatas_by_ids(file_ids)
-
-        return KnowledgeFilesResponse(
-            **knowledge.model_dump(),
-            files=files,
-        )
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.NOT_FOUND,
-        )
+    return KnowledgeFilesResponse(
+        **knowledge.model_dump(),
+        files=files,
+    )
 
 
 ############################
@@ -722,7 +693,7 @@ def update_file_from_knowledge_by_id(
 ############################
 
 
-@router.post("/{id}/file/remove", response_model=Optional[KnowledgeFilesResponse])
+@router.post("/{id}/file/remove", response_model=Optional[KnowledgeFileResponse])
 def remove_file_from_knowledge_by_id(
     id: str,
     form_data: KnowledgeFileIdForm,
@@ -780,16 +751,16 @@ def remove_file_from_knowledge_by_id(
             import os
             import shutil
             from pathlib import Path
-            
+
             # 检查文件数据中是否有 OCR 任务 ID
             file_data = file.data or {}
             ocr_task_id = file_data.get("ocr_task_id")
-            
+
             if ocr_task_id:
                 # 构建 OCR 结果目录路径
                 knowledge_dir = UPLOAD_DIR / "knowledge" / id
                 ocr_result_dir = knowledge_dir / f"ocr_result_{ocr_task_id}"
-                
+
                 # 如果目录存在，删除整个目录
                 if ocr_result_dir.exists() and ocr_result_dir.is_dir():
                     shutil.rmtree(ocr_result_dir)
@@ -816,56 +787,36 @@ def remove_file_from_knowledge_by_id(
         # Delete file from database
         Files.delete_file_by_id(form_data.file_id)
 
-    if knowledge:
-        data = knowledge.data or {}
-        file_ids = data.get("file_ids", [])
-
-        if form_data.file_id in file_ids:
-            file_ids.remove(form_data.file_id)
-            data["file_ids"] = file_ids
-
-            knowledge = Knowledges.update_knowledge_data_by_id(id=id, data=data)
-
-            if knowledge:
-                # 记录文件从知识库移除日志
-                print(f"🔍 DEBUG: 从知识库移除文件 - knowledge_id: {id}, file_id: {form_data.file_id}")
-                log_knowledge_action(
-                    knowledge_id=id,
-                    user_id=user.id,
-                    user_name=user.name,
-                    user_email=user.email,
-                    action_type="file_remove",
-                    action="从知识库移除文件",
-                    description=f"文件 {file.filename} 已从知识库 {knowledge.name} 移除",
-                    file_id=form_data.file_id,
-                    file_name=file.filename,
-                    file_size=file.meta.get("size") if file.meta else None,
-                    extra_data={
-                        "collection_name": id,
-                        "delete_file": delete_file
-                    }
-                )
-                
-                files = Files.get_file_metadatas_by_ids(file_ids)
+    # 只删除一条关联记录
+    if Knowledges.remove_file_from_knowledge_by_id(id=id, file_id=form_data.file_id):
+        # 记录文件从知识库移除日志
+        log.debug(
+            f"从知识库移除文件 - knowledge_id: {id}, file_id: {form_data.file_id}"
+        )
+        log_knowledge_action(
+            knowledge_id=id,
+            user_id=user.id,
+            user_name=user.name,
+            user_email=user.email,
+            action_type="file_remove",
+            action="从知识库移除文件",
+            description=f"文件 {file.filename} 已从知识库 {knowledge.name} 移除",
+            file_id=form_data.file_id,
+            file_name=file.filename,
+            file_size=file.meta.get("size") if file.meta else None,
+            extra_data={"collection_name": id, "delete_file": delete_file},
+        )
 
-                return KnowledgeFilesResponse(
-                    **knowledge.model_dump(),
-                    files=files,
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=ERROR_MESSAGES.DEFAULT("knowledge"),
-                )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ERROR_MESSAGES.DEFAULT("file_id"),
-            )
+        knowledge = Knowledges.get_knowledge_by_id(id=id)
+
+        return KnowledgeFileResponse(
+            **knowledge.model_dump(),
+            file=_get_file_metadata(file),
+        )
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.NOT_FOUND,
+            detail=ERROR_MESSAGES.DEFAULT("file_id"),
         )
 
 
@@ -1002,6 +953,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     except Exception as e:
         log.debug(e)
         pass
+    OcrSegments.delete_segments_by_knowledge_id(id)
     result = Knowledges.delete_knowledge_by_id(id=id)
     return result
 
@@ -1098,25 +1050,19 @@ def add_files_to_knowledge_batch(
         )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Add successful files to knowledge base
-    data = knowledge.data or {}
-    existing_file_ids = data.get("file_ids", [])
-
     # Only add files that were successfully processed
     successful_file_ids = [r.file_id for r in result.results if r.status == "completed"]
-    for file_id in successful_file_ids:
-        if file_id not in existing_file_ids:
-            existing_file_ids.append(file_id)
+    Knowledges.add_files_to_knowledge_by_id(id=id, file_ids=successful_file_ids)
 
-    data["file_ids"] = existing_file_ids
-    knowledge = Knowledges.update_knowledge_data_by_id(id=id, data=data)
+    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(id)
 
     # If there were any errors, include them in the response
     if result.errors:
         error_details = [f"{err.file_id}: {err.error}" for err in result.errors]
         return KnowledgeFilesResponse(
             **knowledge.model_dump(),
-            files=Files.get_file_metadatas_by_ids(existing_file_ids),
+            files=files,
             warnings={
                 "message": "Some files failed to process",
                 "errors": error_details,
@@ -1125,90 +1071,73 @@ def add_files_to_knowledge_batch(
 
     return KnowledgeFilesResponse(
         **knowledge.model_dump(),
-        files=Files.get_file_metadatas_by_ids(existing_file_ids),
+        files=files,
     )
 
 
-# PDF转图片API端点
-@router.post("/{id}/files/{file_id}/pdf-to-image")
-async def convert_pdf_to_image(
-    id: str,
-    file_id: str,
-    page: int = 1,
-    user=Depends(get_verified_user)
+def _get_knowledge_pdf_file(id: str, file_id: str, user) -> FileModel:
+    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    if not knowledge:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Knowledge base not found"
+        )
+
+    if (
+        knowledge.user_id != user.id
+        and not has_access(user.id, "read", knowledge.access_control)
+        and user.role != "admin"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
+        )
+
+    file = Files.get_file_by_id(file_id)
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+        )
+
+    if not (file.meta or {}).get("content_type", "").startswith("application/pdf"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="File is not a PDF"
+        )
+
+    return file
+
+
+async def _resolve_knowledge_pdf_file(file: FileModel):
+    """取得 PDF 的本地路径与内容哈希（按文件 id 与更新时间缓存）"""
+    try:
+        return await PDF_RENDER_POOL.resolve_file(file.id, file.updated_at, file.path)
+    except Exception as e:
+        log.error(f"读取PDF文件失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"PDF conversion failed: {str(e)}",
+        )
+
+
+async def _render_knowledge_pdf_page(
+    source_path: str, file_hash: str, page: int, dpi: int
 ):
-    """
-    将PDF文件的指定页面转换为图片
-    """
+    """渲染 PDF 页面（使用常驻渲染进程池和磁盘缓存），返回图片路径"""
     try:
-        # 验证知识库权限
-        knowledge = Knowledges.get_knowledge_by_id(id=id)
-        if not knowledge:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Knowledge base not found"
-            )
-        
-        if (
-            knowledge.user_id != user.id
-            and not has_access(user.id, "read", knowledge.access_control)
-            and user.role != "admin"
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
-            )
-        
-        # 获取文件
-        file = Files.get_file_by_id(file_id)
-        if not file:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="File not found"
-            )
-        
-        # 检查文件类型
-        if not file.meta.get("content_type", "").startswith("application/pdf"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File is not a PDF"
-            )
-        
-        # 调用Python脚本进行PDF转图片
-        import subprocess
-        import tempfile
-        import os
-        
-        # 获取实际文件路径
-        file_path = Storage.get_file(file.path)
-        
-        # 调用Python脚本
-        script_path = os.path.join(os.path.dirname(__file__), "../../../pdf_to_image.py")
-        result = subprocess.run(
-            ["python3", script_path, file_path, str(page), "200"],
-            capture_output=True,
-            text=True,
-            timeout=30
+        return await asyncio.wait_for(
+            PDF_RENDER_POOL.render_page(source_path, file_hash, page, dpi),
+            timeout=30,
         )
-        
-        if result.returncode != 0:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"PDF conversion failed: {result.stderr}"
-            )
-        
-        return {
-            "success": True,
-            "imageDataUrl": result.stdout.strip(),
-            "pageNumber": page,
-            "message": "PDF转图片完成"
-        }
-                
-    except subprocess.TimeoutExpired:
+    except PdfPageNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Page {page} not found"
+        )
+    except asyncio.TimeoutError:
         raise HTTPException(
             status_code=status.HTTP_408_REQUEST_TIMEOUT,
             detail="PDF conversion timeout"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         log.error(f"PDF转图片失败: {str(e)}")
         raise HTTPException(
@@ -1217,6 +1146,67 @@ async def convert_pdf_to_image(
         )
 
 
+@router.get("/{id}/files/{file_id}/pdf-pages/{page}")
+async def get_pdf_page_image(
+    request: Request,
+    id: str,
+    file_id: str,
+    page: int,
+    dpi: int = DEFAULT_RENDER_DPI,
+    user=Depends(get_verified_user),
+):
+    """
+    以二进制 PNG 返回 PDF 指定页面（带 ETag，支持 304），并预取相邻页面
+    """
+    file = _get_knowledge_pdf_file(id, file_id, user)
+    dpi = PDF_RENDER_POOL.normalize_dpi(dpi)
+
+    source_path, file_hash = await _resolve_knowledge_pdf_file(file)
+    headers = {
+        "ETag": PDF_RENDER_POOL.get_etag(file_hash, page, dpi),
+        "Cache-Control": "private, max-age=86400",
+    }
+
+    # ETag 由文件内容哈希、页码与 dpi 决定，客户端已有该页时无需渲染
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    page_path = await _render_knowledge_pdf_page(source_path, file_hash, page, dpi)
+
+    page_count = PDF_RENDER_POOL.get_page_count(file_hash)
+    if page_count is not None:
+        headers["X-Page-Count"] = str(page_count)
+
+    return FileResponse(page_path, media_type="image/png", headers=headers)
+
+
+# PDF转图片API端点
+@router.post("/{id}/files/{file_id}/pdf-to-image")
+async def convert_pdf_to_image(
+    id: str, file_id: str, page: int = 1, user=Depends(get_verified_user)
+):
+    """
+    将PDF文件的指定页面转换为图片（base64 data URL，兼容旧接口）
+
+    新代码请使用 GET /{id}/files/{file_id}/pdf-pages/{page} 获取二进制图片
+    """
+    file = _get_knowledge_pdf_file(id, file_id, user)
+    source_path, file_hash = await _resolve_knowledge_pdf_file(file)
+    page_path = await _render_knowledge_pdf_page(
+        source_path, file_hash, page, DEFAULT_RENDER_DPI
+    )
+
+    image_bytes = await asyncio.to_thread(page_path.read_bytes)
+
+    return {
+        "success": True,
+        "imageDataUrl": "data:image/png;base64,"
+        + base64.b64encode(image_bytes).decode("utf-8"),
+        "pageNumber": page,
+        "message": "PDF转图片完成",
+    }
+
+
 ############################
 # Move OCR Result Directory
 ############################
@@ -1572,104 +1562,144 @@ class AutoSegmentForm(BaseModel):
     overwrite: bool = True
 
 
-def _split_markdown_sections(
-    text: str, max_heading_level: int = 3
-) -> list[dict]:
+# 匹配 #page 标识符
+_PAGE_PATTERN = re.compile(r"#\s*page\s*\d*", re.IGNORECASE)
+# 提取 #page 标识符中的页码
+_PAGE_NUMBER_PATTERN = re.compile(r"#\s*page\s*(\d+)", re.IGNORECASE)
+# 匹配标题文本是否为 Page X 格式
+_PAGE_TITLE_PATTERN = re.compile(r"^page\s+\d+$", re.IGNORECASE)
+
+# 匹配中文章节编号：一、二、三、... 十、十一、...（可能后面有标题文本）
+_CHINESE_NUMBER_PATTERN = re.compile(r"^[一二三四五六七八九十百千万]+[、，]\s*(.*)")
+# 匹配一级数字编号：1. 2. 3. ...（可能后面有标题文本，注意：数字后可能是 . 或 、）
+_LEVEL1_NUMBER_PATTERN = re.compile(r"^(\d+)[\.、]\s*(.*)")
+# 匹配二级数字编号：1.1. 1.2. 2.1. ...（可能后面有标题文本）
+_LEVEL2_NUMBER_PATTERN = re.compile(r"^(\d+)[\.、]\s*(\d+)[\.、]\s*(.*)")
+# 匹配三级数字编号：1.1.1. 1.1.2. ...（可能后面有标题文本）
+_LEVEL3_NUMBER_PATTERN = re.compile(r"^(\d+)[\.、]\s*(\d+)[\.、]\s*(\d+)[\.、]\s*(.*)")
+
+# 匹配 Markdown 标题格式
+_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)")
+
+# 判断目录项时向后查看的行数
+_TOC_LOOKAHEAD_LINES = 4
+
+
+def _get_section_level_and_title(line: str) -> tuple[int | None, str | None]:
+    """返回 (层级, 标题文本)，如果没有匹配则返回 (None, None)"""
+    stripped = line.strip()
+
+    # 先检查是否是 Markdown 标题
+    match = _HEADING_PATTERN.match(stripped)
+    if match:
+        heading_text = match.group(2).strip()
+        # 跳过 Page X 格式的标题
+        if _PAGE_TITLE_PATTERN.match(heading_text):
+            return None, None
+
+        # 检查标题文本中的章节编号
+        if _CHINESE_NUMBER_PATTERN.match(heading_text):
+            return 1, heading_text
+
+        if _LEVEL3_NUMBER_PATTERN.match(heading_text):
+            return 3, heading_text
+
+        if _LEVEL2_NUMBER_PATTERN.match(heading_text):
+            return 2, heading_text
+
+        if _LEVEL1_NUMBER_PATTERN.match(heading_text):
+            return 2, heading_text
+
+        # 普通 Markdown 标题，不按章节编号分段
+        return None, None
+
+    # 检查是否是独立的章节编号行（不以 # 开头）
+    if _CHINESE_NUMBER_PATTERN.match(stripped):
+        return 1, stripped
+
+    if _LEVEL3_NUMBER_PATTERN.match(stripped):
+        return 3, stripped
+
+    if _LEVEL2_NUMBER_PATTERN.match(stripped):
+        return 2, stripped
+
+    if _LEVEL1_NUMBER_PATTERN.match(stripped):
+        return 2, stripped
+
+    return None, None
+
+
+def _iter_with_lookahead(lines: Iterable[str], size: int):
+    """逐行迭代，同时提供后续最多 size 行（不需要把整个文件读入内存）"""
+    iterator = iter(lines)
+    window: deque[str] = deque()
+
+    def fill():
+        while len(window) < size + 1:
+            try:
+                window.append(next(iterator))
+            except StopIteration:
+                return
+
+    fill()
+    while window:
+        line = window.popleft()
+        yield line, tuple(window)
+        fill()
+
+
+def _is_toc_item(
+    current_lines: list[str], lookahead: tuple[str, ...], max_level: int
+) -> bool:
+    """检查当前分段是否是目录项（只有标题行，后面直接是下一个章节编号）"""
+    filtered_lines = [l for l in current_lines if not _PAGE_PATTERN.search(l)]
+    content_lines = [l.strip() for l in filtered_lines if l.strip()]
+    # 如果只有标题行，或者只有标题行和空行，可能是目录项
+    if len(content_lines) > 1:
+        return False
+
+    # 检查后面几行是否直接是下一个章节编号
+    lookahead_count = 0
+    for lookahead_line in lookahead:
+        lookahead_line = lookahead_line.strip()
+        if not lookahead_line or _PAGE_PATTERN.search(lookahead_line):
+            continue
+        next_level, _ = _get_section_level_and_title(lookahead_line)
+        if next_level is not None:
+            # 如果后面直接是相同层级或更高层级的章节编号，说明这是目录项
+            return next_level <= max_level
+        lookahead_count += 1
+        if lookahead_count >= 3:  # 如果后面3行内没有章节编号，说明有实际内容
+            return False
+    return False
+
+
+def _iter_markdown_sections(
+    open_lines: Callable[[], Iterable[str]], max_heading_level: int = 3
+) -> Iterator[dict]:
     """
-    根据中文章节编号切分文本，返回分段内容与元信息
+    根据中文章节编号流式切分文本，逐个产出分段内容与元信息
     过滤掉包含 #page 标识符的行和标题本身是 Page X 格式的标题
-    
+
+    open_lines 每次调用返回一个新的行迭代器：第一遍扫描确定分段层级，
+    第二遍切分，内存中只保留当前分段。
+
     分段规则：
     H1: 按照"一、"、"二、"等中文数字分段，从"一、"开始，到"二、"之前结束
     H2: 在一级分段内，按照"1."、"2."等数字分段，从"1."开始，到下一个"2."之前结束
     H3: 在二级分段内，按照"1.1."、"1.2."等格式分段，从"1.1."开始，到下一个"1.2."之前结束
-    """
-    sections: list[dict] = []
-    lines = text.splitlines()
-    current_lines: list[str] = []
-    current_heading = None
-    current_level = None
-
-    # 匹配 #page 标识符
-    page_pattern = re.compile(r"#\s*page\s*\d*", re.IGNORECASE)
-    # 匹配标题文本是否为 Page X 格式
-    page_title_pattern = re.compile(r"^page\s+\d+$", re.IGNORECASE)
-    
-    # 匹配中文章节编号：一、二、三、... 十、十一、...（可能后面有标题文本）
-    chinese_number_pattern = re.compile(r"^[一二三四五六七八九十百千万]+[、，]\s*(.*)")
-    # 匹配一级数字编号：1. 2. 3. ...（可能后面有标题文本，注意：数字后可能是 . 或 、）
-    level1_number_pattern = re.compile(r"^(\d+)[\.、]\s*(.*)")
-    # 匹配二级数字编号：1.1. 1.2. 2.1. ...（可能后面有标题文本）
-    level2_number_pattern = re.compile(r"^(\d+)[\.、]\s*(\d+)[\.、]\s*(.*)")
-    # 匹配三级数字编号：1.1.1. 1.1.2. ...（可能后面有标题文本）
-    level3_number_pattern = re.compile(r"^(\d+)[\.、]\s*(\d+)[\.、]\s*(\d+)[\.、]\s*(.*)")
-    
-    # 匹配 Markdown 标题格式
-    heading_pattern = re.compile(r"^(#{1,6})\s+(.*)")
-
-    # 辅助函数：判断行是否包含章节编号
-    def get_section_level_and_title(line: str) -> tuple[int | None, str | None]:
-        """返回 (层级, 标题文本)，如果没有匹配则返回 (None, None)"""
-        stripped = line.strip()
-        
-        # 先检查是否是 Markdown 标题
-        match = heading_pattern.match(stripped)
-        if match:
-            heading_text = match.group(2).strip()
-            # 跳过 Page X 格式的标题
-            if page_title_pattern.match(heading_text):
-                return None, None
-            
-            # 检查标题文本中的章节编号
-            chinese_match = chinese_number_pattern.match(heading_text)
-            if chinese_match:
-                title = chinese_match.group(1).strip() if chinese_match.group(1) else heading_text
-                return 1, heading_text
-            
-            level3_match = level3_number_pattern.match(heading_text)
-            if level3_match:
-                return 3, heading_text
-            
-            level2_match = level2_number_pattern.match(heading_text)
-            if level2_match:
-                return 2, heading_text
-            
-            level1_match = level1_number_pattern.match(heading_text)
-            if level1_match:
-                return 2, heading_text
-            
-            # 普通 Markdown 标题，不按章节编号分段
-            return None, None
-        
-        # 检查是否是独立的章节编号行（不以 # 开头）
-        chinese_match = chinese_number_pattern.match(stripped)
-        if chinese_match:
-            title = chinese_match.group(1).strip() if chinese_match.group(1) else stripped
-            return 1, stripped
-        
-        level3_match = level3_number_pattern.match(stripped)
-        if level3_match:
-            return 3, stripped
-        
-        level2_match = level2_number_pattern.match(stripped)
-        if level2_match:
-            return 2, stripped
-        
-        level1_match = level1_number_pattern.match(stripped)
-        if level1_match:
-            return 2, stripped
-        
-        return None, None
 
+    每个分段额外带有 page_start / page_end（来自 #page N 标识符，没有则为 None）
+    """
     # 扫描文档，确定实际使用的分段层级
     actual_levels = set()
-    for line in lines:
-        if page_pattern.search(line):
+    for line in open_lines():
+        if _PAGE_PATTERN.search(line):
             continue
-        level, _ = get_section_level_and_title(line)
+        level, _ = _get_section_level_and_title(line)
         if level:
             actual_levels.add(level)
-    
+
     # 确定实际分段层级：优先使用H1（中文数字），其次H2（1. 2.），最后H3（1.1. 1.2.）
     actual_split_level = 1
     if actual_levels:
@@ -1683,193 +1713,237 @@ def _split_markdown_sections(
         elif 3 in actual_levels and 3 <= max_heading_level:
             actual_split_level = 3
 
+    current_lines: list[str] = []
+    current_heading = None
+    current_level = None
+    current_page = None
+    page_start = None
+    page_end = None
+    section_count = 0
+
+    def build_section() -> dict:
+        return {
+            "heading": current_heading,
+            "level": current_level,
+            # #page 行在追加时已经过滤
+            "content": "\n".join(current_lines).strip(),
+            "page_start": page_start,
+            "page_end": page_end,
+        }
+
     # 按照确定的层级进行分段
-    for i, line in enumerate(lines):
-        # 过滤掉包含 #page 标识符的行
-        if page_pattern.search(line):
+    for line, lookahead in _iter_with_lookahead(open_lines(), _TOC_LOOKAHEAD_LINES):
+        # 过滤掉包含 #page 标识符的行（记录页码）
+        if _PAGE_PATTERN.search(line):
+            page_match = _PAGE_NUMBER_PATTERN.search(line)
+            if page_match:
+                current_page = int(page_match.group(1))
             continue
-        
-        level, title = get_section_level_and_title(line)
-        
-        if level is not None and title:
-            # 只有当层级等于实际分段层级时，才创建新分段
-            if level == actual_split_level:
-                # 检查前一个分段是否是目录项（只有标题行，后面直接是下一个章节编号）
-                is_toc_item = False
-                if current_lines and current_heading is not None:
-                    # 检查当前分段是否只有标题行（可能是目录项）
-                    filtered_lines = [l for l in current_lines if not page_pattern.search(l)]
-                    content_lines = [l.strip() for l in filtered_lines if l.strip()]
-                    # 如果只有标题行，或者只有标题行和空行，可能是目录项
-                    if len(content_lines) <= 1:
-                        # 检查后面几行是否直接是下一个章节编号
-                        lookahead_count = 0
-                        for j in range(i + 1, min(i + 5, len(lines))):
-                            lookahead_line = lines[j].strip()
-                            if not lookahead_line or page_pattern.search(lookahead_line):
-                                continue
-                            next_level, _ = get_section_level_and_title(lookahead_line)
-                            if next_level is not None:
-                                # 如果后面直接是相同层级或更高层级的章节编号，说明这是目录项
-                                if next_level <= actual_split_level:
-                                    is_toc_item = True
-                                break
-                            lookahead_count += 1
-                            if lookahead_count >= 3:  # 如果后面3行内没有章节编号，说明有实际内容
-                                break
-                
-                if current_lines and current_heading is not None and not is_toc_item:
-                    # 过滤掉所有包含 #page 的行
-                    filtered_lines = [l for l in current_lines if not page_pattern.search(l)]
-                    content = "\n".join(filtered_lines).strip()
-                    # 只有实际内容才保存分段
-                    if content:
-                        sections.append(
-                            {
-                                "heading": current_heading,
-                                "level": current_level,
-                                "content": content,
-                            }
-                        )
-
-                # 开始新分段（即使是目录项也更新，但不会保存）
-                current_lines = [line]
-                current_heading = title or f"Section {len(sections) + 1}"
-                current_level = level
-            elif level < actual_split_level:
-                # 如果遇到更高层级的标题（如一级标题），也创建新分段
-                # 检查前一个分段是否是目录项
-                is_toc_item = False
-                if current_lines and current_heading is not None:
-                    filtered_lines = [l for l in current_lines if not page_pattern.search(l)]
-                    content_lines = [l.strip() for l in filtered_lines if l.strip()]
-                    if len(content_lines) <= 1:
-                        # 检查后面几行是否直接是下一个章节编号
-                        lookahead_count = 0
-                        for j in range(i + 1, min(i + 5, len(lines))):
-                            lookahead_line = lines[j].strip()
-                            if not lookahead_line or page_pattern.search(lookahead_line):
-                                continue
-                            next_level, _ = get_section_level_and_title(lookahead_line)
-                            if next_level is not None:
-                                if next_level <= level:
-                                    is_toc_item = True
-                                break
-                            lookahead_count += 1
-                            if lookahead_count >= 3:
-                                break
-                
-                if current_lines and current_heading is not None and not is_toc_item:
-                    # 过滤掉所有包含 #page 的行
-                    filtered_lines = [l for l in current_lines if not page_pattern.search(l)]
-                    content = "\n".join(filtered_lines).strip()
-                    if content:
-                        sections.append(
-                            {
-                                "heading": current_heading,
-                                "level": current_level,
-                                "content": content,
-                            }
-                        )
-
-                current_lines = [line]
-                current_heading = title or f"Section {len(sections) + 1}"
-                current_level = level
-            else:
-                # 其他层级的标题或内容，添加到当前内容中（但也要过滤 #page）
-                if current_lines and not page_pattern.search(line):
-                    current_lines.append(line)
-        else:
-            # 非章节编号行，添加到当前内容中（但也要过滤 #page）
-            if current_lines and not page_pattern.search(line):
-                current_lines.append(line)
+
+        level, title = _get_section_level_and_title(line)
+
+        # 只有当层级等于实际分段层级时，才创建新分段；
+        # 如果遇到更高层级的标题（如一级标题），也创建新分段
+        if level is not None and title and level <= actual_split_level:
+            is_toc_item = False
+            if current_lines and current_heading is not None:
+                is_toc_item = _is_toc_item(current_lines, lookahead, level)
+
+            if current_lines and current_heading is not None and not is_toc_item:
+                section = build_section()
+                # 只有实际内容才保存分段
+                if section["content"]:
+                    section_count += 1
+                    yield section
+
+            # 开始新分段（即使是目录项也更新，但不会保存）
+            current_lines = [line]
+            current_heading = title or f"Section {section_count + 1}"
+            current_level = level
+            page_start = page_end = current_page
+        elif current_lines:
+            # 其他层级的标题或非章节编号行，添加到当前内容中
+            current_lines.append(line)
+            if current_page is not None:
+                page_end = current_page
+                if page_start is None:
+                    page_start = current_page
 
     if current_lines and current_heading is not None:
-        # 过滤掉所有包含 #page 的行
-        filtered_lines = [l for l in current_lines if not page_pattern.search(l)]
-        content_lines = [l.strip() for l in filtered_lines if l.strip()]
-        content = "\n".join(filtered_lines).strip()
+        content_lines = [l.strip() for l in current_lines if l.strip()]
+        section = build_section()
         # 只有实际内容才保存分段（跳过只有标题行的目录项）
-        if content and len(content_lines) > 1:
-            sections.append(
-                {
-                    "heading": current_heading,
-                    "level": current_level,
-                    "content": content,
-                }
-            )
+        if section["content"] and len(content_lines) > 1:
+            yield section
+
+
+def _split_markdown_sections(text: str, max_heading_level: int = 3) -> list[dict]:
+    """
+    根据中文章节编号切分文本，返回分段内容与元信息（见 _iter_markdown_sections）
+    """
+    return list(_iter_markdown_sections(lambda: text.splitlines(), max_heading_level))
+
+
+def _iter_file_lines(path: Path) -> Iterator[str]:
+    """逐行读取文本文件，与 str.splitlines() 的切分结果一致"""
+    with open(path, "r", encoding="utf-8") as f:
+        for raw_line in f:
+            yield from raw_line.splitlines()
+
 
-    return sections
+def _get_segments_dir(knowledge_dir: Path, ocr_task_id: str) -> Path:
+    return knowledge_dir / f"ocr_result_{ocr_task_id}" / "segments"
+
+
+def _build_segments_manifest(
+    knowledge_id: str, ocr_task_id: str, summary, segments: list
+) -> dict:
+    return {
+        "knowledge_id": knowledge_id,
+        "ocr_task_id": ocr_task_id,
+        "source_file": summary.source_file if summary else None,
+        "created_at": (
+            datetime.utcfromtimestamp(summary.updated_at).isoformat() + "Z"
+            if summary and summary.updated_at
+            else None
+        ),
+        "segment_count": summary.segment_count if summary else 0,
+        "page_count": summary.page_count if summary else None,
+        "segments": [segment.to_manifest_entry() for segment in segments],
+    }
 
 
 def _write_segments_to_disk(
     knowledge_dir: Path,
     ocr_task_id: str,
-    sections: list[dict],
+    sections: Iterable[dict],
     source_file: str,
     overwrite: bool = True,
 ) -> dict:
     """
-    将分段内容写入磁盘，并生成 manifest
-    """
-    if not sections:
-        raise ValueError("No sections to write")
+    将分段内容增量写入磁盘，并同步 ocr_segment 索引表
 
+    只有内容哈希发生变化的分段才会重写文件和索引行；
+    overwrite=True 时删除多余的旧分段，否则保留
+    """
     ocr_dir = knowledge_dir / f"ocr_result_{ocr_task_id}"
     if not ocr_dir.exists():
         raise FileNotFoundError(
             f"OCR result directory not found: ocr_result_{ocr_task_id}"
         )
 
-    segments_dir = ocr_dir / "segments"
-    if segments_dir.exists() and overwrite:
-        shutil.rmtree(segments_dir)
-
+    knowledge_id = knowledge_dir.name
+    segments_dir = _get_segments_dir(knowledge_dir, ocr_task_id)
     segments_dir.mkdir(parents=True, exist_ok=True)
 
-    manifest = {
-        "knowledge_id": knowledge_dir.name,
-        "ocr_task_id": ocr_task_id,
-        "source_file": source_file,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "segment_count": len(sections),
-        "segments": [],
-    }
+    existing = OcrSegments.get_segment_hashes(knowledge_id, ocr_task_id)
+
+    changed: list[OcrSegmentForm] = []
+    segment_count = 0
 
     for idx, section in enumerate(sections, 1):
-        file_name = f"segment_{idx:03d}.mmd"
-        file_path = segments_dir / file_name
-        file_path.write_text(section["content"] + "\n", encoding="utf-8")
+        segment_count = idx
+        segment_id = f"segment_{idx:03d}"
+        file_path = segments_dir / f"{segment_id}.mmd"
+        content = section["content"] + "\n"
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        if idx in existing and existing[idx][1] == content_hash and file_path.exists():
+            continue
+
+        file_path.write_text(content, encoding="utf-8")
 
         preview = section["content"].splitlines()[0] if section["content"] else ""
-        preview = preview[:160]
 
-        manifest["segments"].append(
-            {
-                "id": f"segment_{idx:03d}",
-                "heading": section["heading"],
-                "level": section["level"],
-                "file": str(file_path.relative_to(knowledge_dir)),
-                "preview": preview,
-                "order": idx,
-            }
+        changed.append(
+            OcrSegmentForm(
+                segment_id=segment_id,
+                position=idx,
+                heading=section["heading"],
+                level=section["level"],
+                file=str(file_path.relative_to(knowledge_dir)),
+                preview=preview[:160],
+                source_file=source_file,
+                content_hash=content_hash,
+                page_start=section.get("page_start"),
+                page_end=section.get("page_end"),
+            )
         )
 
-    manifest_path = segments_dir / "index.json"
-    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    if not segment_count:
+        raise ValueError("No sections to write")
 
-    return manifest
+    if overwrite:
+        for position in existing:
+            if position > segment_count:
+                (segments_dir / f"segment_{position:03d}.mmd").unlink(missing_ok=True)
+
+    if not OcrSegments.sync_segments(
+        knowledge_id,
+        ocr_task_id,
+        changed=changed,
+        existing=existing,
+        segment_count=segment_count,
+        delete_stale=overwrite,
+    ):
+        raise RuntimeError("Failed to update segments index")
 
+    # 旧版 index.json 已由 ocr_segment 表取代
+    (segments_dir / "index.json").unlink(missing_ok=True)
 
-@router.post("/{id}/segments/auto")
-async def auto_segment_ocr_result(
-    id: str,
-    form_data: AutoSegmentForm,
-    user=Depends(get_verified_user),
-):
-    """
-    根据 OCR result.mmd 自动分段，并生成 segments 目录
-    """
+    # overwrite=False 时保留的旧分段仍在表中，与清单 summary 的计数保持一致
+    if not overwrite:
+        segment_count = len(set(existing) | set(range(1, segment_count + 1)))
+
+    return {
+        "segment_count": segment_count,
+        "changed_count": len(changed),
+    }
+
+
+def _import_legacy_segments_manifest(knowledge_dir: Path, ocr_task_id: str) -> bool:
+    """将旧版 segments/index.json 导入 ocr_segment 表（一次性迁移）"""
+    manifest_path = _get_segments_dir(knowledge_dir, ocr_task_id) / "index.json"
+    if not manifest_path.exists():
+        return False
+
+    data = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    forms = []
+    for entry in data.get("segments", []):
+        segment_path = knowledge_dir / entry["file"]
+        try:
+            content_hash = hashlib.sha256(segment_path.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            continue
+
+        forms.append(
+            OcrSegmentForm(
+                segment_id=entry["id"],
+                position=entry["order"],
+                heading=entry.get("heading"),
+                level=entry.get("level"),
+                file=entry["file"],
+                preview=entry.get("preview"),
+                source_file=data.get("source_file"),
+                content_hash=content_hash,
+            )
+        )
+
+    if not forms or not OcrSegments.sync_segments(
+        knowledge_dir.name,
+        ocr_task_id,
+        changed=forms,
+        existing={},
+        segment_count=max(form.position for form in forms),
+    ):
+        return False
+
+    manifest_path.unlink(missing_ok=True)
+    return True
+
+
+def _check_segments_access(id: str, user, permission: str):
     knowledge = Knowledges.get_knowledge_by_id(id=id)
     if not knowledge:
         raise HTTPException(
@@ -1880,13 +1954,29 @@ async def auto_segment_ocr_result(
     if (
         user.role != "admin"
         and knowledge.user_id != user.id
-        and not has_access(user.id, "write", knowledge.access_control)
+        and not has_access(user.id, permission, knowledge.access_control)
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
+    return knowledge
+
+
+@router.post("/{id}/segments/auto")
+async def auto_segment_ocr_result(
+    id: str,
+    form_data: AutoSegmentForm,
+    user=Depends(get_verified_user),
+):
+    """
+    根据 OCR result.mmd 自动分段，并生成 segments 目录
+
+    流式读取源文件，只重写内容发生变化的分段
+    """
+    _check_segments_access(id, user, "write")
+
     knowledge_dir = UPLOAD_DIR / "knowledge" / id
     ocr_dir = knowledge_dir / f"ocr_result_{form_data.ocr_task_id}"
     if not ocr_dir.exists():
@@ -1902,29 +1992,31 @@ async def auto_segment_ocr_result(
             detail=f"Source file not found: {form_data.source_file}",
         )
 
+    sections = _iter_markdown_sections(
+        lambda: _iter_file_lines(source_path),
+        max_heading_level=form_data.max_heading_level,
+    )
+
     try:
-        text = source_path.read_text(encoding="utf-8")
-    except Exception as exc:
+        result = await asyncio.to_thread(
+            _write_segments_to_disk,
+            knowledge_dir=knowledge_dir,
+            ocr_task_id=form_data.ocr_task_id,
+            sections=sections,
+            source_file=form_data.source_file,
+            overwrite=form_data.overwrite,
+        )
+    except (OSError, UnicodeDecodeError) as exc:
+        log.exception("Failed to read source file: %s", exc)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to read source file: {exc}",
         )
-
-    sections = _split_markdown_sections(text, max_heading_level=form_data.max_heading_level)
-    if not sections:
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No sections found using provided heading rules",
         )
-
-    try:
-        manifest = _write_segments_to_disk(
-            knowledge_dir=knowledge_dir,
-            ocr_task_id=form_data.ocr_task_id,
-            sections=sections,
-            source_file=form_data.source_file,
-            overwrite=form_data.overwrite,
-        )
     except Exception as exc:
         log.exception("Failed to write segments: %s", exc)
         raise HTTPException(
@@ -1932,10 +2024,16 @@ async def auto_segment_ocr_result(
             detail=f"Failed to write segments: {exc}",
         )
 
+    summary = OcrSegments.get_summary(id, form_data.ocr_task_id)
+    segments = OcrSegments.get_segments(id, form_data.ocr_task_id)
+
     return {
         "status": "success",
-        "segment_count": manifest["segment_count"],
-        "manifest": manifest,
+        "segment_count": result["segment_count"],
+        "changed_count": result["changed_count"],
+        "manifest": _build_segments_manifest(
+            id, form_data.ocr_task_id, summary, segments
+        ),
     }
 
 
@@ -1943,50 +2041,85 @@ async def auto_segment_ocr_result(
 async def get_ocr_segments(
     id: str,
     ocr_task_id: str = Query(..., description="OCR 任务 ID，例如 7ee32dd9"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    page: Optional[int] = Query(None, ge=1, description="只返回覆盖该 PDF 页的分段"),
     user=Depends(get_verified_user),
 ):
     """
-    获取指定 OCR 任务的分段 manifest
+    获取指定 OCR 任务的分段 manifest（支持分页和按页码过滤）
     """
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
-    if not knowledge:
+    _check_segments_access(id, user, "read")
+
+    summary = OcrSegments.get_summary(id, ocr_task_id)
+    if summary is None:
+        knowledge_dir = UPLOAD_DIR / "knowledge" / id
+        try:
+            imported = _import_legacy_segments_manifest(knowledge_dir, ocr_task_id)
+        except Exception as exc:
+            log.exception("Failed to read segments manifest: %s", exc)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to read manifest: {exc}",
+            )
+
+        summary = OcrSegments.get_summary(id, ocr_task_id) if imported else None
+        if summary is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Segments manifest not found. Please run auto segmentation first.",
+            )
+
+    segments = OcrSegments.get_segments(
+        id, ocr_task_id, skip=skip, limit=limit, page=page
+    )
+
+    return {
+        "status": "success",
+        "segment_count": summary.segment_count,
+        "manifest": _build_segments_manifest(id, ocr_task_id, summary, segments),
+    }
+
+
+@router.get("/{id}/segments/{segment_id}")
+async def get_ocr_segment_by_id(
+    id: str,
+    segment_id: str,
+    ocr_task_id: str = Query(..., description="OCR 任务 ID，例如 7ee32dd9"),
+    user=Depends(get_verified_user),
+):
+    """
+    获取单个分段的元信息和内容
+    """
+    _check_segments_access(id, user, "read")
+
+    segment = OcrSegments.get_segment_by_id(id, ocr_task_id, segment_id)
+    if not segment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
 
-    if (
-        user.role != "admin"
-        and knowledge.user_id != user.id
-        and not has_access(user.id, "read", knowledge.access_control)
-    ):
+    knowledge_dir = (UPLOAD_DIR / "knowledge" / id).resolve()
+    segment_path = (knowledge_dir / segment.file).resolve()
+    if not str(segment_path).startswith(str(knowledge_dir)):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
-        )
-
-    knowledge_dir = UPLOAD_DIR / "knowledge" / id
-    manifest_path = knowledge_dir / f"ocr_result_{ocr_task_id}" / "segments" / "index.json"
-
-    if not manifest_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Segments manifest not found. Please run auto segmentation first.",
+            detail="Access denied: File path outside knowledge directory",
         )
 
     try:
-        data = json.loads(manifest_path.read_text(encoding="utf-8"))
-    except Exception as exc:
-        log.exception("Failed to read segments manifest: %s", exc)
+        content = await asyncio.to_thread(segment_path.read_text, encoding="utf-8")
+    except FileNotFoundError:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to read manifest: {exc}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Segment file not found: {segment.file}",
         )
 
     return {
         "status": "success",
-        "segment_count": data.get("segment_count", 0),
-        "manifest": data,
+        "segment": segment.to_manifest_entry(),
+        "content": content,
     }
 
 
@@ -1999,25 +2132,12 @@ async def delete_ocr_segments(
     """
     删除指定 OCR 任务的分段目录
     """
-    knowledge = Knowledges.get_knowledge_by_id(id=id)
-    if not knowledge:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=ERROR_MESSAGES.NOT_FOUND,
-        )
-
-    if (
-        user.role != "admin"
-        and knowledge.user_id != user.id
-        and not has_access(user.id, "write", knowledge.access_control)
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
-        )
+    _check_segments_access(id, user, "write")
 
     knowledge_dir = UPLOAD_DIR / "knowledge" / id
-    segments_dir = knowledge_dir / f"ocr_result_{ocr_task_id}" / "segments"
+    segments_dir = _get_segments_dir(knowledge_dir, ocr_task_id)
+
+    OcrSegments.delete_segments(id, ocr_task_id)
 
     if not segments_dir.exists():
         return {
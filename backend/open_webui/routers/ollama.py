@@ -51,6 +51,8 @@ from open_webui.utils.payload import (
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+from open_webui.utils.model_registry import MODEL_REGISTRY
 
 
 from open_webui.config import (
@@ -107,16 +109,6 @@ async def send_get_request(url, key=None, user: UserModel = None):
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
-
-
 async def send_post_request(
     url: str,
     payload: Union[str, bytes],
@@ -125,17 +117,21 @@ async def send_post_request(
     content_type: Optional[str] = None,
     user: UserModel = None,
     metadata: Optional[dict] = None,
+    pool_size: Optional[int] = None,
 ):
 
     r = None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+        # 复用该上游的长连接池，不为每次请求新建 ClientSession
+        parsed_url = urlparse(url)
+        session = UPSTREAM_SESSION_POOL.get_session(
+            f"{parsed_url.scheme}://{parsed_url.netloc}", limit_per_host=pool_size
         )
 
         r = await session.post(
             url,
             data=payload,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             headers={
                 "Content-Type": "application/json",
                 **({"Authorization": f"Bearer {key}"} if key else {}),
@@ -161,7 +157,7 @@ async def send_post_request(
         if r.ok is False:
             try:
                 res = await r.json()
-                await cleanup_response(r, session)
+                UPSTREAM_SESSION_POOL.release(r)
                 if "error" in res:
                     raise HTTPException(status_code=r.status, detail=res["error"])
             except HTTPException as e:
@@ -184,9 +180,7 @@ async def send_post_request(
                 r.content,
                 status_code=r.status,
                 headers=response_headers,
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(UPSTREAM_SESSION_POOL.release_async, r),
             )
         else:
             res = await r.json()
@@ -203,7 +197,7 @@ async def send_post_request(
         )
     finally:
         if not stream:
-            await cleanup_response(r, session)
+            UPSTREAM_SESSION_POOL.release(r)
 
 
 def get_api_key(idx, url, configs):
@@ -315,6 +309,7 @@ async def update_config(
         for key, value in request.app.state.config.OLLAMA_API_CONFIGS.items()
         if key in keys
     }
+    MODEL_REGISTRY.on_connections_change()
 
     return {
         "ENABLE_OLLAMA_API": request.app.state.config.ENABLE_OLLAMA_API,
@@ -1376,6 +1371,7 @@ async def generate_chat_completion(
         content_type="application/x-ndjson",
         user=user,
         metadata=metadata,
+        pool_size=api_config.get("pool_size"),
     )
 
 
@@ -1482,6 +1478,7 @@ async def generate_openai_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        pool_size=api_config.get("pool_size"),
     )
 
 
@@ -1564,6 +1561,7 @@ async def generate_openai_chat_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        pool_size=api_config.get("pool_size"),
     )
 
 
@@ -51,6 +51,8 @@ from open_webui.utils.misc import (
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+from open_webui.utils.model_registry import MODEL_REGISTRY
 
 
 log = logging.getLogger(__name__)
@@ -271,6 +273,7 @@ async def update_config(
         for key, value in request.app.state.config.OPENAI_API_CONFIGS.items()
         if key in keys
     }
+    MODEL_REGISTRY.on_connections_change()
 
     return {
         "ENABLE_OPENAI_API": request.app.state.config.ENABLE_OPENAI_API,
@@ -280,6 +283,12 @@ async def update_config(
     }
 
 
+@router.get("/pool/metrics")
+async def get_pool_metrics(user=Depends(get_admin_user)):
+    """上游长连接池状态：各上游的占用连接、排队数与排队等待时间"""
+    return UPSTREAM_SESSION_POOL.get_metrics()
+
+
 @router.post("/audio/speech")
 async def speech(request: Request, user=Depends(get_verified_user)):
     idx = None
@@ -814,7 +823,7 @@ async def generate_chat_completion(
 
     payload = {**form_data}
     metadata = payload.pop("metadata", None)
-    
+
     # 检查 agent 模式是否已处理完成
     if metadata and metadata.get("agent_processed", False):
         agent_answer = metadata.get("agent_answer", "")
@@ -956,8 +965,9 @@ async def generate_chat_completion(
     response = None
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+        # 复用该连接（url_idx）的长连接池，不为每次补全新建 ClientSession
+        session = UPSTREAM_SESSION_POOL.get_session(
+            url, limit_per_host=api_config.get("pool_size")
         )
 
         r = await session.request(
@@ -966,6 +976,7 @@ async def generate_chat_completion(
             data=payload,
             headers=headers,
             cookies=cookies,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
         )
 
@@ -976,9 +987,7 @@ async def generate_chat_completion(
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(UPSTREAM_SESSION_POOL.release_async, r),
             )
         else:
             try:
@@ -1003,7 +1012,7 @@ async def generate_chat_completion(
         )
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            UPSTREAM_SESSION_POOL.release(r)
 
 
 async def embeddings(request: Request, form_data: dict, user):
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Request, Depends, Query, UploadFile, File
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
 import logging
 import uuid
 import time
+from pathlib import Path
 
 from open_webui.services.langchain_rag_service import (
     get_langchain_rag_service,
@@ -11,9 +13,31 @@ from open_webui.services.langchain_rag_service import (
 from open_webui.services.ragflow.chunk_management import get_client as get_ragflow_chunk_client
 from open_webui.services.ragflow.dataset_management import get_client as get_ragflow_dataset_client
 from open_webui.services.ragflow.file_management import get_client as get_ragflow_file_client
+from open_webui.services.ragflow.transport import get_transport as get_ragflow_transport
+from open_webui.services.ragflow.migration import (
+    DEFAULT_CONCURRENCY as RAGFLOW_MIGRATION_DEFAULT_CONCURRENCY,
+    FAILED as RAGFLOW_MIGRATION_FAILED,
+    RUNNING as RAGFLOW_MIGRATION_RUNNING,
+    ChunkMigrationEngine,
+    ChunkTask,
+    MigrationJob,
+    MigrationJobStore,
+    content_hash as ragflow_content_hash,
+    segment_key as ragflow_segment_key,
+)
+from open_webui.services.federated_retrieval import (
+    DEFAULT_BACKEND_TIMEOUT,
+    DEFAULT_RRF_K,
+    LocalVectorBackend,
+    RagFlowBackend,
+    federated_search,
+)
+from open_webui.config import CACHE_DIR
+from open_webui.utils.access_control import has_access
 from open_webui.models.knowledge import Knowledges
 from open_webui.models.files import Files, FileForm
-from open_webui.utils.auth import get_verified_user
+from open_webui.models.excel_segments import ExcelSegments, SEGMENTS_INDEXED_KEY
+from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.routers.retrieval import save_docs_to_vector_db
 from langchain_core.documents import Document
 
@@ -21,6 +45,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Excel→RAGFlow 迁移任务（内存 + 磁盘检查点，支持续传）
+RAGFLOW_MIGRATION_JOBS = MigrationJobStore(CACHE_DIR / "ragflow_migrations")
+
 class ExcelExtractRequest(BaseModel):
     dir_path: Optional[str] = None
     limit_per_file: Optional[int] = 1000
@@ -67,7 +94,20 @@ class GetSavedExcelFilesResponse(BaseModel):
 class SavedFileSegmentsResponse(BaseModel):
     file_id: str
     original_file: str
-    sheets: List[Dict[str, Any]]  # [{ name, segments: [{title, content, questions}] }]
+    sheets: List[
+        Dict[str, Any]
+    ]  # [{ name, segment_count, segments: [{row, title, content, questions}] }]
+    # 指定 sheet 分页读取时返回
+    total: Optional[int] = None
+    skip: Optional[int] = None
+    limit: Optional[int] = None
+
+
+class SavedFileSheetsResponse(BaseModel):
+    file_id: str
+    original_file: str
+    sheets: List[Dict[str, Any]]  # [{ name, segment_count }]
+
 
 class ListExcelFilesRequest(BaseModel):
     """列出目录下Excel文件的请求"""
@@ -90,6 +130,13 @@ class MigrateExcelDirectToRagFlowRequest(BaseModel):
     mode: Optional[str] = "skip"  # skip | overwrite
     limit_segments: Optional[int] = None  # 限制每个sheet处理的分段数量
     auto_delete_duplicates: Optional[bool] = True  # 自动删除重名的数据集或文档
+    job_id: Optional[str] = (
+        None  # 续传之前的迁移任务（复用已创建的dataset/document和已上传的chunk）
+    )
+    background: Optional[bool] = False  # 后台执行，立即返回job_id
+    concurrency: Optional[int] = (
+        None  # chunk并发上传数（默认 RAGFLOW_MIGRATION_CONCURRENCY）
+    )
 
 class MigrateExcelDirectToRagFlowResponse(BaseModel):
     """直接从Excel文件迁移到RAGFlow的响应"""
@@ -100,6 +147,9 @@ class MigrateExcelDirectToRagFlowResponse(BaseModel):
     sheets_processed: int
     segments_processed: int
     chunks_created: int
+    chunks_failed: int = 0
+    job_id: Optional[str] = None  # 迁移任务ID，可用于查询进度或续传
+    status: Optional[str] = None  # pending | running | completed | partial | failed
     message: str
 
 # 已移除：测试工具相关的检索API（/list-collections, /query, /search/vector, /search/fulltext）
@@ -284,7 +334,9 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
 
             workbook_total_segments = 0
             sheet_summaries: List[Dict[str, Any]] = []
-            sheets_data: List[Dict[str, Any]] = []  # 保存完整的结构化数据
+            sheets_data: List[Dict[str, Any]] = (
+                []
+            )  # 完整的结构化数据，写入 excel_segment 表
             parts: List[str] = []
 
             for sheet_name in excel_file.sheet_names:
@@ -296,7 +348,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
 
                 # 识别常见列名（优先级：精确匹配 > 包含关键词）
                 cols = [str(c).strip() for c in df.columns]
-                
+
                 # 分段标题列：优先匹配"分段标题"，然后是包含"标题"的列
                 title_cols = []
                 for c in cols:
@@ -304,7 +356,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         title_cols.insert(0, c)  # 精确匹配优先
                     elif "标题" in c or "title" in c.lower():
                         title_cols.append(c)
-                
+
                 # 分段内容列：优先匹配"分段内容"，然后是包含"内容"的列
                 content_cols = []
                 for c in cols:
@@ -312,7 +364,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         content_cols.insert(0, c)  # 精确匹配优先
                     elif "内容" in c or "content" in c.lower():
                         content_cols.append(c)
-                
+
                 # 问题（选填，单元格内一行一个）列：优先匹配"问题（选填，单元格内一行一个）"，然后是包含"问题"的列
                 question_cols = []
                 for c in cols:
@@ -320,7 +372,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         question_cols.insert(0, c)  # 精确匹配优先
                     elif "问题" in c or "question" in c.lower():
                         question_cols.append(c)
-                
+
                 # 日志：记录识别到的列
                 if not title_cols or not content_cols:
                     logger.warning(f"Sheet {f.name}:{sheet_name} 列识别不完整 - 所有列: {cols}, 标题列: {title_cols}, 内容列: {content_cols}, 问题列: {question_cols}")
@@ -349,11 +401,11 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                         })
 
                 if not segments_content:
-                            continue
-        
+                    continue
+
                 segments_content.sort(key=lambda s: s.get("row", 0))
                 workbook_total_segments += len(segments_content)
-                
+
                 # 保存完整的结构化数据
                 sheet_data = {
                     "name": sheet_name,
@@ -361,7 +413,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     "segments": segments_content  # 保存完整的分段数据
                 }
                 sheets_data.append(sheet_data)
-                
+
                 # 同时生成Markdown格式用于展示（兼容性）
                 # 注意：为避免把“问题（选填，单元格内一行一个）”混入分段内容，此处仅输出标题与内容，不再拼接问题到内容文本
                 sheet_block = [f"# {sheet_name}"]
@@ -370,7 +422,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     content_block = f"## {seg_title}\n{s['content']}"
                     sheet_block.append(content_block)
                 parts.append("\n\n".join(sheet_block))
-                
+
                 # 保留summary用于兼容
                 sheet_summaries.append({
                     "name": sheet_name,
@@ -388,6 +440,7 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
             if old_id:
                 try:
                     Files.delete_file_by_id(old_id)
+                    ExcelSegments.delete_by_file_id(old_id)
                 except Exception:
                     pass
             file_id = str(uuid.uuid4())
@@ -400,21 +453,23 @@ async def save_excel_segments(req: SaveExcelSegmentsRequest, user=Depends(get_ve
                     "type": "excel_segment_aggregated",
                     "source_file": f.stem,
                     "sheets": sheet_summaries,  # 保留用于兼容
-                    "sheets_data": sheets_data,  # 新增：完整的结构化数据
                     "segment_count": workbook_total_segments,
-                    "content": file_content  # Markdown格式，用于兼容
+                    "content": file_content,  # Markdown格式，用于兼容（分段读取不加载此字段）
+                    SEGMENTS_INDEXED_KEY: True,
                 },
                 meta={
                     "name": filename,
                     "content_type": "text/plain",
-                    "size": len(file_content.encode('utf-8')),
+                    "size": len(file_content.encode("utf-8")),
                     "source": "excel_extraction",
-                    "original_file": f.stem
+                    "original_file": f.stem,
                 },
-                access_control=None
+                access_control=None,
             )
             rec = Files.insert_new_file(user.id, file_form)
             if rec:
+                # 结构化分段批量写入 excel_segment 表，读取时按 (file, sheet, row) 索引分页
+                ExcelSegments.insert_sheets(file_id, sheets_data)
                 file_ids.append(file_id)
 
         # 更新knowledge.data.file_ids（去重）
@@ -516,13 +571,45 @@ class RagFlowRetrievalResponse(BaseModel):
     scores: List[float]  # 相似度分数列表
     retrieval_time: Optional[float] = None  # 检索耗时（秒）
 
+
+class FederatedRetrievalRequest(BaseModel):
+    """联邦检索请求：同时检索本地知识库（向量库）与RAGFlow数据集"""
+
+    question: str
+    knowledge_ids: Optional[List[str]] = None  # 本地知识库ID（向量库集合）
+    dataset_ids: Optional[List[str]] = None  # RAGFlow dataset ID
+    document_ids: Optional[List[str]] = None  # 仅在这些RAGFlow文档中检索
+    top_k: Optional[int] = 5  # 融合后返回的结果数
+    local_timeout: Optional[float] = DEFAULT_BACKEND_TIMEOUT  # 本地向量库截止时间（秒）
+    ragflow_timeout: Optional[float] = DEFAULT_BACKEND_TIMEOUT  # RAGFlow截止时间（秒）
+    local_weight: Optional[float] = 1.0  # RRF融合权重
+    ragflow_weight: Optional[float] = 1.0
+    rrf_k: Optional[int] = DEFAULT_RRF_K
+    similarity_threshold: Optional[float] = None  # 以下参数仅作用于RAGFlow
+    vector_similarity_weight: Optional[float] = None
+    keyword: Optional[bool] = True
+    highlight: Optional[bool] = False
+
+
+class FederatedRetrievalResponse(BaseModel):
+    """联邦检索响应"""
+
+    question: str
+    total: int
+    documents: List[Dict[str, Any]]  # metadata.sources 记录命中的后端、排名与原始分数
+    scores: List[float]  # 多后端时为RRF融合分数，单后端时为原始相似度
+    backends: List[Dict[str, Any]]  # 各后端状态：ok | timeout | error，耗时
+    partial: bool  # 有后端超时或失败时为 True
+    retrieval_time: Optional[float] = None
+
+
 @router.get("/ragflow/datasets")
 async def ragflow_list_datasets(request: Request, user=Depends(get_verified_user)):
     """获取所有RAGFlow datasets列表，返回id和name用于前端选择"""
     try:
         dataset_client = get_ragflow_dataset_client(request)
         datasets = await dataset_client.list(page=1, page_size=1000)  # 获取所有datasets
-        
+
         # 提取id和name
         dataset_list = []
         for ds in datasets:
@@ -536,10 +623,10 @@ async def ragflow_list_datasets(request: Request, user=Depends(get_verified_user
                     "document_count": ds.get("document_count", 0),
                     "chunk_count": ds.get("chunk_count", 0),
                 })
-        
+
         # 按名称排序
         dataset_list.sort(key=lambda x: x["name"])
-        
+
         return {
             "datasets": dataset_list,
             "total": len(dataset_list)
@@ -549,6 +636,12 @@ async def ragflow_list_datasets(request: Request, user=Depends(get_verified_user
         raise HTTPException(status_code=500, detail=f"获取datasets列表失败: {e}")
 
 
+@router.get("/ragflow/transport/metrics")
+async def ragflow_transport_metrics(user=Depends(get_admin_user)):
+    """RAGFlow 共享连接池状态与各操作的延迟统计"""
+    return get_ragflow_transport().get_metrics()
+
+
 @router.post("/ragflow/retrieval", response_model=RagFlowRetrievalResponse)
 async def ragflow_retrieval(req: RagFlowRetrievalRequest, request: Request, user=Depends(get_verified_user)):
     """RAGFlow知识库检索（支持多知识库）"""
@@ -561,13 +654,13 @@ async def ragflow_retrieval(req: RagFlowRetrievalRequest, request: Request, user
             final_dataset_ids = [req.dataset_id]
         else:
             raise HTTPException(status_code=400, detail="必须指定dataset_id或dataset_ids")
-        
+
         if not final_dataset_ids:
             raise HTTPException(status_code=400, detail="至少需要指定一个知识库")
-        
+
         start_time = time.time()
         chunk_client = get_ragflow_chunk_client(request)
-        
+
         documents, scores = await chunk_client.retrieve(
             question=req.question,
             dataset_ids=final_dataset_ids,
@@ -580,9 +673,9 @@ async def ragflow_retrieval(req: RagFlowRetrievalRequest, request: Request, user
             keyword=req.keyword,
             highlight=req.highlight,
         )
-        
+
         retrieval_time = time.time() - start_time
-        
+
         return RagFlowRetrievalResponse(
             question=req.question,
             total=len(documents),
@@ -595,13 +688,85 @@ async def ragflow_retrieval(req: RagFlowRetrievalRequest, request: Request, user
         raise HTTPException(status_code=500, detail=f"检索失败: {e}")
 
 
+@router.post("/federated/retrieval", response_model=FederatedRetrievalResponse)
+async def federated_retrieval(
+    req: FederatedRetrievalRequest, request: Request, user=Depends(get_verified_user)
+):
+    """联邦检索：并发查询本地向量库与RAGFlow，各后端独立截止时间，RRF融合并按内容去重"""
+    if not req.knowledge_ids and not req.dataset_ids:
+        raise HTTPException(
+            status_code=400, detail="必须指定knowledge_ids或dataset_ids"
+        )
+
+    for knowledge_id in req.knowledge_ids or []:
+        knowledge = Knowledges.get_knowledge_by_id(id=knowledge_id)
+        if not knowledge:
+            raise HTTPException(status_code=404, detail=f"知识库不存在: {knowledge_id}")
+        if (
+            knowledge.user_id != user.id
+            and not has_access(user.id, "read", knowledge.access_control)
+            and user.role != "admin"
+        ):
+            raise HTTPException(
+                status_code=403, detail=f"无权访问该知识库: {knowledge_id}"
+            )
+
+    backends = []
+    if req.knowledge_ids:
+        backends.append(
+            LocalVectorBackend(
+                get_langchain_rag_service(request),
+                req.knowledge_ids,
+                timeout=req.local_timeout or DEFAULT_BACKEND_TIMEOUT,
+                weight=req.local_weight if req.local_weight is not None else 1.0,
+            )
+        )
+    if req.dataset_ids:
+        backends.append(
+            RagFlowBackend(
+                get_ragflow_chunk_client(request),
+                req.dataset_ids,
+                document_ids=req.document_ids,
+                retrieve_kwargs={
+                    "similarity_threshold": req.similarity_threshold,
+                    "vector_similarity_weight": req.vector_similarity_weight,
+                    "keyword": req.keyword,
+                    "highlight": req.highlight,
+                },
+                timeout=req.ragflow_timeout or DEFAULT_BACKEND_TIMEOUT,
+                weight=req.ragflow_weight if req.ragflow_weight is not None else 1.0,
+            )
+        )
+
+    try:
+        result = await federated_search(
+            req.question,
+            backends,
+            top_k=req.top_k or 5,
+            rrf_k=req.rrf_k or DEFAULT_RRF_K,
+        )
+    except Exception as e:
+        logger.error(f"federated_retrieval failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"检索失败: {e}")
+
+    return FederatedRetrievalResponse(
+        question=req.question,
+        total=len(result.documents),
+        documents=result.documents,
+        scores=result.scores,
+        backends=[vars(status) for status in result.backends],
+        partial=result.partial,
+        retrieval_time=result.retrieval_time,
+    )
+
+
 @router.post("/ragflow/list-excel-files", response_model=ListExcelFilesResponse)
 async def list_excel_files(req: ListExcelFilesRequest, user=Depends(get_verified_user)):
     """列出指定目录下的所有Excel文件（仅返回文件名，不暴露完整路径）"""
     try:
         from pathlib import Path
         import os
-        
+
         # 构建目录路径
         if req.knowledge_id:
             # 如果提供了knowledge_id，构建知识库目录路径
@@ -613,13 +778,13 @@ async def list_excel_files(req: ListExcelFilesRequest, user=Depends(get_verified
                 dir_path = Path(req.dir_path)
         else:
             dir_path = Path(req.dir_path)
-        
+
         if not dir_path.exists():
             raise HTTPException(status_code=400, detail=f"目录不存在: {req.dir_path}")
-        
+
         if not dir_path.is_dir():
             raise HTTPException(status_code=400, detail=f"不是目录: {req.dir_path}")
-        
+
         # 扫描Excel文件
         excel_files = []
         for item in dir_path.iterdir():
@@ -630,10 +795,10 @@ async def list_excel_files(req: ListExcelFilesRequest, user=Depends(get_verified
                     "size": stat.st_size,
                     "mtime": stat.st_mtime
                 })
-        
+
         # 按文件名排序
         excel_files.sort(key=lambda x: x["filename"])
-        
+
         return ListExcelFilesResponse(
             files=excel_files,
             dir_path=str(dir_path),  # 返回实际使用的目录路径
@@ -646,65 +811,40 @@ async def list_excel_files(req: ListExcelFilesRequest, user=Depends(get_verified
         raise HTTPException(status_code=500, detail=f"列出Excel文件失败: {e}")
 
 
-@router.post("/ragflow/migrate-excel-direct", response_model=MigrateExcelDirectToRagFlowResponse)
-async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowRequest, request: Request, user=Depends(get_verified_user)):
-    """直接从Excel文件或目录迁移到RAGFlow，按照Sheet（章节）、分段标题、分段内容、问题的结构组织数据。
-    
-    规则：
-    - 支持单个Excel文件或包含多个Excel文件的目录
-    - 所有文件迁移到同一个dataset中
-    - 每个Sheet（章节）作为独立的document，结构更清晰
-    - 每个分段标题作为Sheet下的小标题
-    - 分段内容作为小标题下的内容
-    - 问题作为questions列表关联到内容chunk
-    - 使用breadcrumb格式：文件名 > Sheet名称 > 分段标题
+async def _execute_excel_migration(
+    req: MigrateExcelDirectToRagFlowRequest,
+    job: MigrationJob,
+    excel_files: List[Path],
+    dataset_client,
+    file_client,
+    chunk_client,
+) -> MigrateExcelDirectToRagFlowResponse:
+    """执行Excel迁移：先按Sheet建立dataset/document（串行），再并发上传所有chunk。
+
+    已创建的dataset/document和已上传chunk的幂等键都记录在job检查点中，
+    同一个job_id重新提交时会复用它们，只上传尚未完成的分段。失败时把错误写入job后重新抛出。
     """
     try:
         import pandas as pd
-        from pathlib import Path
-        import hashlib
-        
-        # 1. 获取RAGFlow客户端
-        dataset_client = get_ragflow_dataset_client(request)
-        file_client = get_ragflow_file_client(request)
-        chunk_client = get_ragflow_chunk_client(request)
-        
-        # 2. 验证目录路径并构建文件列表
-        dir_path = Path(req.dir_path)
-        if not dir_path.exists():
-            raise HTTPException(status_code=400, detail=f"目录不存在: {req.dir_path}")
-        
-        if not dir_path.is_dir():
-            raise HTTPException(status_code=400, detail=f"不是目录: {req.dir_path}")
-        
-        if not req.selected_files:
-            raise HTTPException(status_code=400, detail="请至少选择一个文件进行迁移")
-        
-        # 构建选中的Excel文件完整路径
-        excel_files: List[Path] = []
-        for filename in req.selected_files:
-            file_path = dir_path / filename
-            if not file_path.exists():
-                logger.warning(f"文件不存在: {file_path}")
-                continue
-            if file_path.suffix.lower() not in [".xlsx", ".xls"]:
-                logger.warning(f"不是有效的Excel文件: {filename}")
-                continue
-            excel_files.append(file_path)
-        
-        if not excel_files:
-            raise HTTPException(status_code=400, detail="没有有效的Excel文件可迁移")
-        
-        excel_files.sort()  # 按文件名排序
-        logger.info(f"将处理 {len(excel_files)} 个Excel文件: {[f.name for f in excel_files]}")
-        
+
+        # 检查点中的已创建资源（续传时复用）
+        resumed = bool(job.state.get("documents"))
+        file_datasets: Dict[str, str] = job.state.setdefault("datasets", {})
+        sheet_documents: Dict[str, Dict[str, str]] = job.state.setdefault(
+            "documents", {}
+        )
+
+        job.status = RAGFLOW_MIGRATION_RUNNING
+        job.stage = "prepare"
+        job.started_at = time.time()
+        await job.save()
+
         # 3. 辅助函数：删除重名的dataset
         async def delete_duplicate_dataset(dataset_name: str):
             """删除指定名称的所有dataset"""
             if not req.auto_delete_duplicates:
                 return
             try:
-                import asyncio
                 # 列出所有dataset，查找重名的
                 all_datasets = await dataset_client.list()
                 duplicate_ids = []
@@ -713,7 +853,7 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                     ds_id = ds.get("id") or ds.get("dataset_id") or ds.get("_id")
                     if ds_name == dataset_name and ds_id:
                         duplicate_ids.append(ds_id)
-                
+
                 if duplicate_ids:
                     logger.info(f"发现重名dataset '{dataset_name}' ({len(duplicate_ids)}个)，正在批量删除...")
                     try:
@@ -724,7 +864,7 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                         else:
                             logger.warning(f"删除dataset返回非零code: {result}")
                         await asyncio.sleep(1.5)
-                        
+
                         # 验证删除
                         verify_datasets = await dataset_client.list()
                         remaining = [ds for ds in verify_datasets 
@@ -750,30 +890,36 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                         await asyncio.sleep(1.0)
             except Exception as e:
                 logger.warning(f"删除重名dataset时出错: {e}")
-        
-        # 4. 批量处理所有Excel文件
+
+        # 4. 批量处理所有Excel文件：建立dataset/document并收集chunk任务
         # 注意：如果用户指定了dataset_id，所有文件都放入同一个dataset；否则为每个文件创建独立的dataset
         files_processed = 0
         sheets_processed = 0
         segments_processed = 0
-        chunks_created = 0
         created_documents: List[Dict[str, str]] = []  # 存储所有创建的documents: [{file_name, sheet_name, document_id}]
         first_document_id = None
         created_dataset_ids: List[str] = []  # 存储所有创建的dataset_id
-        
+        chunk_tasks: List[ChunkTask] = []
+
         # 去重控制：用于跨document的去重（可选，如果需要在dataset级别去重）
         existing_hashes = set()
-        
+        skip_mode = (req.mode or "skip").lower() == "skip"
+
         # 遍历所有Excel文件
         for excel_file_path in excel_files:
             original_file = excel_file_path.stem
             logger.info(f"开始处理Excel文件: {excel_file_path.name}")
-            
+
             # 重要：为每个文件初始化dataset_id变量，确保每个文件都有独立的dataset_id
             current_file_dataset_id: Optional[str] = None
-            
+
             # 为每个文件创建独立的dataset（如果用户没有指定dataset_id）
-            if not req.dataset_id:
+            if not req.dataset_id and original_file in file_datasets:
+                # 续传：复用检查点中已创建的dataset，不再删除重建
+                dataset_id = file_datasets[original_file]
+                if dataset_id not in created_dataset_ids:
+                    created_dataset_ids.append(dataset_id)
+            elif not req.dataset_id:
                 # 确定该文件的dataset名称：优先使用用户指定的名称，否则使用文件名
                 if req.dataset_name:
                     # 如果指定了dataset_name，但多个文件时应该为每个文件创建独立的数据集
@@ -786,12 +932,12 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                 else:
                     # 使用文件名（不含扩展名）作为dataset名称
                     file_dataset_name = original_file
-                
+
                 logger.info(f"准备为文件 '{excel_file_path.name}' 创建独立dataset: {file_dataset_name}")
-                
+
                 # 删除该文件对应的旧dataset（重要：每个文件都删除其对应的旧dataset）
                 await delete_duplicate_dataset(file_dataset_name)
-                
+
                 # 创建新dataset
                 max_retries = 3
                 dataset_payload = None
@@ -807,27 +953,28 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                             if req.auto_delete_duplicates and attempt < max_retries - 1:
                                 logger.warning(f"创建dataset失败（可能是重名），尝试重新删除: {error_msg}")
                                 await delete_duplicate_dataset(file_dataset_name)
-                                import asyncio
                                 await asyncio.sleep(0.5)  # 等待删除完成
                                 continue
                             else:
                                 raise
                         else:
                             raise
-                
+
                 if not dataset_payload:
                     logger.error(f"为文件 '{excel_file_path.name}' 创建dataset失败，跳过该文件")
                     continue
-                
+
                 # 从响应中提取dataset_id，确保正确处理不同的响应格式
                 if isinstance(dataset_payload, dict):
                     current_file_dataset_id = str(dataset_payload.get("id") or dataset_payload.get("dataset_id") or dataset_payload.get("_id"))
-                
+
                 if not current_file_dataset_id:
                     logger.error(f"为文件 '{excel_file_path.name}' 创建dataset失败，无法获取dataset_id: {dataset_payload}")
                     continue
-                
+
                 created_dataset_ids.append(current_file_dataset_id)
+                file_datasets[original_file] = current_file_dataset_id
+                await job.save()
                 logger.info(f"✓ 成功为文件 '{excel_file_path.name}' 创建dataset: {current_file_dataset_id} (名称: {file_dataset_name})")
                 # 确保后续处理使用当前文件的dataset_id
                 dataset_id = current_file_dataset_id
@@ -836,22 +983,22 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                 dataset_id = req.dataset_id
                 if dataset_id not in created_dataset_ids:
                     created_dataset_ids.append(dataset_id)
-            
+
             # 验证dataset_id已正确设置
             if not dataset_id:
                 logger.error(f"文件 '{excel_file_path.name}' 的dataset_id未设置，跳过该文件")
                 continue
-            
+
             # 确保使用当前文件的dataset_id（防止变量作用域问题）
             logger.debug(f"当前文件 '{excel_file_path.name}' 使用dataset_id: {dataset_id}")
-            
+
             # 读取Excel文件
             try:
                 excel_file = pd.ExcelFile(excel_file_path)
             except Exception as e:
                 logger.warning(f"跳过无法读取的文件 {excel_file_path.name}: {e}")
                 continue
-            
+
             # 处理该文件的每个Sheet
             for sheet_idx, sheet_name in enumerate(excel_file.sheet_names):
                 try:
@@ -859,10 +1006,10 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                 except Exception as e:
                     logger.warning(f"跳过无法读取的Sheet {excel_file_path.name}:{sheet_name}: {e}")
                     continue
-                
+
                 # 识别列名
                 cols = [str(c).strip() for c in df.columns]
-                
+
                 # 分段标题列
                 title_cols = []
                 for c in cols:
@@ -870,7 +1017,7 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                         title_cols.insert(0, c)
                     elif "标题" in c or "title" in c.lower():
                         title_cols.append(c)
-                
+
                 # 分段内容列
                 content_cols = []
                 for c in cols:
@@ -878,7 +1025,7 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                         content_cols.insert(0, c)
                     elif "内容" in c or "content" in c.lower():
                         content_cols.append(c)
-                
+
                 # 问题列
                 question_cols = []
                 for c in cols:
@@ -886,205 +1033,280 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
                         question_cols.insert(0, c)
                     elif "问题" in c or "question" in c.lower():
                         question_cols.append(c)
-            
+
                 if not content_cols:
                     logger.warning(f"Sheet {excel_file_path.name}:{sheet_name} 未找到内容列，跳过")
                     continue
-                
+
                 # 处理每个分段（行）
                 sheet_segments = []
                 for idx, row in df.iterrows():
                     title = ""
                     content = ""
                     questions = ""
-                    
+
                     # 提取分段标题
                     for c in title_cols[:1]:
                         val = row.get(c)
                         if pd.notna(val):
                             title = str(val).strip()
                             break
-                    
+
                     # 提取分段内容
                     for c in content_cols[:1]:
                         val = row.get(c)
                         if pd.notna(val):
                             content = str(val)
                             break
-                    
+
                     # 提取问题
                     for c in question_cols[:1]:
                         val = row.get(c)
                         if pd.notna(val):
                             questions = str(val)
                             break
-                    
+
                     if not content or not content.strip():
                         continue
-                    
+
                     sheet_segments.append({
                         "row": int(idx) if isinstance(idx, (int, float)) else 0,
                         "title": title,
                         "content": content,
                         "questions": questions,
                     })
-                
+
                 # 限制分段数量
                 if req.limit_segments is not None and req.limit_segments >= 0:
                     sheet_segments = sheet_segments[:req.limit_segments]
-                
+
                 # 如果没有分段，跳过该Sheet
                 if not sheet_segments:
                     logger.warning(f"Sheet '{excel_file_path.name}:{sheet_name}' 没有有效分段，跳过")
                     continue
-                
+
                 # 按行号排序
                 sheet_segments.sort(key=lambda s: s.get("row", 0))
-                
+
                 # 为该Sheet创建独立的document
-                document_name = req.document_name or original_file
                 # 确保文件名中的中文正确编码，使用UTF-8字符串
                 # document名称格式：文件名_Sheet名称，便于识别来源
                 sheet_doc_name = f"{original_file}_{sheet_name}"[:100]  # 限制长度，避免文件名过长
-                
-                # 检查是否有重名的document并删除
-                if req.auto_delete_duplicates:
-                    try:
-                        existing_docs = await file_client.list(dataset_id=dataset_id, name=sheet_doc_name)
-                        if existing_docs:
-                            duplicate_ids = [doc.get("id") or doc.get("document_id") for doc in existing_docs 
-                                           if doc.get("name") == sheet_doc_name]
-                            if duplicate_ids:
-                                logger.info(f"发现重名document '{sheet_doc_name}' ({len(duplicate_ids)}个)，正在删除...")
-                                await file_client.delete(dataset_id=dataset_id, ids=duplicate_ids)
-                                logger.info(f"已删除重名document: {duplicate_ids}")
-                    except Exception as e:
-                        logger.warning(f"检查/删除重名document失败: {e}，继续创建新document")
-                
-                # 重要：在创建document前再次确认dataset_id是当前文件的
-                logger.info(f"为文件 '{excel_file_path.name}' 的Sheet '{sheet_name}' 创建document: {sheet_doc_name} (使用dataset_id: {dataset_id})")
-                # 上传时文件名必须包含扩展名，使用sheet_doc_name作为基础（不包含扩展名）
-                # 但为了保持一致性，我们在上传和更新时都保持相同的名称结构
-                filename = f"{sheet_doc_name}.txt"
-                # 确保文件名是UTF-8字符串（Python 3默认就是UTF-8，但显式确保）
-                if isinstance(filename, bytes):
-                    filename = filename.decode('utf-8')
-                placeholder_content = f"Excel迁移文档 - 文件: {original_file} - Sheet: {sheet_name}"
-                content_bytes = placeholder_content.encode("utf-8")
-                doc_data = await file_client.upload(dataset_id=dataset_id, files=[(filename, content_bytes, "text/plain")])
-                
-                sheet_document_id = None
-                if isinstance(doc_data, dict):
-                    if doc_data.get("id"):
-                        sheet_document_id = doc_data.get("id")
-                    elif doc_data.get("document_id"):
-                        sheet_document_id = doc_data.get("document_id")
-                    elif doc_data.get("data") and isinstance(doc_data["data"], dict):
-                        docs = doc_data["data"].get("documents") or doc_data["data"].get("docs") or []
-                        if isinstance(docs, list) and docs:
-                            sheet_document_id = docs[0].get("id")
-                if not sheet_document_id and isinstance(doc_data, list) and doc_data:
-                    sheet_document_id = doc_data[0].get("id")
-                if not sheet_document_id:
-                    logger.error(f"为Sheet '{excel_file_path.name}:{sheet_name}' 创建document失败: {doc_data}")
-                    continue
-                
-                sheet_document_id = str(sheet_document_id)
-                
-                # RAGFlow不允许修改文件的扩展名
-                # 上传时文件名是 "{sheet_doc_name}.txt"
-                # 更新name字段时，必须保持相同的扩展名，否则会报错 "The extension of file can't be changed"
-                # 解决方案：在更新name时也带上.txt扩展名，与上传时的文件名保持一致
-                try:
-                    # 使用带扩展名的名称更新（与上传时的filename保持一致）
-                    await file_client.update(
+                sheet_key = f"{original_file}|{sheet_name}"
+
+                resumed_document = sheet_documents.get(sheet_key)
+                if (
+                    resumed_document
+                    and resumed_document.get("dataset_id") == dataset_id
+                ):
+                    # 续传：复用已创建的document，保留其中已上传的chunks
+                    sheet_document_id = resumed_document["document_id"]
+                else:
+                    # 检查是否有重名的document并删除
+                    if req.auto_delete_duplicates:
+                        try:
+                            existing_docs = await file_client.list(
+                                dataset_id=dataset_id, name=sheet_doc_name
+                            )
+                            if existing_docs:
+                                duplicate_ids = [
+                                    doc.get("id") or doc.get("document_id")
+                                    for doc in existing_docs
+                                    if doc.get("name") == sheet_doc_name
+                                ]
+                                if duplicate_ids:
+                                    logger.info(
+                                        f"发现重名document '{sheet_doc_name}' ({len(duplicate_ids)}个)，正在删除..."
+                                    )
+                                    await file_client.delete(
+                                        dataset_id=dataset_id, ids=duplicate_ids
+                                    )
+                                    logger.info(f"已删除重名document: {duplicate_ids}")
+                        except Exception as e:
+                            logger.warning(
+                                f"检查/删除重名document失败: {e}，继续创建新document"
+                            )
+
+                    # 重要：在创建document前再次确认dataset_id是当前文件的
+                    logger.info(
+                        f"为文件 '{excel_file_path.name}' 的Sheet '{sheet_name}' 创建document: {sheet_doc_name} (使用dataset_id: {dataset_id})"
+                    )
+                    # 上传时文件名必须包含扩展名，使用sheet_doc_name作为基础（不包含扩展名）
+                    # 但为了保持一致性，我们在上传和更新时都保持相同的名称结构
+                    filename = f"{sheet_doc_name}.txt"
+                    # 确保文件名是UTF-8字符串（Python 3默认就是UTF-8，但显式确保）
+                    if isinstance(filename, bytes):
+                        filename = filename.decode("utf-8")
+                    placeholder_content = (
+                        f"Excel迁移文档 - 文件: {original_file} - Sheet: {sheet_name}"
+                    )
+                    content_bytes = placeholder_content.encode("utf-8")
+                    doc_data = await file_client.upload(
                         dataset_id=dataset_id,
-                        document_id=sheet_document_id,
-                        name=filename  # 使用完整的文件名（包含.txt扩展名）
+                        files=[(filename, content_bytes, "text/plain")],
                     )
-                    logger.debug(f"已更新Sheet '{sheet_name}' 的document名称为: {filename}")
-                except Exception as e:
-                    # 如果更新失败，也不影响功能，因为上传时已经使用了正确的中文文件名
-                    logger.debug(f"更新document名称失败（不影响功能）: {e}")
-                
+
+                    sheet_document_id = None
+                    if isinstance(doc_data, dict):
+                        if doc_data.get("id"):
+                            sheet_document_id = doc_data.get("id")
+                        elif doc_data.get("document_id"):
+                            sheet_document_id = doc_data.get("document_id")
+                        elif doc_data.get("data") and isinstance(
+                            doc_data["data"], dict
+                        ):
+                            docs = (
+                                doc_data["data"].get("documents")
+                                or doc_data["data"].get("docs")
+                                or []
+                            )
+                            if isinstance(docs, list) and docs:
+                                sheet_document_id = docs[0].get("id")
+                    if (
+                        not sheet_document_id
+                        and isinstance(doc_data, list)
+                        and doc_data
+                    ):
+                        sheet_document_id = doc_data[0].get("id")
+                    if not sheet_document_id:
+                        logger.error(
+                            f"为Sheet '{excel_file_path.name}:{sheet_name}' 创建document失败: {doc_data}"
+                        )
+                        continue
+
+                    sheet_document_id = str(sheet_document_id)
+
+                    # RAGFlow不允许修改文件的扩展名
+                    # 上传时文件名是 "{sheet_doc_name}.txt"
+                    # 更新name字段时，必须保持相同的扩展名，否则会报错 "The extension of file can't be changed"
+                    # 解决方案：在更新name时也带上.txt扩展名，与上传时的文件名保持一致
+                    try:
+                        # 使用带扩展名的名称更新（与上传时的filename保持一致）
+                        await file_client.update(
+                            dataset_id=dataset_id,
+                            document_id=sheet_document_id,
+                            name=filename,  # 使用完整的文件名（包含.txt扩展名）
+                        )
+                        logger.debug(
+                            f"已更新Sheet '{sheet_name}' 的document名称为: {filename}"
+                        )
+                    except Exception as e:
+                        # 如果更新失败，也不影响功能，因为上传时已经使用了正确的中文文件名
+                        logger.debug(f"更新document名称失败（不影响功能）: {e}")
+
+                    # 如果overwrite模式，清空该document的现有chunks
+                    if not skip_mode:
+                        try:
+                            await chunk_client.delete_chunks(
+                                dataset_id=dataset_id, document_id=sheet_document_id
+                            )
+                            logger.debug(
+                                f"已清空Sheet '{sheet_name}' 的现有chunks（overwrite模式）"
+                            )
+                        except Exception as e:
+                            logger.warning(
+                                f"清空Sheet '{sheet_name}' 的旧chunks失败（忽略继续）: {e}"
+                            )
+
+                    sheet_documents[sheet_key] = {
+                        "file_name": original_file,
+                        "sheet_name": sheet_name,
+                        "document_id": sheet_document_id,
+                        "dataset_id": dataset_id,
+                    }
+                    await job.save()
+
                 created_documents.append({"file_name": original_file, "sheet_name": sheet_name, "document_id": sheet_document_id})
                 if not first_document_id:
                     first_document_id = sheet_document_id
-                logger.info(f"Sheet '{excel_file_path.name}:{sheet_name}' 的document创建成功: {sheet_document_id} (名称: {sheet_doc_name})")
-                
-                # 如果overwrite模式，清空该document的现有chunks
-                if (req.mode or "skip").lower() == "overwrite":
-                    try:
-                        await chunk_client.delete_chunks(dataset_id=dataset_id, document_id=sheet_document_id)
-                        logger.debug(f"已清空Sheet '{sheet_name}' 的现有chunks（overwrite模式）")
-                    except Exception as e:
-                        logger.warning(f"清空Sheet '{sheet_name}' 的旧chunks失败（忽略继续）: {e}")
-                
-                # 处理该Sheet的所有分段
+                logger.info(
+                    f"Sheet '{excel_file_path.name}:{sheet_name}' 的document就绪: {sheet_document_id} (名称: {sheet_doc_name})"
+                )
+
+                # 收集该Sheet的所有分段，稍后统一并发上传
                 for seg in sheet_segments:
                     title = (seg.get("title") or "").strip()
                     content = (seg.get("content") or "").strip()
                     questions_raw = (seg.get("questions") or "").strip()
                     row = seg.get("row", 0)
-                    
+
                     if not content:
                         continue
-                    
+
                     # 构建breadcrumb: 文件名 > Sheet名称 > 分段标题
                     breadcrumb = f"{original_file} > {sheet_name} > {title or ('行' + str(row))}"
-                    
+
                     # 构建关键词
                     important_keywords = list(filter(None, [original_file, sheet_name, title]))
-                    
+
                     # 处理问题：拆分为列表
                     questions_list = None
                     if questions_raw:
                         questions_list = [q.strip() for q in questions_raw.splitlines() if q and q.strip()]
                         if not questions_list:
                             questions_list = None
-                    
+
                     # 只添加内容chunk（标题信息已在breadcrumb和keywords中，避免冗余）
-                    try:
-                        # breadcrumb已包含完整路径信息，直接使用内容即可
-                        # 注意：content中的图片路径（如 /api/image/xxx）会被保留，确保前端可访问
-                        content_text = f"{breadcrumb}: {content}"
-                        h = hashlib.sha1(("C|" + content_text).encode("utf-8")).hexdigest()
-                        
-                        if (req.mode or "skip").lower() == "skip" and h in existing_hashes:
-                            logger.debug(f"跳过重复chunk: {breadcrumb}")
-                        else:
-                            # 重要：在创建chunk前再次确认dataset_id是当前文件的
-                            logger.debug(f"添加chunk到dataset_id={dataset_id}, document_id={sheet_document_id}, 文件={original_file}")
-                            await chunk_client.add_chunk(
-                                dataset_id=dataset_id,  # 确保使用当前文件的dataset_id
-                                document_id=sheet_document_id,  # 使用当前Sheet的document_id
+                    # breadcrumb已包含完整路径信息，直接使用内容即可
+                    # 注意：content中的图片路径（如 /api/image/xxx）会被保留，确保前端可访问
+                    content_text = f"{breadcrumb}: {content}"
+                    h = ragflow_content_hash(content_text)
+
+                    if skip_mode and h in existing_hashes:
+                        logger.debug(f"跳过重复chunk: {breadcrumb}")
+                    else:
+                        existing_hashes.add(h)
+                        chunk_tasks.append(
+                            ChunkTask(
+                                # 幂等键：同一分段（文件/Sheet/行 + 内容）重试或续传时不会重复创建
+                                key=ragflow_segment_key(
+                                    dataset_id,
+                                    original_file,
+                                    sheet_name,
+                                    row,
+                                    content=content_text,
+                                ),
+                                dataset_id=dataset_id,
+                                document_id=sheet_document_id,
                                 content=content_text,
                                 important_keywords=important_keywords or None,
                                 questions=questions_list,
                             )
-                            chunks_created += 1
-                            existing_hashes.add(h)
-                            logger.debug(f"添加内容chunk成功: {breadcrumb}")
-                    except Exception as e:
-                        logger.warning(f"添加内容chunk失败 ({breadcrumb}, dataset_id={dataset_id}): {e}")
-                    
+                        )
+
                     segments_processed += 1
-                
+
                 sheets_processed += 1
                 logger.info(f"文件 '{excel_file_path.name}' 的Sheet '{sheet_name}' 处理完成: {len(sheet_segments)} 个分段")
-            
+
             files_processed += 1
             logger.info(f"Excel文件 '{excel_file_path.name}' 处理完成，共处理 {len(list(excel_file.sheet_names))} 个Sheet")
-        
+
+        # 5. 并发上传所有chunk（有界并发 + 幂等键 + 检查点）
+        job.stage = "upload"
+        engine = ChunkMigrationEngine(
+            chunk_client,
+            concurrency=min(
+                req.concurrency or RAGFLOW_MIGRATION_DEFAULT_CONCURRENCY, 32
+            ),
+        )
+        # 续传时先对账RAGFlow中已存在的chunk，避免响应丢失导致的重复上传
+        await engine.run(job, chunk_tasks, reconcile=resumed)
+        chunks_created = sum(1 for task in chunk_tasks if task.key in job.completed)
+
         # 构建结果消息
         files_desc = f"目录中的 {files_processed} 个Excel文件（已选择 {len(req.selected_files)} 个）"
-        
+
         # 确定返回的dataset_id（如果有多个，返回第一个；如果用户指定了dataset_id，返回指定的）
         return_dataset_id = created_dataset_ids[0] if created_dataset_ids else (req.dataset_id if req.dataset_id else "")
         if len(created_dataset_ids) > 1:
             logger.info(f"共创建了 {len(created_dataset_ids)} 个dataset: {created_dataset_ids}")
-        
-        return MigrateExcelDirectToRagFlowResponse(
+
+        message = f"成功迁移 {files_desc}。共创建 {len(created_dataset_ids)} 个dataset，处理了 {sheets_processed} 个章节, {segments_processed} 个分段, 创建了 {len(created_documents)} 个documents, {chunks_created} 个chunks"
+        if job.failed:
+            message += f"，{job.failed} 个chunk上传失败，可使用 job_id 重新提交以续传"
+
+        response = MigrateExcelDirectToRagFlowResponse(
             dataset_id=return_dataset_id,
             document_id=first_document_id or "",  # 返回第一个document_id作为参考
             documents=created_documents,  # 返回所有创建的documents列表
@@ -1092,108 +1314,247 @@ async def migrate_excel_direct_to_ragflow(req: MigrateExcelDirectToRagFlowReques
             sheets_processed=sheets_processed,
             segments_processed=segments_processed,
             chunks_created=chunks_created,
-            message=f"成功迁移 {files_desc}。共创建 {len(created_dataset_ids)} 个dataset，处理了 {sheets_processed} 个章节, {segments_processed} 个分段, 创建了 {len(created_documents)} 个documents, {chunks_created} 个chunks"
+            chunks_failed=job.failed,
+            job_id=job.job_id,
+            status=job.status,
+            message=message,
         )
-    
+        job.stage = "done"
+        job.result = response.model_dump()
+        await job.save()
+        return response
+    except Exception as e:
+        job.status = RAGFLOW_MIGRATION_FAILED
+        job.finished_at = time.time()
+        job.add_error(str(e))
+        await job.save()
+        raise
+
+
+@router.post(
+    "/ragflow/migrate-excel-direct", response_model=MigrateExcelDirectToRagFlowResponse
+)
+async def migrate_excel_direct_to_ragflow(
+    req: MigrateExcelDirectToRagFlowRequest,
+    request: Request,
+    user=Depends(get_verified_user),
+):
+    """直接从Excel文件或目录迁移到RAGFlow，按照Sheet（章节）、分段标题、分段内容、问题的结构组织数据。
+
+    规则：
+    - 支持单个Excel文件或包含多个Excel文件的目录
+    - 所有文件迁移到同一个dataset中
+    - 每个Sheet（章节）作为独立的document，结构更清晰
+    - 每个分段标题作为Sheet下的小标题
+    - 分段内容作为小标题下的内容
+    - 问题作为questions列表关联到内容chunk
+    - 使用breadcrumb格式：文件名 > Sheet名称 > 分段标题
+    - chunk以有界并发上传；传入 job_id 可续传之前中断或部分失败的迁移
+    - background=true 时立即返回 job_id，通过 /ragflow/migrate-jobs/{job_id} 查询进度
+    """
+    try:
+        # 1. 获取RAGFlow客户端
+        dataset_client = get_ragflow_dataset_client(request)
+        file_client = get_ragflow_file_client(request)
+        chunk_client = get_ragflow_chunk_client(request)
+
+        # 2. 验证目录路径并构建文件列表
+        dir_path = Path(req.dir_path)
+        if not dir_path.exists():
+            raise HTTPException(status_code=400, detail=f"目录不存在: {req.dir_path}")
+
+        if not dir_path.is_dir():
+            raise HTTPException(status_code=400, detail=f"不是目录: {req.dir_path}")
+
+        if not req.selected_files:
+            raise HTTPException(status_code=400, detail="请至少选择一个文件进行迁移")
+
+        # 构建选中的Excel文件完整路径
+        excel_files: List[Path] = []
+        for filename in req.selected_files:
+            file_path = dir_path / filename
+            if not file_path.exists():
+                logger.warning(f"文件不存在: {file_path}")
+                continue
+            if file_path.suffix.lower() not in [".xlsx", ".xls"]:
+                logger.warning(f"不是有效的Excel文件: {filename}")
+                continue
+            excel_files.append(file_path)
+
+        if not excel_files:
+            raise HTTPException(status_code=400, detail="没有有效的Excel文件可迁移")
+
+        excel_files.sort()  # 按文件名排序
+        logger.info(
+            f"将处理 {len(excel_files)} 个Excel文件: {[f.name for f in excel_files]}"
+        )
+
+        # 续传已有任务，或创建新任务
+        if req.job_id:
+            job = RAGFLOW_MIGRATION_JOBS.get(req.job_id)
+            if not job:
+                raise HTTPException(
+                    status_code=404, detail=f"迁移任务不存在: {req.job_id}"
+                )
+            if job.user_id != user.id:
+                raise HTTPException(status_code=403, detail="无权访问该迁移任务")
+            if RAGFLOW_MIGRATION_JOBS.is_running(job.job_id):
+                raise HTTPException(status_code=409, detail="该迁移任务正在执行中")
+            job.errors = []
+            job.result = None
+        else:
+            job = RAGFLOW_MIGRATION_JOBS.create(user.id)
+
+        run = _execute_excel_migration(
+            req, job, excel_files, dataset_client, file_client, chunk_client
+        )
+
+        if req.background:
+
+            async def run_job():
+                try:
+                    await run
+                except Exception as e:
+                    # 失败状态已由 _execute_excel_migration 写入检查点
+                    logger.error(
+                        f"migrate_excel_direct_to_ragflow job {job.job_id} failed: {e}",
+                        exc_info=True,
+                    )
+
+            RAGFLOW_MIGRATION_JOBS.run_in_background(job, run_job())
+            return MigrateExcelDirectToRagFlowResponse(
+                dataset_id=req.dataset_id or "",
+                document_id="",
+                documents=[],
+                files_processed=0,
+                sheets_processed=0,
+                segments_processed=0,
+                chunks_created=0,
+                job_id=job.job_id,
+                status=job.status,
+                message=f"迁移任务已提交: {job.job_id}",
+            )
+
+        return await run
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"migrate_excel_direct_to_ragflow failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"直接迁移Excel到RAGFlow失败: {e}")
 
-@router.get("/saved-excel-file/{file_id}/segments", response_model=SavedFileSegmentsResponse)
-async def get_saved_excel_file_segments(file_id: str, user=Depends(get_verified_user)):
-    """根据聚合后的文件ID，解析并返回 Sheet 与分段层级结构。"""
+
+@router.get("/ragflow/migrate-jobs/{job_id}")
+async def get_ragflow_migration_job(job_id: str, user=Depends(get_verified_user)):
+    """查询Excel迁移任务的进度与吞吐量"""
+    job = RAGFLOW_MIGRATION_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"迁移任务不存在: {job_id}")
+    if job.user_id != user.id and user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权访问该迁移任务")
+    return job.to_status()
+
+
+def _get_saved_excel_file(file_id: str, user) -> tuple:
+    """校验文件归属，并确保分段已写入 excel_segment 表；返回 (file_record, original_file)。
+
+    旧版文件的分段保存在 file.data（sheets_data 或 Markdown）中，首次读取时回填到表中，
+    之后的读取只加载 file.data 中的 Sheet 摘要并走索引查询。
+    """
+    file_record = ExcelSegments.get_file(file_id)
+    if not file_record:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    if file_record.user_id != user.id:
+        raise HTTPException(status_code=403, detail="无权访问该文件")
+
+    file_record = ExcelSegments.ensure_indexed(file_record)
+    data = file_record.data or {}
+    original_file = data.get("source_file") or (file_record.meta or {}).get(
+        "original_file", ""
+    )
+    return file_record, original_file
+
+
+def _get_saved_excel_sheets(file_record) -> list:
+    """按工作簿顺序返回 Sheet 摘要（含没有分段的 Sheet）"""
+    sheet_names = [
+        s.get("name", "") for s in (file_record.data or {}).get("sheets") or []
+    ]
+    return ExcelSegments.get_sheets(file_record.id, sheet_names)
+
+
+@router.get(
+    "/saved-excel-file/{file_id}/sheets", response_model=SavedFileSheetsResponse
+)
+async def get_saved_excel_file_sheets(file_id: str, user=Depends(get_verified_user)):
+    """返回聚合文件的 Sheet 列表及各自分段数量（不含分段内容），供前端按需加载。"""
     try:
-        file_record = Files.get_file_by_id(file_id)
-        if not file_record:
-            raise HTTPException(status_code=404, detail="文件不存在")
-        if file_record.user_id != user.id:
-            raise HTTPException(status_code=403, detail="无权访问该文件")
+        file_record, original_file = _get_saved_excel_file(file_id, user)
+        sheets = [
+            {"name": s.name, "segment_count": s.segment_count}
+            for s in _get_saved_excel_sheets(file_record)
+        ]
+        return SavedFileSheetsResponse(
+            file_id=file_id, original_file=original_file, sheets=sheets
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"get_saved_excel_file_sheets failed: {e}")
+        raise HTTPException(status_code=500, detail=f"获取Sheet列表失败: {e}")
 
-        # 优先使用保存的结构化数据，如果没有则从Markdown解析
-        data = file_record.data or {}
-        original_file = data.get("source_file") or (file_record.meta or {}).get("original_file", "")
-        
-        # 优先使用结构化数据（sheets_data）
-        if "sheets_data" in data and data["sheets_data"]:
-            sheets_result = []
-            for sheet in data["sheets_data"]:
-                # 转换格式以匹配前端期望（与提取时的格式完全一致）
-                segments = []
-                for seg in sheet.get("segments", []):
-                    segments.append({
-                        "title": seg.get("title", ""),
-                        "content": seg.get("content", ""),
-                        "questions": seg.get("questions", ""),
-                        "row": seg.get("row", 0)  # 保留行号信息
-                    })
-                sheets_result.append({
-                    "name": sheet.get("name", ""),
-                    "segments": segments
-                })
-            return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=sheets_result)
-        
-        # Fallback: 从Markdown解析（兼容旧数据）
-        content = data.get("content", "")
-        if not content:
-            return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=[])
-
-        lines = content.splitlines()
-        sheets_flat = []
-        current_sheet = None
-        current_seg = None
-
-        def push_seg():
-            nonlocal current_seg, current_sheet
-            if current_sheet is not None and current_seg is not None:
-                # 结束一段
-                current_sheet["segments"].append(current_seg)
-                current_seg = None
-
-        def push_sheet():
-            nonlocal current_sheet
-            if current_sheet is not None:
-                sheets_flat.append(current_sheet)
-                current_sheet = None
-
-        for line in lines:
-            if line.startswith("# ") and not line.startswith("## "):
-                # 新 sheet
-                push_seg()
-                push_sheet()
-                name = line[2:].strip()
-                current_sheet = {"name": name, "segments": []}
-                continue
-            if line.startswith("## "):
-                # 新分段
-                push_seg()
-                title = line[3:].strip()
-                current_seg = {"title": title, "content": "", "questions": ""}
-                continue
-            if current_seg is None:
-                # 忽略 sheet 标题下的空行等
-                continue
-            # 累积内容或问题
-            # 注意：只有当整行严格以"问题（选填，单元格内一行一个）:"开头时才识别为问题标记
-            # 如果内容中包含"问题（选填，单元格内一行一个）:"应该作为内容的一部分
-            stripped_line = line.strip()
-            if stripped_line.startswith("问题（选填，单元格内一行一个）:") and len(stripped_line.split(":", 1)) == 2:
-                # 这是问题行，提取问题内容
-                question_text = stripped_line.split(":", 1)[1].strip()
-                if question_text:
-                    current_seg["questions"] = question_text
-                # 问题行不添加到content中
-            else:
-                # 这是内容行
-                current_seg["content"] += ("\n" if current_seg["content"] else "") + line
 
-        # 收尾
-        push_seg()
-        push_sheet()
+@router.get(
+    "/saved-excel-file/{file_id}/segments", response_model=SavedFileSegmentsResponse
+)
+async def get_saved_excel_file_segments(
+    file_id: str,
+    sheet: Optional[str] = Query(None, description="只返回该 Sheet 的分段"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    user=Depends(get_verified_user),
+):
+    """返回聚合文件的 Sheet 与分段层级结构。
+
+    指定 sheet 时按行号分页返回该 Sheet 的分段；不指定时返回整个文件（兼容旧前端）。
+    """
+    try:
+        file_record, original_file = _get_saved_excel_file(file_id, user)
+        summaries = _get_saved_excel_sheets(file_record)
+
+        if sheet is not None:
+            summary = next((s for s in summaries if s.name == sheet), None)
+            if summary is None:
+                raise HTTPException(status_code=404, detail=f"Sheet不存在: {sheet}")
+            segments = ExcelSegments.get_segments(
+                file_id, sheet, skip=skip, limit=limit
+            )
+            return SavedFileSegmentsResponse(
+                file_id=file_id,
+                original_file=original_file,
+                sheets=[
+                    {
+                        "name": sheet,
+                        "segment_count": summary.segment_count,
+                        "segments": [s.to_segment() for s in segments],
+                    }
+                ],
+                total=summary.segment_count,
+                skip=skip,
+                limit=limit,
+            )
 
-        # 直接按Sheet返回，不做分组
-        return SavedFileSegmentsResponse(file_id=file_id, original_file=original_file, sheets=sheets_flat)
+        # 按 (sheet, row) 顺序流式读取，放入按工作簿顺序排列的 Sheet 中
+        sheets = {
+            s.name: {"name": s.name, "segment_count": s.segment_count, "segments": []}
+            for s in summaries
+        }
+        for segment in ExcelSegments.iter_segments(file_id):
+            sheets[segment.sheet]["segments"].append(segment.to_segment())
+        sheets = list(sheets.values())
+        return SavedFileSegmentsResponse(
+            file_id=file_id, original_file=original_file, sheets=sheets
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -1210,14 +1571,15 @@ async def delete_saved_excel_file(file_id: str, user=Depends(get_verified_user))
             raise HTTPException(status_code=404, detail="文件不存在")
         if file_record.user_id != user.id:
             raise HTTPException(status_code=403, detail="无权删除该文件")
-        
+
         meta = file_record.meta or {}
         if meta.get("source") != "excel_extraction":
             raise HTTPException(status_code=400, detail="只能删除Excel提取的文件")
-        
+
         # 删除文件
         Files.delete_file_by_id(file_id)
-        
+        ExcelSegments.delete_by_file_id(file_id)
+
         # 从所有知识库的file_ids中移除该文件ID
         from open_webui.models.knowledge import Knowledges
         all_knowledges = Knowledges.get_knowledges_by_user_id(user.id)
@@ -1228,7 +1590,7 @@ async def delete_saved_excel_file(file_id: str, user=Depends(get_verified_user))
                 file_ids.remove(file_id)
                 data["file_ids"] = file_ids
                 Knowledges.update_knowledge_data_by_id(id=kb.id, data=data)
-        
+
         return {"success": True, "message": "文件已删除", "file_id": file_id}
     except HTTPException:
         raise
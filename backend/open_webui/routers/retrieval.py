@@ -44,6 +44,13 @@ from open_webui.retrieval.loaders.youtube import YoutubeLoader
 # Web search engines
 from open_webui.retrieval.web.main import SearchResult
 from open_webui.retrieval.web.utils import get_web_loader
+from open_webui.retrieval.web.pipeline import (
+    PER_URL_WEB_LOADER_ENGINES,
+    WEB_EMBEDDING_CACHE,
+    WEB_SEARCH_RESULT_CACHE,
+    EmbeddingCache,
+    load_web_pages,
+)
 from open_webui.retrieval.web.ollama import search_ollama_cloud
 from open_webui.retrieval.web.perplexity_search import search_perplexity_search
 from open_webui.retrieval.web.brave import search_brave
@@ -101,6 +108,8 @@ from open_webui.env import (
     SENTENCE_TRANSFORMERS_MODEL_KWARGS,
     SENTENCE_TRANSFORMERS_CROSS_ENCODER_BACKEND,
     SENTENCE_TRANSFORMERS_CROSS_ENCODER_MODEL_KWARGS,
+    WEB_LOADER_DEADLINE,
+    WEB_LOADER_PER_DOMAIN_CONCURRENCY,
 )
 
 from open_webui.constants import ERROR_MESSAGES
@@ -1208,6 +1217,7 @@ def save_docs_to_vector_db(
     split: bool = True,
     add: bool = False,
     user=None,
+    embedding_cache: Optional[EmbeddingCache] = None,
 ) -> bool:
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
@@ -1372,11 +1382,23 @@ def save_docs_to_vector_db(
             ),
         )
 
-        embeddings = embedding_function(
-            list(map(lambda x: x.replace("\n", " "), texts)),
-            prefix=RAG_EMBEDDING_CONTENT_PREFIX,
-            user=user,
-        )
+        if embedding_cache is not None:
+            # Only chunks this model has not embedded before hit the backend
+            embeddings = embedding_cache.embed(
+                list(map(lambda x: x.replace("\n", " "), texts)),
+                embedding_function,
+                f"{request.app.state.config.RAG_EMBEDDING_ENGINE}:"
+                f"{request.app.state.config.RAG_EMBEDDING_MODEL}:"
+                f"{RAG_EMBEDDING_CONTENT_PREFIX}",
+                prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+                user=user,
+            )
+        else:
+            embeddings = embedding_function(
+                list(map(lambda x: x.replace("\n", " "), texts)),
+                prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+                user=user,
+            )
         log.info(f"embeddings generated {len(embeddings)} for {len(texts)} items")
 
         items = [
@@ -2036,6 +2058,26 @@ def search_web(request: Request, engine: str, query: str) -> list[SearchResult]:
         raise Exception("No search engine API key found in environment variables")
 
 
+def search_web_cached(request: Request, engine: str, query: str) -> list[SearchResult]:
+    """search_web with results shared across users for WEB_SEARCH_RESULT_CACHE_TTL"""
+    key = json.dumps(
+        [
+            engine,
+            query,
+            request.app.state.config.WEB_SEARCH_RESULT_COUNT,
+            request.app.state.config.WEB_SEARCH_DOMAIN_FILTER_LIST,
+        ],
+        ensure_ascii=False,
+        default=str,
+    )
+    results = WEB_SEARCH_RESULT_CACHE.get(key)
+    if results is None:
+        results = search_web(request, engine, query) or []
+        if results:
+            WEB_SEARCH_RESULT_CACHE.set(key, results)
+    return list(results)
+
+
 @router.post("/process/web/search")
 async def process_web_search(
     request: Request, form_data: SearchForm, user=Depends(get_verified_user)
@@ -2051,7 +2093,7 @@ async def process_web_search(
 
         search_tasks = [
             run_in_threadpool(
-                search_web,
+                search_web_cached,
                 request,
                 request.app.state.config.WEB_SEARCH_ENGINE,
                 query,
@@ -2099,13 +2141,22 @@ async def process_web_search(
                 if hasattr(result, "snippet") and result.snippet is not None
             ]
         else:
-            loader = get_web_loader(
+            # Cached pages first, then per-domain limited concurrent loads that
+            # stop at WEB_LOADER_DEADLINE with whatever has arrived
+            docs = await load_web_pages(
                 urls,
-                verify_ssl=request.app.state.config.ENABLE_WEB_LOADER_SSL_VERIFICATION,
-                requests_per_second=request.app.state.config.WEB_LOADER_CONCURRENT_REQUESTS,
-                trust_env=request.app.state.config.WEB_SEARCH_TRUST_ENV,
+                lambda batch: get_web_loader(
+                    batch,
+                    verify_ssl=request.app.state.config.ENABLE_WEB_LOADER_SSL_VERIFICATION,
+                    requests_per_second=request.app.state.config.WEB_LOADER_CONCURRENT_REQUESTS,
+                    trust_env=request.app.state.config.WEB_SEARCH_TRUST_ENV,
+                ),
+                concurrency=request.app.state.config.WEB_LOADER_CONCURRENT_REQUESTS,
+                per_domain_limit=WEB_LOADER_PER_DOMAIN_CONCURRENCY,
+                deadline=WEB_LOADER_DEADLINE,
+                per_url=request.app.state.config.WEB_LOADER_ENGINE
+                in PER_URL_WEB_LOADER_ENGINES,
             )
-            docs = await loader.aload()
 
         urls = [
             doc.metadata.get("source") for doc in docs if doc.metadata.get("source")
@@ -2145,6 +2196,7 @@ async def process_web_search(
                     collection_name,
                     overwrite=True,
                     user=user,
+                    embedding_cache=WEB_EMBEDDING_CACHE,
                 )
             except Exception as e:
                 log.debug(f"error saving docs: {e}")
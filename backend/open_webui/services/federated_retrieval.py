@@ -0,0 +1,250 @@
+"""
+联邦检索：并发查询多个检索后端（本地向量库 / RAGFlow），按各自的截止时间收集结果，
+使用倒数排名融合（RRF）合并，并按内容哈希去重。
+
+慢或失败的后端不会拖住整体：超时的后端被取消，其余后端的结果照常返回（partial=True）。
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RRF_K = 60
+DEFAULT_BACKEND_TIMEOUT = 5.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def content_key(content: str) -> str:
+    """去重用的内容哈希（忽略空白差异）"""
+    normalized = _WHITESPACE_RE.sub(" ", content or "").strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class RetrievalBackend:
+    """检索后端基类：search 返回 [{"content", "metadata", "score"}]，按相关度降序"""
+
+    name: str = "backend"
+
+    def __init__(self, timeout: float = DEFAULT_BACKEND_TIMEOUT, weight: float = 1.0):
+        self.timeout = timeout
+        self.weight = weight
+
+    async def search(self, question: str, top_k: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class LocalVectorBackend(RetrievalBackend):
+    """本地向量库（VECTOR_DB_CLIENT，经 LangChainRAGService）"""
+
+    name = "local"
+
+    def __init__(self, service, collection_names: Sequence[str], **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.collection_names = list(collection_names)
+
+    def _existing_collections(self) -> List[str]:
+        # 只检索确实存在的集合：_vector_search_direct 找不到集合时会退回任意集合，
+        # 这里不能让它把其它知识库的内容混进来
+        from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+
+        return [
+            name
+            for name in self.collection_names
+            if name in self.service.vector_stores
+            or VECTOR_DB_CLIENT.has_collection(name)
+        ]
+
+    async def search(self, question: str, top_k: int) -> List[Dict[str, Any]]:
+        collection_names = await asyncio.to_thread(self._existing_collections)
+        if not collection_names:
+            return []
+
+        # 查询只向量化一次，所有集合并发检索
+        query_vector = await self.service.embed_query(question)
+        per_collection = await asyncio.gather(
+            *(
+                self.service.vector_search(
+                    question, name, top_k, query_vector=query_vector
+                )
+                for name in collection_names
+            )
+        )
+
+        results = []
+        for name, pairs in zip(collection_names, per_collection):
+            for doc, score in pairs:
+                results.append(
+                    {
+                        "content": doc.page_content,
+                        "metadata": {**(doc.metadata or {}), "collection_name": name},
+                        "score": float(score),
+                    }
+                )
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:top_k]
+
+
+class RagFlowBackend(RetrievalBackend):
+    """RAGFlow 数据集检索（RagFlowChunkClient.retrieve）"""
+
+    name = "ragflow"
+
+    def __init__(
+        self,
+        chunk_client,
+        dataset_ids: Sequence[str],
+        document_ids: Optional[Sequence[str]] = None,
+        retrieve_kwargs: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.chunk_client = chunk_client
+        self.dataset_ids = list(dataset_ids)
+        self.document_ids = list(document_ids) if document_ids else None
+        self.retrieve_kwargs = {
+            k: v for k, v in (retrieve_kwargs or {}).items() if v is not None
+        }
+
+    async def search(self, question: str, top_k: int) -> List[Dict[str, Any]]:
+        params = {"page_size": top_k, **self.retrieve_kwargs}
+        documents, scores = await self.chunk_client.retrieve(
+            question=question,
+            dataset_ids=self.dataset_ids,
+            document_ids=self.document_ids,
+            **params,
+        )
+        return [
+            {
+                "content": doc.get("content", ""),
+                "metadata": doc.get("metadata") or {},
+                "score": float(score or 0.0),
+            }
+            for doc, score in zip(documents, scores)
+        ]
+
+
+@dataclass
+class BackendStatus:
+    name: str
+    status: str  # ok | timeout | error
+    count: int = 0
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class FederatedResult:
+    documents: List[Dict[str, Any]]
+    scores: List[float]
+    backends: List[BackendStatus] = field(default_factory=list)
+    partial: bool = False
+    retrieval_time: float = 0.0
+
+
+async def _run_backend(backend: RetrievalBackend, question: str, top_k: int):
+    start = time.perf_counter()
+    try:
+        results = await asyncio.wait_for(
+            backend.search(question, top_k), backend.timeout
+        )
+        status = BackendStatus(backend.name, "ok", count=len(results))
+    except asyncio.TimeoutError:
+        results = []
+        status = BackendStatus(
+            backend.name, "timeout", error=f"exceeded {backend.timeout}s"
+        )
+    except Exception as e:
+        logger.warning(f"Retrieval backend '{backend.name}' failed: {e}")
+        results = []
+        status = BackendStatus(backend.name, "error", error=str(e))
+    status.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    return results, status
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[tuple], top_k: int, rrf_k: int = DEFAULT_RRF_K
+) -> tuple:
+    """
+    RRF 融合：score(d) = Σ weight_b / (rrf_k + rank_b(d))
+
+    ranked_lists: [(backend_name, weight, [result, ...]), ...]
+    相同内容（content_key）只保留一份，记录命中的后端及原始分数。
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for backend_name, weight, results in ranked_lists:
+        seen = set()
+        for rank, result in enumerate(results, start=1):
+            key = content_key(result["content"])
+            if key in seen:
+                continue  # 同一后端内重复内容只按最高排名计一次
+            seen.add(key)
+
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {
+                    "content": result["content"],
+                    "metadata": {**result["metadata"], "sources": []},
+                    "score": 0.0,
+                }
+            entry["score"] += weight / (rrf_k + rank)
+            entry["metadata"]["sources"].append(
+                {"backend": backend_name, "rank": rank, "score": result["score"]}
+            )
+
+    ranked = sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:top_k]
+    documents = [{"content": e["content"], "metadata": e["metadata"]} for e in ranked]
+    scores = [e["score"] for e in ranked]
+    return documents, scores
+
+
+async def federated_search(
+    question: str,
+    backends: Sequence[RetrievalBackend],
+    top_k: int = 5,
+    rrf_k: int = DEFAULT_RRF_K,
+) -> FederatedResult:
+    """并发检索所有后端并融合结果"""
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(_run_backend(backend, question, top_k) for backend in backends)
+    )
+
+    statuses = [status for _, status in outcomes]
+    ranked_lists = [
+        (backend.name, backend.weight, results)
+        for backend, (results, _) in zip(backends, outcomes)
+        if results
+    ]
+
+    if len(backends) == 1:
+        # 单一后端无需融合，去重后保留其原始分数
+        documents, scores, seen = [], [], set()
+        for result in ranked_lists[0][2] if ranked_lists else []:
+            key = content_key(result["content"])
+            if key in seen:
+                continue
+            seen.add(key)
+            documents.append(
+                {"content": result["content"], "metadata": result["metadata"]}
+            )
+            scores.append(result["score"])
+            if len(documents) >= top_k:
+                break
+    else:
+        documents, scores = reciprocal_rank_fusion(ranked_lists, top_k, rrf_k)
+
+    return FederatedResult(
+        documents=documents,
+        scores=scores,
+        backends=statuses,
+        partial=any(status.status != "ok" for status in statuses),
+        retrieval_time=time.perf_counter() - start,
+    )
@@ -36,7 +36,7 @@ class LangChainRAGResult:
 
 class LangChainRAGService:
     """基于LangChain的完整RAG服务"""
-    
+
     def __init__(self, embedding_model: str = None, embedding_function=None):
         """
         初始化RAG服务
@@ -48,22 +48,21 @@ class LangChainRAGService:
         # vLLM Embedding 服务地址由配置提供，保留默认
         self._vllm_api_url = None  # 由 get_embeddings_client 动态解析
         self._vllm_base_url = None
-        
+
         # 标记：强制使用vLLM服务，忽略其他配置
         self._use_external_embedding = True
         self._embedding_function = None  # 不使用外部函数
         self.embeddings = None  # 不使用LangChain的HuggingFaceEmbeddings
         self._embedding_model = "vllm_embedding_service"  # 保留属性以避免AttributeError，值表示使用vLLM服务
-        
+
         # 仅在首次使用时从 request 配置解析 URL（见 _get_client）
-        
+
         # 向量存储（内存）
         self.vector_stores: Dict[str, Any] = {}
-        
+
         # LLM（延迟初始化）
         self._llm = None
-    
-    
+
     def _get_client(self, request=None):
         try:
             from .embeddings_client import get_embeddings_client, _get_vllm_url_from_request
@@ -84,7 +83,11 @@ class LangChainRAGService:
         except Exception as e:
             logger.error(f"⚠️ vLLM Embedding API failed (url={self._vllm_base_url}): {e}", exc_info=True)
             raise ValueError(f"vLLM Embedding API failed: {e}")
-    
+
+    async def embed_query(self, query: str, request=None) -> List[float]:
+        """查询向量化：调用方可先向量化一次，再以 query_vector 检索多个集合"""
+        return await self._embed_text(query, request)
+
     async def _embed_texts_batch(self, texts: List[str], request=None) -> List[List[float]]:
         """批量嵌入文本（统一接口）- 强制使用vLLM服务"""
         try:
@@ -93,11 +96,11 @@ class LangChainRAGService:
         except Exception as e:
             logger.error(f"⚠️ vLLM Embedding API batch failed (url={self._vllm_base_url}): {e}", exc_info=True)
             raise ValueError(f"vLLM Embedding API batch failed: {e}")
-    
+
     def get_llm(self, request=None):
         """LLM 功能已移除，返回 text_only。"""
         return "text_only"
-    
+
     def chunk_markdown(
         self, 
         text: str, 
@@ -128,10 +131,10 @@ class LangChainRAGService:
                 headers_to_split_on=headers_to_split_on,
                 strip_headers=False
             )
-            
+
             # 分割
             splits = splitter.split_text(text)
-            
+
             # 如果段落太长，再递归分割
             if any(len(split.page_content) > chunk_size for split in splits):
                 recursive_splitter = RecursiveCharacterTextSplitter(
@@ -151,7 +154,7 @@ class LangChainRAGService:
                     else:
                         final_splits.append(split)
                 return final_splits
-            
+
             return splits
         else:
             # 纯文本分段
@@ -161,7 +164,7 @@ class LangChainRAGService:
                 separators=["\n\n", "\n", "。", " ", ""]
             )
             return text_splitter.create_documents([text])
-    
+
     async def load_collection(
         self, 
         collection_name: str, 
@@ -178,31 +181,31 @@ class LangChainRAGService:
         """
         # ⚠️ 记录加载信息（强制使用vLLM服务）
         logger.info(f"Loading collection '{collection_name}' with {len(documents)} documents")
-        
+
         # 创建向量存储（仅内存存储，使用 vLLM 批量向量化）
         # 批量向量化
         texts = [doc.page_content for doc in documents]
-        
+
         try:
             vectors = await self._embed_texts_batch(texts)
-            
+
             # 验证向量数量
             if len(vectors) != len(documents):
                 logger.warning(f"⚠️ 向量数量不匹配: {len(vectors)} vectors for {len(documents)} documents")
                 # 只保留成功向量化的文档
                 documents = documents[:len(vectors)]
                 vectors = vectors[:len(documents)]
-            
+
             # 记录向量维度（可选）
         except Exception as e:
             logger.error(f"❌ vLLM批量向量化失败: {e}")
             vectors = []
-        
+
         if len(vectors) != len(documents):
             logger.warning(f"Vector count mismatch: {len(vectors)} vectors for {len(documents)} documents")
             # 只保留成功向量化的文档
             documents = [doc for i, doc in enumerate(documents) if i < len(vectors)]
-        
+
         if len(vectors) == 0:
             logger.error(f"No valid vectors generated for collection {collection_name}")
             self.vector_stores[collection_name] = {
@@ -214,60 +217,66 @@ class LangChainRAGService:
                 "docs": documents[:len(vectors)],
                 "vectors": vectors
             }
-        
+
         logger.info(f"Collection '{collection_name}' loaded: {len(documents)} docs")
-    
+
     async def vector_search(
-        self, 
-        query: str, 
-        collection_name: str, 
+        self,
+        query: str,
+        collection_name: str,
         top_k: int = 5,
-        use_weighted_multi_channel: bool = True
+        use_weighted_multi_channel: bool = True,
+        query_vector: Optional[List[float]] = None,
     ) -> List[Tuple[Document, float]]:
         """纯向量检索
-        
+
         如果use_weighted_multi_channel=True，支持多通道加权检索（标题0.15、内容0.7、问题0.15）
-        
+
         优化：如果内存中没有缓存，直接从向量数据库检索，避免重新向量化
+        query_vector: 已向量化的查询（跨多个集合检索时复用，避免重复调用embedding服务）
         """
         # 向量检索（内存或直连向量库）
-        
+
         # ⚠️ 如果内存中没有缓存，直接从向量数据库检索（优化：避免重新向量化）
         if collection_name not in self.vector_stores:
             # 未缓存时，直接从向量数据库检索
-            return await self._vector_search_direct(collection_name, query, top_k, use_weighted_multi_channel)
-        
+            return await self._vector_search_direct(
+                collection_name, query, top_k, use_weighted_multi_channel, query_vector
+            )
+
         vector_store = self.vector_stores[collection_name]
-        
-        query_vector = await self._embed_text(query)
-        
+
+        if not query_vector:
+            query_vector = await self._embed_text(query)
+
         # 调试信息：检查查询向量
         if not query_vector or len(query_vector) == 0:
             logger.error(f"Query vector is empty or None for query: {query[:50]}...")
             return []
-        
+
         # 简单内存搜索（本服务仅写入 dict 存储）
-            docs = vector_store["docs"]
-            vectors = vector_store["vectors"]
-            
+        docs = vector_store["docs"]
+        vectors = vector_store["vectors"]
+
         if not vectors or len(vectors) == 0:
             logger.warning(f"No vectors found in collection {collection_name}")
             return []
-        
+
         # 检查向量维度
         query_dim = len(query_vector)
         doc_dim = len(vectors[0]) if vectors else 0
         if query_dim != doc_dim:
             logger.error(f"Vector dimension mismatch: query={query_dim}, document={doc_dim}")
             return []
-            
-            import numpy as np
+
+        import numpy as np
+
         query_array = np.array(query_vector, dtype=np.float32)
         query_norm = np.linalg.norm(query_array)
         if query_norm == 0:
             logger.warning("Query vector is zero vector, cannot compute similarities")
             return []
-        
+
         similarities = []
         for vec in vectors:
             vec_array = np.array(vec, dtype=np.float32)
@@ -277,34 +286,39 @@ class LangChainRAGService:
             else:
                 sim = float(np.dot(query_array, vec_array) / (query_norm * vec_norm))
                 similarities.append(0.0 if (np.isnan(sim) or np.isinf(sim)) else sim)
-            
-            if use_weighted_multi_channel:
-                search_limit = min(len(docs), top_k * 5)
-                preliminary_ranked = sorted(zip(docs, similarities), key=lambda x: x[1], reverse=True)[:search_limit]
-                preliminary_docs = [d for d, _ in preliminary_ranked]
-                preliminary_scores = [s for _, s in preliminary_ranked]
-                return await self._weighted_multi_channel_search(preliminary_docs, preliminary_scores, top_k)
-            else:
-                ranked = sorted(zip(docs, similarities), key=lambda x: x[1], reverse=True)
-            results = ranked[:top_k]
-        
+
+        if use_weighted_multi_channel:
+            search_limit = min(len(docs), top_k * 5)
+            preliminary_ranked = sorted(
+                zip(docs, similarities), key=lambda x: x[1], reverse=True
+            )[:search_limit]
+            preliminary_docs = [d for d, _ in preliminary_ranked]
+            preliminary_scores = [s for _, s in preliminary_ranked]
+            return await self._weighted_multi_channel_search(
+                preliminary_docs, preliminary_scores, top_k
+            )
+        else:
+            ranked = sorted(zip(docs, similarities), key=lambda x: x[1], reverse=True)
+        results = ranked[:top_k]
+
         return results
-    
+
     async def _vector_search_direct(
         self,
         collection_name: str,
         query: str,
         top_k: int,
-        use_weighted_multi_channel: bool
+        use_weighted_multi_channel: bool,
+        query_vector: Optional[List[float]] = None,
     ) -> List[Tuple[Document, float]]:
         """直接从向量数据库检索，不加载到内存（优化性能）"""
         import time
         start_time = time.time()
-        
+
         try:
             from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
             from langchain_core.documents import Document
-            
+
             # 0. 查找实际集合名称（尝试多种格式）
             actual_collection_name = None
             possible_collection_names = [
@@ -312,48 +326,49 @@ class LangChainRAGService:
                 f"knowledge_{collection_name}",
                 f"kb_{collection_name}",
             ]
-            
+
             for candidate_name in possible_collection_names:
                 if VECTOR_DB_CLIENT.has_collection(candidate_name):
                     actual_collection_name = candidate_name
                     logger.info(f"✅ Found collection: {actual_collection_name}")
                     break
-            
+
             # 如果还没找到，尝试列出所有集合
             if not actual_collection_name and hasattr(VECTOR_DB_CLIENT, 'list_collections'):
                 try:
                     all_collections = VECTOR_DB_CLIENT.list_collections()
                     logger.debug(f"Available collections: {all_collections}")
-                    
+
                     # 查找包含知识库ID的集合
                     for coll_name in all_collections:
                         if collection_name in coll_name or coll_name == collection_name:
                             actual_collection_name = coll_name
                             logger.info(f"✅ Found matching collection: {actual_collection_name}")
                             break
-                    
+
                     # 如果仍然没找到，使用第一个可用集合（作为后备）
                     if not actual_collection_name and all_collections:
                         actual_collection_name = all_collections[0]
                         logger.warning(f"⚠️ Using first available collection as fallback: {actual_collection_name}")
                 except Exception as e:
                     logger.warning(f"Failed to list collections: {e}")
-            
+
             if not actual_collection_name:
                 logger.error(f"❌ No collection found for '{collection_name}'. Tried: {possible_collection_names}")
                 return []
-            
-            # 1. 向量化查询（使用vLLM服务）
-            query_vector = await self._embed_text(query)
+
+            # 1. 向量化查询（使用vLLM服务；已传入时复用）
+            if not query_vector:
+                query_vector = await self._embed_text(query)
             logger.debug(f"✅ Query vectorized via vLLM: dimension={len(query_vector) if query_vector else 0}")
-            
+
             if not query_vector or len(query_vector) == 0:
                 logger.error(f"Query vector is empty or None for query: {query[:50]}...")
                 return []
-            
+
             # 2. 直接从向量数据库搜索（使用实际找到的集合名称）
             logger.debug(f"🔍 Searching in collection: {actual_collection_name}, query vector dimension: {len(query_vector)}")
-            
+
             # 检查向量维度是否匹配（如果集合已有向量）
             try:
                 # 获取集合中的第一个向量来检查维度
@@ -364,7 +379,7 @@ class LangChainRAGService:
                     logger.debug(f"Collection '{actual_collection_name}' has documents, proceeding with search")
             except Exception as e:
                 logger.debug(f"Could not pre-check collection: {e}")
-            
+
             # 先验证集合确实存在且可访问
             try:
                 if not VECTOR_DB_CLIENT.has_collection(actual_collection_name):
@@ -372,7 +387,7 @@ class LangChainRAGService:
                     return []
             except Exception as e:
                 logger.warning(f"Could not verify collection existence: {e}")
-            
+
             # 执行搜索
             try:
                 search_result = await asyncio.to_thread(
@@ -394,7 +409,7 @@ class LangChainRAGService:
                 except:
                     pass
                 return []
-            
+
             # 检查搜索结果
             if not search_result:
                 logger.warning(f"Search returned None for collection '{actual_collection_name}'")
@@ -410,47 +425,47 @@ class LangChainRAGService:
                 except Exception as e:
                     logger.warning(f"Could not check collection contents: {e}")
                 return []
-            
+
             if not search_result.documents or not search_result.documents[0]:
                 logger.warning(f"No documents in search result for collection '{actual_collection_name}'")
                 return []
-            
+
             # 3. 转换为Document格式
             docs = []
             scores = []
-            
+
             for i, doc_text in enumerate(search_result.documents[0]):
                 # 获取metadata
                 metadata = search_result.metadatas[0][i] if search_result.metadatas and search_result.metadatas[0] else {}
-                
+
                 # 获取距离并转换为相似度分数
                 distance = search_result.distances[0][i] if search_result.distances and search_result.distances[0] else 1.0
                 # Chroma距离: 0(最好) -> 2(最差)，转换为相似度: 1(最好) -> 0(最差)
                 similarity = 1.0 - (distance / 2.0) if distance <= 2.0 else 0.0
-                
+
                 doc = Document(
                     page_content=doc_text,
                     metadata={**metadata, "distance": distance}
                 )
                 docs.append(doc)
                 scores.append(similarity)
-            
+
             # 4. 如果需要多通道加权检索
             if use_weighted_multi_channel:
                 results = await self._weighted_multi_channel_search(docs, scores, top_k)
             else:
                 # 按分数排序
                 results = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)[:top_k]
-            
+
             # 记录检索时间
             elapsed_time = time.time() - start_time
             logger.info(f"✅ Direct vector DB search completed in {elapsed_time:.3f}s, found {len(results)} documents")
             return results
-            
+
         except Exception as e:
             logger.error(f"Direct vector DB search failed: {e}", exc_info=True)
             return []
-    
+
     async def _weighted_multi_channel_search(
         self,
         docs: List[Document],
@@ -459,33 +474,33 @@ class LangChainRAGService:
     ) -> List[Tuple[Document, float]]:
         """多通道加权检索：标题0.15、内容0.7、问题0.15"""
         import numpy as np
-        
+
         # 按segment_id和type分组
         segment_scores: Dict[str, Dict[str, Tuple[Document, float, float]]] = {}  # (doc, original_score, weighted_score)
         old_data_results: List[Tuple[Document, float]] = []  # 旧数据（无segment_id）
-        
+
         for doc, score in zip(docs, similarities):
             meta = doc.metadata or {}
             segment_id = meta.get("segment_id", "")
             doc_type = meta.get("type", "content")
             weight = meta.get("weight", 0.7)  # 默认权重：标题0.15、内容0.7、问题0.15
-            
+
             # 加权分数
             weighted_score = score * weight
-            
+
             if not segment_id:
                 # 没有segment_id的旧数据，直接使用加权分数（向后兼容）
                 old_data_results.append((doc, weighted_score))
                 continue
-            
+
             if segment_id not in segment_scores:
                 segment_scores[segment_id] = {}
-            
+
             # 同一分段的同一类型只保留最高分（按加权分数比较，但保存原始分数）
             current_best = segment_scores[segment_id].get(doc_type)
             if not current_best or weighted_score > current_best[2]:  # 比较加权分数
                 segment_scores[segment_id][doc_type] = (doc, score, weighted_score)  # 保存原始分数和加权分数
-        
+
         # 合并同一分段的不同类型，累加分数
         merged_results: Dict[str, Tuple[Document, float]] = {}
         for segment_id, type_scores in segment_scores.items():
@@ -494,13 +509,13 @@ class LangChainRAGService:
             title_data = type_scores.get("title")  # (doc, original_score, weighted_score)
             content_data = type_scores.get("content")
             questions_data = type_scores.get("questions")
-            
+
             # 优先使用content作为基础
             base_doc_data = content_data if content_data else (title_data if title_data else questions_data if questions_data else None)
             if not base_doc_data or not isinstance(base_doc_data, tuple) or len(base_doc_data) < 3:
                 continue
             base_doc = base_doc_data[0]
-            
+
             # 提取各通道的原始分数和加权分数（安全访问）
             title_original = title_data[1] if (title_data and isinstance(title_data, tuple) and len(title_data) >= 3) else None
             title_weighted = title_data[2] if (title_data and isinstance(title_data, tuple) and len(title_data) >= 3) else None
@@ -508,12 +523,12 @@ class LangChainRAGService:
             content_weighted = content_data[2] if (content_data and isinstance(content_data, tuple) and len(content_data) >= 3) else None
             questions_original = questions_data[1] if (questions_data and isinstance(questions_data, tuple) and len(questions_data) >= 3) else None
             questions_weighted = questions_data[2] if (questions_data and isinstance(questions_data, tuple) and len(questions_data) >= 3) else None
-            
+
             # 获取Document对象用于构建内容（安全访问）
             title_doc = title_data[0] if (title_data and isinstance(title_data, tuple) and len(title_data) >= 1) else None
             content_doc = content_data[0] if (content_data and isinstance(content_data, tuple) and len(content_data) >= 1) else None
             questions_doc = questions_data[0] if (questions_data and isinstance(questions_data, tuple) and len(questions_data) >= 1) else None
-            
+
             # 构建完整的文本内容（标题 + 内容 + 问题）
             full_content_parts = []
             if title_doc:
@@ -529,7 +544,7 @@ class LangChainRAGService:
                 questions_text = questions_doc.page_content  # questions_doc 已经是 Document 对象，不需要 [0]
                 if ":" in questions_text:
                     full_content_parts.append(f"问题（选填，单元格内一行一个）: {questions_text.split(':', 1)[1].strip()}")
-            
+
             # 更新metadata，添加各通道分数信息
             updated_metadata = base_doc.metadata.copy() if base_doc.metadata else {}
             updated_metadata["channel_scores"] = {
@@ -540,21 +555,21 @@ class LangChainRAGService:
                 "content_weighted": content_weighted,
                 "questions_weighted": questions_weighted,
             }
-            
+
             # 创建新的Document，使用完整内容
             merged_doc = Document(
                 page_content="\n\n".join(full_content_parts) if full_content_parts else base_doc.page_content,
                 metadata=updated_metadata
             )
             merged_results[segment_id] = (merged_doc, total_score)
-        
+
         # 合并新旧数据并排序
         all_results = list(merged_results.values()) + old_data_results
         ranked = sorted(all_results, key=lambda x: x[1], reverse=True)
         return ranked[:top_k]
-    
+
     # 已移除：从外部向量库结果做多通道加权的分支
-    
+
     # 已移除：BM25 检索相关实现
 
     def _clean_text(self, text: str) -> str:
@@ -568,15 +583,13 @@ class LangChainRAGService:
             return t
         except Exception:
             return text
-    
+
     # 已移除：Hybrid 检索相关实现
-    
-    
-    
+
     async def generate_answer(self, query: str, context: str, request=None) -> str:
         """LLM 已移除：直接返回上下文。"""
         return context
-    
+
     async def query(self, rag_query: LangChainRAGQuery, request=None) -> LangChainRAGResult:
         """
         执行RAG查询（完整流程）
@@ -589,7 +602,7 @@ class LangChainRAGService:
         """
         import time
         retrieval_start_time = time.time()
-        
+
         # 1. 仅向量检索
         results = await self.vector_search(
                 rag_query.query, 
@@ -599,10 +612,10 @@ class LangChainRAGService:
         documents = [doc for doc, score in results]
         scores = [score for doc, score in results]
         method = "vector"
-        
+
         # 计算检索时间
         retrieval_time = time.time() - retrieval_start_time
-        
+
         if not documents:
             return LangChainRAGResult(
                 query=rag_query.query,
@@ -612,19 +625,19 @@ class LangChainRAGService:
                 method=method,
                 retrieval_time=retrieval_time
             )
-        
+
         # 2. 重排序已移除
         rerank_scores = None
-        
+
         # 3. 构建上下文
         context = "\n\n".join([
             f"文档 {i+1}:\n{doc.page_content[:500]}"
             for i, doc in enumerate(documents[:3])
         ])
-        
+
         # 4. 生成回答
         answer = await self.generate_answer(rag_query.query, context, request)
-        
+
         return LangChainRAGResult(
             query=rag_query.query,
             answer=answer,
@@ -686,4 +699,3 @@ def get_langchain_rag_service(request: Request = None) -> LangChainRAGService:
 
 # 默认实例（向后兼容）
 langchain_rag_service = LangChainRAGService()
-
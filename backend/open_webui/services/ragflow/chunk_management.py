@@ -1,17 +1,28 @@
 import aiohttp
 import logging
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 from . import get_base_url, get_api_key, get_timeout
+from .transport import RagFlowTransport, get_transport
 
 logger = logging.getLogger(__name__)
 
 
 class RagFlowChunkClient:
-    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout_s: float = 60.0):
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout_s: float = 60.0,
+        transport: Optional[RagFlowTransport] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key or ""
         self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        # Shared pooled session; clients themselves are cheap to construct
+        self.transport = transport or get_transport()
 
     def _headers(self) -> Dict[str, str]:
         headers = {"Content-Type": "application/json"}
@@ -47,13 +58,19 @@ class RagFlowChunkClient:
         if questions is not None:
             body["questions"] = questions
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self._headers(), json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow add chunk error: {payload}")
-                return payload.get("data", payload)
+        async with self.transport.request(
+            "chunk.add_chunk",
+            "POST",
+            url,
+            headers=self._headers(),
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow add chunk error: {payload}")
+            return payload.get("data", payload)
 
     async def list_chunks(
         self,
@@ -89,13 +106,19 @@ class RagFlowChunkClient:
         if chunk_id is not None:
             params["id"] = chunk_id
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers(), params=params, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow list chunks error: {payload}")
-                return payload.get("data", payload)
+        async with self.transport.request(
+            "chunk.list_chunks",
+            "GET",
+            url,
+            headers=self._headers(),
+            params=params,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow list chunks error: {payload}")
+            return payload.get("data", payload)
 
     async def delete_chunks(
         self,
@@ -119,13 +142,19 @@ class RagFlowChunkClient:
         if chunk_ids is not None:
             body["chunk_ids"] = chunk_ids
 
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=self._headers(), json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow delete chunks error: {payload}")
-                return payload
+        async with self.transport.request(
+            "chunk.delete_chunks",
+            "DELETE",
+            url,
+            headers=self._headers(),
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow delete chunks error: {payload}")
+            return payload
 
     async def update_chunk(
         self,
@@ -159,13 +188,19 @@ class RagFlowChunkClient:
         if available is not None:
             body["available"] = available
 
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, headers=self._headers(), json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow update chunk error: {payload}")
-                return payload
+        async with self.transport.request(
+            "chunk.update_chunk",
+            "PUT",
+            url,
+            headers=self._headers(),
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow update chunk error: {payload}")
+            return payload
 
     async def retrieve(
         self,
@@ -234,32 +269,45 @@ class RagFlowChunkClient:
             body["metadata_condition"] = metadata_condition
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=self._headers(), json=body, timeout=self.timeout) as resp:
-                    resp.raise_for_status()
-                    payload = await resp.json()
-                    if payload.get("code") != 0:
-                        raise RuntimeError(f"RagFlow API error: {payload.get('message', 'Unknown error')}")
+            async with self.transport.request(
+                "chunk.retrieve",
+                "POST",
+                url,
+                headers=self._headers(),
+                json=body,
+                timeout=self.timeout,
+                idempotent=True,
+            ) as resp:
+                resp.raise_for_status()
+                payload = await resp.json()
+                if payload.get("code") != 0:
+                    raise RuntimeError(
+                        f"RagFlow API error: {payload.get('message', 'Unknown error')}"
+                    )
 
-                    chunks = payload.get("data", {}).get("chunks", [])
-                    documents = []
-                    scores = []
-                    for chunk in chunks:
-                        documents.append({
+                chunks = payload.get("data", {}).get("chunks", [])
+                documents = []
+                scores = []
+                for chunk in chunks:
+                    documents.append(
+                        {
                             "content": chunk.get("content", ""),
                             "metadata": {
                                 "document_id": chunk.get("document_id"),
-                                "document_name": chunk.get("document_keyword"),  # RagFlow uses document_keyword for name
+                                "document_name": chunk.get(
+                                    "document_keyword"
+                                ),  # RagFlow uses document_keyword for name
                                 "kb_id": chunk.get("kb_id"),
                                 "chunk_id": chunk.get("id"),
                                 "similarity": chunk.get("similarity"),
                                 "vector_similarity": chunk.get("vector_similarity"),
                                 "term_similarity": chunk.get("term_similarity"),
                                 "highlight": chunk.get("highlight"),
-                            }
-                        })
-                        scores.append(chunk.get("similarity", 0.0))
-                    return documents, scores
+                            },
+                        }
+                    )
+                    scores.append(chunk.get("similarity", 0.0))
+                return documents, scores
         except aiohttp.ClientError as e:
             logger.error(f"RagFlow API ClientError: {e}", exc_info=True)
             raise RuntimeError(f"Failed to connect to RagFlow API: {e}")
@@ -268,11 +316,14 @@ class RagFlowChunkClient:
             raise RuntimeError(f"RagFlow API call failed: {e}")
 
 
-def get_client(request=None) -> RagFlowChunkClient:
-    return RagFlowChunkClient(
-        base_url=get_base_url(request),
-        api_key=get_api_key(request),
-        timeout_s=get_timeout(request)
-    )
+@lru_cache(maxsize=16)
+def _get_cached_client(
+    base_url: str, api_key: str, timeout_s: float
+) -> RagFlowChunkClient:
+    return RagFlowChunkClient(base_url=base_url, api_key=api_key, timeout_s=timeout_s)
 
 
+def get_client(request=None) -> RagFlowChunkClient:
+    return _get_cached_client(
+        get_base_url(request), get_api_key(request), get_timeout(request)
+    )
@@ -1,14 +1,25 @@
 import aiohttp
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from . import get_base_url, get_api_key
+from .transport import RagFlowTransport, get_transport
 
 
 class RagFlowDatasetClient:
-    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout_s: float = 30.0):
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout_s: float = 30.0,
+        transport: Optional[RagFlowTransport] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key or ""
         self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        # Shared pooled session; clients themselves are cheap to construct
+        self.transport = transport or get_transport()
 
     def _headers(self) -> Dict[str, str]:
         headers = {"Content-Type": "application/json"}
@@ -41,29 +52,35 @@ class RagFlowDatasetClient:
         if dataset_id is not None:
             params["id"] = dataset_id
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers(), params=params, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                # RagFlow returns either {code:0,data:{...}} or {data:[...]}
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow list datasets error: {payload}")
-
-                data = payload.get("data") if isinstance(payload, dict) else None
-                if isinstance(data, list):
-                    return data
-                if isinstance(data, dict):
-                    # Common: {data: {data:[...], total: N}}
-                    if "data" in data and isinstance(data["data"], list):
-                        return data["data"]
-                    if "datasets" in data and isinstance(data["datasets"], list):
-                        return data["datasets"]
-
-                if isinstance(payload, list):
-                    return payload
-                if isinstance(payload, dict) and isinstance(payload.get("datasets"), list):
-                    return payload["datasets"]
-                return []
+        async with self.transport.request(
+            "dataset.list",
+            "GET",
+            url,
+            headers=self._headers(),
+            params=params,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            # RagFlow returns either {code:0,data:{...}} or {data:[...]}
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow list datasets error: {payload}")
+
+            data = payload.get("data") if isinstance(payload, dict) else None
+            if isinstance(data, list):
+                return data
+            if isinstance(data, dict):
+                # Common: {data: {data:[...], total: N}}
+                if "data" in data and isinstance(data["data"], list):
+                    return data["data"]
+                if "datasets" in data and isinstance(data["datasets"], list):
+                    return data["datasets"]
+
+            if isinstance(payload, list):
+                return payload
+            if isinstance(payload, dict) and isinstance(payload.get("datasets"), list):
+                return payload["datasets"]
+            return []
 
     async def create(
         self,
@@ -95,39 +112,56 @@ class RagFlowDatasetClient:
         if parser_config is not None:
             body["parser_config"] = parser_config
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self._headers(), json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                # Normalize RagFlow success format {code:0,data:{...}}
-                if isinstance(payload, dict):
-                    if payload.get("code", 0) != 0:
-                        raise RuntimeError(f"RagFlow create dataset error: {payload}")
-                    return payload.get("data", payload)
-                return payload
+        async with self.transport.request(
+            "dataset.create",
+            "POST",
+            url,
+            headers=self._headers(),
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            # Normalize RagFlow success format {code:0,data:{...}}
+            if isinstance(payload, dict):
+                if payload.get("code", 0) != 0:
+                    raise RuntimeError(f"RagFlow create dataset error: {payload}")
+                return payload.get("data", payload)
+            return payload
 
     async def delete(self, dataset_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=self._headers(), timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow delete dataset error: {payload}")
-                return payload
+        async with self.transport.request(
+            "dataset.delete",
+            "DELETE",
+            url,
+            headers=self._headers(),
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow delete dataset error: {payload}")
+            return payload
 
     async def delete_many(self, ids: Optional[List[str]]) -> Dict[str, Any]:
         """DELETE /api/v1/datasets with ids or null (delete all)."""
         url = f"{self.base_url}/api/v1/datasets"
         headers = {"Content-Type": "application/json", **self._headers()}
         body: Dict[str, Any] = {"ids": ids}  # ids can be None to delete all
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow delete many datasets error: {payload}")
-                return payload
+        async with self.transport.request(
+            "dataset.delete_many",
+            "DELETE",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow delete many datasets error: {payload}")
+            return payload
 
     async def update(
         self,
@@ -162,36 +196,55 @@ class RagFlowDatasetClient:
             body["parser_config"] = parser_config
 
         headers = {"Content-Type": "application/json", **self._headers()}
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow update dataset error: {payload}")
-                return payload
+        async with self.transport.request(
+            "dataset.update",
+            "PUT",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow update dataset error: {payload}")
+            return payload
 
     async def get_knowledge_graph(self, dataset_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/knowledge_graph"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers(), timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow get knowledge graph error: {payload}")
-                return payload.get("data", payload)
+        async with self.transport.request(
+            "dataset.get_knowledge_graph",
+            "GET",
+            url,
+            headers=self._headers(),
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow get knowledge graph error: {payload}")
+            return payload.get("data", payload)
 
     async def delete_knowledge_graph(self, dataset_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/knowledge_graph"
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=self._headers(), timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code") not in (None, 0):
-                    raise RuntimeError(f"RagFlow delete knowledge graph error: {payload}")
-                return payload
+        async with self.transport.request(
+            "dataset.delete_knowledge_graph",
+            "DELETE",
+            url,
+            headers=self._headers(),
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code") not in (None, 0):
+                raise RuntimeError(f"RagFlow delete knowledge graph error: {payload}")
+            return payload
 
 
-def get_client(request=None) -> RagFlowDatasetClient:
-    return RagFlowDatasetClient(base_url=get_base_url(request), api_key=get_api_key(request))
+@lru_cache(maxsize=16)
+def _get_cached_client(base_url: str, api_key: str) -> RagFlowDatasetClient:
+    return RagFlowDatasetClient(base_url=base_url, api_key=api_key)
 
 
+def get_client(request=None) -> RagFlowDatasetClient:
+    return _get_cached_client(get_base_url(request), get_api_key(request))
@@ -1,14 +1,25 @@
 import aiohttp
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 from . import get_base_url, get_api_key, get_timeout
+from .transport import RagFlowTransport, get_transport
 
 
 class RagFlowFileClient:
-    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout_s: float = 60.0):
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout_s: float = 60.0,
+        transport: Optional[RagFlowTransport] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key or ""
         self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        # Shared pooled session; clients themselves are cheap to construct
+        self.transport = transport or get_transport()
 
     def _headers(self) -> Dict[str, str]:
         headers = {}
@@ -57,41 +68,47 @@ class RagFlowFileClient:
         if run:
             params["run"] = run
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers(), params=params, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-
-                # Handle different response formats
-                if isinstance(payload, dict):
-                    # Check for error code
-                    if payload.get("code") not in (None, 0):
-                        raise RuntimeError(f"RagFlow list documents error: {payload}")
-
-                    # Try data field
-                    data = payload.get("data")
-                    if isinstance(data, list):
-                        return data
-                    if isinstance(data, dict):
-                        # Common: {data: {docs: [...], total: N}}
-                        if "docs" in data and isinstance(data["docs"], list):
-                            return data["docs"]
-                        # data.documents or data.data
-                        if "documents" in data:
-                            return data.get("documents") or []
-                        if "data" in data and isinstance(data["data"], list):
-                            return data["data"]
-
-                    # Check root level
-                    if "documents" in payload and isinstance(payload["documents"], list):
-                        return payload["documents"]
-
-                # If payload itself is a list
-                if isinstance(payload, list):
-                    return payload
-
-                # Empty result
-                return []
+        async with self.transport.request(
+            "document.list",
+            "GET",
+            url,
+            headers=self._headers(),
+            params=params,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+
+            # Handle different response formats
+            if isinstance(payload, dict):
+                # Check for error code
+                if payload.get("code") not in (None, 0):
+                    raise RuntimeError(f"RagFlow list documents error: {payload}")
+
+                # Try data field
+                data = payload.get("data")
+                if isinstance(data, list):
+                    return data
+                if isinstance(data, dict):
+                    # Common: {data: {docs: [...], total: N}}
+                    if "docs" in data and isinstance(data["docs"], list):
+                        return data["docs"]
+                    # data.documents or data.data
+                    if "documents" in data:
+                        return data.get("documents") or []
+                    if "data" in data and isinstance(data["data"], list):
+                        return data["data"]
+
+                # Check root level
+                if "documents" in payload and isinstance(payload["documents"], list):
+                    return payload["documents"]
+
+            # If payload itself is a list
+            if isinstance(payload, list):
+                return payload
+
+            # Empty result
+            return []
 
     async def upload(
         self,
@@ -113,18 +130,25 @@ class RagFlowFileClient:
                 filename = filename.decode('utf-8')
             elif not isinstance(filename, str):
                 filename = str(filename)
-            
+
             # 使用quote_chars参数确保特殊字符正确处理（aiohttp 3.8+支持）
             # 对于旧版本，直接传递UTF-8字符串即可
             form.add_field("file", content, filename=filename, content_type=content_type or "application/octet-stream")
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self._headers(), data=form, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow upload documents error: {payload}")
-                return payload.get("data", payload)
+
+        async with self.transport.request(
+            "document.upload",
+            "POST",
+            url,
+            headers=self._headers(),
+            data=form,
+            timeout=self.timeout,
+            retries=0,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow upload documents error: {payload}")
+            return payload.get("data", payload)
 
     async def update(
         self,
@@ -151,21 +175,32 @@ class RagFlowFileClient:
             body["enabled"] = enabled
 
         headers = {"Content-Type": "application/json; charset=utf-8", **self._headers()}
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                # aiohttp会自动处理UTF-8编码的JSON响应
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow update document error: {payload}")
-                return payload
+        async with self.transport.request(
+            "document.update",
+            "PUT",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            # aiohttp会自动处理UTF-8编码的JSON响应
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow update document error: {payload}")
+            return payload
 
     async def download(self, dataset_id: str, document_id: str) -> bytes:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/documents/{document_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers(), timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                return await resp.read()
+        async with self.transport.request(
+            "document.download",
+            "GET",
+            url,
+            headers=self._headers(),
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            return await resp.read()
 
     async def delete(self, dataset_id: str, ids: Optional[List[str]] = None) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/documents"
@@ -173,40 +208,65 @@ class RagFlowFileClient:
         if ids is not None:
             body["ids"] = ids
         headers = {"Content-Type": "application/json", **self._headers()}
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow delete documents error: {payload}")
-                return payload
+        async with self.transport.request(
+            "document.delete",
+            "DELETE",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow delete documents error: {payload}")
+            return payload
 
     async def parse_documents(self, dataset_id: str, document_ids: List[str]) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/chunks"
         body = {"document_ids": document_ids}
         headers = {"Content-Type": "application/json", **self._headers()}
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow parse documents error: {payload}")
-                return payload
+        async with self.transport.request(
+            "document.parse_documents",
+            "POST",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow parse documents error: {payload}")
+            return payload
 
     async def stop_parsing(self, dataset_id: str, document_ids: List[str]) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/datasets/{dataset_id}/chunks"
         body = {"document_ids": document_ids}
         headers = {"Content-Type": "application/json", **self._headers()}
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                payload = await resp.json()
-                if isinstance(payload, dict) and payload.get("code", 0) != 0:
-                    raise RuntimeError(f"RagFlow stop parsing error: {payload}")
-                return payload
+        async with self.transport.request(
+            "document.stop_parsing",
+            "DELETE",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json()
+            if isinstance(payload, dict) and payload.get("code", 0) != 0:
+                raise RuntimeError(f"RagFlow stop parsing error: {payload}")
+            return payload
 
 
-def get_client(request=None) -> RagFlowFileClient:
-    return RagFlowFileClient(base_url=get_base_url(request), api_key=get_api_key(request), timeout_s=get_timeout(request))
+@lru_cache(maxsize=16)
+def _get_cached_client(
+    base_url: str, api_key: str, timeout_s: float
+) -> RagFlowFileClient:
+    return RagFlowFileClient(base_url=base_url, api_key=api_key, timeout_s=timeout_s)
 
 
+def get_client(request=None) -> RagFlowFileClient:
+    return _get_cached_client(
+        get_base_url(request), get_api_key(request), get_timeout(request)
+    )
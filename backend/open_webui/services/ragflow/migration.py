@@ -0,0 +1,407 @@
+"""Bulk, resumable chunk upload for migrations into RagFlow.
+
+RagFlow's add-chunk endpoint accepts one chunk per call, so throughput comes
+from keeping a bounded number of calls in flight over the shared transport
+rather than from request batching. Every chunk carries an idempotency key
+derived from its source segment; keys that were already uploaded are
+recorded in a per-job checkpoint file, so a retried or resumed job never
+creates the same chunk twice.
+
+Tunables (environment variables):
+  RAGFLOW_MIGRATION_CONCURRENCY  chunk uploads in flight per job (default 8)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .chunk_management import RagFlowChunkClient
+from .transport import _env_number
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONCURRENCY = _env_number("RAGFLOW_MIGRATION_CONCURRENCY", 8)
+# Finished jobs stay in memory this long (and at most this many); after that
+# their status is read back from the checkpoint file on request
+FINISHED_JOB_TTL_S = _env_number("RAGFLOW_MIGRATION_FINISHED_JOB_TTL", 3600)
+MAX_FINISHED_JOBS = _env_number("RAGFLOW_MIGRATION_MAX_FINISHED_JOBS", 256)
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+PARTIAL = "partial"  # finished, but some chunks failed; resumable
+FAILED = "failed"
+
+FINISHED_STATES = {COMPLETED, PARTIAL, FAILED}
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(("C|" + content).encode("utf-8")).hexdigest()
+
+
+def segment_key(*parts: Any, content: str) -> str:
+    """Idempotency key of a source segment, e.g. (file, sheet, row) + content."""
+    source = "|".join(str(p) for p in parts)
+    return hashlib.sha1(f"{source}|{content_hash(content)}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChunkTask:
+    key: str
+    dataset_id: str
+    document_id: str
+    content: str
+    important_keywords: Optional[List[str]] = None
+    questions: Optional[List[str]] = None
+
+
+@dataclass
+class MigrationJob:
+    job_id: str
+    user_id: str
+    status: str = PENDING
+    stage: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    total: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    # idempotency key -> RagFlow chunk id
+    completed: Dict[str, str] = field(default_factory=dict)
+    # Caller-owned state needed to resume (created datasets/documents, ...)
+    state: Dict[str, Any] = field(default_factory=dict)
+    # Final result returned to the caller once finished
+    result: Optional[Dict[str, Any]] = None
+
+    path: Optional[Path] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._save_lock = asyncio.Lock()
+        # (timestamp, uploaded) samples for the recent throughput window
+        self._rate_samples: deque = deque(maxlen=64)
+
+    # ---- persistence ----
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": list(self.errors),
+            "completed": dict(self.completed),
+            "state": self.state,
+            "result": self.result,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, data: Dict[str, Any], path: Optional[Path] = None
+    ) -> "MigrationJob":
+        fields = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**fields, path=path)
+
+    def _write(self, payload: str):
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        if self.path is None:
+            return
+        async with self._save_lock:
+            payload = json.dumps(self.to_dict(), ensure_ascii=False)
+            try:
+                await asyncio.to_thread(self._write, payload)
+            except Exception as e:
+                logger.warning(f"Failed to checkpoint migration job {self.job_id}: {e}")
+
+    # ---- progress ----
+
+    def add_error(self, message: str):
+        self.errors.append(message)
+        del self.errors[:-20]
+
+    def to_status(self) -> Dict[str, Any]:
+        now = time.time()
+        done = self.created + self.skipped + self.failed
+        elapsed = (
+            ((self.finished_at or now) - self.started_at) if self.started_at else 0.0
+        )
+
+        throughput = self.created / elapsed if elapsed > 0 else 0.0
+        if len(self._rate_samples) >= 2 and self.status == RUNNING:
+            (t0, n0), (t1, n1) = self._rate_samples[0], self._rate_samples[-1]
+            if t1 > t0:
+                throughput = (n1 - n0) / (t1 - t0)
+
+        remaining = max(self.total - done, 0)
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "total": self.total,
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "progress": round(done / self.total * 100, 1) if self.total else 0.0,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(throughput, 2),
+            "eta_s": (
+                round(remaining / throughput, 1)
+                if throughput > 0 and remaining
+                else None
+            ),
+            "errors": list(self.errors),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+        }
+
+
+class MigrationJobStore:
+    """
+    Keeps live jobs in memory and checkpoints them as JSON files.
+
+    Finished jobs are dropped from memory once they are older than
+    `finished_ttl` seconds or more than `max_finished` of them are kept;
+    `get` reloads them from their checkpoint file.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        finished_ttl: float = FINISHED_JOB_TTL_S,
+        max_finished: int = MAX_FINISHED_JOBS,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self._jobs: Dict[str, MigrationJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _path(self, job_id: str) -> Path:
+        # job ids are generated uuids; refuse anything that could escape the dir
+        return self.directory / f"{Path(job_id).name}.json"
+
+    def _evict_finished(self):
+        finished = sorted(
+            (
+                job
+                for job in self._jobs.values()
+                if job.status in FINISHED_STATES and not self.is_running(job.job_id)
+            ),
+            key=lambda job: job.finished_at or job.created_at,
+        )
+        cutoff = time.time() - self.finished_ttl
+        overflow = len(finished) - self.max_finished
+        for idx, job in enumerate(finished):
+            if idx < overflow or (job.finished_at or job.created_at) < cutoff:
+                self._jobs.pop(job.job_id, None)
+
+    def create(self, user_id: str) -> MigrationJob:
+        self._evict_finished()
+        job_id = str(uuid.uuid4())
+        job = MigrationJob(job_id=job_id, user_id=user_id, path=self._path(job_id))
+        self._jobs[job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[MigrationJob]:
+        self._evict_finished()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        path = self._path(job_id)
+        if not path.exists():
+            return None
+        try:
+            job = MigrationJob.from_dict(
+                json.loads(path.read_text(encoding="utf-8")), path=path
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load migration job {job_id}: {e}")
+            return None
+
+        # A job persisted as running belonged to a process that is gone
+        if job.status in (PENDING, RUNNING):
+            job.status = PARTIAL
+        self._jobs[job_id] = job
+        return job
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    def run_in_background(self, job: MigrationJob, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return task
+
+
+class ChunkMigrationEngine:
+    def __init__(
+        self,
+        chunk_client: RagFlowChunkClient,
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint_every: int = 100,
+        checkpoint_interval_s: float = 2.0,
+    ):
+        self.chunk_client = chunk_client
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval_s = checkpoint_interval_s
+
+    async def reconcile(
+        self, job: MigrationJob, tasks: List[ChunkTask], page_size: int = 1024
+    ):
+        """Mark tasks whose content already exists in their RagFlow document.
+
+        Covers uploads that succeeded on the server but whose response (and
+        so the checkpoint entry) was lost, e.g. a timeout or a crash.
+
+        Segments with identical content are kept apart: each existing chunk
+        that is not already claimed by the checkpoint marks at most one task,
+        in source order, so repeated content is only skipped as many times as
+        it actually exists in the document.
+        """
+        claimed = set(job.completed.values())
+        # (dataset, document) -> content hash -> pending tasks in source order
+        by_document: Dict[tuple, Dict[str, deque]] = {}
+        for task in tasks:
+            if task.key not in job.completed:
+                by_document.setdefault(
+                    (task.dataset_id, task.document_id), {}
+                ).setdefault(content_hash(task.content), deque()).append(task)
+
+        for (dataset_id, document_id), pending in by_document.items():
+            page = 1
+            while pending:
+                try:
+                    data = await self.chunk_client.list_chunks(
+                        dataset_id=dataset_id,
+                        document_id=document_id,
+                        page=page,
+                        page_size=page_size,
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to list chunks of {document_id} for reconcile: {e}"
+                    )
+                    break
+
+                chunks = (data or {}).get("chunks") or []
+                for chunk in chunks:
+                    chunk_id = str(chunk.get("id") or "")
+                    if chunk_id and chunk_id in claimed:
+                        continue
+                    h = content_hash(chunk.get("content") or "")
+                    matches = pending.get(h)
+                    if matches:
+                        job.completed[matches.popleft().key] = chunk_id
+                        claimed.add(chunk_id)
+                        if not matches:
+                            del pending[h]
+                if len(chunks) < page_size:
+                    break
+                page += 1
+
+    async def run(
+        self, job: MigrationJob, tasks: Iterable[ChunkTask], *, reconcile: bool = False
+    ):
+        """Upload every task not yet recorded in the job's checkpoint."""
+        tasks = list(tasks)
+        if reconcile:
+            await self.reconcile(job, tasks)
+
+        pending = [task for task in tasks if task.key not in job.completed]
+        job.total = len(tasks)
+        job.skipped = len(tasks) - len(pending)
+        job.created = 0
+        job.failed = 0
+        job.errors = []
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.finished_at = None
+        await job.save()
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for task in pending:
+            queue.put_nowait(task)
+
+        last_checkpoint = [time.monotonic(), 0]
+
+        async def checkpoint():
+            done = job.created + job.failed
+            now = time.monotonic()
+            job._rate_samples.append((time.time(), job.created))
+            if (
+                done - last_checkpoint[1] >= self.checkpoint_every
+                or now - last_checkpoint[0] >= self.checkpoint_interval_s
+            ):
+                last_checkpoint[:] = [now, done]
+                await job.save()
+
+        async def worker():
+            while True:
+                try:
+                    task = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    data = await self.chunk_client.add_chunk(
+                        dataset_id=task.dataset_id,
+                        document_id=task.document_id,
+                        content=task.content,
+                        important_keywords=task.important_keywords,
+                        questions=task.questions,
+                    )
+                    chunk = (
+                        (data or {}).get("chunk") if isinstance(data, dict) else None
+                    )
+                    job.completed[task.key] = str((chunk or {}).get("id") or "")
+                    job.created += 1
+                except Exception as e:
+                    job.failed += 1
+                    job.add_error(f"{task.document_id}: {e}")
+                    logger.warning(f"Failed to add chunk to {task.document_id}: {e}")
+                await checkpoint()
+
+        try:
+            await asyncio.gather(
+                *(worker() for _ in range(min(self.concurrency, len(pending)) or 1))
+            )
+            job.status = PARTIAL if job.failed else COMPLETED
+        except asyncio.CancelledError:
+            job.status = PARTIAL
+            raise
+        finally:
+            job.finished_at = time.time()
+            await job.save()
+
+        return job
@@ -0,0 +1,247 @@
+"""Shared, pooled HTTP transport for all RagFlow clients.
+
+One aiohttp session (and connection pool) is reused by every RagFlow client
+instead of opening a new session per call. It keeps connections alive,
+caps concurrent connections per host, retries transient failures with
+jittered exponential backoff and records per-operation latency metrics.
+
+Tunables (environment variables):
+  RAGFLOW_HTTP_POOL_LIMIT        total connections (default 100)
+  RAGFLOW_HTTP_LIMIT_PER_HOST    connections per RagFlow host (default 32)
+  RAGFLOW_HTTP_KEEPALIVE_TIMEOUT idle keep-alive seconds (default 30)
+  RAGFLOW_HTTP_MAX_RETRIES       retries for transient failures (default 3)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses where the server did not act on the request, safe to retry any method
+NOT_PROCESSED_STATUSES = {429, 503}
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _OperationStats:
+    __slots__ = ("count", "errors", "retries", "total_ms", "max_ms", "samples")
+
+    def __init__(self, sample_size: int = 512):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: deque[float] = deque(maxlen=sample_size)
+
+    def record(self, elapsed_ms: float, error: bool, retries: int):
+        self.count += 1
+        self.errors += int(error)
+        self.retries += retries
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def _percentile(self, ordered: list[float], pct: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self._percentile(ordered, 0.50), 2),
+            "p95_ms": round(self._percentile(ordered, 0.95), 2),
+            "p99_ms": round(self._percentile(ordered, 0.99), 2),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class RagFlowTransport:
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 32,
+        keepalive_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats: Dict[str, _OperationStats] = {}
+        self._in_flight = 0
+
+    @classmethod
+    def from_env(cls) -> "RagFlowTransport":
+        return cls(
+            limit=_env_number("RAGFLOW_HTTP_POOL_LIMIT", 100),
+            limit_per_host=_env_number("RAGFLOW_HTTP_LIMIT_PER_HOST", 32),
+            keepalive_timeout=_env_number(
+                "RAGFLOW_HTTP_KEEPALIVE_TIMEOUT", 30.0, float
+            ),
+            max_retries=_env_number("RAGFLOW_HTTP_MAX_RETRIES", 3),
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # A session is bound to the loop it was created on; scripts that call
+        # asyncio.run() repeatedly get a fresh one per loop.
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trust_env=True)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.debug(f"Error closing RagFlow session: {e}")
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * (2**attempt))
+        )
+
+    def _record(self, op: str, started: float, error: bool, retries: int):
+        stats = self._stats.get(op)
+        if stats is None:
+            stats = self._stats[op] = _OperationStats()
+        stats.record((time.perf_counter() - started) * 1000, error, retries)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "pool": {
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+                "in_flight": self._in_flight,
+                "open": self._session is not None and not self._session.closed,
+            },
+            "operations": {
+                op: stats.snapshot() for op, stats in sorted(self._stats.items())
+            },
+        }
+
+    @asynccontextmanager
+    async def request(
+        self,
+        op: str,
+        method: str,
+        url: str,
+        *,
+        idempotent: Optional[bool] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send a request through the shared pool and yield the response.
+
+        `op` names the operation in metrics (e.g. "chunk.add"). Transient
+        failures are retried for idempotent requests; non-idempotent ones are
+        only retried when the request provably was not processed (connect
+        errors, 429/503). Pass `idempotent=True` for safe POSTs such as
+        retrieval, or `retries=0` for bodies that can't be resent.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        max_retries = self.max_retries if retries is None else retries
+
+        started = time.perf_counter()
+        attempt = 0
+        self._in_flight += 1
+        try:
+            while True:
+                try:
+                    resp = await self._get_session().request(method, url, **kwargs)
+                except aiohttp.ClientConnectorError:
+                    # Never reached the server, safe to retry any method
+                    if attempt >= max_retries:
+                        self._record(op, started, True, attempt)
+                        raise
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if not idempotent or attempt >= max_retries:
+                        self._record(op, started, True, attempt)
+                        raise
+                else:
+                    retryable = resp.status in RETRY_STATUSES and (
+                        idempotent or resp.status in NOT_PROCESSED_STATUSES
+                    )
+                    if not retryable or attempt >= max_retries:
+                        failed = True
+                        try:
+                            yield resp
+                            failed = resp.status >= 400
+                        finally:
+                            resp.release()
+                            self._record(op, started, failed, attempt)
+                        return
+
+                    retry_after = resp.headers.get("Retry-After")
+                    resp.release()
+                    attempt += 1
+                    logger.debug(
+                        f"RagFlow {op} got {resp.status}, retry {attempt}/{max_retries}"
+                    )
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+                    continue
+
+                attempt += 1
+                logger.debug(
+                    f"RagFlow {op} connection error, retry {attempt}/{max_retries}"
+                )
+                await asyncio.sleep(self._backoff(attempt))
+        finally:
+            self._in_flight -= 1
+
+
+RAGFLOW_TRANSPORT = RagFlowTransport.from_env()
+
+
+def get_transport() -> RagFlowTransport:
+    return RAGFLOW_TRANSPORT
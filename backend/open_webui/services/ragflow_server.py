@@ -1,8 +1,11 @@
 import logging
+from functools import lru_cache
 from typing import List, Tuple, Dict, Any, Optional
 
 import aiohttp
 
+from open_webui.services.ragflow.transport import RagFlowTransport, get_transport
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,10 +22,19 @@ def _cfg(request, name: str, default: Optional[str] = None) -> Optional[str]:
 
 
 class RagFlowClient:
-    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout_s: float = 30.0):
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout_s: float = 30.0,
+        transport: Optional[RagFlowTransport] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key or ""
         self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        # Shared pooled session; clients themselves are cheap to construct
+        self.transport = transport or get_transport()
 
     async def retrieve(
         self,
@@ -45,47 +57,57 @@ class RagFlowClient:
         if document_ids:
             body["document_ids"] = document_ids
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body, timeout=self.timeout) as resp:
-                if resp.status != 200:
-                    txt = await resp.text()
-                    raise RuntimeError(f"RagFlow {resp.status}: {txt}")
-                payload = await resp.json()
-                if payload.get("code") != 0 or "data" not in payload:
-                    raise RuntimeError(f"RagFlow error: {payload}")
-                data = payload["data"] or {}
-                chunks = data.get("chunks", [])
-
-                documents: List[Dict[str, Any]] = []
-                scores: List[float] = []
-                for c in chunks:
-                    documents.append(
-                        {
-                            "content": c.get("content", ""),
-                            "metadata": {
-                                k: c.get(k)
-                                for k in (
-                                    "similarity",
-                                    "vector_similarity",
-                                    "term_similarity",
-                                    "document_id",
-                                    "kb_id",
-                                    "positions",
-                                )
-                            },
-                        }
-                    )
-                    try:
-                        scores.append(float(c.get("similarity", 0.0)))
-                    except Exception:
-                        scores.append(0.0)
-
-                return documents, scores
+        async with self.transport.request(
+            "retrieval.retrieve",
+            "POST",
+            url,
+            headers=headers,
+            json=body,
+            timeout=self.timeout,
+            idempotent=True,
+        ) as resp:
+            if resp.status != 200:
+                txt = await resp.text()
+                raise RuntimeError(f"RagFlow {resp.status}: {txt}")
+            payload = await resp.json()
+            if payload.get("code") != 0 or "data" not in payload:
+                raise RuntimeError(f"RagFlow error: {payload}")
+            data = payload["data"] or {}
+            chunks = data.get("chunks", [])
+
+            documents: List[Dict[str, Any]] = []
+            scores: List[float] = []
+            for c in chunks:
+                documents.append(
+                    {
+                        "content": c.get("content", ""),
+                        "metadata": {
+                            k: c.get(k)
+                            for k in (
+                                "similarity",
+                                "vector_similarity",
+                                "term_similarity",
+                                "document_id",
+                                "kb_id",
+                                "positions",
+                            )
+                        },
+                    }
+                )
+                try:
+                    scores.append(float(c.get("similarity", 0.0)))
+                except Exception:
+                    scores.append(0.0)
+
+            return documents, scores
+
+
+@lru_cache(maxsize=16)
+def _get_cached_client(base_url: str, api_key: str) -> RagFlowClient:
+    return RagFlowClient(base_url=base_url, api_key=api_key)
 
 
 def get_ragflow_client(request) -> RagFlowClient:
     base = _cfg(request, "RAGFLOW_BASE_URL", "http://192.168.2.168")
     key = _cfg(request, "RAGFLOW_API_KEY", "ragflow-Q5MGVmYThhYjU2MjExZjBiNDIzNGEzMj")
-    return RagFlowClient(base_url=base, api_key=key)
-
-
+    return _get_cached_client(base, key)
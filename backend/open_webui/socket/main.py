@@ -27,9 +27,18 @@ from open_webui.env import (
     WEBSOCKET_SENTINEL_PORT,
     WEBSOCKET_SENTINEL_HOSTS,
     REDIS_KEY_PREFIX,
+    CHAT_STATUS_FLUSH_INTERVAL,
+    CHAT_EVENT_FRAME_INTERVAL,
+    YDOC_COMPACT_THRESHOLD,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock, YdocManager
+from open_webui.socket.utils import (
+    ChatEventFramer,
+    RedisLock,
+    SocketPool,
+    StatusEventBuffer,
+    YdocManager,
+)
 from open_webui.tasks import create_task, stop_item_tasks
 from open_webui.utils.redis import get_redis_connection
 from open_webui.utils.access_control import has_access, get_users_with_access
@@ -47,6 +56,8 @@ log.setLevel(SRC_LOG_LEVELS["SOCKET"])
 
 
 REDIS = None
+# Binary client for collaborative document updates (stored as raw bytes)
+REDIS_BINARY = None
 
 if WEBSOCKET_MANAGER == "redis":
     if WEBSOCKET_SENTINEL_HOSTS:
@@ -90,29 +101,19 @@ if WEBSOCKET_MANAGER == "redis":
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
         async_mode=True,
     )
-
-    redis_sentinels = get_sentinels_from_env(
-        WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
-    )
-    SESSION_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:session_pool",
+    REDIS_BINARY = get_redis_connection(
         redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
-        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
-    )
-    USER_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:user_pool",
-        redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
-        redis_cluster=WEBSOCKET_REDIS_CLUSTER,
-    )
-    USAGE_POOL = RedisDict(
-        f"{REDIS_KEY_PREFIX}:usage_pool",
-        redis_url=WEBSOCKET_REDIS_URL,
-        redis_sentinels=redis_sentinels,
+        redis_sentinels=get_sentinels_from_env(
+            WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
+        ),
         redis_cluster=WEBSOCKET_REDIS_CLUSTER,
+        async_mode=True,
+        decode_responses=False,
     )
 
+    redis_sentinels = get_sentinels_from_env(
+        WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
+    )
     clean_up_lock = RedisLock(
         redis_url=WEBSOCKET_REDIS_URL,
         lock_name=f"{REDIS_KEY_PREFIX}:usage_cleanup_lock",
@@ -124,16 +125,19 @@ if WEBSOCKET_MANAGER == "redis":
     renew_func = clean_up_lock.renew_lock
     release_func = clean_up_lock.release_lock
 else:
-    SESSION_POOL = {}
-    USER_POOL = {}
-    USAGE_POOL = {}
-
     aquire_func = release_func = renew_func = lambda: True
 
 
-YDOC_MANAGER = YdocManager(
+# Sessions, per-user session sets and model usage (Redis-backed when available)
+SOCKET_POOL = SocketPool(
     redis=REDIS,
+    redis_key_prefix=f"{REDIS_KEY_PREFIX}:{{socket_pool}}",
+)
+
+YDOC_MANAGER = YdocManager(
+    redis=REDIS_BINARY,
     redis_key_prefix=f"{REDIS_KEY_PREFIX}:ydoc:documents",
+    compact_threshold=YDOC_COMPACT_THRESHOLD,
 )
 
 
@@ -164,26 +168,8 @@ async def periodic_usage_pool_cleanup():
                 log.error(f"Unable to renew cleanup lock. Exiting usage pool cleanup.")
                 raise Exception("Unable to renew usage pool cleanup lock.")
 
-            now = int(time.time())
-            send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
-                # Creating a list of sids to remove if they have timed out
-                expired_sids = [
-                    sid
-                    for sid, details in connections.items()
-                    if now - details["updated_at"] > TIMEOUT_DURATION
-                ]
-
-                for sid in expired_sids:
-                    del connections[sid]
-
-                if not connections:
-                    log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
-
-                send_usage = True
+            for model_id in await SOCKET_POOL.cleanup_usage(TIMEOUT_DURATION):
+                log.debug(f"Cleaning up model {model_id} from usage pool")
             await asyncio.sleep(TIMEOUT_DURATION)
     finally:
         release_func()
@@ -195,29 +181,38 @@ app = socketio.ASGIApp(
 )
 
 
-def get_models_in_use():
+async def get_models_in_use():
     # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
-    return models_in_use
+    return await SOCKET_POOL.get_models_in_use()
 
 
-def get_active_user_ids():
+async def get_active_user_ids():
     """Get the list of active user IDs."""
-    return list(USER_POOL.keys())
+    return await SOCKET_POOL.get_active_user_ids()
 
 
-def get_user_active_status(user_id):
+def get_active_user_count():
+    """Active user count for callers outside the event loop (e.g. metrics)."""
+    return SOCKET_POOL.count_active_users()
+
+
+async def get_user_active_status(user_id):
     """Check if a user is currently active."""
-    return user_id in USER_POOL
+    return await SOCKET_POOL.is_user_active(user_id)
 
 
-def get_user_id_from_session_pool(sid):
-    user = SESSION_POOL.get(sid)
+async def get_user_id_from_session_pool(sid):
+    user = await SOCKET_POOL.get_session(sid)
     if user:
         return user["id"]
     return None
 
 
+def get_user_room(user_id):
+    """Room joined by every session of a user."""
+    return f"user:{user_id}"
+
+
 def get_session_ids_from_room(room):
     """Get all session IDs from a specific room."""
     active_session_ids = sio.manager.get_participants(
@@ -227,33 +222,20 @@ def get_session_ids_from_room(room):
     return [session_id[0] for session_id in active_session_ids]
 
 
-def get_user_ids_from_room(room):
+async def get_user_ids_from_room(room):
     active_session_ids = get_session_ids_from_room(room)
-
-    active_user_ids = list(
-        set([SESSION_POOL.get(session_id)["id"] for session_id in active_session_ids])
-    )
-    return active_user_ids
+    return await SOCKET_POOL.get_user_ids(active_session_ids)
 
 
-def get_active_status_by_user_id(user_id):
-    if user_id in USER_POOL:
-        return True
-    return False
+async def get_active_status_by_user_id(user_id):
+    return await SOCKET_POOL.is_user_active(user_id)
 
 
 @sio.on("usage")
 async def usage(sid, data):
-    if sid in SESSION_POOL:
-        model_id = data["model"]
+    if await SOCKET_POOL.has_session(sid):
         # Record the timestamp for the last update
-        current_time = int(time.time())
-
-        # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
-        }
+        await SOCKET_POOL.touch_usage(data["model"], sid)
 
 
 @sio.event
@@ -266,13 +248,10 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump(
-                exclude=["date_of_birth", "bio", "gender"]
+            await SOCKET_POOL.add_session(
+                sid, user.model_dump(exclude=["date_of_birth", "bio", "gender"])
             )
-            if user.id in USER_POOL:
-                USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-            else:
-                USER_POOL[user.id] = [sid]
+            await sio.enter_room(sid, get_user_room(user.id))
 
 
 @sio.on("user-join")
@@ -290,11 +269,10 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump(exclude=["date_of_birth", "bio", "gender"])
-    if user.id in USER_POOL:
-        USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-    else:
-        USER_POOL[user.id] = [sid]
+    await SOCKET_POOL.add_session(
+        sid, user.model_dump(exclude=["date_of_birth", "bio", "gender"])
+    )
+    await sio.enter_room(sid, get_user_room(user.id))
 
     # Join all the channels
     channels = Channels.get_channels_by_user_id(user.id)
@@ -372,13 +350,14 @@ async def channel_events(sid, data):
     event_type = event_data["type"]
 
     if event_type == "typing":
+        user = await SOCKET_POOL.get_session(sid)
         await sio.emit(
             "channel-events",
             {
                 "channel_id": data["channel_id"],
                 "message_id": data.get("message_id", None),
                 "data": event_data,
-                "user": UserNameResponse(**SESSION_POOL[sid]).model_dump(),
+                "user": UserNameResponse(**user).model_dump(),
             },
             room=room,
         )
@@ -387,7 +366,7 @@ async def channel_events(sid, data):
 @sio.on("ydoc:document:join")
 async def ydoc_document_join(sid, data):
     """Handle user joining a document"""
-    user = SESSION_POOL.get(sid)
+    user = await SOCKET_POOL.get_session(sid)
 
     try:
         document_id = data["document_id"]
@@ -423,19 +402,13 @@ async def ydoc_document_join(sid, data):
 
         active_session_ids = get_session_ids_from_room(f"doc_{document_id}")
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        # Snapshot plus the updates logged since the last compaction
+        state_update = await YDOC_MANAGER.get_state(document_id)
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                "state": state_update,  # Sent as a binary attachment
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -499,20 +472,14 @@ async def yjs_document_state(sid, data):
             log.warning(f"Document {document_id} not found")
             return
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
-        # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        # Snapshot plus the updates logged since the last compaction
+        state_update = await YDOC_MANAGER.get_state(document_id)
 
         await sio.emit(
             "ydoc:document:state",
             {
                 "document_id": document_id,
-                "state": list(state_update),  # Convert bytes to list for JSON
+                "state": state_update,  # Sent as a binary attachment
                 "sessions": active_session_ids,
             },
             room=sid,
@@ -534,11 +501,12 @@ async def yjs_document_update(sid, data):
 
         user_id = data.get("user_id", sid)
 
-        update = data["update"]  # List of bytes from frontend
+        # Binary attachment from the frontend (older clients send a list of ints)
+        update = bytes(data["update"])
 
         await YDOC_MANAGER.append_to_updates(
             document_id=document_id,
-            update=update,  # Convert list of bytes to bytes
+            update=update,
         )
 
         # Broadcast update to all other users in the document
@@ -557,7 +525,7 @@ async def yjs_document_update(sid, data):
         async def debounced_save():
             await asyncio.sleep(0.5)
             await document_save_handler(
-                document_id, data.get("data", {}), SESSION_POOL.get(sid)
+                document_id, data.get("data", {}), await SOCKET_POOL.get_session(sid)
             )
 
         if data.get("data"):
@@ -622,60 +590,62 @@ async def yjs_awareness_update(sid, data):
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
-
-        user_id = user["id"]
-        USER_POOL[user_id] = [_sid for _sid in USER_POOL[user_id] if _sid != sid]
-
-        if len(USER_POOL[user_id]) == 0:
-            del USER_POOL[user_id]
-
+    user = await SOCKET_POOL.remove_session(sid)
+    if user:
         await YDOC_MANAGER.remove_user_from_all_documents(sid)
     else:
         pass
         # print(f"Unknown session ID {sid} disconnected")
 
 
+# Status events are persisted in batches per message; clients still get them live
+STATUS_EVENT_BUFFER = StatusEventBuffer(
+    Chats.add_message_statuses_to_chat_by_id_and_message_id,
+    interval=CHAT_STATUS_FLUSH_INTERVAL,
+)
+
+
+async def emit_chat_event(to, payload):
+    await sio.emit("chat-events", payload, to=to)
+
+
+# Streamed chat:completion updates are sent in frames, once per user room
+CHAT_EVENT_FRAMER = ChatEventFramer(
+    emit_chat_event,
+    interval=CHAT_EVENT_FRAME_INTERVAL,
+)
+
+
 def get_event_emitter(request_info, update_db=True):
     async def __event_emitter__(event_data):
-        user_id = request_info["user_id"]
-
-        session_ids = list(
-            set(
-                USER_POOL.get(user_id, [])
-                + (
-                    [request_info.get("session_id")]
-                    if request_info.get("session_id")
-                    else []
-                )
-            )
+        # One emit reaches every session of the user; the room list is
+        # de-duplicated by the manager, so the request session never gets it twice
+        to = [get_user_room(request_info["user_id"])]
+        if request_info.get("session_id"):
+            to.append(request_info["session_id"])
+
+        await CHAT_EVENT_FRAMER.send(
+            to,
+            request_info.get("chat_id", None),
+            request_info.get("message_id", None),
+            event_data,
         )
 
-        emit_tasks = [
-            sio.emit(
-                "chat-events",
-                {
-                    "chat_id": request_info.get("chat_id", None),
-                    "message_id": request_info.get("message_id", None),
-                    "data": event_data,
-                },
-                to=session_id,
-            )
-            for session_id in session_ids
-        ]
-
-        await asyncio.gather(*emit_tasks)
-
         if update_db:
             if "type" in event_data and event_data["type"] == "status":
-                Chats.add_message_status_to_chat_by_id_and_message_id(
+                STATUS_EVENT_BUFFER.add(
                     request_info["chat_id"],
                     request_info["message_id"],
                     event_data.get("data", {}),
                 )
 
+            if event_data.get("type") == "chat:completion" and event_data.get(
+                "data", {}
+            ).get("done"):
+                await STATUS_EVENT_BUFFER.flush(
+                    request_info["chat_id"], request_info["message_id"]
+                )
+
             if "type" in event_data and event_data["type"] == "message":
                 message = Chats.get_message_by_id_and_message_id(
                     request_info["chat_id"],
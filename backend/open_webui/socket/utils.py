@@ -1,10 +1,16 @@
+import asyncio
 import json
+import logging
+import time
 import uuid
+from collections import deque
 from open_webui.utils.redis import get_redis_connection
 from open_webui.env import REDIS_KEY_PREFIX
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
+log = logging.getLogger(__name__)
+
 
 class RedisLock:
     def __init__(
@@ -46,115 +52,584 @@ class RedisLock:
             self.redis.delete(self.lock_name)
 
 
-class RedisDict:
-    def __init__(self, name, redis_url, redis_sentinels=[], redis_cluster=False):
-        self.name = name
-        self.redis = get_redis_connection(
-            redis_url,
-            redis_sentinels,
-            redis_cluster=redis_cluster,
-            decode_responses=True,
-        )
+class SocketPool:
+    """
+    Tracks socket sessions, the sessions of each user and model usage.
+
+    With ``redis`` (an asyncio client) the state lives in Redis hashes, sets
+    and sorted sets so it is shared between workers:
+
+    - ``sessions``: hash of sid -> user json
+    - ``user:<user_id>``: set of the user's sids
+    - ``users``: set of user ids with at least one session
+    - ``usage:<model_id>``: sorted set of sids scored by last update
+    - ``models``: set of model ids with recent usage
+
+    Multi-key updates run in a transaction or a Lua script, so concurrent
+    connects/disconnects of the same user never lose a sid. All keys share a
+    hash tag and therefore one cluster slot. Without ``redis`` the same
+    structures are kept in process memory.
+    """
+
+    _REMOVE_SESSION_SCRIPT = """
+    if redis.call('HDEL', KEYS[1], ARGV[1]) == 0 then
+        return 0
+    end
+    redis.call('SREM', KEYS[2], ARGV[1])
+    if redis.call('SCARD', KEYS[2]) == 0 then
+        redis.call('SREM', KEYS[3], ARGV[2])
+    end
+    return 1
+    """
+
+    _DROP_IDLE_MODEL_SCRIPT = """
+    if redis.call('ZCARD', KEYS[1]) == 0 then
+        redis.call('SREM', KEYS[2], ARGV[1])
+        return 1
+    end
+    return 0
+    """
 
-    def __setitem__(self, key, value):
-        serialized_value = json.dumps(value)
-        self.redis.hset(self.name, key, serialized_value)
+    def __init__(
+        self,
+        redis=None,
+        redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:{{socket_pool}}",
+    ):
+        self._redis = redis
+        self._redis_key_prefix = redis_key_prefix
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
-    def __getitem__(self, key):
-        value = self.redis.hget(self.name, key)
-        if value is None:
-            raise KeyError(key)
-        return json.loads(value)
+        self._sessions: dict[str, dict] = {}
+        self._user_sessions: dict[str, set] = {}
+        self._usage: dict[str, dict[str, int]] = {}
 
-    def __delitem__(self, key):
-        result = self.redis.hdel(self.name, key)
-        if result == 0:
-            raise KeyError(key)
+    def _key(self, *parts: str) -> str:
+        return ":".join([self._redis_key_prefix, *parts])
 
-    def __contains__(self, key):
-        return self.redis.hexists(self.name, key)
+    ####################
+    # Sessions
+    ####################
 
-    def __len__(self):
-        return self.redis.hlen(self.name)
+    async def add_session(self, sid: str, user: dict):
+        self._loop = asyncio.get_running_loop()
+        user_id = user["id"]
 
-    def keys(self):
-        return self.redis.hkeys(self.name)
+        if self._redis:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._key("sessions"), sid, json.dumps(user))
+                pipe.sadd(self._key("user", user_id), sid)
+                pipe.sadd(self._key("users"), user_id)
+                await pipe.execute()
+        else:
+            self._sessions[sid] = user
+            self._user_sessions.setdefault(user_id, set()).add(sid)
 
-    def values(self):
-        return [json.loads(v) for v in self.redis.hvals(self.name)]
+    async def remove_session(self, sid: str) -> Optional[dict]:
+        """Remove a session and return its user, or None if it was unknown."""
+        user = await self.get_session(sid)
+        if user is None:
+            return None
 
-    def items(self):
-        return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
+        user_id = user["id"]
 
-    def get(self, key, default=None):
+        if self._redis:
+            await self._redis.eval(
+                self._REMOVE_SESSION_SCRIPT,
+                3,
+                self._key("sessions"),
+                self._key("user", user_id),
+                self._key("users"),
+                sid,
+                user_id,
+            )
+        else:
+            self._sessions.pop(sid, None)
+            sids = self._user_sessions.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._user_sessions[user_id]
+        return user
+
+    async def get_session(self, sid: str) -> Optional[dict]:
+        if self._redis:
+            value = await self._redis.hget(self._key("sessions"), sid)
+            return json.loads(value) if value is not None else None
+        return self._sessions.get(sid)
+
+    async def has_session(self, sid: str) -> bool:
+        if self._redis:
+            return bool(await self._redis.hexists(self._key("sessions"), sid))
+        return sid in self._sessions
+
+    async def get_user_ids(self, sids: List[str]) -> List[str]:
+        """Distinct user ids behind ``sids``, read with a single HMGET."""
+        if not sids:
+            return []
+
+        if self._redis:
+            values = await self._redis.hmget(self._key("sessions"), sids)
+            users = [json.loads(value) for value in values if value is not None]
+        else:
+            users = [self._sessions[sid] for sid in sids if sid in self._sessions]
+        return list(dict.fromkeys(user["id"] for user in users))
+
+    async def get_active_user_ids(self) -> List[str]:
+        if self._redis:
+            return list(await self._redis.smembers(self._key("users")))
+        return list(self._user_sessions.keys())
+
+    async def is_user_active(self, user_id: str) -> bool:
+        if self._redis:
+            return bool(await self._redis.sismember(self._key("users"), user_id))
+        return user_id in self._user_sessions
+
+    def count_active_users(self, timeout: float = 1.0) -> int:
+        """
+        Blocking variant for callers outside the event loop (e.g. metric
+        exporter threads). Returns 0 until the pool has been used on a loop.
+        """
+        if not self._redis:
+            return len(self._user_sessions)
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return 0
+        future = asyncio.run_coroutine_threadsafe(
+            self._redis.scard(self._key("users")), loop
+        )
         try:
-            return self[key]
-        except KeyError:
-            return default
+            return int(future.result(timeout))
+        except Exception as e:
+            future.cancel()
+            log.debug(f"Unable to count active users: {e}")
+            return 0
+
+    ####################
+    # Model usage
+    ####################
+
+    async def touch_usage(self, model_id: str, sid: str, now: Optional[int] = None):
+        now = int(time.time()) if now is None else now
+        if self._redis:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(self._key("usage", model_id), {sid: now})
+                pipe.sadd(self._key("models"), model_id)
+                await pipe.execute()
+        else:
+            self._usage.setdefault(model_id, {})[sid] = now
+
+    async def cleanup_usage(self, timeout: int, now: Optional[int] = None) -> List[str]:
+        """
+        Drop usage entries older than ``timeout`` seconds and return the
+        model ids that no longer have any.
+        """
+        now = int(time.time()) if now is None else now
+        cutoff = now - timeout
+
+        if not self._redis:
+            removed = []
+            for model_id, connections in list(self._usage.items()):
+                for sid in [
+                    sid
+                    for sid, updated_at in connections.items()
+                    if updated_at < cutoff
+                ]:
+                    del connections[sid]
+                if not connections:
+                    del self._usage[model_id]
+                    removed.append(model_id)
+            return removed
+
+        model_ids = list(await self._redis.smembers(self._key("models")))
+        if not model_ids:
+            return []
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for model_id in model_ids:
+                pipe.zremrangebyscore(
+                    self._key("usage", model_id), "-inf", f"({cutoff}"
+                )
+                pipe.zcard(self._key("usage", model_id))
+            results = await pipe.execute()
+
+        removed = []
+        for model_id, count in zip(model_ids, results[1::2]):
+            if count:
+                continue
+            # Re-checked inside the script: a concurrent touch keeps the model
+            if await self._redis.eval(
+                self._DROP_IDLE_MODEL_SCRIPT,
+                2,
+                self._key("usage", model_id),
+                self._key("models"),
+                model_id,
+            ):
+                removed.append(model_id)
+        return removed
+
+    async def get_models_in_use(self) -> List[str]:
+        if self._redis:
+            return list(await self._redis.smembers(self._key("models")))
+        return list(self._usage.keys())
+
+
+class StatusEventBuffer:
+    """
+    Buffers status events per (chat_id, message_id) and persists them in batches.
+
+    ``write(chat_id, message_id, statuses)`` persists one batch (one chat
+    read/write). It runs on the event loop, like the other chat writes on the
+    socket path: the default storage rewrites the whole chat JSON, so running
+    it in a worker thread could race with a message upsert and lose it. A
+    batch is written ``interval`` seconds after its first event, or earlier
+    through ``flush`` (e.g. when the message completes).
+    """
+
+    def __init__(self, write, interval: float = 2.0):
+        self.write = write
+        self.interval = interval
+        self._pending: dict[tuple, list] = {}
+        self._timers: dict[tuple, asyncio.Task] = {}
+
+    def add(self, chat_id: str, message_id: str, status: dict):
+        key = (chat_id, message_id)
+        self._pending.setdefault(key, []).append(status)
+        if key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: tuple):
+        await asyncio.sleep(self.interval)
+        if self._timers.get(key) is asyncio.current_task():
+            self._timers.pop(key, None)
+        self._flush(key)
+
+    async def flush(self, chat_id: str, message_id: str):
+        key = (chat_id, message_id)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        self._flush(key)
+
+    async def flush_all(self):
+        for chat_id, message_id in list(self._pending):
+            await self.flush(chat_id, message_id)
+
+    def _flush(self, key: tuple):
+        statuses = self._pending.pop(key, None)
+        if not statuses:
+            return
+        try:
+            self.write(*key, statuses)
+        except Exception as e:
+            log.error(f"Error persisting status events for {key}: {e}")
+
+
+class _RateCounter:
+    """Events per second over a sliding window of one-second buckets."""
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self._buckets: deque = deque()
+
+    def _trim(self, now: int):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        if self._buckets and self._buckets[-1][0] == now:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([now, count])
+        self._trim(now)
+
+    def rate(self) -> float:
+        self._trim(int(time.monotonic()))
+        return sum(count for _, count in self._buckets) / self.window
+
+
+class ChatEventFramer:
+    """
+    Coalesces streamed ``chat:completion`` updates of a message into frames.
+
+    ``emit(to, payload)`` sends one ``chat-events`` payload to a room (or list
+    of rooms). Updates that only carry replace-semantics fields (``content``,
+    ``usage``) are merged into the pending frame of their message, which is
+    sent ``interval`` seconds after its first update. Any other event of the
+    message flushes the pending frame first, and sends for the same message
+    run one after another, so clients see events in their original order.
+    """
+
+    MERGEABLE_KEYS = frozenset({"content", "usage"})
+
+    def __init__(self, emit, interval: float = 0.05):
+        self.emit = emit
+        self.interval = interval
+        self._frames: dict[tuple, dict] = {}
+        self._timers: dict[tuple, asyncio.Task] = {}
+        self._sends: dict[tuple, asyncio.Future] = {}
+
+        self._events = 0
+        self._coalesced = 0
+        self._emits = 0
+        self._emit_rate = _RateCounter()
+        self._event_rate = _RateCounter()
+
+    @classmethod
+    def is_mergeable(cls, event_data: dict) -> bool:
+        data = event_data.get("data")
+        return (
+            event_data.get("type") == "chat:completion"
+            and isinstance(data, dict)
+            and bool(data)
+            and data.keys() <= cls.MERGEABLE_KEYS
+        )
+
+    async def send(self, to, chat_id, message_id, event_data: dict):
+        self._events += 1
+        self._event_rate.add()
+
+        if chat_id is None or message_id is None:
+            await self._emit(to, _payload(chat_id, message_id, event_data))
+            return
+
+        key = (tuple(to) if isinstance(to, list) else to, chat_id, message_id)
+        if self.interval > 0 and self.is_mergeable(event_data):
+            frame = self._frames.get(key)
+            if frame is None:
+                self._frames[key] = {"to": to, "data": dict(event_data["data"])}
+            else:
+                frame["data"].update(event_data["data"])
+                self._coalesced += 1
+
+            if key not in self._timers:
+                self._timers[key] = asyncio.create_task(self._flush_later(key))
+            return
+
+        payloads = []
+        frame = self._frames.pop(key, None)
+        if frame is not None:
+            payloads.append(_frame_payload(key, frame))
+        payloads.append(_payload(chat_id, message_id, event_data))
+        await self._send(key, to, payloads)
+
+    async def _flush_later(self, key: tuple):
+        await asyncio.sleep(self.interval)
+        if self._timers.get(key) is asyncio.current_task():
+            self._timers.pop(key, None)
+        await self.flush(key)
+
+    async def flush(self, key: tuple):
+        frame = self._frames.pop(key, None)
+        if frame is not None:
+            await self._send(key, frame["to"], [_frame_payload(key, frame)])
+
+    async def flush_all(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for key in list(self._frames):
+            await self.flush(key)
+
+    async def _send(self, key: tuple, to, payloads: list):
+        # Chain onto the previous send for this message so frames land in order
+        task = asyncio.ensure_future(
+            self._send_after(self._sends.get(key), to, payloads)
+        )
+        self._sends[key] = task
+        try:
+            await asyncio.shield(task)
+        finally:
+            if self._sends.get(key) is task:
+                self._sends.pop(key, None)
+
+    async def _send_after(self, previous, to, payloads: list):
+        if previous is not None:
+            await asyncio.wait([previous])
+        for payload in payloads:
+            await self._emit(to, payload)
+
+    async def _emit(self, to, payload: dict):
+        self._emits += 1
+        self._emit_rate.add()
+        try:
+            await self.emit(to, payload)
+        except Exception as e:
+            log.error(f"Error emitting chat event to {to}: {e}")
+
+    def get_metrics(self) -> dict:
+        return {
+            "events": self._events,
+            "coalesced": self._coalesced,
+            "emits": self._emits,
+            "events_per_sec": round(self._event_rate.rate(), 2),
+            "emits_per_sec": round(self._emit_rate.rate(), 2),
+            "pending_frames": len(self._frames),
+            "pending_sends": len(self._sends),
+            "interval": self.interval,
+        }
+
 
-    def clear(self):
-        self.redis.delete(self.name)
+def _payload(chat_id, message_id, event_data: dict) -> dict:
+    return {"chat_id": chat_id, "message_id": message_id, "data": event_data}
 
-    def update(self, other=None, **kwargs):
-        if other is not None:
-            for k, v in other.items() if hasattr(other, "items") else other:
-                self[k] = v
-        for k, v in kwargs.items():
-            self[k] = v
 
-    def setdefault(self, key, default=None):
-        if key not in self:
-            self[key] = default
-        return self[key]
+def _frame_payload(key: tuple, frame: dict) -> dict:
+    _, chat_id, message_id = key
+    return _payload(
+        chat_id, message_id, {"type": "chat:completion", "data": frame["data"]}
+    )
 
 
 class YdocManager:
+    """
+    Stores collaborative (Yjs) documents as a snapshot plus a log of raw
+    update bytes.
+
+    Once the log reaches ``compact_threshold`` entries it is merged into
+    the snapshot and truncated, so joining a document costs at most one
+    snapshot plus ``compact_threshold`` updates regardless of how many
+    edits the document has seen. ``redis`` must be an asyncio client
+    created with ``decode_responses=False``.
+
+    Keys hash-tag the document id (``...:{<doc_id>}:snapshot``) so the
+    snapshot and log of a document share a Redis Cluster slot and can be
+    read and written in one transaction. Documents stored by earlier
+    versions (a ``...:<doc_id>:updates`` list of JSON int arrays) are merged
+    into the snapshot the first time they are read or compacted.
+    """
+
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:ydoc:documents",
+        compact_threshold: int = 500,
     ):
-        self._updates = {}
+        self._snapshots: dict[str, bytes] = {}
+        self._updates: dict[str, List[bytes]] = {}
         self._users = {}
         self._redis = redis
         self._redis_key_prefix = redis_key_prefix
+        self._compact_threshold = compact_threshold
+
+    def _key(self, document_id: str, name: str) -> str:
+        return f"{self._redis_key_prefix}:{{{document_id}}}:{name}"
+
+    def _legacy_key(self, document_id: str, name: str) -> str:
+        return f"{self._redis_key_prefix}:{document_id}:{name}"
+
+    async def _migrate_legacy_updates(self, document_id: str) -> Optional[bytes]:
+        """Fold an earlier version's update list into the snapshot; returns it."""
+        legacy_key = self._legacy_key(document_id, "updates")
+        legacy = await self._redis.lrange(legacy_key, 0, -1)
+        if not legacy:
+            return None
+
+        snapshot_key = self._key(document_id, "snapshot")
+        snapshot = await asyncio.to_thread(
+            _merge_updates, None, [bytes(json.loads(update)) for update in legacy]
+        )
+        # Another worker may have migrated it first; its snapshot already
+        # holds the same updates
+        if await self._redis.set(snapshot_key, snapshot, nx=True):
+            await self._redis.delete(legacy_key)
+            return snapshot
+        return await self._redis.get(snapshot_key)
 
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
+        update = bytes(update)
+
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
+            length = await self._redis.rpush(self._key(document_id, "log"), update)
         else:
-            if document_id not in self._updates:
-                self._updates[document_id] = []
-            self._updates[document_id].append(update)
+            self._updates.setdefault(document_id, []).append(update)
+            length = len(self._updates[document_id])
+
+        if self._compact_threshold and length >= self._compact_threshold:
+            await self._compact(document_id)
+
+    async def compact(self, document_id: str):
+        """Merge the update log of a document into its snapshot."""
+        await self._compact(document_id.replace(":", "_"))
+
+    async def _compact(self, document_id: str):
+        if not self._redis:
+            updates = self._updates.pop(document_id, [])
+            if updates:
+                self._snapshots[document_id] = _merge_updates(
+                    self._snapshots.get(document_id), updates
+                )
+            return
+
+        # Only one worker compacts a document at a time; the log is trimmed by
+        # the number of entries merged, so updates appended meanwhile are kept
+        lock_key = self._key(document_id, "compacting")
+        if not await self._redis.set(lock_key, b"1", nx=True, ex=30):
+            return
+        try:
+            snapshot_key = self._key(document_id, "snapshot")
+            log_key = self._key(document_id, "log")
+
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.get(snapshot_key)
+                pipe.lrange(log_key, 0, -1)
+                snapshot, updates = await pipe.execute()
+            if not updates:
+                return
+            if snapshot is None:
+                snapshot = await self._migrate_legacy_updates(document_id)
+
+            snapshot = await asyncio.to_thread(_merge_updates, snapshot, updates)
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.set(snapshot_key, snapshot)
+                pipe.ltrim(log_key, len(updates), -1)
+                await pipe.execute()
+        finally:
+            await self._redis.delete(lock_key)
 
     async def get_updates(self, document_id: str) -> List[bytes]:
+        """The snapshot (if any) followed by the updates logged after it."""
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.get(self._key(document_id, "snapshot"))
+                pipe.lrange(self._key(document_id, "log"), 0, -1)
+                snapshot, updates = await pipe.execute()
+            if snapshot is None:
+                snapshot = await self._migrate_legacy_updates(document_id)
         else:
-            return self._updates.get(document_id, [])
+            snapshot = self._snapshots.get(document_id)
+            updates = self._updates.get(document_id, [])
+
+        return ([snapshot] if snapshot else []) + list(updates)
+
+    async def get_state(self, document_id: str) -> bytes:
+        """The whole document encoded as a single update."""
+        return _merge_updates(None, await self.get_updates(document_id))
 
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            return await self._redis.exists(redis_key) > 0
+            return (
+                await self._redis.exists(
+                    self._key(document_id, "snapshot"), self._key(document_id, "log")
+                )
+                + await self._redis.exists(self._legacy_key(document_id, "updates"))
+                > 0
+            )
         else:
-            return document_id in self._updates
+            return document_id in self._snapshots or document_id in self._updates
 
     async def get_users(self, document_id: str) -> List[str]:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            users = await self._redis.smembers(redis_key)
-            return list(users)
+            users = await self._redis.smembers(self._key(document_id, "users"))
+            return [_decode(user) for user in users]
         else:
             return self._users.get(document_id, [])
 
@@ -162,8 +637,7 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.sadd(redis_key, user_id)
+            await self._redis.sadd(self._key(document_id, "users"), user_id)
         else:
             if document_id not in self._users:
                 self._users[document_id] = set()
@@ -173,22 +647,21 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.srem(redis_key, user_id)
+            await self._redis.srem(self._key(document_id, "users"), user_id)
         else:
             if document_id in self._users and user_id in self._users[document_id]:
                 self._users[document_id].remove(user_id)
 
     async def remove_user_from_all_documents(self, user_id: str):
         if self._redis:
-            keys = await self._redis.keys(f"{self._redis_key_prefix}:*")
+            keys = await self._redis.keys(f"{self._redis_key_prefix}:*:users")
             for key in keys:
-                if key.endswith(":users"):
-                    await self._redis.srem(key, user_id)
+                key = _decode(key)
+                await self._redis.srem(key, user_id)
 
-                    document_id = key.split(":")[-2]
-                    if len(await self.get_users(document_id)) == 0:
-                        await self.clear_document(document_id)
+                document_id = key.split(":")[-2].strip("{}")
+                if len(await self.get_users(document_id)) == 0:
+                    await self.clear_document(document_id)
 
         else:
             for document_id in list(self._users.keys()):
@@ -203,12 +676,28 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.delete(redis_key)
-            redis_users_key = f"{self._redis_key_prefix}:{document_id}:users"
-            await self._redis.delete(redis_users_key)
+            await self._redis.delete(
+                self._key(document_id, "snapshot"),
+                self._key(document_id, "log"),
+                self._key(document_id, "users"),
+            )
+            # Keys of earlier versions live in other slots, delete them apart
+            await self._redis.delete(self._legacy_key(document_id, "updates"))
+            await self._redis.delete(self._legacy_key(document_id, "users"))
         else:
-            if document_id in self._updates:
-                del self._updates[document_id]
-            if document_id in self._users:
-                del self._users[document_id]
+            self._snapshots.pop(document_id, None)
+            self._updates.pop(document_id, None)
+            self._users.pop(document_id, None)
+
+
+def _merge_updates(snapshot: Optional[bytes], updates: List[bytes]) -> bytes:
+    ydoc = Y.Doc()
+    if snapshot:
+        ydoc.apply_update(snapshot)
+    for update in updates:
+        ydoc.apply_update(update)
+    return ydoc.get_update()
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,570 @@
+"""
+Agent 工作流基准测试
+
+在本地桩服务（RAGFlow 检索、Embedding、OpenAI 兼容接口、OpenAPI 工具服务器）上运行
+代表性的工作流，把 agent/graph.py 与 agent/nodes.py 自身的开销从模型和工具延迟中
+分离出来。结果以 JSON 输出，便于跟踪回归。
+
+用法:
+    cd backend
+    python -m open_webui.test.bench_agent_workflow --iterations 200 --output bench.json
+
+指标（毫秒，均给出 mean / p50 / p99 / min / max）:
+    compile_ms         构图 + 编译（不走缓存）
+    framework_ms       同一拓扑换成空节点后的一次执行：LangGraph 调度与状态传递的成本
+    end_to_end_ms      execute_workflow 全程
+    graph_overhead_ms  end_to_end 减去关键路径上节点的耗时
+    nodes              各节点耗时（桩服务零延迟时即节点自身开销 + 本地回环请求）
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.metadata
+import json
+import logging
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+# 确保可以导入 backend 包
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from aiohttp import web
+
+from open_webui.agent import graph
+from open_webui.agent.graph import create_workflow_graph, execute_workflow
+from open_webui.agent.nodes import BaseNode
+from open_webui.agent.state import WorkflowState
+
+MODEL_ID = "bench-model"
+DATASET_ID = "bench-dataset"
+KNOWLEDGE_ID = "bench-kb"
+TOOL_SERVER_ID = "bench"
+TOOL_NAMES = ["lookup_order", "lookup_stock", "lookup_weather"]
+EMBEDDING_DIM = 64
+
+
+# ---------------------------------------------------------------------------
+# 桩服务
+# ---------------------------------------------------------------------------
+
+
+def _embedding(text: str) -> List[float]:
+    """确定性的伪向量（同一文本总是得到同一向量）"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIM)]
+
+
+def _openai_app(latency: float, tokens: int) -> web.Application:
+    async def chat_completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        words = [f"token{i} " for i in range(tokens)]
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    "choices": [
+                        {"message": {"role": "assistant", "content": "".join(words)}}
+                    ]
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in words:
+            chunk = {"choices": [{"delta": {"content": word}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def _embeddings_app(latency: float) -> web.Application:
+    async def embeddings(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response(
+            {
+                "data": [
+                    {"embedding": _embedding(text)} for text in body.get("input", [])
+                ]
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/v1/embeddings", embeddings)
+    return app
+
+
+def _ragflow_app(latency: float, chunks: int) -> web.Application:
+    async def retrieval(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response(
+            {
+                "code": 0,
+                "data": {
+                    "chunks": [
+                        {
+                            "id": f"chunk-{i}",
+                            "content": f"RAGFlow 段落 {i}: {body.get('question', '')}",
+                            "document_id": f"doc-{i}",
+                            "document_keyword": f"doc-{i}.pdf",
+                            "kb_id": DATASET_ID,
+                            "similarity": 1.0 - i / (chunks + 1),
+                        }
+                        for i in range(chunks)
+                    ],
+                    "total": chunks,
+                },
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/api/v1/retrieval", retrieval)
+    return app
+
+
+def _tool_server_app(latency: float) -> web.Application:
+    spec = {
+        "openapi": "3.0.0",
+        "info": {"title": "Bench tools", "version": "1"},
+        "paths": {
+            f"/{name}": {
+                "get": {
+                    "operationId": name,
+                    "summary": name,
+                    "parameters": [
+                        {
+                            "name": "question",
+                            "in": "query",
+                            "schema": {"type": "string"},
+                        }
+                    ],
+                }
+            }
+            for name in TOOL_NAMES
+        },
+    }
+
+    async def openapi(request):
+        return web.json_response(spec)
+
+    async def tool(request):
+        await asyncio.sleep(latency)
+        return web.json_response(
+            {"tool": request.path.strip("/"), "question": request.query.get("question")}
+        )
+
+    app = web.Application()
+    app.router.add_get("/openapi.json", openapi)
+    for name in TOOL_NAMES:
+        app.router.add_get(f"/{name}", tool)
+    return app
+
+
+async def _serve(app: web.Application):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def start_stub_servers(
+    llm_latency: float = 0.0,
+    backend_latency: float = 0.0,
+    llm_tokens: int = 32,
+    chunks: int = 8,
+):
+    """启动全部桩服务，返回 (runners, urls)"""
+    apps = {
+        "openai": _openai_app(llm_latency, llm_tokens),
+        "embeddings": _embeddings_app(backend_latency),
+        "ragflow": _ragflow_app(backend_latency, chunks),
+        "tools": _tool_server_app(backend_latency),
+    }
+    runners, urls = [], {}
+    for name, app in apps.items():
+        runner, url = await _serve(app)
+        runners.append(runner)
+        urls[name] = url
+    return runners, urls
+
+
+# ---------------------------------------------------------------------------
+# 请求上下文与本地向量库
+# ---------------------------------------------------------------------------
+
+
+async def make_request(urls: Dict[str, str]) -> SimpleNamespace:
+    """与节点实际读取的字段一致的最小 Request（app.state.config / MODELS / TOOL_SERVERS）"""
+    from open_webui.utils.tools import get_tool_servers_data
+
+    config = SimpleNamespace(
+        OPENAI_API_BASE_URLS=[f"{urls['openai']}/v1"],
+        OPENAI_API_KEYS=["bench"],
+        RAGFLOW_BASE_URL=urls["ragflow"],
+        RAGFLOW_API_KEY="bench",
+        RAGFLOW_TIMEOUT=30,
+        RAG_VLLM_EMBEDDING_URL=urls["embeddings"],
+        TOOL_SERVER_CONNECTIONS=[
+            {
+                "url": urls["tools"],
+                "path": "openapi.json",
+                "auth_type": "none",
+                "config": {"enable": True},
+                "info": {"id": TOOL_SERVER_ID},
+            }
+        ],
+    )
+    state = SimpleNamespace(
+        config=config,
+        MODELS={MODEL_ID: {"id": MODEL_ID, "urlIdx": 0}},
+        TOOLS={},
+        TOOL_SERVERS=await get_tool_servers_data(config.TOOL_SERVER_CONNECTIONS),
+        TOOL_SERVERS_LOADED_AT=time.monotonic(),
+        redis=None,
+    )
+    return SimpleNamespace(
+        app=SimpleNamespace(state=state),
+        cookies={},
+        state=SimpleNamespace(),
+    )
+
+
+@contextmanager
+def local_vector_store(embeddings_url: str, documents: int = 32):
+    """用桩 Embedding 服务和内存向量集合替换 LangChainRAGService 单例"""
+    from langchain_core.documents import Document
+
+    from open_webui.services import langchain_rag_service
+    from open_webui.services.embeddings_client import EmbeddingsClient
+
+    class BenchRAGService(langchain_rag_service.LangChainRAGService):
+        def _get_client(self, request=None):
+            return EmbeddingsClient(base_url=embeddings_url)
+
+    service = BenchRAGService()
+    texts = [f"本地知识段落 {i}" for i in range(documents)]
+    service.vector_stores[KNOWLEDGE_ID] = {
+        "docs": [
+            Document(page_content=text, metadata={"document_name": f"local-{i}.md"})
+            for i, text in enumerate(texts)
+        ],
+        "vectors": [_embedding(text) for text in texts],
+    }
+
+    instances = langchain_rag_service._langchain_rag_service_instances
+    with patch.dict(instances, {"vllm_forced_service": service}):
+        yield service
+
+
+# ---------------------------------------------------------------------------
+# 工作流定义
+# ---------------------------------------------------------------------------
+
+
+def rag_workflow() -> tuple:
+    """input → dataSource → retrieval（RAGFlow + 本地向量库）→ llm → output"""
+    nodes = [
+        {"id": "input_1", "type": "input", "config": {}},
+        {
+            "id": "datasource_1",
+            "type": "dataSource",
+            "config": {"selected_datasets": [DATASET_ID]},
+        },
+        {
+            "id": "retrieval_1",
+            "type": "retrieval",
+            "config": {
+                "knowledge_ids": [KNOWLEDGE_ID],
+                "top_k": 5,
+                "input_bindings": {"datasets": "datasource_1.datasets"},
+            },
+        },
+        {
+            "id": "llm_1",
+            "type": "llm",
+            "config": {
+                "model": MODEL_ID,
+                "input_bindings": {"context": "retrieval_1.context"},
+            },
+        },
+        {
+            "id": "output_1",
+            "type": "output",
+            "config": {"input_bindings": {"answer": "llm_1.answer"}},
+        },
+    ]
+    order = [node["id"] for node in nodes]
+    connections = [
+        {"from": a, "to": b, "type": "unidirectional"} for a, b in zip(order, order[1:])
+    ]
+    return nodes, connections
+
+
+def chat_tools_workflow(tool_count: int = 3) -> tuple:
+    """与 chat_handler 相同的拓扑：input → 多个工具并行 → llm → output"""
+    nodes = [{"id": "input_1", "type": "input", "config": {}}]
+    connections = []
+    for idx in range(tool_count):
+        tool_node_id = f"tool_{idx + 1}"
+        nodes.append(
+            {
+                "id": tool_node_id,
+                "type": "tool",
+                "config": {
+                    "tool_id": f"server:{TOOL_SERVER_ID}",
+                    "tool_name": TOOL_NAMES[idx % len(TOOL_NAMES)],
+                    "tool_params": {},
+                    "input_bindings": {"params": "input_1.user"},
+                },
+            }
+        )
+        connections.append(
+            {"from": "input_1", "to": tool_node_id, "type": "unidirectional"}
+        )
+        connections.append(
+            {"from": tool_node_id, "to": "llm_1", "type": "unidirectional"}
+        )
+    nodes.append({"id": "llm_1", "type": "llm", "config": {"model": MODEL_ID}})
+    nodes.append(
+        {
+            "id": "output_1",
+            "type": "output",
+            "config": {"input_bindings": {"answer": "llm_1.answer"}},
+        }
+    )
+    connections.append({"from": "llm_1", "to": "output_1", "type": "unidirectional"})
+    return nodes, connections
+
+
+WORKFLOWS = {
+    "rag": rag_workflow,
+    "chat_tools": chat_tools_workflow,
+}
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+
+class NoopNode(BaseNode):
+    """空节点：只记录执行路径，用于测量框架本身的成本"""
+
+    async def execute(self, state: WorkflowState) -> WorkflowState:
+        state.execution_path.append(self.node_id)
+        return state
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": round(percentile(0.5), 3),
+        "p99": round(percentile(0.99), 3),
+        "min": round(ordered[0], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def measure_compile(nodes, connections, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        create_workflow_graph(nodes, connections).compile()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+async def measure_framework(nodes, connections, iterations: int) -> List[float]:
+    with patch.dict(graph.NODE_CLASSES, {t: NoopNode for t in graph.NODE_CLASSES}):
+        app = create_workflow_graph(nodes, connections).compile()
+
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        workflow_state = WorkflowState(question="bench", start_time=time.time())
+        await app.ainvoke(
+            {"workflow": workflow_state}, {"configurable": {"thread_id": "bench"}}
+        )
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+async def measure_workflow(
+    request, nodes, connections, iterations: int, warmup: int
+) -> Dict[str, Any]:
+    events = 0
+
+    async def event_emitter(event):
+        nonlocal events
+        events += 1
+
+    user = SimpleNamespace(
+        id="bench-user", name="bench", email="bench@example.com", role="user"
+    )
+
+    async def run_once(question: str) -> WorkflowState:
+        return await execute_workflow(
+            question=question,
+            nodes=nodes,
+            connections=connections,
+            request=request,
+            user=user,
+            event_emitter=event_emitter,
+        )
+
+    for i in range(warmup):
+        await run_once(f"warmup {i}")
+
+    events = 0
+    end_to_end, overhead = [], []
+    node_samples: Dict[str, List[float]] = {}
+    partial_runs = 0
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        state = await run_once(f"问题 {i}")
+        end_to_end.append((time.perf_counter() - t0) * 1000)
+        overhead.append(end_to_end[-1] - state.timings.get("critical_path", 0.0))
+        for key, value in state.timings.items():
+            if key.startswith("node_"):
+                node_samples.setdefault(key[len("node_") :], []).append(value)
+        partial_runs += bool(state.partial)
+
+    return {
+        "end_to_end_ms": summarize(end_to_end),
+        "graph_overhead_ms": summarize(overhead),
+        "nodes": {
+            node_id: summarize(values)
+            for node_id, values in sorted(node_samples.items())
+        },
+        "critical_path": state.critical_path,
+        "events_per_run": round(events / max(iterations, 1), 2),
+        "partial_runs": partial_runs,
+    }
+
+
+async def run_benchmark(
+    iterations: int = 100,
+    warmup: int = 10,
+    compile_iterations: int = 20,
+    llm_latency: float = 0.0,
+    backend_latency: float = 0.0,
+    workflows: List[str] = None,
+) -> Dict[str, Any]:
+    """运行基准测试，返回可直接序列化为 JSON 的结果"""
+    from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+
+    runners, urls = await start_stub_servers(llm_latency, backend_latency)
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "langgraph": importlib.metadata.version("langgraph"),
+            "iterations": iterations,
+            "warmup": warmup,
+            "llm_latency_ms": llm_latency * 1000,
+            "backend_latency_ms": backend_latency * 1000,
+        },
+        "workflows": {},
+    }
+
+    try:
+        request = await make_request(urls)
+        with local_vector_store(urls["embeddings"]):
+            for name in workflows or list(WORKFLOWS):
+                nodes, connections = WORKFLOWS[name]()
+                graph._compiled_workflows.clear()
+
+                result = {
+                    "compile_ms": summarize(
+                        measure_compile(nodes, connections, compile_iterations)
+                    ),
+                    "framework_ms": summarize(
+                        await measure_framework(nodes, connections, iterations)
+                    ),
+                }
+                result.update(
+                    await measure_workflow(
+                        request, nodes, connections, iterations, warmup
+                    )
+                )
+                results["workflows"][name] = result
+    finally:
+        await UPSTREAM_SESSION_POOL.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent 工作流基准测试（本地桩服务）")
+    parser.add_argument(
+        "--iterations", type=int, default=100, help="每个工作流的测量次数"
+    )
+    parser.add_argument("--warmup", type=int, default=10, help="预热次数（不计入结果）")
+    parser.add_argument(
+        "--compile-iterations", type=int, default=20, help="编译耗时的测量次数"
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="OpenAI 桩的响应延迟（秒）"
+    )
+    parser.add_argument(
+        "--backend-latency",
+        type=float,
+        default=0.0,
+        help="RAGFlow / Embedding / 工具桩的响应延迟（秒）",
+    )
+    parser.add_argument(
+        "--workflow",
+        action="append",
+        choices=list(WORKFLOWS),
+        help="只运行指定工作流（可重复）",
+    )
+    parser.add_argument("--output", help="结果写入的 JSON 文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    results = asyncio.run(
+        run_benchmark(
+            iterations=args.iterations,
+            warmup=args.warmup,
+            compile_iterations=args.compile_iterations,
+            llm_latency=args.llm_latency,
+            backend_latency=args.backend_latency,
+            workflows=args.workflow,
+        )
+    )
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
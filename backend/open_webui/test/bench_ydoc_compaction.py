@@ -0,0 +1,185 @@
+"""
+协同文档（Yjs）快照压缩基准测试
+
+生成一篇经历 N 次编辑（默认 100k，在光标处逐字输入/退格）的笔记，对比两种存储方式:
+
+    legacy     每条更新存为 JSON 整数数组，加入文档时重放全部更新（旧实现）
+    compacted  YdocManager：原始字节 + 快照压缩，加入文档时读取快照与尾部日志
+
+结果以 JSON 输出，便于跟踪回归。默认使用进程内存储；传入 --redis-url 时
+compacted 走真实 Redis（会在独立前缀下读写并在结束后清理）。
+
+用法:
+    cd backend
+    python -m open_webui.test.bench_ydoc_compaction --edits 100000 --output bench.json
+
+指标:
+    append_ms      写入全部更新的总耗时（含压缩）
+    join_ms        加入文档时构造完整状态的耗时（mean / p50 / max）
+    stored_bytes   文档在存储中的体积
+    log_entries    加入时需要重放的条目数
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+# 确保可以导入 backend 包
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pycrdt as Y
+
+from open_webui.socket.utils import YdocManager
+
+
+def generate_updates(edits: int, seed: int = 0) -> List[bytes]:
+    """模拟连续输入：在光标处打字，偶尔退格或把光标移到别处"""
+    rng = random.Random(seed)
+    doc = Y.Doc()
+    text = doc.get("prosemirror", type=Y.Text)
+    updates: List[bytes] = []
+    subscription = doc.observe(lambda event: updates.append(event.update))
+
+    length = cursor = 0
+    for _ in range(edits):
+        if length and rng.random() < 0.005:
+            cursor = rng.randint(0, length)
+        if cursor and rng.random() < 0.15:
+            cursor -= 1
+            del text[cursor]
+            length -= 1
+        else:
+            text.insert(cursor, rng.choice("abcdefghij "))
+            cursor += 1
+            length += 1
+
+    doc.unobserve(subscription)
+    return updates
+
+
+def _summary(samples: List[float]) -> dict:
+    return {
+        "mean": round(statistics.mean(samples), 3),
+        "p50": round(statistics.median(samples), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def bench_legacy(updates: List[bytes], joins: int) -> dict:
+    start = time.perf_counter()
+    log = [json.dumps(list(update)) for update in updates]
+    append_ms = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for _ in range(joins):
+        start = time.perf_counter()
+        ydoc = Y.Doc()
+        for update in log:
+            ydoc.apply_update(bytes(json.loads(update)))
+        ydoc.get_update()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "append_ms": round(append_ms, 3),
+        "join_ms": _summary(samples),
+        "stored_bytes": sum(len(update) for update in log),
+        "log_entries": len(log),
+    }
+
+
+async def bench_compacted(
+    updates: List[bytes], joins: int, threshold: int, redis_url: str = None
+) -> dict:
+    redis = None
+    if redis_url:
+        from redis import asyncio as aioredis
+
+        redis = aioredis.from_url(redis_url, decode_responses=False)
+
+    prefix = f"bench:ydoc:{uuid.uuid4().hex}"
+    manager = YdocManager(
+        redis=redis, redis_key_prefix=prefix, compact_threshold=threshold
+    )
+    document_id = "note:bench"
+
+    try:
+        start = time.perf_counter()
+        for update in updates:
+            await manager.append_to_updates(document_id, update)
+        append_ms = (time.perf_counter() - start) * 1000
+
+        samples = []
+        for _ in range(joins):
+            start = time.perf_counter()
+            state = await manager.get_state(document_id)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        stored = await manager.get_updates(document_id)
+        return {
+            "append_ms": round(append_ms, 3),
+            "join_ms": _summary(samples),
+            "stored_bytes": sum(len(update) for update in stored),
+            "log_entries": len(stored),
+        }, state
+    finally:
+        await manager.clear_document(document_id)
+        if redis is not None:
+            await redis.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协同文档快照压缩基准测试")
+    parser.add_argument("--edits", type=int, default=100_000, help="编辑次数")
+    parser.add_argument("--joins", type=int, default=5, help="加入文档的测量次数")
+    parser.add_argument(
+        "--threshold", type=int, default=500, help="压缩阈值（日志条数）"
+    )
+    parser.add_argument("--redis-url", default=None, help="使用真实 Redis（可选）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="结果写入的 JSON 文件")
+    args = parser.parse_args()
+
+    updates = generate_updates(args.edits, args.seed)
+
+    legacy = bench_legacy(updates, args.joins)
+    compacted, state = asyncio.run(
+        bench_compacted(updates, args.joins, args.threshold, args.redis_url)
+    )
+
+    # 压缩后的状态必须与逐条重放的结果一致
+    expected = Y.Doc()
+    for update in updates:
+        expected.apply_update(update)
+    actual = Y.Doc()
+    actual.apply_update(state)
+    assert str(actual.get("prosemirror", type=Y.Text)) == str(
+        expected.get("prosemirror", type=Y.Text)
+    )
+
+    result = {
+        "edits": args.edits,
+        "threshold": args.threshold,
+        "backend": "redis" if args.redis_url else "memory",
+        "legacy": legacy,
+        "compacted": compacted,
+        "join_speedup": round(
+            legacy["join_ms"]["mean"] / max(compacted["join_ms"]["mean"], 1e-6), 1
+        ),
+    }
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# open_webui.config empties STATIC_DIR and copies the frontend build into it
+# on import; point it away from the source tree before anything imports it
+os.environ.setdefault("STATIC_DIR", tempfile.mkdtemp(prefix="open-webui-static-"))
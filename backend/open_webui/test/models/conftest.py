@@ -0,0 +1,42 @@
+import contextlib
+import importlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from open_webui.internal.db import Base
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    """
+    In-memory SQLite for model tests: creates ``tables`` and points get_db of
+    every module in ``modules`` at it. Returns the engine.
+    """
+
+    def setup(tables, modules):
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine, tables=[table.__table__ for table in tables])
+        SessionLocal = sessionmaker(
+            bind=engine, autocommit=False, autoflush=False, expire_on_commit=False
+        )
+
+        @contextlib.contextmanager
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        for module in modules:
+            monkeypatch.setattr(importlib.import_module(module), "get_db", get_db)
+        return engine
+
+    return setup
@@ -0,0 +1,126 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from open_webui.models.chat_messages import ChatMessage
+from open_webui.models.chat_search import ChatSearch, ChatSearches
+from open_webui.models.chats import Chat, ChatTitleIdResponse, Chats
+from open_webui.models.feedbacks import Feedback
+from open_webui.models.folders import Folder
+from open_webui.models.tags import Tag, Tags
+
+MODULES = [
+    "open_webui.models.chats",
+    "open_webui.models.chat_search",
+    "open_webui.models.folders",
+    "open_webui.models.tags",
+]
+USER = SimpleNamespace(id="u1", name="user", email="u@x", role="user")
+
+
+@pytest.fixture
+def engine(memory_db, monkeypatch):
+    engine = memory_db([Chat, ChatSearch, ChatMessage, Feedback, Folder, Tag], MODULES)
+    monkeypatch.setattr(ChatSearches, "_fts_available", None)
+    with engine.begin() as conn:
+        # c0..c5; c2 and c3 share updated_at so paging must break ties on id
+        for i, updated_at in enumerate([10, 20, 30, 30, 40, 50]):
+            conn.execute(
+                Chat.__table__.insert().values(
+                    id=f"c{i}",
+                    user_id=USER.id,
+                    title=f"chat {i}",
+                    chat={"title": f"chat {i}", "messages": [{"content": "x"}]},
+                    meta={"tags": ["work"] if i % 2 else []},
+                    archived=(i == 0),
+                    pinned=False,
+                    created_at=updated_at,
+                    updated_at=updated_at,
+                )
+            )
+    return engine
+
+
+def _ids(chats):
+    return [chat.id for chat in chats]
+
+
+def test_keyset_pages_cover_the_list_once(engine):
+    pages, cursor = [], None
+    while True:
+        page = Chats.get_chat_title_id_list_by_user_id(USER.id, limit=2, cursor=cursor)
+        if not page:
+            break
+        pages.append(_ids(page))
+        cursor = f"{page[-1].updated_at}:{page[-1].id}"
+
+    assert pages == [["c5", "c4"], ["c3", "c2"], ["c1"]]
+    assert _ids(Chats.get_chat_title_id_list_by_user_id(USER.id, skip=2, limit=2)) == [
+        "c3",
+        "c2",
+    ]
+
+
+def test_chat_lists_do_not_load_the_chat_json(engine):
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    chats = Chats.get_chat_list_by_user_id(USER.id, include_archived=True)
+    chats += Chats.get_archived_chat_list_by_user_id(USER.id)
+    chats += Chats.get_chat_list_by_user_id_and_tag_name(USER.id, "work")
+
+    assert all(isinstance(chat, ChatTitleIdResponse) for chat in chats)
+    assert statements and not any("chat.chat" in s for s in statements)
+
+
+def test_feedback_counts_are_aggregated_per_chat(engine):
+    with engine.begin() as conn:
+        for i, (chat_id, rating) in enumerate(
+            [("c5", 1), ("c5", 1), ("c5", -1), ("c4", -1), ("c1", 1)]
+        ):
+            conn.execute(
+                Feedback.__table__.insert().values(
+                    id=f"fb{i}",
+                    user_id=USER.id,
+                    chat_id=chat_id,
+                    type="rating",
+                    data={"rating": rating},
+                    created_at=0,
+                    updated_at=0,
+                )
+            )
+
+    page = Chats.get_chat_list_by_user_id_with_feedback(USER.id, skip=0, limit=3)
+    assert [
+        (c["id"], c["thumbs_up"], c["thumbs_down"], c["total_feedback"]) for c in page
+    ] == [("c5", 2, 1, 3), ("c4", 0, 1, 1), ("c3", 0, 0, 0)]
+
+    ordered = Chats.get_chat_list_by_user_id_with_feedback(
+        USER.id, filter={"order_by": "updated_at", "direction": "asc"}
+    )
+    assert [c["id"] for c in ordered] == ["c1", "c2", "c3", "c4", "c5"]
+
+
+def test_tag_survives_a_page_past_the_end(engine):
+    router = importlib.import_module("open_webui.routers.chats")
+    Tags.insert_new_tag("work", USER.id)
+
+    def tag_list(skip):
+        form = router.TagFilterForm(name="work", skip=skip, limit=2)
+        return asyncio.run(router.get_user_chat_list_by_tag_name(form, user=USER))
+
+    assert _ids(tag_list(0)) == ["c5", "c3"]
+    assert tag_list(10) == []
+    assert Tags.get_tag_by_name_and_user_id("work", USER.id) is not None
+
+    with engine.begin() as conn:
+        conn.execute(Chat.__table__.update().values(meta={"tags": []}))
+    assert tag_list(0) == []
+    assert Tags.get_tag_by_name_and_user_id("work", USER.id) is None
@@ -0,0 +1,180 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+
+from open_webui.models import chats as chats_model
+from open_webui.models.chat_messages import ChatMessage, is_message_table_chat
+from open_webui.models.chat_search import ChatSearch, ChatSearches
+from open_webui.models.chats import Chat, ChatForm, Chats
+from open_webui.models.feedbacks import Feedback
+from open_webui.models.folders import Folder
+from open_webui.models.tags import Tag
+
+MODULES = [
+    "open_webui.models.chats",
+    "open_webui.models.chat_search",
+    "open_webui.models.folders",
+    "open_webui.models.tags",
+]
+USER = SimpleNamespace(id="u1", name="user", email="u@x", role="user")
+
+
+@pytest.fixture
+def engine(memory_db, monkeypatch):
+    engine = memory_db([Chat, ChatSearch, ChatMessage, Feedback, Folder, Tag], MODULES)
+    monkeypatch.setattr(ChatSearches, "_fts_available", None)
+    return engine
+
+
+def _history(count, branch=None):
+    """m0 <- m1 <- ... linear thread; ``branch`` adds a sibling of the last message"""
+    messages = {
+        f"m{i}": {
+            "id": f"m{i}",
+            "parentId": f"m{i - 1}" if i else None,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i}",
+            "timestamp": i + 1,
+        }
+        for i in range(count)
+    }
+    if branch:
+        messages[branch] = {
+            **messages[f"m{count - 1}"],
+            "id": branch,
+            "content": branch,
+        }
+    return {
+        "title": "t",
+        "history": {"messages": messages, "currentId": f"m{count - 1}"},
+    }
+
+
+def _rows(engine, chat_id=None):
+    query = select(func.count()).select_from(ChatMessage)
+    if chat_id:
+        query = query.where(ChatMessage.chat_id == chat_id)
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+
+def _stored_chat(engine, chat_id):
+    with engine.connect() as conn:
+        return conn.execute(select(Chat.chat).where(Chat.id == chat_id)).scalar()
+
+
+def test_legacy_chat_is_migrated_on_first_write(engine, monkeypatch):
+    chat = Chats.insert_new_chat(USER.id, ChatForm(chat=_history(3)))
+    assert not is_message_table_chat(_stored_chat(engine, chat.id))
+    assert _rows(engine) == 0
+
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    returned = Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m3", {"id": "m3", "parentId": "m2", "content": "new"}
+    )
+
+    stored = _stored_chat(engine, chat.id)
+    assert is_message_table_chat(stored) and "messages" not in stored["history"]
+    assert _rows(engine, chat.id) == 4
+    # the hot path only returns the message it wrote
+    assert list(returned.chat["history"]["messages"]) == ["m3"]
+
+
+def test_compat_view_rebuilds_the_legacy_json(engine, monkeypatch):
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    legacy = _history(4, branch="b3")
+    chat = Chats.insert_new_chat(USER.id, ChatForm(chat=legacy))
+
+    rebuilt = Chats.get_chat_by_id(chat.id).chat
+    assert rebuilt["history"] == legacy["history"]
+    assert [m["id"] for m in rebuilt["messages"]] == ["m0", "m1", "m2", "m3"]
+    assert Chats.get_message_by_id_and_message_id(chat.id, "b3")["content"] == "b3"
+    assert Chats.get_chats_by_user_id(USER.id)[0].chat["history"] == legacy["history"]
+
+
+def test_full_history_write_and_sync_deletes(engine, monkeypatch):
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    chat = Chats.insert_new_chat(USER.id, ChatForm(chat=_history(4, branch="b3")))
+
+    full = Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m2", {"content": "edited"}, full_history=True
+    )
+    assert sorted(full.chat["history"]["messages"]) == ["b3", "m0", "m1", "m2", "m3"]
+    assert full.chat["history"]["messages"]["m2"]["content"] == "edited"
+    assert full.chat["history"]["messages"]["m2"]["parentId"] == "m1"
+
+    # Saving the whole chat without a branch drops its row
+    history = Chats.get_chat_by_id(chat.id).chat
+    del history["history"]["messages"]["b3"]
+    Chats.update_chat_by_id(chat.id, history)
+    assert _rows(engine, chat.id) == 4
+    assert Chats.get_message_by_id_and_message_id(chat.id, "b3") == {}
+
+
+def test_message_route_returns_the_whole_chat(engine, monkeypatch):
+    router = importlib.import_module("open_webui.routers.chats")
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    monkeypatch.setattr(router, "get_event_emitter", lambda *args: None)
+    chat = Chats.insert_new_chat(USER.id, ChatForm(chat=_history(3)))
+
+    response = asyncio.run(
+        router.update_chat_message_by_id(
+            chat.id, "m2", router.MessageForm(content="edited"), user=USER
+        )
+    )
+
+    assert sorted(response.chat["history"]["messages"]) == ["m0", "m1", "m2"]
+    assert [m["content"] for m in response.chat["messages"]][-1] == "edited"
+
+    other = SimpleNamespace(id="u2", role="user")
+    with pytest.raises(router.HTTPException):
+        asyncio.run(
+            router.update_chat_message_by_id(
+                chat.id, "m2", router.MessageForm(content="x"), user=other
+            )
+        )
+    assert Chats.get_chat_user_id_by_id("missing") is None
+
+
+@pytest.mark.parametrize("message_table", [True, False])
+def test_thread_paging_follows_the_current_branch(engine, monkeypatch, message_table):
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", message_table)
+    chat = Chats.insert_new_chat(USER.id, ChatForm(chat=_history(5, branch="b4")))
+
+    first = Chats.get_message_page_by_chat_id_and_user_id(chat.id, USER.id, limit=2)
+    assert [m["id"] for m in first.messages] == ["m3", "m4"]
+    assert first.next_cursor == "m2"
+
+    rest = Chats.get_message_page_by_chat_id_and_user_id(
+        chat.id, USER.id, first.next_cursor, limit=10
+    )
+    assert [m["id"] for m in rest.messages] == ["m0", "m1", "m2"]
+    assert rest.next_cursor is None
+
+    branch = Chats.get_message_page_by_chat_id_and_user_id(chat.id, USER.id, "b4", 1)
+    assert [m["id"] for m in branch.messages] == ["b4"]
+    assert Chats.get_message_page_by_chat_id_and_user_id(chat.id, "u2") is None
+
+
+def test_deletes_cascade_to_message_rows(engine, monkeypatch):
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    monkeypatch.setattr(Chats, "delete_shared_chat_by_chat_id", lambda id: True)
+    ids = [
+        Chats.insert_new_chat(USER.id, ChatForm(chat=_history(2), folder_id=folder)).id
+        for folder in [None, None, "f1", "f1"]
+    ]
+    other = Chats.insert_new_chat("u2", ChatForm(chat=_history(2))).id
+
+    assert Chats.delete_chat_by_id(ids[0])
+    assert Chats.delete_chat_by_id_and_user_id(ids[1], USER.id)
+    assert _rows(engine, ids[0]) == _rows(engine, ids[1]) == 0
+
+    assert Chats.delete_chats_by_user_id_and_folder_id(USER.id, "f1")
+    assert _rows(engine, ids[2]) == 0
+
+    Chats.insert_new_chat(USER.id, ChatForm(chat=_history(3)))
+    assert Chats.delete_chats_by_user_id(USER.id)
+    assert _rows(engine) == _rows(engine, other) == 2
@@ -0,0 +1,195 @@
+import time
+
+import pytest
+from sqlalchemy import text
+
+from open_webui.migrations.versions.add_chat_search_table import SQLITE_FTS_DDL
+from open_webui.models.chat_messages import ChatMessage
+from open_webui.models.chat_search import (
+    ChatSearch,
+    ChatSearches,
+    get_tag_token,
+    normalize_search_text,
+)
+from open_webui.models import chats as chats_model
+from open_webui.models.chats import Chat, ChatForm, Chats
+from open_webui.models.feedbacks import Feedback
+from open_webui.models.folders import Folder
+from open_webui.models.tags import Tag
+
+MODULES = [
+    "open_webui.models.chats",
+    "open_webui.models.chat_search",
+    "open_webui.models.folders",
+    "open_webui.models.tags",
+]
+USER = "u1"
+
+
+def _setup(memory_db, monkeypatch, fts: bool):
+    engine = memory_db([Chat, ChatSearch, ChatMessage, Feedback, Folder, Tag], MODULES)
+    if fts:
+        with engine.begin() as conn:
+            for statement in SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+    monkeypatch.setattr(ChatSearches, "_fts_available", None)
+    return engine
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def engine(request, memory_db, monkeypatch):
+    return _setup(memory_db, monkeypatch, request.param)
+
+
+def _chat(title, *contents):
+    messages = {
+        str(i): {"id": str(i), "role": "user", "content": content}
+        for i, content in enumerate(contents)
+    }
+    return Chats.insert_new_chat(
+        USER, ChatForm(chat={"title": title, "history": {"messages": messages}})
+    )
+
+
+def _search(query):
+    return [
+        chat.title for chat in Chats.get_chats_by_user_id_and_search_text(USER, query)
+    ]
+
+
+def test_normalize_search_text():
+    assert normalize_search_text("Hello, World! foo_bar") == "hello world foo bar"
+    assert normalize_search_text("数据库Index优化") == "数 据 库 index 优 化"
+    assert normalize_search_text("?!…") == ""
+    assert get_tag_token("Work Stuff").isalnum()
+
+
+def test_search_matches_title_content_and_cjk_phrases(engine):
+    _chat("Postgres tuning", "how do I add an index")
+    _chat("数据库优化", "如何给表加索引")
+    _chat("Weekend", "hiking plans")
+
+    assert _search("postgres") == ["Postgres tuning"]
+    # 词前缀匹配，多个词都必须命中
+    assert _search("ind how") == ["Postgres tuning"]
+    assert _search("index hiking") == []
+    # CJK 按相邻字短语匹配，不相邻的字不算命中
+    assert _search("索引") == ["数据库优化"]
+    assert _search("库优") == ["数据库优化"]
+    assert _search("索优") == []
+
+
+def test_punctuation_only_search_does_not_fail(engine):
+    _chat("Postgres tuning", "index")
+    Chats.add_chat_tag_by_id_and_user_id_and_tag_name(_chat("Tagged").id, USER, "work")
+
+    assert sorted(_search("?!")) == ["Postgres tuning", "Tagged"]
+    assert _search("?! tag:work") == ["Tagged"]
+
+
+def test_tag_filters(engine):
+    tagged = _chat("Tagged", "alpha")
+    _chat("Untagged", "alpha")
+    Chats.add_chat_tag_by_id_and_user_id_and_tag_name(tagged.id, USER, "Work Stuff")
+
+    assert _search("tag:work_stuff") == ["Tagged"]
+    assert _search("alpha tag:work_stuff") == ["Tagged"]
+    assert _search("tag:none") == ["Untagged"]
+    assert _search("tag:missing") == []
+
+
+def test_index_follows_updates_and_deletes(engine):
+    chat = _chat("Old title", "first message")
+    Chats.update_chat_by_id(
+        chat.id,
+        {
+            "title": "New title",
+            "history": {"messages": {"1": {"id": "1", "content": "second"}}},
+        },
+    )
+    assert _search("old") == [] and _search("first") == []
+    assert _search("new second") == ["New title"]
+
+    Chats.add_chat_tag_by_id_and_user_id_and_tag_name(chat.id, USER, "work")
+    Chats.delete_tag_by_id_and_user_id_and_tag_name(chat.id, USER, "work")
+    assert _search("tag:work") == []
+
+    Chats.delete_chat_by_id(chat.id)
+    assert _search("new") == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM chat_search")).scalar() == 0
+
+
+def test_ensure_user_indexed_backfills_old_chats_once(engine):
+    now = int(time.time()) - 10
+    with engine.begin() as conn:
+        for i, title in enumerate(["Legacy one", "Legacy two"]):
+            conn.execute(
+                Chat.__table__.insert().values(
+                    id=f"c{i}",
+                    user_id=USER,
+                    title=title,
+                    meta={},
+                    archived=False,
+                    chat={"title": title, "messages": [{"content": f"body {i}"}]},
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+
+    assert ChatSearches.ensure_user_indexed(USER, batch_size=1) == 2
+    assert ChatSearches.ensure_user_indexed(USER) == 0
+    assert _search("body 1") == ["Legacy two"]
+
+
+def test_message_writes_leave_the_index_until_the_next_search(engine, monkeypatch):
+    monkeypatch.setattr(chats_model, "ENABLE_CHAT_MESSAGE_TABLE", True)
+    chat = _chat("Notes", "first")
+
+    def indexed_content():
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT content FROM chat_search")).scalar()
+
+    before = indexed_content()
+    for i in range(3):
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            chat.id, f"m{i}", {"id": f"m{i}", "content": f"token{i} streamed"}
+        )
+    # per-message writes do not rewrite the chat's index row
+    assert indexed_content() == before
+
+    assert _search("token2") == ["Notes"]
+    assert "token2" in indexed_content()
+    # a write within the same second as that refresh is still picked up
+    Chats.upsert_message_to_chat_by_id_and_message_id(
+        chat.id, "m9", {"content": "late"}
+    )
+    assert _search("late") == ["Notes"]
+
+
+def test_tag_tokens_match_whole_words(engine):
+    short = _chat("Short tag")
+    long = _chat("Long tag")
+    # get_tag_token("a") is a prefix of get_tag_token("ab")
+    Chats.add_chat_tag_by_id_and_user_id_and_tag_name(short.id, USER, "a")
+    Chats.add_chat_tag_by_id_and_user_id_and_tag_name(long.id, USER, "ab")
+
+    assert _search("tag:a") == ["Short tag"]
+    assert _search("tag:ab") == ["Long tag"]
+
+
+def test_chat_saves_are_indexed_on_the_next_search(engine):
+    chat = _chat("Draft", "one")
+
+    def indexed_rows():
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT title, content FROM chat_search")).all()
+
+    assert indexed_rows() == []
+    assert _search("one") == ["Draft"]
+
+    Chats.update_chat_by_id(
+        chat.id, {"title": "Final", "history": {"messages": {"1": {"content": "two"}}}}
+    )
+    assert indexed_rows() == [("draft", "one")]
+    assert _search("final two") == ["Final"]
@@ -0,0 +1,223 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.models.excel_segments import (
+    ExcelSegment,
+    ExcelSegments,
+    parse_excel_segment_markdown,
+)
+from open_webui.models.files import File, FileForm, Files
+
+MODULES = ["open_webui.models.excel_segments", "open_webui.models.files"]
+USER = SimpleNamespace(id="u1", name="user", email="u@x", role="user")
+
+QUESTION_MARK = "问题（选填，单元格内一行一个）:"
+LEGACY_MARKDOWN = "\n".join(
+    [
+        "# Intro",
+        "## Welcome",
+        "hello",
+        "world",
+        f"{QUESTION_MARK} what is this?",
+        "## Second",
+        "more",
+        "# Empty",
+        "# Specs",
+        "## Size",
+        "10cm",
+    ]
+)
+
+
+@pytest.fixture
+def engine(memory_db):
+    return memory_db([ExcelSegment, File], MODULES)
+
+
+def _sheet(name, rows):
+    return {
+        "name": name,
+        "segments": [
+            {
+                "row": row,
+                "title": f"{name} {row}",
+                "content": f"c{row}",
+                "questions": "",
+            }
+            for row in rows
+        ],
+    }
+
+
+def _insert_file(file_id, data):
+    return Files.insert_new_file(
+        USER.id,
+        FileForm(
+            id=file_id,
+            filename=f"{file_id}.txt",
+            path="",
+            data={"type": "excel_segment_aggregated", "source_file": "book", **data},
+            meta={"source": "excel_extraction", "original_file": "book"},
+        ),
+    )
+
+
+def test_segments_are_paged_per_sheet(engine):
+    assert (
+        ExcelSegments.insert_sheets("f1", [_sheet("A", [5, 2, 9]), _sheet("B", [1])])
+        == 4
+    )
+
+    assert [
+        (s.name, s.sheet_index, s.segment_count) for s in ExcelSegments.get_sheets("f1")
+    ] == [
+        ("A", 0, 3),
+        ("B", 1, 1),
+    ]
+    assert [s.row for s in ExcelSegments.get_segments("f1", "A", skip=1, limit=1)] == [
+        5
+    ]
+    assert [
+        (s.sheet, s.row) for s in ExcelSegments.iter_segments("f1", batch_size=1)
+    ] == [
+        ("A", 2),
+        ("A", 5),
+        ("A", 9),
+        ("B", 1),
+    ]
+    assert ExcelSegments.get_segment("f1", "B", 1).title == "B 1"
+
+    # Saving again replaces the file's segments
+    assert ExcelSegments.insert_sheets("f1", [_sheet("A", [1])]) == 1
+    assert ExcelSegments.delete_by_file_id("f1")
+    assert not ExcelSegments.has_segments("f1")
+
+
+def test_sheet_names_keep_empty_sheets_in_workbook_order(engine):
+    ExcelSegments.insert_sheets(
+        "f1", [_sheet("A", [1]), _sheet("Empty", []), _sheet("C", [1, 2])]
+    )
+
+    sheets = ExcelSegments.get_sheets("f1", ["A", "Empty", "C"])
+    assert [(s.name, s.sheet_index, s.segment_count) for s in sheets] == [
+        ("A", 0, 1),
+        ("Empty", 1, 0),
+        ("C", 2, 2),
+    ]
+
+
+def test_legacy_markdown_is_parsed_with_empty_sheets():
+    sheets = parse_excel_segment_markdown(LEGACY_MARKDOWN)
+
+    assert [sheet["name"] for sheet in sheets] == ["Intro", "Empty", "Specs"]
+    assert sheets[0]["segments"][0] == {
+        "title": "Welcome",
+        "content": "hello\nworld",
+        "questions": "what is this?",
+        "row": 1,
+    }
+    assert [s["row"] for s in sheets[0]["segments"]] == [1, 2]
+    assert sheets[1]["segments"] == []
+
+
+@pytest.mark.parametrize(
+    "module", ["open_webui.routers.rag_api", "open_webui.agent.rag_api"]
+)
+def test_legacy_markdown_file_is_backfilled_on_first_read(engine, module):
+    router = importlib.import_module(module)
+    _insert_file("f1", {"content": LEGACY_MARKDOWN})
+
+    if module.endswith("routers.rag_api"):
+        listed = asyncio.run(router.get_saved_excel_file_sheets("f1", user=USER))
+        assert [(s["name"], s["segment_count"]) for s in listed.sheets] == [
+            ("Intro", 2),
+            ("Empty", 0),
+            ("Specs", 1),
+        ]
+        full = asyncio.run(
+            router.get_saved_excel_file_segments(
+                "f1", sheet=None, skip=0, limit=None, user=USER
+            )
+        )
+    else:
+        full = asyncio.run(router.get_saved_excel_file_segments("f1", user=USER))
+
+    assert [(s["name"], len(s["segments"])) for s in full.sheets] == [
+        ("Intro", 2),
+        ("Empty", 0),
+        ("Specs", 1),
+    ]
+    assert full.sheets[0]["segments"][0]["questions"] == "what is this?"
+    assert Files.get_file_by_id("f1").data["sheets"][1] == {
+        "name": "Empty",
+        "segment_count": 0,
+    }
+    # Later reads come from the table only
+    assert (
+        ExcelSegments.backfill_from_file_data("f1", Files.get_file_by_id("f1").data)
+        is None
+    )
+
+
+def test_sheet_pagination_and_structured_backfill(engine):
+    router = importlib.import_module("open_webui.routers.rag_api")
+    _insert_file("f1", {"sheets_data": [_sheet("A", [3, 1, 2]), _sheet("B", [])]})
+
+    def segments(**kwargs):
+        params = {"sheet": None, "skip": 0, "limit": None, **kwargs}
+        return asyncio.run(
+            router.get_saved_excel_file_segments("f1", user=USER, **params)
+        )
+
+    page = segments(sheet="A", skip=1, limit=1)
+    assert [s["row"] for s in page.sheets[0]["segments"]] == [2]
+    assert (page.total, page.skip, page.limit) == (3, 1, 1)
+
+    empty = segments(sheet="B")
+    assert empty.total == 0 and empty.sheets[0]["segments"] == []
+
+    with pytest.raises(router.HTTPException) as e:
+        segments(sheet="missing")
+    assert e.value.status_code == 404
+
+    other = SimpleNamespace(id="u2", role="user")
+    with pytest.raises(router.HTTPException) as e:
+        asyncio.run(router.get_saved_excel_file_sheets("f1", user=other))
+    assert e.value.status_code == 403
+
+
+def test_reads_skip_the_workbook_markdown_after_the_first(engine, monkeypatch):
+    router = importlib.import_module("open_webui.routers.rag_api")
+    # Every sheet is empty, so the table never gets a row for this file
+    _insert_file("f1", {"content": "# Empty\n\n# Blank"})
+    _insert_file("f2", {"content": "# A\n## t\nc", "segments_indexed": True})
+    ExcelSegments.insert_sheets("f2", [_sheet("A", [1])])
+
+    listed = asyncio.run(router.get_saved_excel_file_sheets("f1", user=USER))
+    assert [(s["name"], s["segment_count"]) for s in listed.sheets] == [
+        ("Empty", 0),
+        ("Blank", 0),
+    ]
+
+    full_reads, writes = [], []
+    monkeypatch.setattr(Files, "get_file_by_id", lambda id: full_reads.append(id))
+    monkeypatch.setattr(
+        Files, "update_file_data_by_id", lambda id, data: writes.append(id)
+    )
+    for file_id in ("f1", "f2", "f1"):
+        asyncio.run(router.get_saved_excel_file_sheets(file_id, user=USER))
+    page = asyncio.run(
+        router.get_saved_excel_file_segments(
+            "f2", sheet="A", skip=0, limit=10, user=USER
+        )
+    )
+
+    assert full_reads == [] and writes == []
+    assert [s["row"] for s in page.sheets[0]["segments"]] == [1]
+    assert ExcelSegments.get_file("f2").data == {
+        "source_file": "book",
+        "segments_indexed": True,
+    }
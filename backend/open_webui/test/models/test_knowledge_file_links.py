@@ -0,0 +1,205 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from open_webui.models.files import File
+from open_webui.models.knowledge import Knowledge, KnowledgeForm, Knowledges
+from open_webui.models.knowledge_file_link import KnowledgeFileLink, KnowledgeFileLinks
+from open_webui.models.knowledge_logs import KnowledgeLog
+
+MODULES = [
+    "open_webui.models.files",
+    "open_webui.models.knowledge",
+    "open_webui.models.knowledge_file_link",
+    "open_webui.models.knowledge_logs",
+]
+ADMIN = SimpleNamespace(id="u1", name="admin", email="a@x", role="admin")
+
+
+@pytest.fixture
+def engine(memory_db):
+    engine = memory_db([Knowledge, KnowledgeFileLink, File, KnowledgeLog], MODULES)
+    with engine.begin() as conn:
+        for i in range(5):
+            conn.execute(
+                File.__table__.insert().values(
+                    id=f"f{i}",
+                    user_id="u1",
+                    filename=f"f{i}.txt",
+                    data={"content": "x"},
+                    meta={"name": f"f{i}.txt"},
+                    created_at=i,
+                    updated_at=i,
+                )
+            )
+    return engine
+
+
+def _stored_data(engine, knowledge_id):
+    with engine.connect() as conn:
+        return (
+            conn.execute(
+                Knowledge.__table__.select().where(Knowledge.id == knowledge_id)
+            )
+            .first()
+            .data
+        )
+
+
+def test_file_ids_are_derived_from_links(engine):
+    knowledge = Knowledges.insert_new_knowledge(
+        "u1", KnowledgeForm(name="kb", description="", data={"file_ids": ["f0", "f1"]})
+    )
+    assert knowledge.data["file_ids"] == ["f0", "f1"]
+    assert "file_ids" not in _stored_data(engine, knowledge.id)
+
+    # Single-file add/remove touch one link; a second add is still a success
+    assert Knowledges.add_file_to_knowledge_by_id(knowledge.id, "f2")
+    assert Knowledges.add_file_to_knowledge_by_id(knowledge.id, "f2")
+    assert Knowledges.remove_file_from_knowledge_by_id(knowledge.id, "f0")
+    assert not Knowledges.remove_file_from_knowledge_by_id(knowledge.id, "f0")
+    assert Knowledges.get_knowledge_by_id(knowledge.id).data["file_ids"] == ["f1", "f2"]
+
+    # Writes of a whole file_ids list are applied as a diff
+    Knowledges.update_knowledge_data_by_id(knowledge.id, {"file_ids": ["f2", "f3"]})
+    assert Knowledges.get_knowledge_by_id(knowledge.id).data["file_ids"] == ["f2", "f3"]
+
+    Knowledges.delete_knowledge_by_id(knowledge.id)
+    assert KnowledgeFileLinks.count_files_by_knowledge_id(knowledge.id) == 0
+
+
+def test_listing_and_pagination_skip_deleted_files(engine):
+    knowledge = Knowledges.insert_new_knowledge(
+        "u1", KnowledgeForm(name="kb", description="", data=None)
+    )
+    Knowledges.add_files_to_knowledge_by_id(knowledge.id, ["f0", "f1", "f2", "f3"])
+    with engine.begin() as conn:
+        conn.execute(File.__table__.delete().where(File.id == "f3"))
+
+    files = KnowledgeFileLinks.get_file_metadatas_by_knowledge_ids([knowledge.id])
+    assert [f.id for f in files[knowledge.id]] == ["f2", "f1", "f0"]
+    page = KnowledgeFileLinks.get_file_metadatas_by_knowledge_id(
+        knowledge.id, skip=1, limit=1
+    )
+    assert [f.id for f in page] == ["f1"]
+    assert KnowledgeFileLinks.count_existing_files_by_knowledge_id(knowledge.id) == 3
+    assert Knowledges.get_knowledge_bases()[0].data["file_ids"] == ["f0", "f1", "f2"]
+
+
+def test_delete_all_knowledge_drops_links(engine):
+    knowledge = Knowledges.insert_new_knowledge(
+        "u1", KnowledgeForm(name="kb", description="", data={"file_ids": ["f0"]})
+    )
+    assert Knowledges.delete_all_knowledge()
+    assert KnowledgeFileLinks.count_files_by_knowledge_id(knowledge.id) == 0
+
+
+def test_router_add_remove_and_paged_files(engine, monkeypatch):
+    router = importlib.import_module("open_webui.routers.knowledge")
+    processed = []
+    monkeypatch.setattr(
+        router, "process_file", lambda request, form, user: processed.append(form)
+    )
+    monkeypatch.setattr(
+        router, "VECTOR_DB_CLIENT", SimpleNamespace(delete=lambda **kwargs: None)
+    )
+
+    knowledge = Knowledges.insert_new_knowledge(
+        "u1", KnowledgeForm(name="kb", description="", data=None)
+    )
+    form = router.KnowledgeFileIdForm
+
+    # Upload with collection_name already linked f0: adding it again succeeds
+    KnowledgeFileLinks.create_link(knowledge.id, "f0")
+    added = router.add_file_to_knowledge_by_id(
+        None, knowledge.id, form(file_id="f0"), ADMIN
+    )
+    assert added.file.id == "f0"
+    added = router.add_file_to_knowledge_by_id(
+        None, knowledge.id, form(file_id="f1"), ADMIN
+    )
+    # Only the changed file is returned, not the whole list
+    assert added.file.id == "f1" and added.files is None
+    assert len(processed) == 2
+
+    page = asyncio.run(
+        router.get_knowledge_files_by_id(knowledge.id, skip=1, limit=1, user=ADMIN)
+    )
+    assert [f.id for f in page.items] == ["f0"] and page.total == 2
+
+    removed = router.remove_file_from_knowledge_by_id(
+        knowledge.id, form(file_id="f1"), delete_file=False, user=ADMIN
+    )
+    assert removed.file.id == "f1"
+    page = asyncio.run(
+        router.get_knowledge_files_by_id(knowledge.id, skip=0, limit=50, user=ADMIN)
+    )
+    assert [f.id for f in page.items] == ["f0"]
+    with pytest.raises(router.HTTPException):
+        router.remove_file_from_knowledge_by_id(
+            knowledge.id, form(file_id="f1"), delete_file=False, user=ADMIN
+        )
+
+    listed = asyncio.run(router.get_knowledge(user=ADMIN))
+    assert [[f.id for f in kb.files] for kb in listed] == [["f0"]]
+
+
+def test_backfill_migration_matches_links_to_file_ids(engine):
+    migration = importlib.import_module(
+        "open_webui.migrations.versions.backfill_knowledge_file_links"
+    )
+    knowledge = Knowledge.__table__
+    link = KnowledgeFileLink.__table__
+    with engine.begin() as conn:
+        for id, data in [
+            ("kb1", {"file_ids": ["f0", "f1"], "extra": 1}),
+            ("kb2", None),
+        ]:
+            conn.execute(
+                knowledge.insert().values(
+                    id=id,
+                    user_id="u1",
+                    name=id,
+                    description="",
+                    data=data,
+                    created_at=0,
+                    updated_at=0,
+                )
+            )
+        # Stale links that baseline never deleted: f2 removed from kb1, f3
+        # from kb2, and a knowledge base that no longer exists
+        for knowledge_id, file_id in [
+            ("kb1", "f1"),
+            ("kb1", "f2"),
+            ("kb2", "f3"),
+            ("gone", "f4"),
+        ]:
+            conn.execute(
+                link.insert().values(
+                    knowledge_id=knowledge_id,
+                    file_id=file_id,
+                    is_indexed=False,
+                    created_at=0,
+                    updated_at=0,
+                )
+            )
+
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+    with engine.connect() as conn:
+        links = sorted(conn.execute(sa.select(link.c.knowledge_id, link.c.file_id)))
+    assert links == [("kb1", "f0"), ("kb1", "f1")]
+    assert _stored_data(engine, "kb1") == {"extra": 1}
+
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.downgrade()
+
+    assert sorted(_stored_data(engine, "kb1")["file_ids"]) == ["f0", "f1"]
+    assert _stored_data(engine, "kb2") == {"file_ids": []}
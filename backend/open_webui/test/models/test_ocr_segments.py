@@ -0,0 +1,209 @@
+import json
+
+import pytest
+
+from open_webui.models.ocr_segments import OcrSegment, OcrSegments
+from open_webui.routers.knowledge import (
+    _import_legacy_segments_manifest,
+    _iter_file_lines,
+    _iter_markdown_sections,
+    _split_markdown_sections,
+    _write_segments_to_disk,
+)
+
+MODULES = ["open_webui.models.ocr_segments"]
+
+MANUAL = "\n".join(
+    [
+        "# 产品手册",
+        "目录",
+        "一、概述",
+        "二、安装",
+        "三、维护",
+        "#page 1",
+        "一、概述",
+        "本手册介绍产品。",
+        "1. 适用范围",
+        "适用于所有型号。",
+        "#page 2",
+        "二、安装",
+        "## 2.1. 准备",
+        "检查包装。",
+        "#page 3",
+        "2.2. 接线",
+        "按图接线。",
+        "三、维护",
+        "# Page 4",
+        "定期清洁。",
+        "四、附录",
+    ]
+)
+NUMBERED = "\n".join(
+    [
+        "前言文字",
+        "1. 第一节",
+        "内容A",
+        "1.1. 小节",
+        "内容B",
+        "#page 5",
+        "2、第二节",
+        "内容C",
+        "3. 仅标题",
+    ]
+)
+LEVEL3 = "\r\n".join(["1.1.1. 甲", "x", "", "1.1.2. 乙", "y"])
+
+# (heading, level, content) produced by the in-memory splitter before the
+# streaming rewrite, for the samples above
+LEGACY_OUTPUT = {
+    "manual": [
+        ("三、维护", 1, "三、维护"),
+        ("一、概述", 1, "一、概述\n本手册介绍产品。\n1. 适用范围\n适用于所有型号。"),
+        ("二、安装", 1, "二、安装\n## 2.1. 准备\n检查包装。\n2.2. 接线\n按图接线。"),
+        ("三、维护", 1, "三、维护\n定期清洁。"),
+    ],
+    "numbered": [
+        ("1. 第一节", 2, "1. 第一节\n内容A"),
+        ("1.1. 小节", 2, "1.1. 小节\n内容B"),
+        ("2、第二节", 2, "2、第二节\n内容C"),
+    ],
+    "level3": [
+        ("1.1.1. 甲", 3, "1.1.1. 甲\nx"),
+        ("1.1.2. 乙", 3, "1.1.2. 乙\ny"),
+    ],
+}
+SAMPLES = {"manual": MANUAL, "numbered": NUMBERED, "level3": LEVEL3}
+
+
+@pytest.fixture
+def engine(memory_db):
+    return memory_db([OcrSegment], MODULES)
+
+
+@pytest.fixture
+def knowledge_dir(tmp_path):
+    knowledge_dir = tmp_path / "kb1"
+    (knowledge_dir / "ocr_result_t1").mkdir(parents=True)
+    return knowledge_dir
+
+
+@pytest.mark.parametrize("name", list(SAMPLES))
+def test_streaming_segmenter_matches_legacy_output(tmp_path, name):
+    path = tmp_path / "result.mmd"
+    path.write_bytes(SAMPLES[name].encode("utf-8"))
+
+    streamed = list(_iter_markdown_sections(lambda: _iter_file_lines(path)))
+
+    assert [
+        (s["heading"], s["level"], s["content"]) for s in streamed
+    ] == LEGACY_OUTPUT[name]
+    assert streamed == _split_markdown_sections(SAMPLES[name])
+
+
+def test_sections_carry_page_ranges():
+    sections = _split_markdown_sections(MANUAL)
+
+    assert [(s["page_start"], s["page_end"]) for s in sections] == [
+        (None, None),
+        (1, 1),
+        (2, 3),
+        (3, 4),
+    ]
+    assert _split_markdown_sections(LEVEL3, max_heading_level=2) == []
+
+
+def test_segments_round_trip_through_the_table(engine, knowledge_dir):
+    sections = _split_markdown_sections(MANUAL)
+    assert _write_segments_to_disk(knowledge_dir, "t1", sections, "result.mmd") == {
+        "segment_count": 4,
+        "changed_count": 4,
+    }
+
+    summary = OcrSegments.get_summary("kb1", "t1")
+    assert (summary.segment_count, summary.page_count, summary.source_file) == (
+        4,
+        4,
+        "result.mmd",
+    )
+
+    segments = OcrSegments.get_segments("kb1", "t1")
+    assert [s.segment_id for s in segments] == [f"segment_{i:03d}" for i in range(1, 5)]
+    assert [(s.heading, s.level) for s in segments] == [
+        (h, l) for h, l, _ in LEGACY_OUTPUT["manual"]
+    ]
+    for segment, section in zip(segments, sections):
+        assert (knowledge_dir / segment.file).read_text(encoding="utf-8") == section[
+            "content"
+        ] + "\n"
+
+    assert [
+        s.position for s in OcrSegments.get_segments("kb1", "t1", skip=1, limit=2)
+    ] == [2, 3]
+    assert [s.position for s in OcrSegments.get_segments("kb1", "t1", page=3)] == [3, 4]
+    assert (
+        OcrSegments.get_segment_by_id("kb1", "t1", "segment_002").preview == "一、概述"
+    )
+
+
+def test_resegmenting_only_rewrites_changed_segments(engine, knowledge_dir):
+    sections = _split_markdown_sections(MANUAL)
+    _write_segments_to_disk(knowledge_dir, "t1", sections, "result.mmd")
+    before = OcrSegments.get_segment_hashes("kb1", "t1")
+
+    edited = [dict(s) for s in sections[:3]]
+    edited[2]["content"] += "\n补充说明。"
+
+    assert _write_segments_to_disk(knowledge_dir, "t1", edited, "result.mmd") == {
+        "segment_count": 3,
+        "changed_count": 1,
+    }
+    after = OcrSegments.get_segment_hashes("kb1", "t1")
+    # rows keep their ids; the segment past the new end is dropped with its file
+    assert sorted(after) == [1, 2, 3]
+    assert [after[p] == before[p] for p in (1, 2)] == [True, True]
+    assert after[3][0] == before[3][0] and after[3][1] != before[3][1]
+    assert not (
+        knowledge_dir / "ocr_result_t1" / "segments" / "segment_004.mmd"
+    ).exists()
+
+    # overwrite=False keeps the stale tail
+    _write_segments_to_disk(knowledge_dir, "t1", sections, "result.mmd")
+    kept = _write_segments_to_disk(
+        knowledge_dir, "t1", sections[:2], "result.mmd", overwrite=False
+    )
+    assert OcrSegments.get_summary("kb1", "t1").segment_count == 4
+    assert kept == {"segment_count": 4, "changed_count": 0}
+
+
+def test_legacy_manifest_is_imported_once(engine, knowledge_dir):
+    segments_dir = knowledge_dir / "ocr_result_t1" / "segments"
+    segments_dir.mkdir()
+    (segments_dir / "segment_001.mmd").write_text("一、概述\n内容\n", encoding="utf-8")
+    manifest = {
+        "source_file": "result.mmd",
+        "segments": [
+            {
+                "id": "segment_001",
+                "order": 1,
+                "heading": "一、概述",
+                "level": 1,
+                "file": "ocr_result_t1/segments/segment_001.mmd",
+                "preview": "一、概述",
+            },
+            # file missing on disk: skipped
+            {
+                "id": "segment_002",
+                "order": 2,
+                "file": "ocr_result_t1/segments/segment_002.mmd",
+            },
+        ],
+    }
+    (segments_dir / "index.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+    assert _import_legacy_segments_manifest(knowledge_dir, "t1")
+    assert not (segments_dir / "index.json").exists()
+    assert [
+        (s.segment_id, s.heading, s.source_file)
+        for s in OcrSegments.get_segments("kb1", "t1")
+    ] == [("segment_001", "一、概述", "result.mmd")]
+    assert not _import_legacy_segments_manifest(knowledge_dir, "t1")
@@ -0,0 +1,110 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from open_webui.retrieval.web.pipeline import (
+    EmbeddingCache,
+    WebPageCache,
+    load_web_pages,
+    normalize_url,
+)
+
+
+class _FakeLoader:
+    def __init__(self, urls, delays, stats):
+        self.urls = urls
+        self.delays = delays
+        self.stats = stats
+
+    async def alazy_load(self):
+        for url in self.urls:
+            domain = url.split("/")[2]
+            self.stats["active"][domain] = self.stats["active"].get(domain, 0) + 1
+            self.stats["peak"][domain] = max(
+                self.stats["peak"].get(domain, 0), self.stats["active"][domain]
+            )
+            try:
+                await asyncio.sleep(self.delays.get(url, 0.01))
+            finally:
+                self.stats["active"][domain] -= 1
+            self.stats["loads"].append(url)
+            yield Document(page_content=f"page {url}", metadata={"source": url})
+
+
+def _loader_factory(delays=None):
+    stats = {"active": {}, "peak": {}, "loads": []}
+    return (lambda urls: _FakeLoader(urls, delays or {}, stats)), stats
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443/a/?b=2&utm_source=x&a=1#top") == (
+        "https://example.com/a?a=1&b=2"
+    )
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/") == "http://example.com:8080/"
+
+
+def test_per_domain_limit_and_cache_reuse():
+    get_loader, stats = _loader_factory()
+    cache = WebPageCache(size=16, ttl=60)
+    urls = [f"https://a.com/{i}" for i in range(6)] + ["https://b.com/1"]
+
+    docs = asyncio.run(
+        load_web_pages(
+            urls, get_loader, concurrency=10, per_domain_limit=2, cache=cache
+        )
+    )
+    assert [doc.metadata["source"] for doc in docs] == urls
+    assert stats["peak"]["a.com"] == 2
+
+    # Overlapping search: same page with tracking params comes from the cache
+    again = asyncio.run(
+        load_web_pages(
+            ["https://a.com/1?utm_source=news", "https://c.com/"],
+            get_loader,
+            cache=cache,
+        )
+    )
+    assert [doc.metadata["source"] for doc in again] == [
+        "https://a.com/1?utm_source=news",
+        "https://c.com/",
+    ]
+    assert stats["loads"].count("https://a.com/1") == 1
+
+
+def test_deadline_returns_loaded_pages():
+    get_loader, _ = _loader_factory({"https://slow.com/": 5})
+    cache = WebPageCache(size=16, ttl=60)
+
+    docs = asyncio.run(
+        load_web_pages(
+            ["https://slow.com/", "https://fast.com/"],
+            get_loader,
+            deadline=0.2,
+            cache=cache,
+        )
+    )
+    assert [doc.metadata["source"] for doc in docs] == ["https://fast.com/"]
+    assert cache.get_documents("https://slow.com/") is None
+
+
+def test_embedding_cache_embeds_only_new_chunks():
+    calls = []
+
+    def embedding_function(texts, prefix=None, user=None):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    cache = EmbeddingCache(size=16)
+    assert cache.embed(["a", "bb", "a"], embedding_function, "m") == [
+        [1.0],
+        [2.0],
+        [1.0],
+    ]
+    assert cache.embed(["bb", "ccc"], embedding_function, "m") == [[2.0], [3.0]]
+    cache.embed(["bb"], embedding_function, "other-model")
+
+    assert calls == [["a", "bb"], ["ccc"], ["bb"]]
+    # Stored as float32 arrays rather than lists of Python floats
+    entry = next(iter(cache._entries.values()))
+    assert entry.typecode == "f"
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from pathlib import Path as PathType
+
+# Ensure backend package is importable
+backend_dir = PathType(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from open_webui.services.federated_retrieval import (
+    RetrievalBackend,
+    federated_search,
+)
+
+
+def scores_sorted(scores):
+    return all(a >= b for a, b in zip(scores, scores[1:]))
+
+
+class _StaticBackend(RetrievalBackend):
+    def __init__(self, name, contents, delay=0.0, error=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.contents = contents
+        self.delay = delay
+        self.error = error
+
+    async def search(self, question, top_k):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [
+            {"content": c, "metadata": {"origin": self.name}, "score": 1.0 - i * 0.1}
+            for i, c in enumerate(self.contents[:top_k])
+        ]
+
+
+def test_federated_rrf_fusion_and_dedupe():
+    local = _StaticBackend("local", ["a", "b", "c"])
+    ragflow = _StaticBackend("ragflow", ["b", "d", "a  "])  # "a  " dedupes with "a"
+
+    result = asyncio.run(federated_search("q", [local, ragflow], top_k=10))
+
+    contents = [d["content"] for d in result.documents]
+    assert sorted(contents) == ["a", "b", "c", "d"]
+    # b is ranked 2nd and 1st, a 1st and 3rd: both beat single-backend hits
+    assert set(contents[:2]) == {"a", "b"}
+    assert scores_sorted(result.scores)
+    assert not result.partial
+    sources = result.documents[0]["metadata"]["sources"]
+    assert {s["backend"] for s in sources} == {"local", "ragflow"}
+
+
+def test_federated_returns_partial_results_on_deadline():
+    fast = _StaticBackend("local", ["a", "b"])
+    slow = _StaticBackend("ragflow", ["c"], delay=5.0, timeout=0.05)
+    broken = _StaticBackend("other", ["d"], error=RuntimeError("down"))
+
+    result = asyncio.run(federated_search("q", [fast, slow, broken], top_k=5))
+
+    assert [d["content"] for d in result.documents] == ["a", "b"]
+    assert result.partial
+    statuses = {b.name: b.status for b in result.backends}
+    assert statuses == {"local": "ok", "ragflow": "timeout", "other": "error"}
+    assert result.retrieval_time < 1.0
@@ -12,18 +12,18 @@ backend_dir = PathType(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(backend_dir))
 
 from open_webui.services.ragflow_server import RagFlowClient
+from open_webui.services.ragflow import transport as transport_module
+from open_webui.services.ragflow.transport import RagFlowTransport
 
 
 class _FakeResp:
     def __init__(self, status: int, payload: dict):
         self.status = status
+        self.headers = {}
         self._payload = payload
 
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
+    def release(self):
+        pass
 
     async def text(self):
         return json.dumps(self._payload)
@@ -36,15 +36,17 @@ class _FakeSession:
     def __init__(self, status: int, payload: dict):
         self.status = status
         self.payload = payload
+        self.closed = False
 
-    async def __aenter__(self):
-        return self
+    async def request(self, *args, **kwargs):
+        return _FakeResp(self.status, self.payload)
 
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
 
-    def post(self, *args, **kwargs):
-        return _FakeResp(self.status, self.payload)
+def _fake_transport(monkeypatch, status: int, payload: dict) -> RagFlowTransport:
+    transport = RagFlowTransport(max_retries=0)
+    session = _FakeSession(status, payload)
+    monkeypatch.setattr(transport, "_get_session", lambda: session)
+    return transport
 
 
 def test_ragflow_client_retrieve_success(monkeypatch):
@@ -66,13 +68,10 @@ def test_ragflow_client_retrieve_success(monkeypatch):
         },
     }
 
-    # Patch aiohttp.ClientSession
-    import aiohttp
-
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: _FakeSession(200, payload))
+    transport = _fake_transport(monkeypatch, 200, payload)
 
     async def run():
-        client = RagFlowClient(base_url="http://fake")
+        client = RagFlowClient(base_url="http://fake", transport=transport)
         docs, scores = await client.retrieve("q", ["kb1"], None, 5)
         assert len(docs) == 1
         assert docs[0]["content"] == "ragflow content"
@@ -83,18 +82,112 @@ def test_ragflow_client_retrieve_success(monkeypatch):
 
 def test_ragflow_client_retrieve_error(monkeypatch):
     bad = {"code": 102, "message": "`datasets` is required."}
-    import aiohttp
-
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: _FakeSession(200, bad))
+    transport = _fake_transport(monkeypatch, 200, bad)
 
     async def run():
-        client = RagFlowClient(base_url="http://fake")
+        client = RagFlowClient(base_url="http://fake", transport=transport)
         with pytest.raises(RuntimeError):
             await client.retrieve("q", [], None, 5)
 
     asyncio.run(run())
 
 
+def test_ragflow_client_retrieve_records_metrics(monkeypatch):
+    payload = {"code": 0, "data": {"chunks": [], "doc_aggs": [], "total": 0}}
+    transport = _fake_transport(monkeypatch, 200, payload)
+
+    async def run():
+        client = RagFlowClient(base_url="http://fake", transport=transport)
+        await client.retrieve("q", ["kb1"], None, 5)
+
+    asyncio.run(run())
+    ops = transport.get_metrics()["operations"]
+    assert ops["retrieval.retrieve"]["count"] == 1
+    assert ops["retrieval.retrieve"]["errors"] == 0
+
+
+class _ScriptedSession:
+    """Returns the scripted statuses (or raises the scripted errors) in order."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.closed = False
+
+    async def request(self, *args, **kwargs):
+        self.calls += 1
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        status, headers = step if isinstance(step, tuple) else (step, {})
+        resp = _FakeResp(status, {"code": 0})
+        resp.headers = headers
+        return resp
+
+
+def _scripted_transport(monkeypatch, script, **kwargs):
+    transport = RagFlowTransport(backoff_base=0.1, backoff_max=1.0, **kwargs)
+    session = _ScriptedSession(script)
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(transport, "_get_session", lambda: session)
+    monkeypatch.setattr(transport_module.asyncio, "sleep", fake_sleep)
+    # Full jitter draws from [0, cap]; take the cap to check the schedule
+    monkeypatch.setattr(transport_module.random, "uniform", lambda low, high: high)
+    return transport, session, delays
+
+
+def _send(transport, method="GET", **kwargs):
+    async def run():
+        async with transport.request(
+            "test.op", method, "http://fake", **kwargs
+        ) as resp:
+            return resp.status
+
+    return asyncio.run(run())
+
+
+def test_transport_retries_transient_failures_with_backoff(monkeypatch):
+    import aiohttp
+
+    transport, session, delays = _scripted_transport(
+        monkeypatch,
+        [aiohttp.ClientOSError(), 502, (503, {"Retry-After": "0.5"}), 200],
+        max_retries=3,
+    )
+
+    assert _send(transport) == 200
+    assert session.calls == 4
+    # base * 2^attempt, except where the server asked for Retry-After
+    assert delays == [0.2, 0.4, 0.5]
+    ops = transport.get_metrics()["operations"]["test.op"]
+    assert (ops["count"], ops["retries"], ops["errors"]) == (1, 3, 0)
+
+
+def test_transport_gives_up_after_max_retries(monkeypatch):
+    transport, session, delays = _scripted_transport(
+        monkeypatch, [500, 500, 500, 500, 200], max_retries=2
+    )
+
+    assert _send(transport) == 500
+    assert session.calls == 3
+    assert delays == [0.2, 0.4]
+    ops = transport.get_metrics()["operations"]["test.op"]
+    assert (ops["retries"], ops["errors"]) == (2, 1)
+
+
+def test_transport_only_retries_unprocessed_posts(monkeypatch):
+    transport, session, delays = _scripted_transport(monkeypatch, [500, 200])
+    assert _send(transport, "POST") == 500
+    assert session.calls == 1 and delays == []
+
+    transport, session, delays = _scripted_transport(monkeypatch, [429, 503, 200])
+    assert _send(transport, "POST") == 200
+    assert session.calls == 3 and len(delays) == 2
+
 
 def test_ragflow_client_live_optional():
     """真实调用 RagFlow（仅当设置环境变量时运行）。
@@ -127,7 +220,6 @@ def test_ragflow_client_live_optional():
     asyncio.run(run())
 
 
-
 if __name__ == "__main__":
     """直接运行本文件，联通测试 RagFlow 服务。
 
@@ -0,0 +1,153 @@
+import asyncio
+import sys
+from pathlib import Path as PathType
+
+# Ensure backend package is importable
+backend_dir = PathType(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from open_webui.services.ragflow.migration import (
+    COMPLETED,
+    PARTIAL,
+    ChunkMigrationEngine,
+    ChunkTask,
+    MigrationJobStore,
+    segment_key,
+)
+
+
+class _FakeChunkClient:
+    def __init__(self, fail_contents=()):
+        self.fail_contents = set(fail_contents)
+        self.chunks = {}  # document_id -> list of chunks
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def add_chunk(self, dataset_id, document_id, content, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if content in self.fail_contents:
+                raise RuntimeError("boom")
+            chunk = {
+                "id": f"c{sum(map(len, self.chunks.values()))}",
+                "content": content,
+            }
+            self.chunks.setdefault(document_id, []).append(chunk)
+            return {"chunk": chunk}
+        finally:
+            self.in_flight -= 1
+
+    async def list_chunks(
+        self, dataset_id, document_id, page=None, page_size=None, **kwargs
+    ):
+        chunks = self.chunks.get(document_id, [])
+        start = ((page or 1) - 1) * page_size
+        return {"chunks": chunks[start : start + page_size]}
+
+
+def _tasks(n):
+    return [
+        ChunkTask(
+            key=segment_key("file", "sheet", row, content=f"content {row}"),
+            dataset_id="ds",
+            document_id="doc",
+            content=f"content {row}",
+        )
+        for row in range(n)
+    ]
+
+
+def test_migration_bounded_concurrency_and_resume(tmp_path):
+    store = MigrationJobStore(tmp_path)
+    client = _FakeChunkClient(fail_contents={"content 3"})
+    tasks = _tasks(20)
+
+    async def run():
+        job = store.create("user")
+        await ChunkMigrationEngine(client, concurrency=4).run(job, tasks)
+        assert job.status == PARTIAL
+        assert job.created == 19 and job.failed == 1
+        assert client.max_in_flight <= 4
+
+        # Resume from the checkpoint file: only the failed chunk is re-sent
+        client.fail_contents.clear()
+        resumed = MigrationJobStore(tmp_path).get(job.job_id)
+        await ChunkMigrationEngine(client, concurrency=4).run(resumed, tasks)
+        assert resumed.status == COMPLETED
+        assert resumed.created == 1 and resumed.skipped == 19
+        assert len(client.chunks["doc"]) == 20
+
+    asyncio.run(run())
+
+
+def test_migration_reconcile_skips_chunks_already_in_ragflow(tmp_path):
+    store = MigrationJobStore(tmp_path)
+    client = _FakeChunkClient()
+    tasks = _tasks(5)
+
+    async def run():
+        # Chunks uploaded, but the checkpoint never recorded them
+        for task in tasks[:3]:
+            await client.add_chunk(task.dataset_id, task.document_id, task.content)
+
+        job = store.create("user")
+        await ChunkMigrationEngine(client, concurrency=2).run(
+            job, tasks, reconcile=True
+        )
+        assert job.skipped == 3 and job.created == 2
+        assert len(client.chunks["doc"]) == 5
+        assert job.to_status()["progress"] == 100.0
+
+    asyncio.run(run())
+
+
+def test_migration_reconcile_keeps_identical_segments_apart(tmp_path):
+    store = MigrationJobStore(tmp_path)
+    client = _FakeChunkClient()
+    # Three rows with the same content (overwrite mode does not dedupe them)
+    tasks = [
+        ChunkTask(
+            key=segment_key("file", "sheet", row, content="same"),
+            dataset_id="ds",
+            document_id="doc",
+            content="same",
+        )
+        for row in range(3)
+    ]
+
+    async def run():
+        job = store.create("user")
+        await ChunkMigrationEngine(client).run(job, tasks[:1])
+
+        # Row 1 reached RagFlow but its checkpoint entry was lost; row 2 never did
+        await client.add_chunk("ds", "doc", "same")
+        await ChunkMigrationEngine(client).run(job, tasks, reconcile=True)
+        assert job.skipped == 2 and job.created == 1
+        assert len(client.chunks["doc"]) == 3
+        assert len(set(job.completed.values())) == 3
+
+    asyncio.run(run())
+
+
+def test_finished_jobs_are_evicted_from_memory(tmp_path):
+    store = MigrationJobStore(tmp_path, finished_ttl=60, max_finished=1)
+    client = _FakeChunkClient()
+
+    async def run():
+        jobs = [store.create("user") for _ in range(4)]
+        for job in jobs[:3]:
+            await ChunkMigrationEngine(client).run(job, _tasks(1))
+        jobs[0].finished_at -= 120
+        return jobs
+
+    jobs = asyncio.run(run())
+    new_job = store.create("user")
+
+    # jobs[0] expired, jobs[1] is over the cap; the unfinished job stays
+    assert set(store._jobs) == {jobs[2].job_id, jobs[3].job_id, new_job.job_id}
+
+    # evicted jobs are still served from their checkpoint
+    reloaded = store.get(jobs[0].job_id)
+    assert reloaded is not jobs[0] and reloaded.status == COMPLETED
@@ -0,0 +1,77 @@
+import asyncio
+
+from open_webui.socket.utils import ChatEventFramer
+
+
+def _delta(content):
+    return {"type": "chat:completion", "data": {"content": content}}
+
+
+class TestChatEventFramer:
+    def test_deltas_are_coalesced_and_order_is_kept(self):
+        emitted = []
+
+        async def emit(to, payload):
+            emitted.append((to, payload["data"]))
+
+        framer = ChatEventFramer(emit, interval=60)
+        to = ["user:u1", "sid-1"]
+
+        async def run():
+            for content in ("H", "He", "Hel", "Hello"):
+                await framer.send(to, "chat", "msg", _delta(content))
+            await framer.send(
+                to,
+                "chat",
+                "msg",
+                {"type": "chat:completion", "data": {"usage": {"n": 1}}},
+            )
+            pending = framer.get_metrics()["pending_frames"]
+            await framer.send(
+                to, "chat", "msg", {"type": "chat:completion", "data": {"done": True}}
+            )
+            return pending
+
+        pending = asyncio.run(run())
+
+        assert pending == 1
+        assert emitted == [
+            (
+                to,
+                {
+                    "type": "chat:completion",
+                    "data": {"content": "Hello", "usage": {"n": 1}},
+                },
+            ),
+            (to, {"type": "chat:completion", "data": {"done": True}}),
+        ]
+        metrics = framer.get_metrics()
+        assert metrics["events"] == 6
+        assert metrics["coalesced"] == 4
+        assert metrics["emits"] == 2
+        assert metrics["pending_frames"] == 0
+
+    def test_frames_are_sent_after_the_interval(self):
+        emitted = []
+
+        async def emit(to, payload):
+            emitted.append(payload)
+
+        framer = ChatEventFramer(emit, interval=0.01)
+
+        async def run():
+            await framer.send("user:u1", "chat", "msg", _delta("a"))
+            await framer.send("user:u1", "chat", "other", _delta("b"))
+            await framer.send("user:u1", None, None, {"type": "notification"})
+            before = len(emitted)
+            await asyncio.sleep(0.05)
+            return before
+
+        before = asyncio.run(run())
+
+        assert before == 1  # events without a message are not framed
+        assert sorted(payload["message_id"] or "" for payload in emitted) == [
+            "",
+            "msg",
+            "other",
+        ]
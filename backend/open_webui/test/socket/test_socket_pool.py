@@ -0,0 +1,67 @@
+import asyncio
+
+from open_webui.socket.utils import SocketPool
+
+
+def _user(id):
+    return {"id": id, "name": id}
+
+
+class TestSocketPool:
+    def test_sessions_are_tracked_per_user(self):
+        pool = SocketPool()
+
+        async def run():
+            await asyncio.gather(
+                *(pool.add_session(f"sid-{i}", _user("u1")) for i in range(5)),
+                pool.add_session("sid-x", _user("u2")),
+            )
+            await pool.add_session("sid-0", _user("u1"))  # connect + user-join
+
+            sessions = sorted(pool._user_sessions["u1"])
+            room_users = await pool.get_user_ids(["sid-1", "sid-x", "sid-1", "gone"])
+
+            await asyncio.gather(*(pool.remove_session(f"sid-{i}") for i in range(4)))
+            remaining = sorted(pool._user_sessions["u1"])
+            still_active = await pool.is_user_active("u1")
+
+            removed = await pool.remove_session("sid-4")
+            unknown = await pool.remove_session("sid-4")
+            return (
+                sessions,
+                room_users,
+                remaining,
+                still_active,
+                removed,
+                unknown,
+                await pool.get_active_user_ids(),
+            )
+
+        sessions, room_users, remaining, still_active, removed, unknown, active = (
+            asyncio.run(run())
+        )
+
+        assert sessions == [f"sid-{i}" for i in range(5)]
+        assert room_users == ["u1", "u2"]
+        assert remaining == ["sid-4"]
+        assert still_active
+        assert removed == _user("u1")
+        assert unknown is None
+        assert active == ["u2"]
+        assert pool.count_active_users() == 1
+
+    def test_usage_expires_per_session(self):
+        pool = SocketPool()
+
+        async def run():
+            await pool.touch_usage("llama3", "a", now=100)
+            await pool.touch_usage("llama3", "b", now=104)
+            await pool.touch_usage("qwen2", "a", now=100)
+
+            removed = await pool.cleanup_usage(3, now=105)
+            return removed, await pool.get_models_in_use()
+
+        removed, in_use = asyncio.run(run())
+
+        assert removed == ["qwen2"]
+        assert in_use == ["llama3"]
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+from open_webui.socket.utils import StatusEventBuffer
+
+
+def _status(action):
+    return {"action": action, "done": False}
+
+
+class TestStatusEventBuffer:
+    def test_flush_writes_one_batch_per_message(self):
+        writes = []
+        buffer = StatusEventBuffer(
+            lambda chat_id, message_id, statuses: writes.append(
+                (chat_id, message_id, list(statuses))
+            ),
+            interval=60,
+        )
+
+        async def run():
+            for node in ("input_1", "llm_1"):
+                buffer.add("chat", "msg", _status(f"{node}_start"))
+                buffer.add("chat", "msg", _status(f"{node}_end"))
+            buffer.add("chat", "other", _status("web_search"))
+            await buffer.flush("chat", "msg")
+            await buffer.flush("chat", "msg")  # nothing left to write
+            return dict(buffer._timers)
+
+        timers = asyncio.run(run())
+
+        assert writes == [
+            (
+                "chat",
+                "msg",
+                [
+                    _status("input_1_start"),
+                    _status("input_1_end"),
+                    _status("llm_1_start"),
+                    _status("llm_1_end"),
+                ],
+            )
+        ]
+        assert list(timers) == [("chat", "other")]
+
+    def test_timer_persists_pending_statuses_in_order(self):
+        writes = []
+        buffer = StatusEventBuffer(
+            lambda chat_id, message_id, statuses: writes.extend(statuses),
+            interval=0.01,
+        )
+
+        async def run():
+            buffer.add("chat", "msg", _status("first"))
+            await asyncio.sleep(0.05)
+            buffer.add("chat", "msg", _status("second"))
+            buffer.add("chat", "msg", _status("third"))
+            await buffer.flush_all()
+
+        asyncio.run(run())
+
+        assert [status["action"] for status in writes] == ["first", "second", "third"]
+
+    def test_writes_run_on_the_event_loop(self):
+        # The default storage rewrites the whole chat, so a flush must not run
+        # concurrently with the message upserts done on the loop
+        chat = {"content": "", "statuses": []}
+        threads = []
+
+        def write(chat_id, message_id, statuses):
+            threads.append(threading.get_ident())
+            snapshot = dict(chat)
+            snapshot["statuses"] = chat["statuses"] + statuses
+            chat.update(snapshot)
+
+        buffer = StatusEventBuffer(write, interval=0.01)
+
+        async def run():
+            buffer.add("chat", "msg", _status("first"))
+            for i in range(20):
+                chat["content"] += str(i % 10)  # upsert on the loop
+                await asyncio.sleep(0.001)
+            await buffer.flush_all()
+
+        asyncio.run(run())
+
+        assert threads == [threading.get_ident()]
+        assert chat["content"] == "01234567890123456789"
+        assert [status["action"] for status in chat["statuses"]] == ["first"]
@@ -0,0 +1,179 @@
+import asyncio
+import fnmatch
+import json
+
+import pycrdt as Y
+from redis.crc import key_slot
+
+from open_webui.socket.utils import YdocManager
+
+
+def _edits(count):
+    doc = Y.Doc()
+    text = doc.get("prosemirror", type=Y.Text)
+    updates = []
+    doc.observe(lambda event: updates.append(event.update))
+    for i in range(count):
+        text.insert(len(text), str(i % 10))
+    return updates, str(text)
+
+
+def _text(state):
+    doc = Y.Doc()
+    doc.apply_update(state)
+    return str(doc.get("prosemirror", type=Y.Text))
+
+
+class ClusterRedis:
+    """Just enough of an asyncio Redis Cluster client for YdocManager."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+        return len(self.data[key])
+
+    async def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = self.data.get(key, [])[start:]
+
+    async def exists(self, *keys):
+        self._same_slot(keys)
+        return sum(key in self.data for key in keys)
+
+    async def delete(self, *keys):
+        self._same_slot(keys)
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def sadd(self, key, value):
+        self.data.setdefault(key, set()).add(value.encode())
+
+    async def srem(self, key, value):
+        self.data.get(key, set()).discard(value.encode())
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def keys(self, pattern):
+        return [key.encode() for key in self.data if fnmatch.fnmatch(key, pattern)]
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    @staticmethod
+    def _same_slot(keys):
+        if len({key_slot(key.encode()) for key in keys}) > 1:
+            raise RuntimeError("CROSSSLOT Keys in request don't hash to the same slot")
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(key, *args, **kwargs):
+            self._calls.append((key, getattr(self._redis, name)(key, *args, **kwargs)))
+
+        return queue
+
+    async def execute(self):
+        self._redis._same_slot([key for key, _ in self._calls])
+        return [await call for _, call in self._calls]
+
+
+class TestYdocManager:
+    def test_updates_are_compacted_into_a_snapshot(self):
+        updates, expected = _edits(25)
+        manager = YdocManager(compact_threshold=10)
+
+        async def run():
+            for update in updates:
+                await manager.append_to_updates("note:1", update)
+            stored = await manager.get_updates("note:1")
+            state = await manager.get_state("note:1")
+            exists = await manager.document_exists("note:1")
+
+            await manager.compact("note:1")
+            compacted = await manager.get_updates("note:1")
+            return stored, state, exists, compacted
+
+        stored, state, exists, compacted = asyncio.run(run())
+
+        # snapshot of the first 20 edits plus the 5 logged after it
+        assert len(stored) == 6
+        assert all(isinstance(update, bytes) for update in stored)
+        assert _text(state) == expected
+        assert exists
+        assert len(compacted) == 1
+        assert _text(compacted[0]) == expected
+
+    def test_clear_document_drops_snapshot_and_log(self):
+        updates, _ = _edits(3)
+        manager = YdocManager(compact_threshold=2)
+
+        async def run():
+            for update in updates:
+                await manager.append_to_updates("note:1", update)
+            await manager.add_user("note:1", "sid")
+            await manager.remove_user_from_all_documents("sid")
+            return await manager.document_exists("note:1")
+
+        assert asyncio.run(run()) is False
+
+    def test_redis_keys_share_a_cluster_slot(self):
+        updates, expected = _edits(25)
+        redis = ClusterRedis()
+        manager = YdocManager(redis=redis, redis_key_prefix="t", compact_threshold=10)
+
+        async def run():
+            for update in updates:
+                await manager.append_to_updates("note:1", update)
+            await manager.add_user("note:1", "sid")
+            state = await manager.get_state("note:1")
+            keys = sorted(redis.data)
+            await manager.remove_user_from_all_documents("sid")
+            return state, keys, await manager.document_exists("note:1")
+
+        state, keys, exists = asyncio.run(run())
+
+        assert _text(state) == expected
+        assert keys == ["t:{note_1}:log", "t:{note_1}:snapshot", "t:{note_1}:users"]
+        assert exists is False and redis.data == {}
+
+    def test_legacy_update_list_is_migrated_into_the_snapshot(self):
+        updates, expected = _edits(5)
+        redis = ClusterRedis()
+        redis.data["t:note_1:updates"] = [json.dumps(list(u)) for u in updates]
+        manager = YdocManager(redis=redis, redis_key_prefix="t", compact_threshold=2)
+
+        async def run():
+            exists = await manager.document_exists("note:1")
+            stored = await manager.get_updates("note:1")
+            return exists, stored, await manager.get_state("note:1")
+
+        exists, stored, state = asyncio.run(run())
+
+        assert exists
+        assert len(stored) == 1 and _text(state) == expected
+        assert "t:note_1:updates" not in redis.data
+        assert redis.data["t:{note_1}:snapshot"] == stored[0]
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from open_webui.agent import graph
+from open_webui.agent.graph import execute_workflow, get_compiled_workflow
+
+NODES = [
+    {"id": "input_1", "type": "input", "config": {}},
+    {
+        "id": "output_1",
+        "type": "output",
+        "config": {"input_bindings": {"answer": "input_1.user"}},
+    },
+]
+CONNECTIONS = [{"from": "input_1", "to": "output_1", "type": "unidirectional"}]
+
+
+def test_compiled_workflow_is_reused_across_requests():
+    graph._compiled_workflows.clear()
+    events = []
+
+    async def emitter(event):
+        events.append(event["data"]["action"])
+
+    async def run():
+        first = await execute_workflow("q1", NODES, CONNECTIONS, event_emitter=emitter)
+        second = await execute_workflow("q2", NODES, CONNECTIONS)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert len(graph._compiled_workflows) == 1
+    assert get_compiled_workflow(NODES, CONNECTIONS) is next(
+        iter(graph._compiled_workflows.values())
+    )
+    assert first.messages["output_1"]["output"].payload == "q1"
+    assert second.messages["output_1"]["output"].payload == "q2"
+    assert first.execution_path == ["input_1", "output_1"]
+    assert events == ["agent_node_start", "agent_node_end"] * 2
+
+
+def test_parallel_branches_share_one_state():
+    nodes = [
+        {"id": "input_1", "type": "input", "config": {}},
+        {"id": "input_2", "type": "input", "config": {"user_input": "fixed"}},
+    ]
+
+    state = asyncio.run(execute_workflow("q", nodes, []))
+
+    assert sorted(state.execution_path) == ["input_1", "input_2"]
+    assert state.messages["input_2"]["user"].payload == "fixed"
+    assert "node_input_1" in state.timings and "total" in state.timings
+
+
+def test_tools_fan_out_in_parallel_with_timeouts(monkeypatch):
+    async def slow_tool(question: str = ""):
+        await asyncio.sleep(0.2)
+        return f"done: {question}"
+
+    async def fake_get_tools(request, tool_ids, user, extra_params):
+        return {tool_ids[0]: {"tool_id": tool_ids[0], "callable": slow_tool}}
+
+    monkeypatch.setattr("open_webui.utils.tools.get_tools", fake_get_tools)
+
+    nodes = [{"id": "input_1", "type": "input", "config": {}}]
+    connections = []
+    for idx, timeout in enumerate([None, None, 0.05], start=1):
+        config = {"tool_id": f"t{idx}", "tool_name": f"t{idx}"}
+        if timeout:
+            config["timeout"] = timeout
+        nodes.append({"id": f"tool_{idx}", "type": "tool", "config": config})
+        connections.append(
+            {"from": "input_1", "to": f"tool_{idx}", "type": "unidirectional"}
+        )
+    nodes.append({"id": "output_1", "type": "output", "config": {}})
+    for idx in range(1, 4):
+        connections.append(
+            {"from": f"tool_{idx}", "to": "output_1", "type": "unidirectional"}
+        )
+
+    state = asyncio.run(execute_workflow("q", nodes, connections))
+
+    # Three 200ms tools in parallel, not 600ms in sequence
+    assert state.timings["total"] < 450
+    assert state.execution_path.count("output_1") == 1
+    assert state.messages["tool_1"]["result"].payload == "done: q"
+    assert "error" in state.messages["tool_3"]
+    assert state.partial is True
+    assert state.critical_path[0] == "input_1" and state.critical_path[-1] == "output_1"
+    assert state.critical_path[1] in ("tool_1", "tool_2")
+
+
+def test_cached_tool_node_does_not_leak_params_between_requests(monkeypatch):
+    calls = []
+
+    async def echo_tool(question: str = "", top_k: int = 1):
+        calls.append(question)
+        return question
+
+    async def fake_get_tools(request, tool_ids, user, extra_params):
+        return {"echo": {"tool_id": "echo", "callable": echo_tool}}
+
+    monkeypatch.setattr("open_webui.utils.tools.get_tools", fake_get_tools)
+    graph._compiled_workflows.clear()
+
+    # params bound to a plain-text port: not a dict, so tool_params is used as is
+    tool_config = {
+        "tool_id": "echo",
+        "tool_name": "echo",
+        "tool_params": {"top_k": 2},
+        "input_bindings": {"params": "input_1.user"},
+    }
+    nodes = [
+        {"id": "input_1", "type": "input", "config": {}},
+        {"id": "tool_1", "type": "tool", "config": tool_config},
+    ]
+    connections = [{"from": "input_1", "to": "tool_1", "type": "unidirectional"}]
+
+    async def run():
+        await execute_workflow("alice secret question", nodes, connections)
+        return await execute_workflow("bob question", nodes, connections)
+
+    second = asyncio.run(run())
+
+    assert len(graph._compiled_workflows) == 1
+    assert calls == ["alice secret question", "bob question"]
+    assert second.messages["tool_1"]["result"].payload == "bob question"
+    assert tool_config["tool_params"] == {"top_k": 2}
+
+
+def test_tool_server_timeout_marks_workflow_partial(monkeypatch):
+    async def timing_out_get_tools(request, tool_ids, user, extra_params):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr("open_webui.utils.tools.get_tools", timing_out_get_tools)
+
+    nodes = [
+        {"id": "input_1", "type": "input", "config": {}},
+        {"id": "tool_1", "type": "tool", "config": {"tool_id": "t1", "timeout": 3}},
+    ]
+    connections = [{"from": "input_1", "to": "tool_1", "type": "unidirectional"}]
+
+    state = asyncio.run(execute_workflow("q", nodes, connections))
+
+    assert state.partial is True
+    assert "3.0s" in state.messages["tool_1"]["error"].payload
+    assert state.execution_path[-1] == "tool_1"
+
+
+def test_retrieval_node_only_searches_readable_knowledge(monkeypatch):
+    from open_webui.models.knowledge import Knowledges
+
+    searched = []
+
+    class FakeRagService:
+        vector_stores = {"kb_own": object(), "kb_other": object()}
+
+        async def embed_query(self, query, request=None):
+            return [0.0]
+
+        async def vector_search(self, question, name, top_k, query_vector=None):
+            searched.append(name)
+            return [(SimpleNamespace(page_content=f"from {name}", metadata={}), 1.0)]
+
+    monkeypatch.setattr(
+        "open_webui.services.langchain_rag_service.get_langchain_rag_service",
+        lambda request: FakeRagService(),
+    )
+    monkeypatch.setattr(
+        Knowledges,
+        "check_access_by_user_id",
+        lambda id, user_id, permission="write": id == "kb_own" and permission == "read",
+    )
+
+    nodes = [
+        {"id": "input_1", "type": "input", "config": {}},
+        {
+            "id": "retrieval_1",
+            "type": "retrieval",
+            "config": {"knowledge_ids": ["kb_own", "kb_other"]},
+        },
+    ]
+    connections = [{"from": "input_1", "to": "retrieval_1", "type": "unidirectional"}]
+    user = SimpleNamespace(id="u1", role="user")
+
+    state = asyncio.run(execute_workflow("q", nodes, connections, user=user))
+
+    assert searched == ["kb_own"]
+    assert state.retrieved_context.startswith("from kb_own")
+
+    # Without a user the node cannot check access, so local knowledge is skipped
+    searched.clear()
+    asyncio.run(execute_workflow("q", nodes, connections))
+    assert searched == []
+
+
+def test_llm_node_streams_tokens_through_pooled_session():
+    from types import SimpleNamespace
+
+    from aiohttp import web
+
+    from open_webui.agent import nodes
+    from open_webui.agent.nodes import LLMNode
+    from open_webui.agent.state import WorkflowState
+    from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
+
+    connections = []
+
+    async def chat_completions(request):
+        connections.append(request.transport)
+        body = await request.json()
+        assert body["stream"] is True and body["model"] == "base-model"
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in ["Hel", "lo", "!"]:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(0.02)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat_completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        request = SimpleNamespace(
+            app=SimpleNamespace(
+                state=SimpleNamespace(
+                    MODELS={
+                        "custom": {
+                            "id": "custom",
+                            "info": {"base_model_id": "base-model"},
+                        },
+                        "base-model": {"id": "base-model", "urlIdx": 0},
+                    },
+                    config=SimpleNamespace(
+                        OPENAI_API_BASE_URLS=[f"http://127.0.0.1:{port}/v1"],
+                        OPENAI_API_KEYS=["sk-test"],
+                    ),
+                )
+            )
+        )
+        events = []
+
+        async def emitter(event):
+            events.append(event["data"]["content"])
+
+        node = LLMNode("llm_1", {"model": "custom", "prompt_template": "{question}"})
+        outputs = []
+        try:
+            for _ in range(2):
+                state = WorkflowState(question="hi")
+                state._request = request
+                state._event_emitter = emitter
+                outputs.append((await node.execute(state)).llm_output)
+        finally:
+            await UPSTREAM_SESSION_POOL.close()
+            await runner.cleanup()
+        return outputs, events
+
+    nodes._endpoint_cache.clear()
+    outputs, events = asyncio.run(run())
+
+    assert outputs == ["Hello!", "Hello!"]
+    # Partial content was pushed before the completion finished
+    assert events[0] != "Hello!" and events[-1] == "Hello!"
+    # The second call reused the first call's keep-alive connection
+    assert connections[0] is connections[1]
+    assert "custom" in nodes._endpoint_cache
+
+
+def test_benchmark_harness_reports_json_metrics():
+    from open_webui.test.bench_agent_workflow import run_benchmark
+
+    results = asyncio.run(run_benchmark(iterations=2, warmup=1, compile_iterations=1))
+
+    json.dumps(results)
+    for name in ("rag", "chat_tools"):
+        workflow = results["workflows"][name]
+        assert workflow["partial_runs"] == 0
+        for metric in (
+            "compile_ms",
+            "framework_ms",
+            "end_to_end_ms",
+            "graph_overhead_ms",
+        ):
+            assert set(workflow[metric]) == {"mean", "p50", "p99", "min", "max"}
+        assert "llm_1" in workflow["nodes"]
+    assert results["workflows"]["rag"]["critical_path"][-1] == "output_1"
@@ -296,21 +296,21 @@ async def test_agent_mode():
     logger.info("\n工具列表:")
     logger.info("  1. ragflow_retrieval - 检索知识库中的相关信息")
     logger.info("  2. delivery_prediction_get - 查询产品交付预测")
-    
+
     # 创建 mock 对象
     user = create_mock_user()
     request = create_mock_request()
-    
+
     logger.info(f"\n使用用户: {user.name} ({user.id})")
     logger.info("\n" + "=" * 80)
     logger.info("开始执行 Agent 工作流...")
     logger.info("=" * 80 + "\n")
-    
+
     try:
         # 构建工作流节点
         nodes = []
         connections = []
-        
+
         # 1. 输入节点
         input_node_id = "input_1"
         nodes.append({
@@ -320,7 +320,7 @@ async def test_agent_mode():
                 "user_input": FIXED_QUESTION
             }
         })
-        
+
         # 2. 工具节点1: ragflow_retrieval
         tool1_node_id = "tool_1"
         nodes.append({
@@ -342,7 +342,7 @@ async def test_agent_mode():
             "to": tool1_node_id,
             "type": "unidirectional"
         })
-        
+
         # 3. 工具节点2: delivery_prediction_get
         tool2_node_id = "tool_2"
         nodes.append({
@@ -362,7 +362,7 @@ async def test_agent_mode():
             "to": tool2_node_id,
             "type": "unidirectional"
         })
-        
+
         # 4. LLM节点
         llm_node_id = "llm_1"
         nodes.append({
@@ -388,7 +388,7 @@ async def test_agent_mode():
             "to": llm_node_id,
             "type": "unidirectional"
         })
-        
+
         # 5. 输出节点
         output_node_id = "output_1"
         nodes.append({
@@ -405,26 +405,25 @@ async def test_agent_mode():
             "to": output_node_id,
             "type": "unidirectional"
         })
-        
+
         # 修改 execute_workflow 以支持自定义工具节点
         # 这里我们需要手动创建图，因为需要替换自定义工具节点
         from langgraph.graph import StateGraph, END, START
-        from langgraph.checkpoint.memory import MemorySaver
-        from open_webui.agent.state import WorkflowState, Message
+        from open_webui.agent.state import WorkflowState
         from open_webui.agent.nodes import InputNode, LLMNode, OutputNode
-        from open_webui.agent.graph import WorkflowGraphState, _convert_to_langgraph_state, _convert_from_langgraph_state
+        from open_webui.agent.graph import WorkflowGraphState, create_node_function
         import time
-        
+
         # 创建图
         workflow = StateGraph(WorkflowGraphState)
-        
+
         # 创建节点实例
         node_instances = {}
         for node_data in nodes:
             node_id = node_data["id"]
             node_type = node_data["type"]
             node_config = node_data.get("config", {})
-            
+
             if node_type == "input":
                 node_instance = InputNode(node_id, node_config)
             elif node_type == "custom_tool":
@@ -438,104 +437,43 @@ async def test_agent_mode():
             else:
                 logger.warning(f"未知节点类型: {node_type}, 跳过节点 {node_id}")
                 continue
-            
+
             node_instances[node_id] = node_instance
-            
-            # 创建节点函数（使用闭包捕获变量）
-            def make_node_func(nid, ntype, nconfig, ninst):
-                async def node_func(state: WorkflowGraphState) -> WorkflowGraphState:
-                    t0 = time.time()
-                    workflow_state = _convert_from_langgraph_state(state)
-                    workflow_state._request = request
-                    workflow_state._user = user
-                    
-                    # 发送开始事件
-                    try:
-                        await simple_event_emitter({
-                            "type": "status",
-                            "data": {
-                                "action": "agent_node_start",
-                                "node_id": nid,
-                                "node_type": ntype,
-                                "node_label": nconfig.get("tool_name", nid),
-                                "done": False,
-                            },
-                        })
-                    except:
-                        pass
-                    
-                    # 执行节点
-                    workflow_state = await ninst.execute(workflow_state)
-                    workflow_state.timings[f"node_{nid}"] = (time.time() - t0) * 1000
-                    
-                    # 发送结束事件
-                    try:
-                        await simple_event_emitter({
-                            "type": "status",
-                            "data": {
-                                "action": "agent_node_end",
-                                "node_id": nid,
-                                "node_type": ntype,
-                                "node_label": nconfig.get("tool_name", nid),
-                                "elapsed_ms": workflow_state.timings.get(f"node_{nid}"),
-                                "done": False,
-                            },
-                        })
-                    except:
-                        pass
-                    
-                    return _convert_to_langgraph_state(workflow_state)
-                return node_func
-            
-            workflow.add_node(node_id, make_node_func(node_id, node_type, node_config, node_instance))
-        
+            workflow.add_node(node_id, create_node_function(node_instance, node_id))
+
         # 添加边
         workflow.add_edge(START, input_node_id)
         for conn in connections:
             if conn.get("type") == "unidirectional":
                 workflow.add_edge(conn["from"], conn["to"])
         workflow.add_edge(output_node_id, END)
-        
-        # 编译并执行
-        checkpoint = MemorySaver()
-        app = workflow.compile(checkpointer=checkpoint)
-        
-        initial_state = WorkflowGraphState(
-            messages={},
-            execution_path=[],
-            question=FIXED_QUESTION,
-            start_time=time.time(),
-            timings={},
-            retrieved_context=None,
-            llm_output=None,
-            total=0,
-            documents=[],
-            scores=[],
-        )
-        
+
+        # 编译并执行（request / user / 事件回调随状态传入）
+        app = workflow.compile()
+
+        workflow_state = WorkflowState(question=FIXED_QUESTION, start_time=time.time())
+        workflow_state._request = request
+        workflow_state._user = user
+        workflow_state._event_emitter = simple_event_emitter
+
         config = {"configurable": {"thread_id": "1"}}
-        final_state = None
-        
-        async for state in app.astream(initial_state, config):
-            if isinstance(state, dict) and state:
-                final_state = list(state.values())[-1]
-        
-        # 转换为 WorkflowState
-        if final_state:
-            workflow_state = _convert_from_langgraph_state(final_state)
-            if workflow_state.start_time:
-                workflow_state.timings["total"] = (time.time() - workflow_state.start_time) * 1000
-        
+        await app.ainvoke({"workflow": workflow_state}, config)
+
+        if workflow_state.start_time:
+            workflow_state.timings["total"] = (
+                time.time() - workflow_state.start_time
+            ) * 1000
+
         logger.info("\n" + "=" * 80)
         logger.info("Agent 执行完成")
         logger.info("=" * 80)
-        
+
         # 显示结果
         logger.info("\n📝 Agent 回答:")
         logger.info("-" * 80)
         logger.info(workflow_state.llm_output or "无回答")
         logger.info("-" * 80)
-        
+
         # 显示工具调用结果
         tool_calls = []
         for node_id in workflow_state.execution_path:
@@ -555,18 +493,18 @@ async def test_agent_mode():
                         "result": tool_error_msg.payload,
                         "success": False
                     })
-        
+
         if tool_calls:
             logger.info(f"\n🔧 工具调用结果 ({len(tool_calls)} 个):")
             for idx, tool_call in enumerate(tool_calls, 1):
                 tool_id = tool_call.get("tool_id", "未知")
                 success = tool_call.get("success", False)
                 result_data = tool_call.get("result", {})
-                
+
                 status = "✅ 成功" if success else "❌ 失败"
                 logger.info(f"\n  {idx}. {tool_id} - {status}")
                 logger.info(f"     结果: {str(result_data)[:500]}...")
-        
+
         # 显示执行步骤
         steps = []
         for nid in workflow_state.execution_path:
@@ -582,24 +520,24 @@ async def test_agent_mode():
                         label = "Output"
                     steps.append({"id": nid, "label": label})
                     break
-        
+
         if steps:
             logger.info(f"\n📊 执行步骤 ({len(steps)} 个):")
             for idx, step in enumerate(steps, 1):
                 step_id = step.get("id", "未知")
                 step_label = step.get("label", step_id)
                 logger.info(f"  {idx}. {step_label} ({step_id})")
-        
+
         # 显示执行时间
         if workflow_state.timings:
             logger.info(f"\n⏱️  执行时间:")
             for key, value in workflow_state.timings.items():
                 logger.info(f"  {key}: {value:.2f}ms")
-        
+
         logger.info("\n" + "=" * 80)
         logger.info("测试完成")
         logger.info("=" * 80)
-        
+
     except Exception as e:
         logger.error(f"\n❌ Agent 执行失败: {e}", exc_info=True)
         raise
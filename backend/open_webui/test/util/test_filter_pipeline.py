@@ -0,0 +1,162 @@
+import asyncio
+import types
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from open_webui.utils.filter import (
+    FilterPipeline,
+    iter_ready_batches,
+    process_filter_functions,
+)
+from open_webui.utils.plugin import PLUGIN_REGISTRY
+
+
+class _Filter:
+    class Valves(BaseModel):
+        suffix: str = "!"
+
+    class UserValves(BaseModel):
+        upper: bool = False
+
+    def __init__(self):
+        self.valves = self.Valves()
+
+    def stream(self, event, __user__):
+        text = event["text"] + self.valves.suffix
+        return {"text": text.upper() if __user__["valves"].upper else text}
+
+
+class _BatchFilter:
+    def __init__(self):
+        self.batches = []
+
+    def stream(self, event):
+        return event
+
+    def stream_batch(self, events):
+        self.batches.append(len(events))
+        return [e for e in events if e["text"] != "drop!"]
+
+
+def _loaded(modules):
+    return patch.dict(
+        PLUGIN_REGISTRY._modules,
+        {function_id: ("v", module) for function_id, module in modules.items()},
+    )
+
+
+class TestFilterPipeline:
+    def test_stream_chunks_resolve_valves_once(self):
+        modules = {"f1": _Filter()}
+        functions = [types.SimpleNamespace(id="f1")]
+        extra_params = {"__user__": {"id": "u1"}}
+
+        with (
+            _loaded(modules),
+            patch.object(
+                PLUGIN_REGISTRY, "get_function_valves", return_value={"suffix": "?"}
+            ) as valves,
+            patch(
+                "open_webui.utils.filter.Functions.get_user_valves_by_id_and_user_id",
+                return_value={"upper": True},
+            ) as user_valves,
+        ):
+            pipeline = FilterPipeline(None, functions)
+
+            async def run():
+                return [
+                    await process_filter_functions(
+                        None, pipeline, "stream", {"text": f"c{i}"}, extra_params
+                    )
+                    for i in range(100)
+                ]
+
+            results = asyncio.run(run())
+
+        assert results[0] == ({"text": "C0?"}, {})
+        assert valves.call_count == 1
+        assert user_valves.call_count == 1
+        # The shared __user__ dict is not mutated
+        assert "valves" not in extra_params["__user__"]
+
+    def test_process_batch_uses_stream_batch(self):
+        batch_filter = _BatchFilter()
+        modules = {"f1": _Filter(), "f2": batch_filter}
+        functions = [types.SimpleNamespace(id="f1"), types.SimpleNamespace(id="f2")]
+
+        with (
+            _loaded(modules),
+            patch.object(PLUGIN_REGISTRY, "get_function_valves", return_value=None),
+            patch(
+                "open_webui.utils.filter.Functions.get_user_valves_by_id_and_user_id",
+                return_value={},
+            ),
+        ):
+            pipeline = FilterPipeline(None, functions)
+            events = asyncio.run(
+                pipeline.process_batch(
+                    [{"text": "a"}, {"text": "drop"}, {"text": "b"}],
+                    {"__user__": {"id": "u1"}},
+                )
+            )
+
+        assert events == [{"text": "a!"}, {"text": "b!"}]
+        assert batch_filter.batches == [3]
+
+    def test_streamed_chunks_reach_stream_batch_in_arrival_groups(self):
+        batch_filter = _BatchFilter()
+        modules = {"f1": _Filter(), "f2": batch_filter}
+        functions = [types.SimpleNamespace(id="f1"), types.SimpleNamespace(id="f2")]
+
+        async def upstream():
+            for text in ["a", "drop", "b", "c"]:
+                yield {"text": text}
+            # Arrives after the consumer caught up
+            await asyncio.sleep(0.05)
+            yield {"text": "d"}
+
+        async def run():
+            received = []
+            async for event in pipeline.process_stream(
+                upstream(), {"__user__": {"id": "u1"}}
+            ):
+                received.append(event)
+                # A slow consumer lets chunks pile up behind it
+                await asyncio.sleep(0.01)
+            return received
+
+        with (
+            _loaded(modules),
+            patch.object(PLUGIN_REGISTRY, "get_function_valves", return_value=None),
+            patch(
+                "open_webui.utils.filter.Functions.get_user_valves_by_id_and_user_id",
+                return_value={},
+            ),
+        ):
+            pipeline = FilterPipeline(None, functions)
+            received = asyncio.run(run())
+
+        assert received == [{"text": t} for t in ["a!", "b!", "c!", "d!"]]
+        assert sum(batch_filter.batches) == 5
+        assert max(batch_filter.batches) > 1
+        assert batch_filter.batches[-1] == 1
+
+    def test_ready_batches_keep_order_and_raise_upstream_errors(self):
+        async def upstream():
+            yield 1
+            yield 2
+            raise ValueError("upstream closed")
+
+        async def run():
+            batches = []
+            try:
+                async for batch in iter_ready_batches(upstream()):
+                    batches.append(batch)
+            except ValueError as e:
+                return batches, str(e)
+
+        batches, error = asyncio.run(run())
+
+        assert [item for batch in batches for item in batch] == [1, 2]
+        assert error == "upstream closed"
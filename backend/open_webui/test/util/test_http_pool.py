@@ -0,0 +1,174 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from aiohttp import web
+
+from open_webui.routers.ollama import send_post_request
+from open_webui.utils.http_pool import UpstreamSessionPool
+
+
+async def _start_upstream():
+    async def chat(request):
+        body = await request.json()
+        peer = request.transport.get_extra_info("peername")[1]
+        if not body.get("stream"):
+            await asyncio.sleep(body.get("delay", 0))
+            return web.json_response({"peer": peer})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for i in range(body.get("chunks", 3)):
+            await response.write(json.dumps({"i": i, "peer": peer}).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _consume(response):
+    chunks = [chunk async for chunk in response.body_iterator]
+    await response.background()
+    return [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+class TestUpstreamSessionPool:
+    def test_streamed_responses_are_released_back_to_the_pool(self):
+        async def run():
+            pool = UpstreamSessionPool()
+            runner, base_url = await _start_upstream()
+            try:
+                with patch("open_webui.routers.ollama.UPSTREAM_SESSION_POOL", pool):
+                    url = f"{base_url}/api/chat"
+                    streamed = await _consume(
+                        await send_post_request(url, json.dumps({"stream": True}))
+                    )
+                    plain = await send_post_request(
+                        url, json.dumps({"stream": False}), stream=False
+                    )
+                metrics = pool.get_metrics()["upstreams"][base_url]
+            finally:
+                await pool.close()
+                await runner.cleanup()
+            return streamed, plain, metrics
+
+        streamed, plain, metrics = asyncio.run(run())
+
+        assert [chunk["i"] for chunk in streamed] == [0, 1, 2]
+        assert plain["peer"] == streamed[0]["peer"]
+        assert metrics["requests"] == 2
+        assert metrics["connections_created"] == 1
+        assert metrics["connections_reused"] == 1
+        assert metrics["in_use"] == 0
+
+    def test_per_upstream_limit_queues_requests(self):
+        async def run():
+            pool = UpstreamSessionPool()
+            runner, base_url = await _start_upstream()
+            try:
+                with patch("open_webui.routers.ollama.UPSTREAM_SESSION_POOL", pool):
+                    results = await asyncio.gather(
+                        *(
+                            send_post_request(
+                                f"{base_url}/api/chat",
+                                json.dumps({"stream": False, "delay": 0.05}),
+                                stream=False,
+                                pool_size=1,
+                            )
+                            for _ in range(3)
+                        )
+                    )
+                metrics = pool.get_metrics()["upstreams"][base_url]
+            finally:
+                await pool.close()
+                await runner.cleanup()
+            return results, metrics
+
+        results, metrics = asyncio.run(run())
+
+        assert len({result["peer"] for result in results}) == 1
+        assert metrics["limit_per_host"] == 1
+        assert metrics["waits"] == 2
+        assert metrics["queued"] == 0
+        assert metrics["wait_max_ms"] > 0
+
+    def test_alternating_limits_reuse_one_session_each(self):
+        async def run():
+            pool = UpstreamSessionPool(limit_per_host=10)
+            try:
+                sessions = {
+                    id(pool.get_session("http://upstream", limit))
+                    for _ in range(50)
+                    for limit in (None, 4)
+                }
+                metrics = pool.get_metrics()["upstreams"]["http://upstream"]
+            finally:
+                await pool.close()
+            return sessions, metrics, len(pool._sessions)
+
+        sessions, metrics, remaining = asyncio.run(run())
+
+        assert len(sessions) == 2
+        assert metrics["sessions"] == 2 and metrics["limit_per_host"] == 10
+        assert remaining == 0
+
+    def test_streamed_release_runs_on_the_event_loop(self):
+        threads = []
+        release = UpstreamSessionPool.release
+
+        def record_release(response):
+            threads.append(threading.get_ident())
+            release(response)
+
+        async def run():
+            pool = UpstreamSessionPool()
+            runner, base_url = await _start_upstream()
+            try:
+                with patch("open_webui.routers.ollama.UPSTREAM_SESSION_POOL", pool):
+                    await _consume(
+                        await send_post_request(
+                            f"{base_url}/api/chat", json.dumps({"stream": True})
+                        )
+                    )
+            finally:
+                await pool.close()
+                await runner.cleanup()
+
+        with patch.object(UpstreamSessionPool, "release", staticmethod(record_release)):
+            asyncio.run(run())
+
+        assert threads == [threading.get_ident()]
+
+    def test_sessions_of_a_previous_loop_are_closed(self):
+        pool = UpstreamSessionPool()
+        old_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+        thread.start()
+
+        async def get_session():
+            return pool.get_session("http://upstream")
+
+        try:
+            old = asyncio.run_coroutine_threadsafe(get_session(), old_loop).result()
+            new = asyncio.run(get_session())
+            # closed on its own loop
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), old_loop).result()
+        finally:
+            old_loop.call_soon_threadsafe(old_loop.stop)
+            thread.join()
+            old_loop.close()
+
+        assert new is not old and old.closed
+
+        # a session whose loop is gone is detached instead
+        newest = asyncio.run(get_session())
+        assert newest is not new and new.closed
+        asyncio.run(pool.close())
@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from open_webui.models.groups import Groups
+from open_webui.models.models import ModelModel, Models
+from open_webui.utils.model_registry import ModelRegistry
+from open_webui.utils.plugin import PLUGIN_REGISTRY
+
+BASE_MODELS = [
+    {"id": "llama3:8b", "name": "llama3:8b", "owned_by": "ollama"},
+    {"id": "llama3:70b", "name": "llama3:70b", "owned_by": "ollama"},
+    {"id": "qwen2:7b", "name": "qwen2:7b", "owned_by": "ollama"},
+    {"id": "gpt-4o", "name": "gpt-4o", "owned_by": "openai"},
+]
+
+
+def _model(
+    id, base_model_id=None, is_active=True, user_id="admin", access_control=None
+):
+    return ModelModel(
+        id=id,
+        user_id=user_id,
+        base_model_id=base_model_id,
+        name=f"Custom {id}",
+        params={},
+        meta={"filterIds": []},
+        access_control=access_control,
+        is_active=is_active,
+        updated_at=0,
+        created_at=0,
+    )
+
+
+def _request():
+    config = SimpleNamespace(
+        ENABLE_EVALUATION_ARENA_MODELS=False, EVALUATION_ARENA_MODELS=[]
+    )
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(config=config)))
+
+
+def _patched(rows, version=(1, 0)):
+    return (
+        patch.object(Models, "get_all_models", return_value=rows),
+        patch.object(PLUGIN_REGISTRY, "get_functions_by_type", return_value=[]),
+        patch.object(Models, "get_models_version", return_value=version),
+    )
+
+
+class TestModelRegistry:
+    def test_custom_models_are_matched_through_indexes(self):
+        rows = [
+            _model("llama3"),  # applies to every llama3 tag
+            _model("qwen2:7b", is_active=False),  # hides the base model
+            _model("helper", base_model_id="gpt-4o"),
+            _model("coder", base_model_id="llama3"),
+        ]
+        registry = ModelRegistry()
+        models_patch, functions_patch, version_patch = _patched(rows)
+        with models_patch as get_all, functions_patch, version_patch:
+            models, by_id = registry.get_models(_request(), BASE_MODELS)
+            again, _ = registry.get_models(_request(), BASE_MODELS)
+
+            registry.on_model_change("helper")
+            rebuilt, _ = registry.get_models(_request(), BASE_MODELS)
+
+        assert [model["id"] for model in models] == [
+            "llama3:8b",
+            "llama3:70b",
+            "gpt-4o",
+            "helper",
+            "coder",
+        ]
+        assert by_id["llama3:70b"]["name"] == "Custom llama3"
+        assert by_id["helper"]["owned_by"] == "openai"
+        assert by_id["coder"]["owned_by"] == "ollama"
+        assert BASE_MODELS[0]["name"] == "llama3:8b"  # base models are not mutated
+
+        assert again == models
+        assert get_all.call_count == 2
+
+    def test_access_views_are_cached_per_user_and_groups(self):
+        rows = [
+            _model("gpt-4o", access_control={"read": {"group_ids": ["eng"]}}),
+            _model("private", base_model_id="gpt-4o", access_control={}),
+            _model("mine", base_model_id="gpt-4o", user_id="u1", access_control={}),
+        ]
+        registry = ModelRegistry()
+        user = SimpleNamespace(id="u1", role="user")
+        models_patch, functions_patch, version_patch = _patched(rows)
+        with models_patch as get_all, functions_patch, version_patch:
+            models, _ = registry.get_models(_request(), BASE_MODELS)
+            with patch.object(Groups, "get_groups_by_member_id", return_value=[]):
+                outsider = registry.filter_models(models, user)
+                registry.filter_models(models, user)
+            with patch.object(
+                Groups,
+                "get_groups_by_member_id",
+                return_value=[SimpleNamespace(id="eng")],
+            ):
+                member = registry.filter_models(models, user)
+
+        # llama3/qwen2 have no model rows and stay hidden from regular users
+        assert [model["id"] for model in outsider] == ["mine"]
+        assert [model["id"] for model in member] == ["gpt-4o", "mine"]
+        assert get_all.call_count == 1
+        assert len(registry._views) == 2
+
+    def test_refetched_base_models_reuse_the_build(self):
+        registry = ModelRegistry()
+        models_patch, functions_patch, version_patch = _patched([_model("llama3")])
+        with (
+            models_patch,
+            functions_patch,
+            version_patch,
+            patch.object(registry, "_assemble", wraps=registry._assemble) as assemble,
+        ):
+            models, by_id = registry.get_models(_request(), BASE_MODELS)
+            # a new list per request, as get_all_base_models returns it
+            refetched = [{**model, "created": 123} for model in BASE_MODELS]
+            again, _ = registry.get_models(_request(), refetched)
+            assert again == models
+
+            # callers get copies; the cached build is not modified through them
+            by_id["llama3:8b"]["name"] = "changed"
+            third, _ = registry.get_models(_request(), BASE_MODELS)
+
+        assert assemble.call_count == 1
+        assert third[0]["name"] == "Custom llama3"
+
+    def test_writes_from_another_worker_are_seen_without_redis(self):
+        shared = [_model("gpt-4o", access_control=None)]
+        revoked = [_model("gpt-4o", access_control={})]
+        registry = ModelRegistry()
+        user = SimpleNamespace(id="u1", role="user")
+
+        with (
+            patch.object(PLUGIN_REGISTRY, "get_functions_by_type", return_value=[]),
+            patch.object(Groups, "get_groups_by_member_id", return_value=[]),
+        ):
+            with (
+                patch.object(Models, "get_all_models", return_value=shared),
+                patch.object(Models, "get_models_version", return_value=(1, 100)),
+            ):
+                models, _ = registry.get_models(_request(), BASE_MODELS)
+                before = registry.filter_models(models, user)
+
+            # another worker revoked access: only the table version moved
+            with (
+                patch.object(Models, "get_all_models", return_value=revoked),
+                patch.object(Models, "get_models_version", return_value=(1, 200)),
+            ):
+                after = registry.filter_models(models, user)
+
+        assert [model["id"] for model in before] == ["gpt-4o"]
+        assert after == []
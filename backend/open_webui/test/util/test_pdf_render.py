@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pymupdf
+import pytest
+
+from open_webui.routers import knowledge as knowledge_router
+from open_webui.utils import pdf_render_worker
+from open_webui.utils.pdf_render import (
+    PdfPageNotFound,
+    PdfRenderPool,
+    _compute_file_hash,
+)
+
+
+def _write_pdf(path, pages):
+    document = pymupdf.open()
+    for i in range(pages):
+        document.new_page().insert_text((72, 72), f"page {i + 1}")
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = PdfRenderPool(tmp_path / "cache", max_workers=1, prefetch_pages=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_worker_reopens_a_replaced_file(tmp_path):
+    source = _write_pdf(tmp_path / "doc.pdf", 2)
+    assert pdf_render_worker.render_page_to_file(
+        source, 3, 36, str(tmp_path / "a.png"), 4
+    ) == (2, False)
+
+    # Same path, new content: the cached document must not be served
+    _write_pdf(tmp_path / "doc.pdf", 3)
+    os.utime(source, ns=(0, 0))
+    assert pdf_render_worker.render_page_to_file(
+        source, 3, 36, str(tmp_path / "b.png"), 4
+    ) == (3, True)
+    assert [key[0] for key in pdf_render_worker._WORKER_DOCUMENTS].count(source) == 1
+
+
+def test_pool_renders_caches_and_prefetches(pool, tmp_path):
+    source = _write_pdf(tmp_path / "doc.pdf", 3)
+    file_hash = _compute_file_hash(source)
+
+    async def run():
+        page_path = await pool.render_page(source, file_hash, 1, 36)
+        # prefetch of page 2 was queued by the first request
+        await asyncio.gather(*map(asyncio.wrap_future, list(pool._inflight.values())))
+        with pytest.raises(PdfPageNotFound):
+            await pool.render_page(source, file_hash, 4, 36)
+        return page_path
+
+    page_path = asyncio.run(run())
+
+    assert page_path == pool.get_page_path(file_hash, 1, 36) and page_path.exists()
+    assert pool.get_page_path(file_hash, 2, 36).exists()
+    assert pool.get_page_count(file_hash) == 3
+
+
+def test_broken_pool_is_replaced(pool, tmp_path):
+    source = _write_pdf(tmp_path / "doc.pdf", 1)
+    file_hash = _compute_file_hash(source)
+
+    broken = pool._get_executor()
+    with pytest.raises(Exception):
+        broken.submit(os._exit, 1).result()
+
+    page_path = asyncio.run(pool.render_page(source, file_hash, 1, 36))
+
+    assert page_path.exists()
+    assert pool._executor is not broken
+
+
+def test_not_modified_is_answered_before_rendering(monkeypatch, tmp_path):
+    pool = PdfRenderPool(tmp_path / "cache")
+    file = SimpleNamespace(id="f1", updated_at=1, path="f1.pdf")
+
+    async def resolve_file(file_id, updated_at, storage_path):
+        return "f1.pdf", "a" * 64
+
+    async def render_page(*args):
+        raise AssertionError("rendered a page the client already has")
+
+    monkeypatch.setattr(pool, "resolve_file", resolve_file)
+    monkeypatch.setattr(pool, "render_page", render_page)
+    monkeypatch.setattr(knowledge_router, "PDF_RENDER_POOL", pool)
+    monkeypatch.setattr(
+        knowledge_router, "_get_knowledge_pdf_file", lambda id, file_id, user: file
+    )
+
+    etag = pool.get_etag("a" * 64, 2, 200)
+    request = SimpleNamespace(headers={"if-none-match": etag})
+    response = asyncio.run(
+        knowledge_router.get_pdf_page_image(request, "kb", "f1", 2, dpi=200, user=None)
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_page_cache_is_trimmed_on_the_event_loop(tmp_path):
+    pool = PdfRenderPool(tmp_path / "cache", max_workers=1, prefetch_pages=0)
+    source = _write_pdf(tmp_path / "doc.pdf", 4)
+    file_hash = _compute_file_hash(source)
+    threads = []
+    add_cache_bytes = pool._add_cache_bytes
+
+    def record(size):
+        threads.append(threading.get_ident())
+        add_cache_bytes(size)
+
+    pool._add_cache_bytes = record
+
+    async def run():
+        first = await pool.render_page(source, file_hash, 1, 36)
+        pool.max_cache_bytes = int(first.stat().st_size * 2.5)
+        for page in (2, 3, 4):
+            await pool.render_page(source, file_hash, page, 36)
+        while pool._trimming or pool._inflight:
+            await asyncio.sleep(0.01)
+        return threading.get_ident()
+
+    try:
+        loop_thread = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert threads == [loop_thread] * 4
+    assert pool._cache_bytes <= pool.max_cache_bytes
+    pages = [pool.get_page_path(file_hash, page, 36) for page in (1, 2, 3, 4)]
+    assert sum(page.exists() for page in pages) == 2
+
+    # Least recently served pages go first; empty directories are removed
+    budget, pool.max_cache_bytes = pool.max_cache_bytes, 1 << 30
+    for page in (1, 2, 3, 4):
+        asyncio.run(pool.render_page(source, file_hash, page, 36))
+    pool.shutdown()
+    for mtime, page in zip((400, 100, 300, 200), pages):
+        os.utime(page, (mtime, mtime))
+    pool.max_cache_bytes = budget
+    pool._trim_cache(set())
+    assert [page.exists() for page in pages] == [True, False, True, False]
+
+    pool.max_cache_bytes = 0
+    assert pool._trim_cache(set()) == 0
+    assert not pages[0].parent.exists()
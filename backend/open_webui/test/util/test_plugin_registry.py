@@ -0,0 +1,139 @@
+import time
+import types
+from unittest.mock import patch
+
+from open_webui.utils.plugin import PluginRegistry, content_version
+
+
+def _function(id, content, type="filter", priority=0, is_global=True):
+    return types.SimpleNamespace(
+        id=id,
+        type=type,
+        content=content,
+        valves={"priority": priority},
+        is_active=True,
+        is_global=is_global,
+    )
+
+
+FILTER_SOURCE = """
+class Filter:
+    def inlet(self, body):
+        return body
+"""
+
+
+class TestPluginRegistry:
+    def test_steady_state_dispatch_does_not_touch_the_database(self):
+        registry = PluginRegistry()
+        rows = [
+            _function("a", FILTER_SOURCE, priority=2),
+            _function("b", FILTER_SOURCE),
+        ]
+
+        with (
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions", return_value=rows
+            ) as get_functions,
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions_version",
+                return_value=(2, 1),
+            ),
+            patch(
+                "open_webui.utils.plugin.load_function_module_by_id",
+                side_effect=lambda id, content, **kw: (object(), "filter", {}),
+            ) as load,
+        ):
+            registry.warmup()
+            for _ in range(50):
+                module, _, _ = registry.get_function_module("a")
+                assert registry.get_function_valves("a") == {"priority": 2}
+                assert [f.id for f in registry.get_global_filter_functions()] == [
+                    "a",
+                    "b",
+                ]
+
+        assert get_functions.call_count == 1
+        assert load.call_count == 2
+
+    def test_changed_content_reloads_only_that_module(self):
+        registry = PluginRegistry()
+        rows = [_function("a", FILTER_SOURCE), _function("b", FILTER_SOURCE)]
+
+        with (
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions",
+                side_effect=lambda **kw: list(rows),
+            ) as get_functions,
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions_version",
+                return_value=(2, 1),
+            ),
+            patch(
+                "open_webui.utils.plugin.load_function_module_by_id",
+                side_effect=lambda id, content, **kw: (object(), "filter", {}),
+            ) as load,
+        ):
+            registry.warmup()
+            module_b, _, _ = registry.get_function_module("b")
+
+            # Another worker edited "a"
+            rows[0] = _function("a", FILTER_SOURCE + "\n# v2\n")
+            registry.apply_remote_change({"kind": "function", "id": "a", "origin": "x"})
+            registry.get_function_module("a")
+
+            assert registry.get_function_module("b")[0] is module_b
+            assert registry._modules["a"][0] == content_version(rows[0].content)
+
+        assert get_functions.call_count == 2
+        assert load.call_count == 3
+
+    def test_writes_from_another_worker_are_seen_without_redis(self):
+        registry = PluginRegistry()
+        rows = [_function("a", FILTER_SOURCE)]
+        version = [(1, 1)]
+
+        with (
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions",
+                side_effect=lambda **kw: list(rows),
+            ) as get_functions,
+            patch(
+                "open_webui.utils.plugin.Functions.get_functions_version",
+                side_effect=lambda: version[0],
+            ),
+            patch(
+                "open_webui.utils.plugin.load_function_module_by_id",
+                side_effect=lambda id, content, **kw: (object(), "filter", {}),
+            ),
+        ):
+            module, _, _ = registry.get_function_module("a")
+            assert registry.get_function_module("a")[0] is module
+
+            # Another worker edited "a"; no broadcast reaches this one
+            rows[0] = _function("a", FILTER_SOURCE + "\n# v2\n", priority=5)
+            version[0] = (1, 2)
+
+            assert registry.get_function_module("a")[0] is not module
+            assert registry.get_function_valves("a") == {"priority": 5}
+
+            # A version from the current second is re-read until it settles
+            version[0] = (1, int(time.time()) + 60)
+            registry.get_function("a")
+            registry.get_function("a")
+
+        assert get_functions.call_count == 4
+
+    def test_remote_tool_change_evicts_tool_module(self):
+        registry = PluginRegistry()
+        app = types.SimpleNamespace(state=types.SimpleNamespace(TOOLS={"t": object()}))
+        registry.bind(app)
+
+        # Own broadcasts are ignored
+        registry.apply_remote_change(
+            {"kind": "tool", "id": "t", "origin": registry.instance_id}
+        )
+        assert "t" in app.state.TOOLS
+
+        registry.apply_remote_change({"kind": "tool", "id": "t", "origin": "x"})
+        assert "t" not in app.state.TOOLS
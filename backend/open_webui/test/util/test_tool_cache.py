@@ -0,0 +1,75 @@
+import asyncio
+import types
+
+from open_webui.utils.tool_cache import (
+    ToolCachePolicy,
+    ToolResultCache,
+    memoize_tool_function,
+)
+
+
+def _counting_tool():
+    calls = []
+
+    async def search(query: str, top_k: int = 3):
+        calls.append((query, top_k))
+        return [{"content": f"{query}-{i}"} for i in range(top_k)]
+
+    return search, calls
+
+
+class TestToolCachePolicy:
+    def test_opt_in_from_frontmatter_and_valves(self):
+        assert ToolCachePolicy.from_settings({"title": "Search"}) is None
+
+        policy = ToolCachePolicy.from_settings(
+            {"cache_ttl": "600", "cache_functions": "search, lookup"}
+        )
+        assert policy.ttl == 600
+        assert policy.applies_to("search") and not policy.applies_to("delete")
+        assert policy.scope == "user"
+
+        # Valves override the frontmatter
+        valves = types.SimpleNamespace(cache_ttl=0, cache_scope=None)
+        assert ToolCachePolicy.from_settings({"cache_ttl": "600"}, valves) is None
+
+
+class TestMemoizeToolFunction:
+    def test_identical_calls_hit_the_cache_per_user(self):
+        search, calls = _counting_tool()
+        cache = ToolResultCache()
+        policy = ToolCachePolicy(ttl=60)
+
+        async def run():
+            alice = memoize_tool_function(
+                search, "kb", "search", policy, "alice", cache=cache
+            )
+            bob = memoize_tool_function(
+                search, "kb", "search", policy, "bob", cache=cache
+            )
+            first = await alice(query="robot", top_k=2)
+            first.pop()  # callers may mutate what they get back
+            again = await alice(top_k=2, query="robot")
+            await bob(query="robot", top_k=2)
+            return again
+
+        again = asyncio.run(run())
+
+        assert calls == [("robot", 2), ("robot", 2)]
+        assert again == [{"content": "robot-0"}, {"content": "robot-1"}]
+
+    def test_evicted_entries_are_recomputed(self):
+        search, calls = _counting_tool()
+        cache = ToolResultCache(size=1)
+
+        async def run():
+            cached_search = memoize_tool_function(
+                search, "kb", "search", ToolCachePolicy(ttl=60), None, cache=cache
+            )
+            await cached_search(query="a")
+            await cached_search(query="b")  # evicts "a"
+            await cached_search(query="a")
+
+        asyncio.run(run())
+
+        assert [query for query, _ in calls] == ["a", "b", "a"]
@@ -0,0 +1,250 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from aiohttp import web
+
+from open_webui.utils.http_pool import UpstreamSessionPool
+from open_webui.utils import tools as tools_module
+from open_webui.utils.tools import (
+    ToolServerSpecCache,
+    execute_tool_server,
+    get_tool_servers,
+    set_tool_servers,
+)
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "Weather", "version": "1"},
+    "paths": {
+        "/weather": {
+            "get": {
+                "operationId": "get_weather",
+                "summary": "Current weather",
+                "parameters": [
+                    {"name": "city", "in": "query", "schema": {"type": "string"}}
+                ],
+            }
+        }
+    },
+}
+
+
+async def _start_tool_server(requests):
+    async def openapi(request):
+        requests.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.json_response(SPEC, headers={"ETag": '"v1"'})
+
+    async def weather(request):
+        peer = request.transport.get_extra_info("peername")
+        return web.json_response({"city": request.query["city"], "peer": peer[1]})
+
+    app = web.Application()
+    app.router.add_get("/openapi.json", openapi)
+    app.router.add_get("/weather", weather)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.gets = []
+
+    async def get(self, key):
+        self.gets.append(key)
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1).encode()
+        return int(self.data[key])
+
+
+def _worker_request(redis, connections):
+    state = SimpleNamespace(
+        redis=redis,
+        TOOL_SERVERS=[],
+        config=SimpleNamespace(TOOL_SERVER_CONNECTIONS=connections),
+    )
+    return SimpleNamespace(app=SimpleNamespace(state=state))
+
+
+class TestToolServerSpecCache:
+    def test_fresh_spec_is_served_without_refetching(self):
+        async def run():
+            requests = []
+            runner, base_url = await _start_tool_server(requests)
+            try:
+                cache = ToolServerSpecCache(ttl=60)
+                first = await asyncio.gather(
+                    *(cache.get("key", f"{base_url}/openapi.json") for _ in range(5))
+                )
+                second = await cache.get("key", f"{base_url}/openapi.json")
+            finally:
+                await runner.cleanup()
+            return requests, first, second
+
+        requests, first, second = asyncio.run(run())
+
+        assert len(requests) == 1
+        assert requests[0]["Authorization"] == "Bearer key"
+        assert all(data is second for data in first)
+        assert [spec["name"] for spec in second["specs"]] == ["get_weather"]
+
+    def test_stale_spec_is_revalidated_in_background_with_etag(self):
+        async def run():
+            requests = []
+            runner, base_url = await _start_tool_server(requests)
+            try:
+                cache = ToolServerSpecCache(ttl=0)
+                url = f"{base_url}/openapi.json"
+                first = await cache.get(None, url)
+                # Stale: returned immediately, a conditional request goes out behind it
+                stale = await cache.get(None, url)
+                fetches = list(cache._fetches.values())
+                await asyncio.gather(*fetches)
+            finally:
+                await runner.cleanup()
+            return requests, first, stale
+
+        requests, first, stale = asyncio.run(run())
+
+        assert stale is first
+        assert len(requests) == 2
+        assert "If-None-Match" not in requests[0]
+        assert requests[1]["If-None-Match"] == '"v1"'
+
+    def test_tool_calls_reuse_a_pooled_connection(self):
+        async def run():
+            pool = UpstreamSessionPool()
+            runner, base_url = await _start_tool_server([])
+            try:
+                server_data = {"openapi": SPEC}
+                with patch("open_webui.utils.tools.UPSTREAM_SESSION_POOL", pool):
+                    results = [
+                        await execute_tool_server(
+                            url=base_url,
+                            headers={},
+                            cookies={},
+                            name="get_weather",
+                            params={"city": city},
+                            server_data=server_data,
+                        )
+                        for city in ("Paris", "Oslo")
+                    ]
+            finally:
+                await pool.close()
+                await runner.cleanup()
+            return results
+
+        (first, _), (second, _) = asyncio.run(run())
+
+        assert [first["city"], second["city"]] == ["Paris", "Oslo"]
+        assert first["peer"] == second["peer"]
+
+    def test_304_keeps_the_refreshed_validators(self, monkeypatch):
+        async def fetch(token, url, etag=None, last_modified=None):
+            if etag is None:
+                return {"specs": []}, {"etag": '"v1"', "last_modified": None}
+            return None, {"etag": '"v2"', "last_modified": "Tue, 01 Jan 2030"}
+
+        monkeypatch.setattr(tools_module, "fetch_tool_server_data", fetch)
+
+        async def run():
+            cache = ToolServerSpecCache(ttl=60)
+            data = await cache.get(None, "http://tools/openapi.json")
+            assert (
+                await cache.get(None, "http://tools/openapi.json", force=True) is data
+            )
+            return cache._entries[cache.key(None, "http://tools/openapi.json")]
+
+        entry = asyncio.run(run())
+
+        assert entry["etag"] == '"v2"'
+        assert entry["last_modified"] == "Tue, 01 Jan 2030"
+
+
+class TestToolServersAcrossWorkers:
+    def test_change_on_another_worker_is_seen_before_the_ttl(self, monkeypatch):
+        servers = [[{"url": "a"}], [{"url": "b"}]]
+
+        async def get_tool_servers_data(connections, force=True):
+            return servers.pop(0)
+
+        monkeypatch.setattr(
+            tools_module, "get_tool_servers_data", get_tool_servers_data
+        )
+        redis = _FakeRedis()
+        writer, reader = _worker_request(redis, []), _worker_request(redis, [])
+
+        async def run():
+            await set_tool_servers(writer)
+            first = await get_tool_servers(reader)
+            # Still fresh and unchanged: only the version key is read
+            redis.gets.clear()
+            assert await get_tool_servers(reader) is first
+            assert redis.gets == [tools_module.TOOL_SERVERS_VERSION_REDIS_KEY]
+
+            await set_tool_servers(writer)
+            return first, await get_tool_servers(reader)
+
+        first, second = asyncio.run(run())
+
+        assert first == [{"url": "a"}]
+        assert second == [{"url": "b"}]
+        assert json.loads(redis.data["tool_servers"]) == second
+
+    def test_one_worker_revalidates_upstream_after_the_ttl(self, monkeypatch):
+        specs = [[{"url": "a"}], [{"url": "a"}], [{"url": "b"}]]
+        fetches = []
+
+        async def get_tool_servers_data(connections, force=True):
+            fetches.append(force)
+            return specs.pop(0)
+
+        monkeypatch.setattr(
+            tools_module, "get_tool_servers_data", get_tool_servers_data
+        )
+        redis = _FakeRedis()
+        workers = [_worker_request(redis, []), _worker_request(redis, [])]
+
+        async def expire_and_read():
+            for worker in workers:
+                worker.app.state.TOOL_SERVERS_LOADED_AT -= 3600
+            results = [await get_tool_servers(worker) for worker in workers]
+            await asyncio.sleep(0)
+            redis.data.pop(tools_module.TOOL_SERVERS_REFRESH_REDIS_KEY, None)
+            return results
+
+        async def run():
+            await set_tool_servers(workers[0])
+            await get_tool_servers(workers[1])
+            version = redis.data[tools_module.TOOL_SERVERS_VERSION_REDIS_KEY]
+
+            # Upstream unchanged: one refresh, stale copies served, no version bump
+            stale = await expire_and_read()
+            assert fetches == [True, True]
+            assert redis.data[tools_module.TOOL_SERVERS_VERSION_REDIS_KEY] == version
+
+            # Upstream changed: the refreshing worker publishes a new version
+            await expire_and_read()
+            assert fetches == [True, True, True]
+            return stale, [await get_tool_servers(worker) for worker in workers]
+
+        stale, refreshed = asyncio.run(run())
+
+        assert stale == [[{"url": "a"}], [{"url": "a"}]]
+        assert refreshed == [[{"url": "b"}], [{"url": "b"}]]
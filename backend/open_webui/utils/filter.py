@@ -1,7 +1,9 @@
+import asyncio
 import inspect
 import logging
 
 from open_webui.utils.plugin import (
+    PLUGIN_REGISTRY,
     load_function_module_by_id,
     get_function_module_from_cache,
 )
@@ -24,19 +26,20 @@ def get_function_module(request, function_id, load_from_db=True):
 
 def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
     def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None:
-            valves = Functions.get_function_valves_by_id(function_id)
-            return valves.get("priority", 0) if valves else 0
-        return 0
+        valves = PLUGIN_REGISTRY.get_function_valves(function_id)
+        return valves.get("priority", 0) if valves else 0
 
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
+    filter_ids = [
+        function.id for function in PLUGIN_REGISTRY.get_global_filter_functions()
+    ]
     if "info" in model and "meta" in model["info"]:
         filter_ids.extend(model["info"]["meta"].get("filterIds", []))
         filter_ids = list(set(filter_ids))
     active_filter_ids = [
         function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
+        for function in PLUGIN_REGISTRY.get_functions_by_type(
+            "filter", active_only=True
+        )
     ]
 
     def get_active_status(filter_id):
@@ -57,80 +60,281 @@ def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None)
     return filter_ids
 
 
-async def process_filter_functions(
-    request, filter_functions, filter_type, form_data, extra_params
-):
-    skip_files = None
+async def iter_ready_batches(iterator, max_batch_size: int = 64):
+    """
+    Yield the items of an async iterator in lists of whatever has arrived so far.
+
+    Only the first item of each list is waited for, so batching never holds a
+    chunk back; it only groups chunks that arrived while the consumer was busy.
+    """
+    queue = asyncio.Queue(maxsize=max_batch_size)
+    end = object()
+
+    async def pump():
+        try:
+            async for item in iterator:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(end)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            items = [await queue.get()]
+            while len(items) < max_batch_size and not queue.empty():
+                items.append(queue.get_nowait())
+
+            done = items[-1] is end
+            if done:
+                items.pop()
+            if items and isinstance(items[-1], Exception):
+                error = items.pop()
+                if items:
+                    yield items
+                raise error
+            if items:
+                yield items
+            if done:
+                return
+    finally:
+        task.cancel()
+
+
+class CompiledFilter:
+    """A filter hook resolved once: module, handler, valves and signature."""
 
-    for function in filter_functions:
-        filter = function
-        filter_id = function.id
-        if not filter:
-            continue
+    __slots__ = (
+        "id",
+        "module",
+        "handler",
+        "is_async",
+        "param_names",
+        "user_valves",
+        "batch_handler",
+        "batch_is_async",
+        "batch_param_names",
+    )
+
+    def __init__(self, filter_id, module, handler, batch_handler=None):
+        self.id = filter_id
+        self.module = module
+        self.handler = handler
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.param_names = frozenset(inspect.signature(handler).parameters)
+        self.user_valves = None
 
-        function_module = get_function_module(
-            request, filter_id, load_from_db=(filter_type != "stream")
+        self.batch_handler = batch_handler
+        self.batch_is_async = inspect.iscoroutinefunction(batch_handler)
+        self.batch_param_names = (
+            frozenset(inspect.signature(batch_handler).parameters)
+            if batch_handler
+            else frozenset()
         )
-        # Prepare handler function
-        handler = getattr(function_module, filter_type, None)
-        if not handler:
-            continue
-
-        # Check if the function has a file_handler variable
-        if filter_type == "inlet" and hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
-
-        # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
+
+    def build_params(self, param_names, params, extra_params):
+        params = params | {
+            k: v
+            for k, v in {**extra_params, "__id__": self.id}.items()
+            if k in param_names
+        }
+
+        # Each filter gets its own __user__ so user valves don't leak between filters
+        if "__user__" in params and self.user_valves is not None:
+            params["__user__"] = {**params["__user__"], "valves": self.user_valves}
+
+        return params
+
+    async def call(self, params):
+        if self.is_async:
+            return await self.handler(**params)
+        return self.handler(**params)
+
+    async def call_batch(self, params):
+        if self.batch_is_async:
+            return await self.batch_handler(**params)
+        return self.batch_handler(**params)
+
+
+class FilterPipeline:
+    """
+    Filter functions compiled once per chat request.
+
+    Modules, valves, user valves and handler signatures are resolved the
+    first time a hook type is used, so processing e.g. every streamed chunk
+    is pure in-memory calls with no database access.
+
+    A filter may also define `stream_batch(events: list) -> list` to receive
+    several stream events at once: the events sent before the upstream
+    response (`process_batch`) and, while streaming, each group of chunks
+    that arrived together (`process_stream`).
+    """
+
+    def __init__(self, request, filter_functions):
+        self.request = request
+        self.filter_ids = [function.id for function in filter_functions if function]
+        self._compiled: dict[str, list[CompiledFilter]] = {}
+        self.skip_files = None
+
+    def compile(self, filter_type, user_id=None) -> list[CompiledFilter]:
+        compiled = self._compiled.get(filter_type)
+        if compiled is not None:
+            return compiled
+
+        compiled = []
+        for filter_id in self.filter_ids:
+            function_module = get_function_module(
+                self.request, filter_id, load_from_db=(filter_type != "stream")
             )
+            # Prepare handler function
+            handler = getattr(function_module, filter_type, None)
+            if not handler:
+                continue
 
-        try:
-            # Prepare parameters
-            sig = inspect.signature(handler)
-
-            params = {"body": form_data}
-            if filter_type == "stream":
-                params = {"event": form_data}
-
-            params = params | {
-                k: v
-                for k, v in {
-                    **extra_params,
-                    "__id__": filter_id,
-                }.items()
-                if k in sig.parameters
-            }
-
-            # Handle user parameters
-            if "__user__" in sig.parameters:
-                if hasattr(function_module, "UserValves"):
-                    try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
+            # Check if the function has a file_handler variable
+            if filter_type == "inlet" and hasattr(function_module, "file_handler"):
+                self.skip_files = function_module.file_handler
+
+            # Apply valves to the function
+            if hasattr(function_module, "valves") and hasattr(
+                function_module, "Valves"
+            ):
+                valves = PLUGIN_REGISTRY.get_function_valves(filter_id)
+                function_module.valves = function_module.Valves(
+                    **(valves if valves else {})
+                )
+
+            batch_handler = (
+                getattr(function_module, "stream_batch", None)
+                if filter_type == "stream"
+                else None
+            )
+            compiled_filter = CompiledFilter(
+                filter_id, function_module, handler, batch_handler
+            )
+
+            # Resolve user valves once
+            if (
+                user_id
+                and "__user__"
+                in (compiled_filter.param_names | compiled_filter.batch_param_names)
+                and hasattr(function_module, "UserValves")
+            ):
+                try:
+                    compiled_filter.user_valves = function_module.UserValves(
+                        **Functions.get_user_valves_by_id_and_user_id(
+                            filter_id, user_id
+                        )
+                    )
+                except Exception as e:
+                    log.exception(f"Failed to get user values: {e}")
+
+            compiled.append(compiled_filter)
+
+        self._compiled[filter_type] = compiled
+        return compiled
+
+    @staticmethod
+    def _get_user_id(extra_params):
+        user = extra_params.get("__user__") or {}
+        return user.get("id") if isinstance(user, dict) else None
+
+    async def process(self, filter_type, form_data, extra_params):
+        for compiled_filter in self.compile(
+            filter_type, self._get_user_id(extra_params)
+        ):
+            try:
+                params = {"body": form_data}
+                if filter_type == "stream":
+                    params = {"event": form_data}
+
+                form_data = await compiled_filter.call(
+                    compiled_filter.build_params(
+                        compiled_filter.param_names, params, extra_params
+                    )
+                )
+            except Exception as e:
+                log.debug(f"Error in {filter_type} handler {compiled_filter.id}: {e}")
+                raise e
+
+        # Handle file cleanup for inlet
+        if filter_type == "inlet" and self.skip_files:
+            if "files" in form_data.get("metadata", {}):
+                del form_data["metadata"]["files"]
+            if "files" in form_data:
+                del form_data["files"]
+
+        return form_data, {}
+
+    async def process_batch(self, events, extra_params):
+        """
+        Run the stream filters over a list of events.
+
+        Filters that define `stream_batch` are called once with the whole
+        list; the others are applied event by event. Events a filter drops
+        (returns a falsy value for) are removed.
+        """
+        for compiled_filter in self.compile("stream", self._get_user_id(extra_params)):
+            try:
+                if compiled_filter.batch_handler:
+                    events = await compiled_filter.call_batch(
+                        compiled_filter.build_params(
+                            compiled_filter.batch_param_names,
+                            {"events": events},
+                            extra_params,
+                        )
+                    )
+                else:
+                    events = [
+                        await compiled_filter.call(
+                            compiled_filter.build_params(
+                                compiled_filter.param_names,
+                                {"event": event},
+                                extra_params,
                             )
                         )
-                    except Exception as e:
-                        log.exception(f"Failed to get user values: {e}")
+                        for event in events
+                    ]
+            except Exception as e:
+                log.debug(f"Error in stream handler {compiled_filter.id}: {e}")
+                raise e
 
-            # Execute handler
-            if inspect.iscoroutinefunction(handler):
-                form_data = await handler(**params)
-            else:
-                form_data = handler(**params)
+            events = [event for event in events or [] if event]
 
-        except Exception as e:
-            log.debug(f"Error in {filter_type} handler {filter_id}: {e}")
-            raise e
+        return events
+
+    async def process_stream(self, events, extra_params):
+        """
+        Run the stream filters over an async iterator of events.
+
+        Events are passed to `process_batch` in groups of those already
+        received (see `iter_ready_batches`), so a slow consumer hands
+        `stream_batch` filters several chunks at once without delaying any.
+        A group a filter fails on is logged and dropped.
+        """
+        async for batch in iter_ready_batches(events):
+            try:
+                batch = await self.process_batch(batch, extra_params)
+            except Exception as e:
+                log.exception(f"Dropped {len(batch)} stream events: {e}")
+                continue
+
+            for event in batch:
+                yield event
 
-    # Handle file cleanup for inlet
-    if skip_files:
-        if "files" in form_data.get("metadata", {}):
-            del form_data["metadata"]["files"]
-        if "files" in form_data:
-            del form_data["files"]
 
-    return form_data, {}
+async def process_filter_functions(
+    request, filter_functions, filter_type, form_data, extra_params
+):
+    """
+    Run one hook type over form_data.
+
+    `filter_functions` may be a compiled FilterPipeline (reused across
+    calls, e.g. for every streamed chunk) or a plain list of functions.
+    """
+    if isinstance(filter_functions, FilterPipeline):
+        pipeline = filter_functions
+    else:
+        pipeline = FilterPipeline(request, filter_functions)
+
+    return await pipeline.process(filter_type, form_data, extra_params)
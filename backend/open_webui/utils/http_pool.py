@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_POOL_SIZE,
+    AIOHTTP_CLIENT_POOL_SIZE_PER_HOST,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class _PoolStats:
+    """Counters for one upstream, fed by aiohttp request tracing."""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "connections_created",
+        "connections_reused",
+        "queued",
+        "waits",
+        "wait_total_ms",
+        "wait_max_ms",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+
+        async def on_request_start(session, ctx, params):
+            self.requests += 1
+
+        async def on_request_exception(session, ctx, params):
+            self.errors += 1
+
+        async def on_queued_start(session, ctx, params):
+            self.queued += 1
+            ctx.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            self.queued -= 1
+            wait_ms = (time.perf_counter() - ctx.queued_at) * 1000
+            self.waits += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+        async def on_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_reuse(session, ctx, params):
+            self.connections_reused += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "queued": self.queued,
+            "waits": self.waits,
+            "wait_avg_ms": (
+                round(self.wait_total_ms / self.waits, 2) if self.waits else 0.0
+            ),
+            "wait_max_ms": round(self.wait_max_ms, 2),
+        }
+
+
+class UpstreamSessionPool:
+    """
+    Long-lived aiohttp sessions for upstream model APIs, one per base URL.
+
+    Reusing a session keeps TCP/TLS connections alive between requests
+    instead of paying a new handshake on every call. Sessions are bound to the
+    event loop that created them, so a session from another loop is replaced.
+    Sessions are shared between users, so they never store response cookies;
+    per-request cookies are still sent.
+
+    Each upstream may set its own connection limit (``limit_per_host``), e.g.
+    from the ``pool_size`` of an OpenAI/Ollama connection config. Sessions
+    are keyed by (base URL, limit), so callers that pass different limits for
+    the same upstream each keep their own long-lived session instead of
+    replacing one another's. Responses must be handed back with ``release``
+    (never close the session), which returns a fully read connection to the
+    pool.
+    """
+
+    def __init__(
+        self,
+        limit: int = AIOHTTP_CLIENT_POOL_SIZE,
+        limit_per_host: int = AIOHTTP_CLIENT_POOL_SIZE_PER_HOST,
+        keepalive_timeout: float = AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        # (base url, limit_per_host) -> (loop, session)
+        self._sessions: dict[tuple, tuple] = {}
+        self._stats: dict[str, _PoolStats] = {}
+
+    def get_session(
+        self, base_url: str, limit_per_host: Optional[int] = None
+    ) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        key = (base_url, limit_per_host or self.limit_per_host)
+
+        entry = self._sessions.get(key)
+        if entry is not None:
+            session_loop, session = entry
+            if session_loop is loop and not session.closed:
+                return session
+            self._close_replaced(session_loop, session)
+
+        stats = self._stats.setdefault(base_url, _PoolStats())
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=key[1],
+                keepalive_timeout=self.keepalive_timeout,
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trace_configs=[stats.trace_config()],
+            trust_env=True,
+        )
+        self._sessions[key] = (loop, session)
+        return session
+
+    @staticmethod
+    def _close_replaced(
+        loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession
+    ):
+        """Close a session that was replaced because its event loop changed."""
+        if session.closed:
+            return
+        if loop.is_closed():
+            # Its connections went away with the loop; nothing is left to await
+            session.detach()
+            return
+        # Connector state belongs to the old loop, so close it there
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+    @staticmethod
+    def release(response: Optional[aiohttp.ClientResponse]):
+        """
+        Hand a response's connection back to the pool.
+
+        A response whose body was not read to the end (e.g. the client left
+        mid-stream) has its connection closed instead of reused. Must be
+        called on the event loop that owns the response.
+        """
+        if response is not None:
+            response.release()
+
+    @classmethod
+    async def release_async(cls, response: Optional[aiohttp.ClientResponse]):
+        """
+        ``release`` as a coroutine, for Starlette background tasks.
+
+        Starlette runs sync background callables in a threadpool, where
+        touching the aiohttp connector is not safe; a coroutine runs on the
+        event loop instead.
+        """
+        cls.release(response)
+
+    def get_metrics(self) -> dict[str, Any]:
+        connectors = {}
+        for (base_url, limit_per_host), (_, session) in self._sessions.items():
+            connectors.setdefault(base_url, {})[limit_per_host] = session.connector
+
+        upstreams = {}
+        for base_url, stats in sorted(self._stats.items()):
+            sessions = connectors.get(base_url, {})
+            upstreams[base_url] = {
+                "limit_per_host": max(sessions) if sessions else None,
+                "sessions": len(sessions),
+                "open": any(
+                    connector is not None and not connector.closed
+                    for connector in sessions.values()
+                ),
+                "in_use": sum(
+                    len(getattr(connector, "_acquired", ()))
+                    for connector in sessions.values()
+                    if connector is not None
+                ),
+                **stats.snapshot(),
+            }
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "upstreams": upstreams,
+        }
+
+    async def close(self):
+        sessions, self._sessions = self._sessions, {}
+        for _, session in sessions.values():
+            try:
+                await session.close()
+            except Exception as e:
+                log.debug(f"Error closing upstream session: {e}")
+
+
+UPSTREAM_SESSION_POOL = UpstreamSessionPool()
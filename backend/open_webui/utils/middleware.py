@@ -86,8 +86,9 @@ from open_webui.utils.misc import (
     convert_logit_bias_input_to_json,
 )
 from open_webui.utils.tools import get_tools
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.plugin import PLUGIN_REGISTRY, load_function_module_by_id
 from open_webui.utils.filter import (
+    FilterPipeline,
     get_sorted_filter_ids,
     process_filter_functions,
 )
@@ -919,7 +920,6 @@ async def process_chat_payload(request, form_data, user, metadata, model):
                         *form_data.get("files", []),
                     ]
 
-
     # Model "Knowledge" handling
     user_message = get_last_user_message(form_data["messages"])
     model_knowledge = model.get("info", {}).get("meta", {}).get("knowledge", False)
@@ -974,7 +974,7 @@ async def process_chat_payload(request, form_data, user, metadata, model):
 
     try:
         filter_functions = [
-            Functions.get_function_by_id(filter_id)
+            PLUGIN_REGISTRY.get_function(filter_id)
             for filter_id in get_sorted_filter_ids(
                 request, model, metadata.get("filter_ids", [])
             )
@@ -1023,7 +1023,7 @@ async def process_chat_payload(request, form_data, user, metadata, model):
     if selected_tool_ids and not tool_ids:
         tool_ids = selected_tool_ids
     files = form_data.pop("files", None)
-    
+
     # Agent mode 参数（先获取，再移除，避免丢失）
     agent_mode = form_data.get("agentMode", False) or False
     if "agentMode" in form_data:
@@ -1176,28 +1176,28 @@ async def process_chat_payload(request, form_data, user, metadata, model):
 
     # 检查是否启用 agent 模式（在检查 tools_dict 之前）
     agent_mode = metadata.get("agentMode", False)
-    
+
     log.info(f"Agent模式检查: agentMode={agent_mode}, metadata.agentMode={metadata.get('agentMode', False)}")
     log.info(f"工具字典状态: tools_dict存在={bool(tools_dict)}, 工具数量={len(tools_dict) if tools_dict else 0}")
-    
+
     # Agent 模式处理（不依赖 tools_dict 是否已构建）
     if agent_mode:
         # Agent 模式：使用 LangGraph Agent 框架调用工具
         try:
             from open_webui.agent.chat_handler import process_agent_chat
-            
+
             # 获取选中的工具ID（优先使用已规范化的 tool_ids，其次回退 selectedToolIds）
             selected_tool_ids = metadata.get("tool_ids") or metadata.get("selectedToolIds", []) or []
-            
+
             log.info(f"Agent模式: tool_ids={metadata.get('tool_ids')}, selectedToolIds(raw)={metadata.get('selectedToolIds', [])}, using={selected_tool_ids}")
-            
+
             if selected_tool_ids:
                 # 获取用户消息
                 user_message = get_last_user_message(form_data["messages"])
-                
+
                 # 获取模型ID
                 model_id = form_data.get("model", "")
-                
+
                 # 调用 agent 处理器
                 agent_result = await process_agent_chat(
                     question=user_message,
@@ -1209,14 +1209,14 @@ async def process_chat_payload(request, form_data, user, metadata, model):
                     max_tokens=form_data.get("max_tokens", 2000),
                     event_emitter=event_emitter
                 )
-                
+
                 # 将 agent 结果添加到 sources
                 sources.extend(agent_result.get("sources", []))
-                
+
                 # 将工具调用结果添加到 metadata
                 metadata["agent_tool_calls"] = agent_result.get("tool_calls", [])
                 metadata["agent_result"] = agent_result
-                
+
                 # Agent 模式处理完成
                 if agent_result.get("answer"):
                     # 将 agent 回答作为 assistant 消息添加到消息列表
@@ -1231,11 +1231,11 @@ async def process_chat_payload(request, form_data, user, metadata, model):
                             "steps": agent_result.get("agent_meta", {}).get("steps", []),
                         }
                     })
-                    
+
                     # 标记 agent 模式已处理，后续将直接返回结果
                     metadata["agent_processed"] = True
                     metadata["agent_answer"] = agent_result["answer"]
-                    
+
                     # 保持流式事件输出（由 event_emitter 发送过程），不强制关闭流式
                     log.info(f"Agent模式处理完成，工具调用数: {len(agent_result.get('tool_calls', []))}, 回答长度: {len(agent_result.get('answer', ''))}")
                 else:
@@ -1253,33 +1253,33 @@ async def process_chat_payload(request, form_data, user, metadata, model):
             metadata["agent_answer"] = f"Agent执行失败: {e}"
             # 仍允许发送过程事件，但不强制关闭流
             agent_mode = False
-    
+
     # 默认工具调用模式
     if tools_dict and not agent_mode:
         # 默认模式：使用原有的工具调用方式
-            if metadata.get("params", {}).get("function_calling") == "native":
-                # If the function calling is native, then call the tools function calling handler
-                metadata["tools"] = tools_dict
-                form_data["tools"] = [
+        if metadata.get("params", {}).get("function_calling") == "native":
+            # If the function calling is native, then call the tools function calling handler
+            metadata["tools"] = tools_dict
+            form_data["tools"] = [
                     {"type": "function", "function": tool.get("spec", {})}
                     for tool in tools_dict.values()
                 ]
 
-            else:
-                # If the function calling is not native, then call the tools function calling handler
-                try:
-                    form_data, flags = await chat_completion_tools_handler(
+        else:
+            # If the function calling is not native, then call the tools function calling handler
+            try:
+                form_data, flags = await chat_completion_tools_handler(
                         request, form_data, extra_params, user, models, tools_dict
                     )
-                    sources.extend(flags.get("sources", []))
-                    # Store flags for later use
-                    if flags.get("search_knowledge_tool_called"):
-                        log.info(f"✅ Storing search_knowledge_tool_flags in process_chat_payload")
-                        search_knowledge_tool_flags = flags
-                    else:
-                        log.debug(f"❌ search_knowledge_tool_flags not set, flags keys: {list(flags.keys())}")
-                except Exception as e:
-                    log.exception(e)
+                sources.extend(flags.get("sources", []))
+                # Store flags for later use
+                if flags.get("search_knowledge_tool_called"):
+                    log.info(f"✅ Storing search_knowledge_tool_flags in process_chat_payload")
+                    search_knowledge_tool_flags = flags
+                else:
+                    log.debug(f"❌ search_knowledge_tool_flags not set, flags keys: {list(flags.keys())}")
+            except Exception as e:
+                log.exception(e)
 
     try:
         form_data, flags = await chat_completion_files_handler(
@@ -1705,7 +1705,7 @@ async def process_chat_response(
                             )
 
                             # Send a webhook notification if the user is not active
-                            if not get_active_status_by_user_id(user.id):
+                            if not await get_active_status_by_user_id(user.id):
                                 webhook_url = Users.get_user_webhook_url_by_id(user.id)
                                 if webhook_url:
                                     await post_webhook(
@@ -1791,12 +1791,16 @@ async def process_chat_response(
         "__request__": request,
         "__model__": model,
     }
-    filter_functions = [
-        Functions.get_function_by_id(filter_id)
-        for filter_id in get_sorted_filter_ids(
-            request, model, metadata.get("filter_ids", [])
-        )
-    ]
+    # Resolved once; every streamed chunk then runs the filters in memory
+    filter_functions = FilterPipeline(
+        request,
+        [
+            PLUGIN_REGISTRY.get_function(filter_id)
+            for filter_id in get_sorted_filter_ids(
+                request, model, metadata.get("filter_ids", [])
+            )
+        ],
+    )
 
     # Streaming response
     if event_emitter and event_caller:
@@ -2262,32 +2266,38 @@ async def process_chat_response(
                             delta_count = 0
                             last_delta_data = None
 
-                    async for line in response.body_iterator:
-                        line = line.decode("utf-8") if isinstance(line, bytes) else line
-                        data = line
+                    async def stream_events():
+                        async for line in response.body_iterator:
+                            line = (
+                                line.decode("utf-8")
+                                if isinstance(line, bytes)
+                                else line
+                            )
+                            data = line
 
-                        # Skip empty lines
-                        if not data.strip():
-                            continue
+                            # Skip empty lines
+                            if not data.strip():
+                                continue
 
-                        # "data:" is the prefix for each event
-                        if not data.startswith("data:"):
-                            continue
+                            # "data:" is the prefix for each event
+                            if not data.startswith("data:"):
+                                continue
 
-                        # Remove the prefix
-                        data = data[len("data:") :].strip()
+                            # Remove the prefix
+                            data = data[len("data:") :].strip()
 
-                        try:
-                            data = json.loads(data)
-
-                            data, _ = await process_filter_functions(
-                                request=request,
-                                filter_functions=filter_functions,
-                                filter_type="stream",
-                                form_data=data,
-                                extra_params={"__body__": form_data, **extra_params},
-                            )
+                            try:
+                                yield json.loads(data)
+                            except Exception as e:
+                                if "data: [DONE]" not in line:
+                                    log.debug(f"Error: {e}")
 
+                    # Chunks that arrive together go through the stream filters
+                    # as one batch (see FilterPipeline.process_stream)
+                    async for data in filter_functions.process_stream(
+                        stream_events(), {"__body__": form_data, **extra_params}
+                    ):
+                        try:
                             if data:
                                 if "event" in data:
                                     await event_emitter(data.get("event", {}))
@@ -2531,12 +2541,8 @@ async def process_chat_response(
                                         }
                                     )
                         except Exception as e:
-                            done = "data: [DONE]" in line
-                            if done:
-                                pass
-                            else:
-                                log.debug(f"Error: {e}")
-                                continue
+                            log.debug(f"Error: {e}")
+                            continue
                     await flush_pending_delta_data()
 
                     if content_blocks:
@@ -3086,7 +3092,7 @@ async def process_chat_response(
                     )
 
                 # Send a webhook notification if the user is not active
-                if not get_active_status_by_user_id(user.id):
+                if not await get_active_status_by_user_id(user.id):
                     webhook_url = Users.get_user_webhook_url_by_id(user.id)
                     if webhook_url:
                         await post_webhook(
@@ -3134,29 +3140,13 @@ async def process_chat_response(
             def wrap_item(item):
                 return f"data: {item}\n\n"
 
-            for event in events:
-                event, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=event,
-                    extra_params=extra_params,
-                )
-
-                if event:
-                    yield wrap_item(json.dumps(event))
-
-            async for data in original_generator:
-                data, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=data,
-                    extra_params=extra_params,
-                )
+            for event in await filter_functions.process_batch(events, extra_params):
+                yield wrap_item(json.dumps(event))
 
-                if data:
-                    yield data
+            async for data in filter_functions.process_stream(
+                original_generator, extra_params
+            ):
+                yield data
 
         return StreamingResponse(
             stream_wrapper(response.body_iterator, events),
@@ -0,0 +1,477 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from open_webui.models.functions import Functions
+from open_webui.models.groups import Groups
+from open_webui.models.models import Models
+from open_webui.utils.access_control import has_access
+from open_webui.utils.plugin import (
+    PLUGIN_REGISTRY,
+    REDIS_PLUGIN_CHANNEL,
+    get_function_module_from_cache,
+)
+from open_webui.config import DEFAULT_ARENA_MODEL
+from open_webui.env import REDIS_KEY_PREFIX, SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+REDIS_MODEL_CHANNEL = f"{REDIS_KEY_PREFIX}:models:changes"
+
+
+def get_arena_models(config) -> list[dict]:
+    if not config.ENABLE_EVALUATION_ARENA_MODELS:
+        return []
+
+    arena_models = config.EVALUATION_ARENA_MODELS or [DEFAULT_ARENA_MODEL]
+    return [
+        {
+            "id": model["id"],
+            "name": model["name"],
+            "info": {
+                "meta": model["meta"],
+            },
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "arena",
+            "arena": True,
+        }
+        for model in arena_models
+    ]
+
+
+def get_action_items_from_module(function, module) -> list[dict]:
+    if hasattr(module, "actions"):
+        return [
+            {
+                "id": f"{function.id}.{action['id']}",
+                "name": action.get("name", f"{function.name} ({action['id']})"),
+                "description": function.meta.description,
+                "icon": action.get(
+                    "icon_url",
+                    function.meta.manifest.get("icon_url", None)
+                    or getattr(module, "icon_url", None)
+                    or getattr(module, "icon", None),
+                ),
+            }
+            for action in module.actions
+        ]
+    else:
+        return [
+            {
+                "id": function.id,
+                "name": function.name,
+                "description": function.meta.description,
+                "icon": function.meta.manifest.get("icon_url", None)
+                or getattr(module, "icon_url", None)
+                or getattr(module, "icon", None),
+            }
+        ]
+
+
+def get_filter_items_from_module(function, module) -> list[dict]:
+    return [
+        {
+            "id": function.id,
+            "name": function.name,
+            "description": function.meta.description,
+            "icon": function.meta.manifest.get("icon_url", None)
+            or getattr(module, "icon_url", None)
+            or getattr(module, "icon", None),
+        }
+    ]
+
+
+class ModelRegistry:
+    """
+    The assembled model list (base models + arena + model table + actions and
+    filters), indexed by id.
+
+    The list is built from the base models and kept until a model, function or
+    connection changes, so /api/models and the chat path don't redo the
+    assembly per request. The build is keyed on the content of the base
+    models, not the list object, since they are refetched per request unless
+    ENABLE_BASE_MODELS_CACHE is set; callers get copies of the cached dicts. Custom models are matched through indexes by id and
+    by Ollama base name ('llama3' for 'llama3:7b') instead of scanning every
+    base model. Access checks use the model rows loaded for the build, and the
+    outcome is cached per user and group set until the next change.
+
+    Writes are observed through the model/function change listeners and, when
+    Redis is configured, broadcast to the other workers. Without Redis each
+    read compares a (row count, latest updated_at) version of the model table
+    instead, so writes made by another worker are picked up on its next read.
+    """
+
+    def __init__(self, view_cache_size: int = 1024):
+        self.instance_id = str(uuid.uuid4())
+        self.view_cache_size = view_cache_size
+        self._lock = threading.Lock()
+        self._generation = 0
+        # model_id -> ModelModel
+        self._model_infos = None
+        # (base models fingerprint, generation, models)
+        self._build = None
+        # Models.get_models_version() the cached rows were checked against
+        self._db_version = None
+        # (user_id, role, group ids) -> {model_id: bool}
+        self._views: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._app = None
+        self._redis = None
+
+    def bind(self, app, redis=None):
+        """Attach the app (for its base model cache) and a sync Redis client."""
+        self._app = app
+        self._redis = redis
+
+    # ---- invalidation ----
+
+    def invalidate(self, base_models=False):
+        with self._lock:
+            self._generation += 1
+            self._model_infos = None
+            self._build = None
+            self._views.clear()
+
+        if base_models and self._app is not None:
+            # Connections changed: refetch instead of reusing the cached base models
+            self._app.state.BASE_MODELS = []
+
+    def _publish(self, kind, id=None):
+        if self._redis is None:
+            return
+        try:
+            self._redis.publish(
+                REDIS_MODEL_CHANNEL,
+                json.dumps({"kind": kind, "id": id, "origin": self.instance_id}),
+            )
+        except Exception as e:
+            log.warning(f"Failed to broadcast {kind} change {id}: {e}")
+
+    def on_model_change(self, model_id):
+        self.invalidate()
+        self._publish("model", model_id)
+
+    def on_function_change(self, function_id):
+        # The plugin registry already broadcasts function changes
+        self.invalidate()
+
+    def on_connections_change(self):
+        self.invalidate(base_models=True)
+        self._publish("connections")
+
+    def on_config_change(self):
+        self.invalidate()
+        self._publish("config")
+
+    def apply_remote_change(self, change: dict):
+        if change.get("origin") in (self.instance_id, PLUGIN_REGISTRY.instance_id):
+            return
+
+        kind = change.get("kind")
+        if kind == "tool":
+            return
+        self.invalidate(base_models=kind == "connections")
+
+    def _check_db_version(self):
+        """Without Redis, notice model writes made by other workers."""
+        if self._redis is not None:
+            return
+        try:
+            version = Models.get_models_version()
+        except Exception as e:
+            log.warning(f"Failed to read the model table version: {e}")
+            return
+
+        # updated_at has one-second resolution, so a second write within the
+        # current second would leave the version unchanged: don't trust it yet
+        settled = version[1] < int(time.time())
+        if version != self._db_version or not settled:
+            self.invalidate()
+            self._db_version = version
+
+    # ---- model rows ----
+
+    def _snapshot(self) -> dict:
+        model_infos = self._model_infos
+        if model_infos is not None:
+            return model_infos
+
+        generation = self._generation
+        model_infos = {model.id: model for model in Models.get_all_models()}
+        with self._lock:
+            # A write that landed while we were reading wins; the next call reloads
+            if generation == self._generation:
+                self._model_infos = model_infos
+        return model_infos
+
+    def get_model_info(self, model_id: str):
+        self._check_db_version()
+        return self._snapshot().get(model_id)
+
+    # ---- assembly ----
+
+    @staticmethod
+    def _fingerprint(base_models: list) -> str:
+        # "created" is stamped with the fetch time for Ollama models
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    {k: v for k, v in model.items() if k != "created"}
+                    for model in base_models
+                ],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get_models(self, request, base_models: list) -> tuple[list, dict]:
+        """Return (models, models by id) assembled from `base_models`."""
+        self._check_db_version()
+        fingerprint = self._fingerprint(base_models)
+
+        build = self._build
+        if build is None or build[0] != fingerprint or build[1] != self._generation:
+            generation = self._generation
+            models = self._assemble(request, base_models)
+            build = (fingerprint, generation, models)
+            with self._lock:
+                if generation == self._generation:
+                    self._build = build
+            log.debug(f"Model registry rebuilt with {len(models)} models")
+
+        # Callers may modify the dicts they get; the cached build stays as is
+        models = [model.copy() for model in build[2]]
+        return models, {model["id"]: model for model in models}
+
+    def _assemble(self, request, base_models: list) -> list:
+        # Copy the base models to avoid modifying the cached list
+        models = [model.copy() for model in base_models]
+        models += get_arena_models(request.app.state.config)
+
+        # base name -> models in list order; Ollama may return model ids in
+        # different formats (e.g., 'llama3' vs. 'llama3:7b')
+        by_base_name: dict[str, list] = {}
+        present: dict[str, int] = {}
+
+        def index(model):
+            by_base_name.setdefault(model["id"].split(":")[0], []).append(model)
+            present[model["id"]] = present.get(model["id"], 0) + 1
+
+        for model in models:
+            index(model)
+
+        removed = set()
+        presets = []
+        for custom_model in self._snapshot().values():
+            candidates = [
+                model
+                for model in by_base_name.get(custom_model.id.split(":")[0], [])
+                if id(model) not in removed
+            ]
+
+            if custom_model.base_model_id is None:
+                # Applied directly to a base model
+                for model in candidates:
+                    if not (
+                        custom_model.id == model["id"]
+                        or (
+                            model.get("owned_by") == "ollama"
+                            and custom_model.id == model["id"].split(":")[0]
+                        )
+                    ):
+                        continue
+
+                    if custom_model.is_active:
+                        model["name"] = custom_model.name
+                        model["info"] = custom_model.model_dump()
+
+                        meta = model["info"].get("meta") or {}
+                        model["action_ids"] = list(meta.get("actionIds", []))
+                        model["filter_ids"] = list(meta.get("filterIds", []))
+                    else:
+                        removed.add(id(model))
+                        present[model["id"]] -= 1
+
+            elif custom_model.is_active and not present.get(custom_model.id):
+                owned_by = "openai"
+                pipe = None
+
+                for model in by_base_name.get(
+                    custom_model.base_model_id.split(":")[0], []
+                ):
+                    if id(model) in removed:
+                        continue
+                    if (
+                        custom_model.base_model_id == model["id"]
+                        or custom_model.base_model_id == model["id"].split(":")[0]
+                    ):
+                        owned_by = model.get("owned_by", "unknown owner")
+                        if "pipe" in model:
+                            pipe = model["pipe"]
+                        break
+
+                action_ids = []
+                filter_ids = []
+                if custom_model.meta:
+                    meta = custom_model.meta.model_dump()
+                    action_ids.extend(meta.get("actionIds", []))
+                    filter_ids.extend(meta.get("filterIds", []))
+
+                preset = {
+                    "id": f"{custom_model.id}",
+                    "name": custom_model.name,
+                    "object": "model",
+                    "created": custom_model.created_at,
+                    "owned_by": owned_by,
+                    "info": custom_model.model_dump(),
+                    "preset": True,
+                    **({"pipe": pipe} if pipe is not None else {}),
+                    "action_ids": action_ids,
+                    "filter_ids": filter_ids,
+                }
+                presets.append(preset)
+                index(preset)
+
+        models = [model for model in models if id(model) not in removed] + presets
+        self._attach_functions(request, models)
+        return models
+
+    def _attach_functions(self, request, models: list):
+        global_action_ids = [
+            function.id for function in PLUGIN_REGISTRY.get_global_action_functions()
+        ]
+        enabled_action_ids = {
+            function.id
+            for function in PLUGIN_REGISTRY.get_functions_by_type(
+                "action", active_only=True
+            )
+        }
+        global_filter_ids = [
+            function.id for function in PLUGIN_REGISTRY.get_global_filter_functions()
+        ]
+        enabled_filter_ids = {
+            function.id
+            for function in PLUGIN_REGISTRY.get_functions_by_type(
+                "filter", active_only=True
+            )
+        }
+
+        # Each function's items are resolved once, not once per model
+        action_items: dict[str, list] = {}
+        filter_items: dict[str, list] = {}
+
+        def get_function(function_id, kind):
+            function = PLUGIN_REGISTRY.get_function(function_id)
+            if function is None:
+                raise Exception(f"{kind} not found: {function_id}")
+            function_module, _, _ = get_function_module_from_cache(request, function_id)
+            return function, function_module
+
+        for model in models:
+            action_ids = [
+                action_id
+                for action_id in set(model.pop("action_ids", []) + global_action_ids)
+                if action_id in enabled_action_ids
+            ]
+            filter_ids = [
+                filter_id
+                for filter_id in set(model.pop("filter_ids", []) + global_filter_ids)
+                if filter_id in enabled_filter_ids
+            ]
+
+            model["actions"] = []
+            for action_id in action_ids:
+                if action_id not in action_items:
+                    function, module = get_function(action_id, "Action")
+                    action_items[action_id] = get_action_items_from_module(
+                        function, module
+                    )
+                model["actions"].extend(action_items[action_id])
+
+            model["filters"] = []
+            for filter_id in filter_ids:
+                if filter_id not in filter_items:
+                    function, module = get_function(filter_id, "Filter")
+                    filter_items[filter_id] = (
+                        get_filter_items_from_module(function, module)
+                        if getattr(module, "toggle", None)
+                        else []
+                    )
+                model["filters"].extend(filter_items[filter_id])
+
+    # ---- access ----
+
+    def _has_access(self, user, user_group_ids, model, model_infos) -> bool:
+        if model.get("arena"):
+            return has_access(
+                user.id,
+                type="read",
+                access_control=model.get("info", {})
+                .get("meta", {})
+                .get("access_control", {}),
+                user_group_ids=user_group_ids,
+            )
+
+        model_info = model_infos.get(model.get("id"))
+        return model_info is not None and (
+            user.id == model_info.user_id
+            or has_access(
+                user.id,
+                type="read",
+                access_control=model_info.access_control,
+                user_group_ids=user_group_ids,
+            )
+        )
+
+    def filter_models(self, models: list, user) -> list:
+        """Models from `models` the user may read, memoized per user and group set."""
+        user_group_ids = frozenset(
+            group.id for group in Groups.get_groups_by_member_id(user.id)
+        )
+        key = (user.id, user.role, user_group_ids)
+        self._check_db_version()
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = {}
+                while len(self._views) > self.view_cache_size:
+                    self._views.popitem(last=False)
+            else:
+                self._views.move_to_end(key)
+
+        model_infos = self._snapshot()
+        filtered_models = []
+        for model in models:
+            allowed = view.get(model.get("id"))
+            if allowed is None:
+                allowed = view[model.get("id")] = self._has_access(
+                    user, user_group_ids, model, model_infos
+                )
+            if allowed:
+                filtered_models.append(model)
+        return filtered_models
+
+
+MODEL_REGISTRY = ModelRegistry()
+Models.add_change_listener(MODEL_REGISTRY.on_model_change)
+Functions.add_change_listener(MODEL_REGISTRY.on_function_change)
+
+
+async def redis_model_change_listener(app):
+    pubsub = app.state.redis.pubsub()
+    await pubsub.subscribe(REDIS_MODEL_CHANNEL, REDIS_PLUGIN_CHANNEL)
+
+    async for message in pubsub.listen():
+        if message["type"] != "message":
+            continue
+        try:
+            MODEL_REGISTRY.apply_remote_change(json.loads(message["data"]))
+        except Exception as e:
+            log.exception(f"Error handling model change: {e}")
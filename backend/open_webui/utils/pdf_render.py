@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from open_webui.config import (
+    PDF_RENDER_CACHE_DIR,
+    PDF_RENDER_CACHE_MAX_MB,
+    PDF_RENDER_MAX_OPEN_DOCUMENTS,
+    PDF_RENDER_PREFETCH_PAGES,
+    PDF_RENDER_WORKERS,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.storage.provider import Storage
+from open_webui.utils.pdf_render_worker import render_page_to_file
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+MIN_RENDER_DPI = 36
+MAX_RENDER_DPI = 600
+DEFAULT_RENDER_DPI = 200
+
+
+def _compute_file_hash(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class PdfPageNotFound(Exception):
+    pass
+
+
+class PdfRenderPool:
+    """
+    Renders PDF pages in a pool of long-lived worker processes.
+
+    Each worker keeps an LRU of opened documents, and rendered pages are
+    cached on disk under `{cache_dir}/{file_hash}/{page}_{dpi}.png`, so a
+    page is only rasterized once per file content and resolution. Once the
+    page cache grows past `max_cache_bytes`, the least recently served pages
+    (by mtime, refreshed on every hit) are deleted down to 90% of it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_workers: int = 2,
+        max_open_documents: int = 8,
+        prefetch_pages: int = 2,
+        max_cache_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max(1, max_workers)
+        self.max_open_documents = max(1, max_open_documents)
+        self.prefetch_pages = max(0, prefetch_pages)
+        self.max_cache_bytes = max_cache_bytes
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: dict[tuple[str, int, int], Future] = {}
+
+        # (file_id, updated_at) -> (local path, content hash)
+        self._file_hashes: "OrderedDict[tuple, tuple[str, str]]" = OrderedDict()
+        # content hash -> page count
+        self._page_counts: dict[str, int] = {}
+
+        # Size of the page cache on disk; unknown until the first trim scans it
+        self._cache_bytes: Optional[int] = None
+        self._trimming = False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is not None and getattr(self._executor, "_broken", False):
+            # A worker died (e.g. crashed on a malformed PDF or was OOM
+            # killed); a broken pool rejects all new work, so start a new one
+            log.warning("PDF render pool is broken, restarting workers")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        if self._executor is None:
+            # "spawn" keeps workers independent of the server's threads and
+            # open sockets at fork time
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._inflight.clear()
+
+    @staticmethod
+    def normalize_dpi(dpi: Optional[int]) -> int:
+        if not dpi:
+            return DEFAULT_RENDER_DPI
+        return min(max(int(dpi), MIN_RENDER_DPI), MAX_RENDER_DPI)
+
+    @staticmethod
+    def get_etag(file_hash: str, page: int, dpi: int) -> str:
+        return f'"{file_hash[:32]}-{page}-{dpi}"'
+
+    def get_page_path(self, file_hash: str, page: int, dpi: int) -> Path:
+        return self.cache_dir / file_hash / f"{page}_{dpi}.png"
+
+    def get_page_count(self, file_hash: str) -> Optional[int]:
+        return self._page_counts.get(file_hash)
+
+    async def resolve_file(self, file_id: str, updated_at: int, storage_path: str):
+        """
+        Return (local path, content hash) for a stored file.
+
+        Results are memoized by (file_id, updated_at) so cache hits don't go
+        through the storage provider or re-hash the file.
+        """
+        key = (file_id, updated_at)
+        cached = self._file_hashes.get(key)
+        if cached is not None and os.path.exists(cached[0]):
+            self._file_hashes.move_to_end(key)
+            return cached
+
+        local_path = await asyncio.to_thread(Storage.get_file, storage_path)
+        file_hash = await asyncio.to_thread(_compute_file_hash, local_path)
+
+        self._file_hashes[key] = (local_path, file_hash)
+        while len(self._file_hashes) > 1024:
+            self._file_hashes.popitem(last=False)
+
+        return local_path, file_hash
+
+    def _submit(self, source_path: str, file_hash: str, page: int, dpi: int) -> Future:
+        key = (file_hash, page, dpi)
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+
+        target_path = self.get_page_path(file_hash, page, dpi)
+
+        future = self._get_executor().submit(
+            render_page_to_file,
+            source_path,
+            page,
+            dpi,
+            str(target_path),
+            self.max_open_documents,
+        )
+        self._inflight[key] = future
+        loop = asyncio.get_running_loop()
+
+        def _record(f: Future, size: int):
+            self._inflight.pop(key, None)
+            if not f.cancelled() and f.exception() is None:
+                self._page_counts[file_hash] = f.result()[0]
+                self._add_cache_bytes(size)
+
+        def _done(f: Future):
+            # Runs on the executor's thread: stat the page here, but leave the
+            # pool's state to the event loop
+            size = 0
+            if not f.cancelled() and f.exception() is None and f.result()[1]:
+                try:
+                    size = target_path.stat().st_size
+                except OSError:
+                    pass
+            try:
+                loop.call_soon_threadsafe(_record, f, size)
+            except RuntimeError:
+                # The loop is closed; nothing else can be using the pool's state
+                _record(f, size)
+
+        future.add_done_callback(_done)
+        return future
+
+    # ---- page cache size ----
+
+    def _add_cache_bytes(self, size: int):
+        if self._cache_bytes is not None:
+            self._cache_bytes += size
+        if self._trimming or (
+            self._cache_bytes is not None and self._cache_bytes <= self.max_cache_bytes
+        ):
+            return
+
+        self._trimming = True
+        try:
+            busy = {key[0] for key in self._inflight}
+            task = asyncio.get_running_loop().create_task(
+                asyncio.to_thread(self._trim_cache, busy)
+            )
+        except RuntimeError:
+            self._trimming = False
+            return
+        task.add_done_callback(self._on_trimmed)
+
+    def _on_trimmed(self, task: asyncio.Task):
+        self._trimming = False
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            log.warning(f"Failed to trim the PDF page cache: {task.exception()}")
+            return
+        self._cache_bytes = task.result()
+
+    def _trim_cache(self, busy_hashes: set) -> int:
+        """Delete the least recently served pages once over budget; return the cache size."""
+        pages = []
+        for file_dir in os.scandir(self.cache_dir):
+            if not file_dir.is_dir():
+                continue
+            for entry in os.scandir(file_dir.path):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    pages.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in pages)
+        if total <= self.max_cache_bytes:
+            return total
+
+        target = self.max_cache_bytes * 0.9
+        evicted = 0
+        for _, size, path in sorted(pages):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+        for file_dir in os.scandir(self.cache_dir):
+            if file_dir.name in busy_hashes or not file_dir.is_dir():
+                continue
+            if not any(os.scandir(file_dir.path)):
+                try:
+                    os.rmdir(file_dir.path)
+                except OSError:
+                    pass
+
+        log.info(f"Evicted {evicted} pages from the PDF page cache")
+        return total
+
+    async def render_page(
+        self, source_path: str, file_hash: str, page: int, dpi: int
+    ) -> Path:
+        """Return the path of the rendered page, rendering it if needed."""
+        page_path = self.get_page_path(file_hash, page, dpi)
+
+        try:
+            # Mark the page as recently served for the cache eviction
+            os.utime(page_path)
+            cached = True
+        except FileNotFoundError:
+            cached = False
+
+        if not cached:
+            page_count = self._page_counts.get(file_hash)
+            if page_count is not None and not 1 <= page <= page_count:
+                raise PdfPageNotFound(page)
+
+            # Shielded so a timed-out request doesn't cancel a render other
+            # requests (or the prefetcher) are waiting on
+            _, rendered = await asyncio.shield(
+                asyncio.wrap_future(self._submit(source_path, file_hash, page, dpi))
+            )
+            if not rendered:
+                raise PdfPageNotFound(page)
+
+        self.prefetch(source_path, file_hash, page, dpi)
+        return page_path
+
+    def prefetch(self, source_path: str, file_hash: str, page: int, dpi: int):
+        """Queue renders for the neighbouring pages without waiting on them."""
+        page_count = self._page_counts.get(file_hash)
+
+        for offset in range(1, self.prefetch_pages + 1):
+            for neighbour in (page + offset, page - offset):
+                if neighbour < 1 or (page_count is not None and neighbour > page_count):
+                    continue
+                if self.get_page_path(file_hash, neighbour, dpi).exists():
+                    continue
+                try:
+                    self._submit(source_path, file_hash, neighbour, dpi)
+                except Exception as e:
+                    log.debug(f"Failed to queue PDF page prefetch: {e}")
+                    return
+
+
+PDF_RENDER_POOL = PdfRenderPool(
+    cache_dir=PDF_RENDER_CACHE_DIR,
+    max_workers=PDF_RENDER_WORKERS,
+    max_open_documents=PDF_RENDER_MAX_OPEN_DOCUMENTS,
+    prefetch_pages=PDF_RENDER_PREFETCH_PAGES,
+    max_cache_bytes=PDF_RENDER_CACHE_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,81 @@
+"""
+Worker-side half of `open_webui.utils.pdf_render`.
+
+Kept free of open_webui imports: pool workers are spawned processes and
+import only this module, not the app config or database.
+"""
+
+import os
+from collections import OrderedDict
+
+# Opened documents, per worker process:
+# (source path, mtime, size) -> pymupdf.Document
+_WORKER_DOCUMENTS: "OrderedDict[tuple, object]" = OrderedDict()
+
+
+def _close(document):
+    try:
+        document.close()
+    except Exception:
+        pass
+
+
+def _open_document(source_path: str, max_open_documents: int):
+    # Storage may reuse a local path for new content (e.g. a re-uploaded
+    # file), so a cached document only counts if the file is unchanged
+    stat = os.stat(source_path)
+    key = (source_path, stat.st_mtime_ns, stat.st_size)
+
+    document = _WORKER_DOCUMENTS.get(key)
+    if document is not None:
+        _WORKER_DOCUMENTS.move_to_end(key)
+        return document
+
+    for stale_key in [k for k in _WORKER_DOCUMENTS if k[0] == source_path]:
+        _close(_WORKER_DOCUMENTS.pop(stale_key))
+
+    import pymupdf
+
+    document = pymupdf.open(source_path)
+    _WORKER_DOCUMENTS[key] = document
+
+    while len(_WORKER_DOCUMENTS) > max(1, max_open_documents):
+        _, evicted = _WORKER_DOCUMENTS.popitem(last=False)
+        _close(evicted)
+
+    return document
+
+
+def render_page_to_file(
+    source_path: str,
+    page_number: int,
+    dpi: int,
+    target_path: str,
+    max_open_documents: int,
+) -> tuple[int, bool]:
+    """
+    Render one page (1-based) to a PNG file.
+
+    Runs inside a pool worker. Returns (page_count, rendered); `rendered` is
+    False when the page is out of range.
+    """
+    document = _open_document(source_path, max_open_documents)
+    page_count = document.page_count
+
+    if page_number < 1 or page_number > page_count:
+        return page_count, False
+
+    if os.path.exists(target_path):
+        return page_count, True
+
+    pixmap = document.load_page(page_number - 1).get_pixmap(dpi=dpi)
+
+    # Write to a temp file first so readers never see a partial image; the
+    # directory may have been removed by the page cache eviction
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pixmap.tobytes("png"))
+    os.replace(tmp_path, target_path)
+
+    return page_count, True
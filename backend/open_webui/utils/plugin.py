@@ -1,13 +1,23 @@
+import hashlib
+import json
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
+import uuid
 from importlib import util
 import types
 import tempfile
 import logging
 
-from open_webui.env import SRC_LOG_LEVELS, PIP_OPTIONS, PIP_PACKAGE_INDEX_OPTIONS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    PIP_OPTIONS,
+    PIP_PACKAGE_INDEX_OPTIONS,
+    REDIS_KEY_PREFIX,
+)
 from open_webui.models.functions import Functions
 from open_webui.models.tools import Tools
 
@@ -75,10 +85,9 @@ def load_tool_module_by_id(tool_id, content=None):
         if not tool:
             raise Exception(f"Toolkit not found: {tool_id}")
 
-        content = tool.content
-
-        content = replace_imports(content)
-        Tools.update_tool_by_id(tool_id, {"content": content})
+        content = replace_imports(tool.content)
+        if content != tool.content:
+            Tools.update_tool_by_id(tool_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         # Install required packages found within the frontmatter
@@ -115,18 +124,20 @@ def load_tool_module_by_id(tool_id, content=None):
         os.unlink(temp_file.name)
 
 
-def load_function_module_by_id(function_id: str, content: str | None = None):
+def load_function_module_by_id(
+    function_id: str, content: str | None = None, install_requirements: bool = True
+):
     if content is None:
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
-
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
+        content = replace_imports(function.content)
+        if content != function.content:
+            Functions.update_function_by_id(function_id, {"content": content})
     else:
-        frontmatter = extract_frontmatter(content)
-        install_frontmatter_requirements(frontmatter.get("requirements", ""))
+        if install_requirements:
+            frontmatter = extract_frontmatter(content)
+            install_frontmatter_requirements(frontmatter.get("requirements", ""))
 
     module_name = f"function_{function_id}"
     module = types.ModuleType(module_name)
@@ -168,58 +179,13 @@ def load_function_module_by_id(function_id: str, content: str | None = None):
 
 def get_function_module_from_cache(request, function_id, load_from_db=True):
     if load_from_db:
-        # Always load from the database by default
-        # This is useful for hooks like "inlet" or "outlet" where the content might change
-        # and we want to ensure the latest content is used.
+        # Resolve against the registry's view of the database row, so a
+        # function edited elsewhere (including on another worker) is reloaded,
+        # while an unchanged one is not re-executed.
+        return PLUGIN_REGISTRY.get_function_module(function_id)
 
-        function = Functions.get_function_by_id(function_id)
-        if not function:
-            raise Exception(f"Function not found: {function_id}")
-        content = function.content
-
-        new_content = replace_imports(content)
-        if new_content != content:
-            content = new_content
-            # Update the function content in the database
-            Functions.update_function_by_id(function_id, {"content": content})
-
-        if (
-            hasattr(request.app.state, "FUNCTION_CONTENTS")
-            and function_id in request.app.state.FUNCTION_CONTENTS
-        ) and (
-            hasattr(request.app.state, "FUNCTIONS")
-            and function_id in request.app.state.FUNCTIONS
-        ):
-            if request.app.state.FUNCTION_CONTENTS[function_id] == content:
-                return request.app.state.FUNCTIONS[function_id], None, None
-
-        function_module, function_type, frontmatter = load_function_module_by_id(
-            function_id, content
-        )
-    else:
-        # Load from cache (e.g. "stream" hook)
-        # This is useful for performance reasons
-
-        if (
-            hasattr(request.app.state, "FUNCTIONS")
-            and function_id in request.app.state.FUNCTIONS
-        ):
-            return request.app.state.FUNCTIONS[function_id], None, None
-
-        function_module, function_type, frontmatter = load_function_module_by_id(
-            function_id
-        )
-
-    if not hasattr(request.app.state, "FUNCTIONS"):
-        request.app.state.FUNCTIONS = {}
-
-    if not hasattr(request.app.state, "FUNCTION_CONTENTS"):
-        request.app.state.FUNCTION_CONTENTS = {}
-
-    request.app.state.FUNCTIONS[function_id] = function_module
-    request.app.state.FUNCTION_CONTENTS[function_id] = content
-
-    return function_module, function_type, frontmatter
+    # Any loaded version will do (e.g. the "stream" hook)
+    return PLUGIN_REGISTRY.get_function_module(function_id, check_version=False)
 
 
 def install_frontmatter_requirements(requirements: str):
@@ -268,3 +234,228 @@ def install_tool_and_function_dependencies():
         install_frontmatter_requirements(all_dependencies.strip(", "))
     except Exception as e:
         log.error(f"Error installing requirements: {e}")
+
+
+####################
+# Plugin registry
+####################
+
+REDIS_PLUGIN_CHANNEL = f"{REDIS_KEY_PREFIX}:plugins:changes"
+
+
+def content_version(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+class PluginRegistry:
+    """
+    In-process view of the function table and the modules compiled from it.
+
+    Function rows (with valves) are loaded in one query and kept until a write
+    invalidates them; modules are keyed by the sha256 of the content they were
+    built from, so a module is only re-executed when its source changed. Writes
+    are observed through the model change listeners and, when Redis is
+    configured, broadcast to the other workers, which drop their snapshot and
+    any tool modules that changed. Without Redis, the table's version (row
+    count, latest updated_at) is read before each lookup instead.
+    """
+
+    def __init__(self):
+        self.instance_id = str(uuid.uuid4())
+        self._lock = threading.Lock()
+        self._generation = 0
+        # function_id -> (FunctionWithValvesModel, content version)
+        self._functions = None
+        # function_id -> (content version, module)
+        self._modules = {}
+        self._db_version = None
+        self._app = None
+        self._redis = None
+
+    def bind(self, app, redis=None):
+        """Attach the app (for its tool module cache) and a sync Redis client."""
+        self._app = app
+        self._redis = redis
+
+    # ---- function rows ----
+
+    def invalidate_functions(self):
+        with self._lock:
+            self._generation += 1
+            self._functions = None
+
+    def _check_db_version(self):
+        """Without Redis, notice function writes made by other workers."""
+        if self._redis is not None:
+            return
+        try:
+            version = Functions.get_functions_version()
+        except Exception as e:
+            log.warning(f"Failed to read the function table version: {e}")
+            return
+
+        # updated_at has one-second resolution, so a second write within the
+        # current second would leave the version unchanged: don't trust it yet
+        settled = version[1] < int(time.time())
+        if version != self._db_version or not settled:
+            self.invalidate_functions()
+            self._db_version = version
+
+    def _snapshot(self) -> dict:
+        functions = self._functions
+        if functions is not None:
+            return functions
+
+        generation = self._generation
+        functions = {
+            function.id: (function, content_version(function.content))
+            for function in Functions.get_functions(include_valves=True)
+        }
+        with self._lock:
+            # A write that landed while we were reading wins; the next call reloads
+            if generation == self._generation:
+                self._functions = functions
+                for function_id in list(self._modules):
+                    if function_id not in functions:
+                        del self._modules[function_id]
+        return functions
+
+    def get_function(self, function_id):
+        self._check_db_version()
+        entry = self._snapshot().get(function_id)
+        return entry[0] if entry else None
+
+    def get_function_valves(self, function_id) -> dict:
+        function = self.get_function(function_id)
+        return (function.valves or {}) if function else {}
+
+    def get_functions_by_type(self, type: str, active_only=False) -> list:
+        self._check_db_version()
+        return [
+            function
+            for function, _ in self._snapshot().values()
+            if function.type == type and (function.is_active or not active_only)
+        ]
+
+    def get_global_filter_functions(self) -> list:
+        return [
+            function
+            for function in self.get_functions_by_type("filter", active_only=True)
+            if function.is_global
+        ]
+
+    def get_global_action_functions(self) -> list:
+        return [
+            function
+            for function in self.get_functions_by_type("action", active_only=True)
+            if function.is_global
+        ]
+
+    # ---- function modules ----
+
+    def set_function_module(self, function_id, content, function_module):
+        """Record a module the caller just built from `content`."""
+        self._modules[function_id] = (content_version(content), function_module)
+
+    def drop_function_module(self, function_id):
+        self._modules.pop(function_id, None)
+
+    def get_function_module(self, function_id, check_version=True):
+        cached = self._modules.get(function_id)
+        if cached is not None and not check_version:
+            return cached[1], None, None
+
+        self._check_db_version()
+        entry = self._snapshot().get(function_id)
+        if entry is None:
+            raise Exception(f"Function not found: {function_id}")
+        function, version = entry
+
+        if cached is not None and cached[0] == version:
+            return cached[1], None, None
+
+        content = replace_imports(function.content)
+        if content != function.content:
+            # Persist the rewritten imports once; the row is reloaded on next access
+            Functions.update_function_by_id(function_id, {"content": content})
+
+        function_module, function_type, frontmatter = load_function_module_by_id(
+            function_id, content
+        )
+        self.set_function_module(function_id, content, function_module)
+        return function_module, function_type, frontmatter
+
+    def warmup(self):
+        """Execute the modules of all active functions ahead of the first request."""
+        self._check_db_version()
+        loaded = 0
+        for function_id, (function, version) in self._snapshot().items():
+            if not function.is_active:
+                continue
+            cached = self._modules.get(function_id)
+            if cached is not None and cached[0] == version:
+                continue
+            try:
+                content = replace_imports(function.content)
+                function_module, _, _ = load_function_module_by_id(
+                    function_id, content, install_requirements=False
+                )
+                self.set_function_module(function_id, content, function_module)
+                loaded += 1
+            except Exception as e:
+                log.warning(f"Failed to warm up function {function_id}: {e}")
+        log.info(f"Warmed up {loaded} function modules")
+
+    # ---- change propagation ----
+
+    def _publish(self, kind, id):
+        if self._redis is None:
+            return
+        try:
+            self._redis.publish(
+                REDIS_PLUGIN_CHANNEL,
+                json.dumps({"kind": kind, "id": id, "origin": self.instance_id}),
+            )
+        except Exception as e:
+            log.warning(f"Failed to broadcast {kind} change {id}: {e}")
+
+    def on_function_change(self, function_id):
+        self.invalidate_functions()
+        self._publish("function", function_id)
+
+    def on_tool_change(self, tool_id):
+        # Local tool modules are kept up to date by the tools router itself
+        self._publish("tool", tool_id)
+
+    def apply_remote_change(self, change: dict):
+        if change.get("origin") == self.instance_id:
+            return
+
+        if change.get("kind") == "function":
+            self.invalidate_functions()
+        elif change.get("kind") == "tool" and self._app is not None:
+            tools = getattr(self._app.state, "TOOLS", None)
+            if tools is None:
+                return
+            if change.get("id"):
+                tools.pop(change["id"], None)
+            else:
+                tools.clear()
+
+
+PLUGIN_REGISTRY = PluginRegistry()
+Functions.add_change_listener(PLUGIN_REGISTRY.on_function_change)
+Tools.add_change_listener(PLUGIN_REGISTRY.on_tool_change)
+
+
+async def redis_plugin_change_listener(app):
+    pubsub = app.state.redis.pubsub()
+    await pubsub.subscribe(REDIS_PLUGIN_CHANNEL)
+
+    async for message in pubsub.listen():
+        if message["type"] != "message":
+            continue
+        try:
+            PLUGIN_REGISTRY.apply_remote_change(json.loads(message["data"]))
+        except Exception as e:
+            log.exception(f"Error handling plugin change: {e}")
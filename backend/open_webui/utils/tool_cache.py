@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import update_wrapper
+from typing import Any, Awaitable, Callable, Optional
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_KEY_PREFIX,
+    TOOL_RESULT_CACHE_SIZE,
+    TOOL_RESULT_CACHE_MAX_ITEM_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+class ToolCachePolicy:
+    """
+    Opt-in memoization settings for one toolkit.
+
+    Declared in the tool's frontmatter::
+
+        cache_ttl: 600
+        cache_functions: search, lookup
+        cache_scope: user
+
+    or through valves with the same names (valves win). ``cache_functions``
+    defaults to every function of the toolkit; ``cache_scope`` is ``user``
+    (results are never shared between users) or ``global``.
+    """
+
+    def __init__(self, ttl: int, functions: Optional[set] = None, scope: str = "user"):
+        self.ttl = ttl
+        self.functions = functions
+        self.scope = scope
+
+    def applies_to(self, function_name: str) -> bool:
+        return self.functions is None or function_name in self.functions
+
+    @classmethod
+    def from_settings(cls, *sources: Any) -> Optional["ToolCachePolicy"]:
+        settings = {}
+        for source in sources:
+            if source is None:
+                continue
+            for key in ("cache_ttl", "cache_functions", "cache_scope"):
+                value = (
+                    source.get(key)
+                    if isinstance(source, dict)
+                    else getattr(source, key, None)
+                )
+                if value not in (None, ""):
+                    settings[key] = value
+
+        try:
+            ttl = int(float(settings.get("cache_ttl", 0)))
+        except (TypeError, ValueError):
+            return None
+        if ttl <= 0:
+            return None
+
+        functions = settings.get("cache_functions")
+        if isinstance(functions, str):
+            functions = {name.strip() for name in functions.split(",") if name.strip()}
+        elif functions is not None:
+            functions = set(functions)
+
+        scope = str(settings.get("cache_scope", "user")).strip().lower()
+        return cls(ttl, functions or None, "global" if scope == "global" else "user")
+
+
+def tool_cache_key(
+    tool_id: str,
+    function_name: str,
+    params: dict,
+    scope: Optional[str],
+    version: str = "",
+) -> str:
+    """Cache key from the canonical JSON of the call (reserved ``__`` params excluded)."""
+    payload = json.dumps(
+        {
+            "tool": tool_id,
+            "version": version,
+            "function": function_name,
+            "params": {k: v for k, v in params.items() if not k.startswith("__")},
+            "scope": scope,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Memoized tool results, stored as JSON.
+
+    Entries live in an in-process LRU bounded by ``size``; when a Redis client
+    is given, entries go to Redis instead so every worker shares them. Results
+    that aren't JSON-serializable or exceed ``max_item_size`` are not cached.
+    """
+
+    def __init__(
+        self,
+        size: int = TOOL_RESULT_CACHE_SIZE,
+        max_item_size: int = TOOL_RESULT_CACHE_MAX_ITEM_SIZE,
+        key_prefix: str = f"{REDIS_KEY_PREFIX}:tool_results",
+    ):
+        self.size = size
+        self.max_item_size = max_item_size
+        self.key_prefix = key_prefix
+        # key -> (expires_at, json)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str, redis=None) -> tuple[bool, Any]:
+        if redis is not None:
+            try:
+                value = await redis.get(f"{self.key_prefix}:{key}")
+            except Exception as e:
+                log.debug(f"Tool result cache read failed: {e}")
+                return False, None
+            return (False, None) if value is None else (True, json.loads(value))
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, json.loads(value)
+
+    async def set(self, key: str, result: Any, ttl: int, redis=None):
+        try:
+            value = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        if len(value) > self.max_item_size:
+            return
+
+        if redis is not None:
+            try:
+                await redis.set(f"{self.key_prefix}:{key}", value, ex=ttl)
+            except Exception as e:
+                log.debug(f"Tool result cache write failed: {e}")
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+TOOL_RESULT_CACHE = ToolResultCache()
+
+
+def memoize_tool_function(
+    function: Callable[..., Awaitable],
+    tool_id: str,
+    function_name: str,
+    policy: ToolCachePolicy,
+    user_id: Optional[str],
+    version: str = "",
+    redis=None,
+    cache: Optional[ToolResultCache] = None,
+) -> Callable[..., Awaitable]:
+    """
+    Wrap an async tool callable so identical calls are served from the cache.
+
+    Each hit returns a fresh copy, so callers may mutate the result.
+    """
+    cache = cache or TOOL_RESULT_CACHE
+    scope = user_id if policy.scope == "user" else None
+
+    async def cached_function(*args, **kwargs):
+        if args:
+            return await function(*args, **kwargs)
+
+        key = tool_cache_key(tool_id, function_name, kwargs, scope, version)
+        hit, result = await cache.get(key, redis=redis)
+        if hit:
+            log.debug(f"Tool result cache hit: {tool_id}/{function_name}")
+            return result
+
+        result = await function(**kwargs)
+        if result is not None:
+            await cache.set(key, result, policy.ttl, redis=redis)
+        return result
+
+    update_wrapper(cached_function, function)
+    if hasattr(function, "__signature__"):
+        cached_function.__signature__ = function.__signature__
+    return cached_function
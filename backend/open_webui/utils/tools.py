@@ -6,6 +6,8 @@ import aiohttp
 import asyncio
 import yaml
 import json
+import hashlib
+import time
 
 from pydantic import BaseModel
 from pydantic.fields import FieldInfo
@@ -24,6 +26,7 @@ from typing import (
     Type,
 )
 from functools import update_wrapper, partial
+from yarl import URL
 
 
 from fastapi import Request
@@ -36,13 +39,20 @@ from langchain_core.utils.function_calling import (
 
 from open_webui.models.tools import Tools
 from open_webui.models.users import UserModel
-from open_webui.utils.plugin import load_tool_module_by_id
+from open_webui.utils.plugin import (
+    load_tool_module_by_id,
+    extract_frontmatter,
+    content_version,
+)
+from open_webui.utils.tool_cache import ToolCachePolicy, memoize_tool_function
 from open_webui.env import (
     SRC_LOG_LEVELS,
     AIOHTTP_CLIENT_TIMEOUT,
     AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA,
     AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+    TOOL_SERVER_SPEC_CACHE_TTL,
 )
+from open_webui.utils.http_pool import UPSTREAM_SESSION_POOL
 
 import copy
 
@@ -78,9 +88,10 @@ def get_async_tool_function_and_apply_extra_params(
             return await partial_func(*args, **kwargs)
 
     else:
-        # Make it a coroutine function when it is not already
+        # Make it a coroutine function when it is not already; blocking tools run
+        # in a worker thread so they don't stall the event loop (or each other)
         async def new_function(*args, **kwargs):
-            return partial_func(*args, **kwargs)
+            return await asyncio.to_thread(partial_func, *args, **kwargs)
 
     update_wrapper(new_function, function)
     new_function.__signature__ = new_sig
@@ -92,6 +103,7 @@ async def get_tools(
     request: Request, tool_ids: list[str], user: UserModel, extra_params: dict
 ) -> dict[str, dict]:
     tools_dict = {}
+    tool_servers = None
 
     for tool_id in tool_ids:
         tool = Tools.get_tool_by_id(tool_id)
@@ -114,11 +126,13 @@ async def get_tools(
 
                 if type == "openapi":
 
-                    tool_server_data = None
-                    for server in await get_tool_servers(request):
-                        if server["id"] == server_id:
-                            tool_server_data = server
-                            break
+                    # Resolved once per call, shared by every server tool id
+                    if tool_servers is None:
+                        tool_servers = {}
+                        for server in await get_tool_servers(request):
+                            tool_servers.setdefault(server["id"], server)
+
+                    tool_server_data = tool_servers.get(server_id)
 
                     if tool_server_data is None:
                         log.warning(f"Tool server data not found for {server_id}")
@@ -221,7 +235,7 @@ async def get_tools(
             import sys
             module_name = f"tool_{tool_id}"
             module = sys.modules.get(module_name, None)
-            
+
             # Set valves for the tool
             if module and hasattr(module, "valves") and hasattr(module, "Valves"):
                 valves = Tools.get_tool_valves_by_id(tool_id) or {}
@@ -234,6 +248,20 @@ async def get_tools(
                     **user_valves_dict
                 )
 
+            # Opt-in result memoization, declared in frontmatter or valves
+            cache_policy = ToolCachePolicy.from_settings(
+                (tool.meta.manifest if tool.meta else None)
+                or extract_frontmatter(tool.content),
+                getattr(module, "valves", None) if module else None,
+                getattr(tools_instance, "valves", None),
+            )
+            if cache_policy is not None:
+                # Results depend on the code and the valves, not only the args
+                tool_valves = Tools.get_tool_valves_by_id(tool_id) or {}
+                tool_version = content_version(
+                    tool.content + json.dumps(tool_valves, sort_keys=True, default=str)
+                )
+
             for spec in tool.specs:
                 # TODO: Fix hack for OpenAI API
                 # Some times breaks OpenAI but others don't. Leaving the comment
@@ -255,6 +283,16 @@ async def get_tools(
                 callable = get_async_tool_function_and_apply_extra_params(
                     tool_function, extra_params
                 )
+                if cache_policy is not None and cache_policy.applies_to(function_name):
+                    callable = memoize_tool_function(
+                        callable,
+                        tool_id,
+                        function_name,
+                        cache_policy,
+                        user_id=getattr(user, "id", None),
+                        version=tool_version,
+                        redis=request.app.state.redis,
+                    )
 
                 # TODO: Support Pydantic models as parameters
                 if callable.__doc__ and callable.__doc__.strip() != "":
@@ -525,69 +563,269 @@ def convert_openapi_to_tool_payload(openapi_spec):
     return tool_payload
 
 
-async def set_tool_servers(request: Request):
-    request.app.state.TOOL_SERVERS = await get_tool_servers_data(
-        request.app.state.config.TOOL_SERVER_CONNECTIONS
-    )
+class ToolServerSpecCache:
+    """
+    OpenAPI specs of tool servers, one entry per connection (spec URL + token).
+
+    Each entry keeps the fetched spec together with its precomputed tool
+    payload (``convert_openapi_to_tool_payload``) and the ETag/Last-Modified
+    validators from the response. Fresh entries are served as-is; stale
+    entries are still served immediately while a conditional request
+    revalidates them in the background, so a chat never waits on a tool
+    server unless its spec has never been fetched.
+    """
 
-    if request.app.state.redis is not None:
-        await request.app.state.redis.set(
-            "tool_servers", json.dumps(request.app.state.TOOL_SERVERS)
+    def __init__(self, ttl: float = TOOL_SERVER_SPEC_CACHE_TTL):
+        self.ttl = ttl
+        # key -> {"data", "etag", "last_modified", "fetched_at"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # key -> in-flight fetch task, so concurrent callers share one request
+        self._fetches: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def key(token: Optional[str], url: str) -> str:
+        token_hash = hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+        return f"{url}|{token_hash[:16]}"
+
+    async def get(
+        self, token: Optional[str], url: str, force: bool = False
+    ) -> Dict[str, Any]:
+        key = self.key(token, url)
+        entry = self._entries.get(key)
+
+        if entry is None or force:
+            return await asyncio.shield(self._fetch(key, token, url))
+
+        if time.monotonic() - entry["fetched_at"] >= self.ttl:
+            # Serve the cached spec now and revalidate it in the background
+            self._fetch(key, token, url)
+
+        return entry["data"]
+
+    def retain(self, keys: set):
+        """Drop entries for connections that are no longer configured."""
+        for key in list(self._entries):
+            if key not in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _fetch(self, key: str, token: Optional[str], url: str) -> asyncio.Task:
+        task = self._fetches.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._revalidate(key, token, url))
+            self._fetches[key] = task
+            task.add_done_callback(lambda t: self._on_fetch_done(key, t))
+        return task
+
+    def _on_fetch_done(self, key: str, task: asyncio.Task):
+        if self._fetches.get(key) is task:
+            self._fetches.pop(key, None)
+        if not task.cancelled():
+            # Mark a failed background refresh as handled (it is already
+            # logged); the stale entry keeps being served
+            task.exception()
+
+    async def _revalidate(
+        self, key: str, token: Optional[str], url: str
+    ) -> Dict[str, Any]:
+        entry = self._entries.get(key)
+        data, validators = await fetch_tool_server_data(
+            token,
+            url,
+            etag=entry.get("etag") if entry else None,
+            last_modified=entry.get("last_modified") if entry else None,
         )
 
+        if data is None:
+            # 304 Not Modified: keep the spec and its resolved payload, but
+            # take any validators the server sent with it for the next request
+            entry["etag"] = validators.get("etag")
+            entry["last_modified"] = validators.get("last_modified")
+            entry["fetched_at"] = time.monotonic()
+            return entry["data"]
+
+        self._entries[key] = {
+            "data": data,
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "fetched_at": time.monotonic(),
+        }
+        return data
+
+
+TOOL_SERVER_SPEC_CACHE = ToolServerSpecCache()
+
+
+TOOL_SERVERS_REDIS_KEY = "tool_servers"
+# Bumped on every write so other workers notice the change on their next read
+TOOL_SERVERS_VERSION_REDIS_KEY = "tool_servers:version"
+# Held by the worker that revalidates the specs upstream once the TTL passes
+TOOL_SERVERS_REFRESH_REDIS_KEY = "tool_servers:refresh"
+
+
+def _parse_tool_servers_version(version) -> Optional[int]:
+    try:
+        return int(version) if version is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def set_tool_servers(request: Request, force: bool = True):
+    request.app.state.TOOL_SERVERS = await get_tool_servers_data(
+        request.app.state.config.TOOL_SERVER_CONNECTIONS, force=force
+    )
+    request.app.state.TOOL_SERVERS_LOADED_AT = time.monotonic()
+
+    redis = request.app.state.redis
+    if redis is not None:
+        tool_servers = json.dumps(request.app.state.TOOL_SERVERS)
+        if tool_servers != await redis.get(TOOL_SERVERS_REDIS_KEY):
+            await redis.set(TOOL_SERVERS_REDIS_KEY, tool_servers)
+            request.app.state.TOOL_SERVERS_VERSION = _parse_tool_servers_version(
+                await redis.incr(TOOL_SERVERS_VERSION_REDIS_KEY)
+            )
+
     return request.app.state.TOOL_SERVERS
 
 
+async def _refresh_tool_servers(request: Request):
+    try:
+        await set_tool_servers(request)
+    except Exception as e:
+        log.error(f"Error refreshing tool servers: {e}")
+
+
+async def _claim_tool_servers_refresh(redis) -> bool:
+    try:
+        return bool(
+            await redis.set(
+                TOOL_SERVERS_REFRESH_REDIS_KEY,
+                "1",
+                nx=True,
+                ex=max(1, int(TOOL_SERVER_SPEC_CACHE.ttl)),
+            )
+        )
+    except Exception as e:
+        log.error(f"Error claiming the tool_servers refresh in Redis: {e}")
+        return False
+
+
 async def get_tool_servers(request: Request):
+    # Served from memory until the spec cache TTL passes. With Redis, only the
+    # small version key is read per call, so a change made on another worker
+    # is picked up immediately instead of after the TTL; once the TTL passes,
+    # one worker revalidates the specs upstream in the background and bumps
+    # the version if they changed, while the others keep serving their copy
+    redis = request.app.state.redis
+    loaded_at = getattr(request.app.state, "TOOL_SERVERS_LOADED_AT", None)
+    fresh = (
+        request.app.state.TOOL_SERVERS
+        and loaded_at is not None
+        and time.monotonic() - loaded_at < TOOL_SERVER_SPEC_CACHE.ttl
+    )
+
+    version = getattr(request.app.state, "TOOL_SERVERS_VERSION", None)
+    if redis is not None:
+        try:
+            version = _parse_tool_servers_version(
+                await redis.get(TOOL_SERVERS_VERSION_REDIS_KEY)
+            )
+        except Exception as e:
+            log.error(f"Error fetching tool_servers version from Redis: {e}")
+
+    unchanged = version == getattr(request.app.state, "TOOL_SERVERS_VERSION", None)
+    if fresh and unchanged:
+        return request.app.state.TOOL_SERVERS
+
+    if redis is not None and unchanged and request.app.state.TOOL_SERVERS:
+        request.app.state.TOOL_SERVERS_LOADED_AT = time.monotonic()
+        if await _claim_tool_servers_refresh(redis):
+            asyncio.create_task(_refresh_tool_servers(request))
+        return request.app.state.TOOL_SERVERS
+
     tool_servers = []
-    if request.app.state.redis is not None:
+    if redis is not None:
         try:
-            tool_servers = json.loads(await request.app.state.redis.get("tool_servers"))
+            tool_servers = json.loads(await redis.get(TOOL_SERVERS_REDIS_KEY))
             request.app.state.TOOL_SERVERS = tool_servers
+            request.app.state.TOOL_SERVERS_LOADED_AT = time.monotonic()
+            request.app.state.TOOL_SERVERS_VERSION = version
         except Exception as e:
             log.error(f"Error fetching tool_servers from Redis: {e}")
 
     if not tool_servers:
-        tool_servers = await set_tool_servers(request)
+        tool_servers = await set_tool_servers(request, force=False)
 
     return tool_servers
 
 
-async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
+async def fetch_tool_server_data(
+    token: str,
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Optional[str]]]:
+    """
+    Fetch a tool server's OpenAPI spec, conditionally when validators are given.
+
+    Returns ``(data, validators)``; ``data`` is None when the server answered
+    304 Not Modified.
+    """
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
     }
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
 
     error = None
     try:
-        timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA)
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers=headers, ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL
-            ) as response:
-                if response.status != 200:
-                    error_body = await response.json()
-                    raise Exception(error_body)
+        session = UPSTREAM_SESSION_POOL.get_session(get_tool_server_base_url(url))
+        async with session.get(
+            url,
+            headers=headers,
+            ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+            timeout=aiohttp.ClientTimeout(
+                total=AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA
+            ),
+        ) as response:
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
 
-                text_content = None
+            if response.status == 304 and (etag or last_modified):
+                return None, {
+                    "etag": validators["etag"] or etag,
+                    "last_modified": validators["last_modified"] or last_modified,
+                }
 
-                # Check if URL ends with .yaml or .yml to determine format
-                if url.lower().endswith((".yaml", ".yml")):
-                    text_content = await response.text()
-                    res = yaml.safe_load(text_content)
-                else:
-                    text_content = await response.text()
+            if response.status != 200:
+                error_body = await response.json()
+                raise Exception(error_body)
 
+            text_content = None
+
+            # Check if URL ends with .yaml or .yml to determine format
+            if url.lower().endswith((".yaml", ".yml")):
+                text_content = await response.text()
+                res = yaml.safe_load(text_content)
+            else:
+                text_content = await response.text()
+
+            try:
+                res = json.loads(text_content)
+            except json.JSONDecodeError:
                 try:
-                    res = json.loads(text_content)
-                except json.JSONDecodeError:
-                    try:
-                        res = yaml.safe_load(text_content)
-                    except Exception as e:
-                        raise e
+                    res = yaml.safe_load(text_content)
+                except Exception as e:
+                    raise e
 
     except Exception as err:
         log.exception(f"Could not fetch tool server spec from {url}")
@@ -604,10 +842,17 @@ async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
     }
 
     log.info(f"Fetched data: {data}")
+    return data, validators
+
+
+async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
+    data, _ = await fetch_tool_server_data(token, url)
     return data
 
 
-async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+async def get_tool_servers_data(
+    servers: List[Dict[str, Any]], force: bool = True
+) -> List[Dict[str, Any]]:
     # Prepare list of enabled servers along with their original index
     server_entries = []
     for idx, server in enumerate(servers):
@@ -636,9 +881,17 @@ async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str,
 
             server_entries.append((id, idx, server, full_url, info, token))
 
-    # Create async tasks to fetch data
+    TOOL_SERVER_SPEC_CACHE.retain(
+        {
+            TOOL_SERVER_SPEC_CACHE.key(token, url)
+            for (_, _, _, url, _, token) in server_entries
+        }
+    )
+
+    # Create async tasks to fetch data (cached specs return without a request)
     tasks = [
-        get_tool_server_data(token, url) for (_, _, _, url, _, token) in server_entries
+        TOOL_SERVER_SPEC_CACHE.get(token, url, force=force)
+        for (_, _, _, url, _, token) in server_entries
     ]
 
     # Execute tasks concurrently
@@ -654,7 +907,8 @@ async def get_tool_servers_data(servers: List[Dict[str, Any]]) -> List[Dict[str,
         openapi_data = response.get("openapi", {})
 
         if info and isinstance(openapi_data, dict):
-            openapi_data["info"] = openapi_data.get("info", {})
+            # Copy before overriding: the cached spec is shared between calls
+            openapi_data = {**openapi_data, "info": dict(openapi_data.get("info", {}))}
 
             if "name" in info:
                 openapi_data["info"]["title"] = info.get("name", "Tool Server")
@@ -743,50 +997,52 @@ async def execute_tool_server(
                     f"Request body expected for operation '{name}' but none found."
                 )
 
-        async with aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        ) as session:
-            request_method = getattr(session, http_method.lower())
-
-            if http_method in ["post", "put", "patch"]:
-                async with request_method(
-                    final_url,
-                    json=body_params,
-                    headers=headers,
-                    cookies=cookies,
-                    ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
-                    allow_redirects=False,
-                ) as response:
-                    if response.status >= 400:
-                        text = await response.text()
-                        raise Exception(f"HTTP error {response.status}: {text}")
-
-                    try:
-                        response_data = await response.json()
-                    except Exception:
-                        response_data = await response.text()
-
-                    response_headers = response.headers
-                    return (response_data, response_headers)
-            else:
-                async with request_method(
-                    final_url,
-                    headers=headers,
-                    cookies=cookies,
-                    ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
-                    allow_redirects=False,
-                ) as response:
-                    if response.status >= 400:
-                        text = await response.text()
-                        raise Exception(f"HTTP error {response.status}: {text}")
-
-                    try:
-                        response_data = await response.json()
-                    except Exception:
-                        response_data = await response.text()
-
-                    response_headers = response.headers
-                    return (response_data, response_headers)
+        # Pooled per tool server, so repeated tool calls reuse the connection
+        session = UPSTREAM_SESSION_POOL.get_session(get_tool_server_base_url(url))
+        timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+        request_method = getattr(session, http_method.lower())
+
+        if http_method in ["post", "put", "patch"]:
+            async with request_method(
+                final_url,
+                json=body_params,
+                headers=headers,
+                cookies=cookies,
+                ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+                allow_redirects=False,
+                timeout=timeout,
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise Exception(f"HTTP error {response.status}: {text}")
+
+                try:
+                    response_data = await response.json()
+                except Exception:
+                    response_data = await response.text()
+
+                response_headers = response.headers
+                return (response_data, response_headers)
+        else:
+            async with request_method(
+                final_url,
+                headers=headers,
+                cookies=cookies,
+                ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+                allow_redirects=False,
+                timeout=timeout,
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise Exception(f"HTTP error {response.status}: {text}")
+
+                try:
+                    response_data = await response.json()
+                except Exception:
+                    response_data = await response.text()
+
+                response_headers = response.headers
+                return (response_data, response_headers)
 
     except Exception as err:
         error = str(err)
@@ -794,6 +1050,16 @@ async def execute_tool_server(
         return ({"error": error}, None)
 
 
+def get_tool_server_base_url(url: str) -> str:
+    """
+    Scheme and host of a tool server URL, used to key pooled sessions.
+    """
+    try:
+        return str(URL(url).origin())
+    except Exception:
+        return url
+
+
 def get_tool_server_url(url: Optional[str], path: str) -> str:
     """
     Build the full URL for a tool server, given a base url and a path.
@@ -80,12 +80,16 @@ export const importChat = async (
 export const getChatList = async (
 	token: string = '',
 	page: number | null = null,
-	include_folders: boolean = false
+	include_folders: boolean = false,
+	cursor: string | null = null
 ) => {
 	let error = null;
 	const searchParams = new URLSearchParams();
 
-	if (page !== null) {
+	if (cursor !== null) {
+		// keyset pagination: "<updated_at>:<id>" of the last chat already loaded
+		searchParams.append('cursor', cursor);
+	} else if (page !== null) {
 		searchParams.append('page', `${page}`);
 	}
 
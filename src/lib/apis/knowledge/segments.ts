@@ -7,6 +7,9 @@ export interface SegmentMeta {
 	file: string;
 	preview: string;
 	order: number;
+	page_start?: number | null;
+	page_end?: number | null;
+	content_hash?: string;
 }
 
 export interface SegmentManifest {
@@ -15,6 +18,7 @@ export interface SegmentManifest {
 	source_file: string;
 	created_at: string;
 	segment_count: number;
+	page_count?: number | null;
 	segments: SegmentMeta[];
 }
 
@@ -95,7 +95,16 @@ export interface GetSavedExcelFilesResponse {
 export interface SavedFileSegmentsResponse {
   file_id: string;
   original_file: string;
-  sheets: Array<{ name: string; segments: Array<{ title: string; content: string; questions?: string }>; }>;
+  sheets: Array<{ name: string; segment_count?: number; segments: Array<{ row?: number; title: string; content: string; questions?: string }>; }>;
+  total?: number | null; // 指定 sheet 分页读取时返回
+  skip?: number | null;
+  limit?: number | null;
+}
+
+export interface SavedFileSheetsResponse {
+  file_id: string;
+  original_file: string;
+  sheets: Array<{ name: string; segment_count: number }>;
 }
 
 export interface ListExcelFilesRequest {
@@ -118,6 +127,9 @@ export interface MigrateExcelDirectToRagFlowRequest {
   mode?: 'skip' | 'overwrite'; // skip | overwrite
   limit_segments?: number | null; // 限制每个sheet处理的分段数量
   auto_delete_duplicates?: boolean | null; // 自动删除重名的数据集或文档
+  job_id?: string | null; // 续传之前的迁移任务
+  background?: boolean | null; // 后台执行，立即返回job_id
+  concurrency?: number | null; // chunk并发上传数
 }
 
 export interface MigrateExcelDirectToRagFlowResponse {
@@ -128,9 +140,59 @@ export interface MigrateExcelDirectToRagFlowResponse {
   sheets_processed: number;
   segments_processed: number;
   chunks_created: number;
+  chunks_failed?: number;
+  job_id?: string | null; // 迁移任务ID，可用于查询进度或续传
+  status?: string | null;
   message: string;
 }
 
+// 迁移任务进度
+export interface RagFlowMigrationJobStatus {
+  job_id: string;
+  status: 'pending' | 'running' | 'completed' | 'partial' | 'failed';
+  stage: string; // prepare | upload | done
+  total: number;
+  created: number;
+  skipped: number;
+  failed: number;
+  progress: number; // 0-100
+  elapsed_s: number;
+  throughput_per_s: number;
+  eta_s: number | null;
+  errors: string[];
+  created_at: number;
+  finished_at: number | null;
+  result: MigrateExcelDirectToRagFlowResponse | null;
+}
+
+// 联邦检索（本地知识库 + RAGFlow 并发检索，RRF融合）
+export interface FederatedRetrievalRequest {
+  question: string;
+  knowledge_ids?: string[] | null; // 本地知识库ID
+  dataset_ids?: string[] | null; // RAGFlow dataset ID
+  document_ids?: string[] | null;
+  top_k?: number | null;
+  local_timeout?: number | null; // 本地向量库截止时间（秒）
+  ragflow_timeout?: number | null; // RAGFlow截止时间（秒）
+  local_weight?: number | null;
+  ragflow_weight?: number | null;
+  rrf_k?: number | null;
+  similarity_threshold?: number | null;
+  vector_similarity_weight?: number | null;
+  keyword?: boolean | null;
+  highlight?: boolean | null;
+}
+
+export interface FederatedRetrievalResponse {
+  question: string;
+  total: number;
+  documents: Array<{ content: string; metadata: Record<string, any> }>;
+  scores: number[];
+  backends: Array<{ name: string; status: 'ok' | 'timeout' | 'error'; count: number; elapsed_ms: number; error?: string | null }>;
+  partial: boolean; // 有后端超时或失败
+  retrieval_time?: number | null;
+}
+
 // RAGFlow检索接口
 export interface RagFlowRetrievalRequest {
   question: string; // 查询问题
@@ -437,10 +499,34 @@ export class RAGAPIClient {
   // removed duplicate deleteSavedExcelFile definition above
 
   /**
-   * 获取已保存聚合文件的分段
+   * 获取已保存聚合文件的 Sheet 列表（仅分段数量，不含内容）
+   */
+  async getSavedFileSheets(file_id: string): Promise<SavedFileSheetsResponse> {
+    const response = await fetch(`${this.baseUrl}/saved-excel-file/${file_id}/sheets`, {
+      method: 'GET',
+      headers: {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.token || ''}`
+      }
+    });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return await response.json();
+  }
+
+  /**
+   * 获取已保存聚合文件的分段；指定 sheet 时按行号分页
    */
-  async getSavedFileSegments(file_id: string): Promise<SavedFileSegmentsResponse> {
-    const response = await fetch(`${this.baseUrl}/saved-excel-file/${file_id}/segments`, {
+  async getSavedFileSegments(
+    file_id: string,
+    params: { sheet?: string; skip?: number; limit?: number } = {}
+  ): Promise<SavedFileSegmentsResponse> {
+    const query = new URLSearchParams();
+    if (params.sheet !== undefined) query.set('sheet', params.sheet);
+    if (params.skip) query.set('skip', String(params.skip));
+    if (params.limit) query.set('limit', String(params.limit));
+    const qs = query.toString();
+    const response = await fetch(`${this.baseUrl}/saved-excel-file/${file_id}/segments${qs ? `?${qs}` : ''}`, {
       method: 'GET',
       headers: {
         'Accept': 'application/json',
@@ -486,6 +572,22 @@ export class RAGAPIClient {
     return await response.json();
   }
 
+  /**
+   * 查询Excel迁移任务的进度
+   */
+  async getMigrationJobStatus(job_id: string): Promise<RagFlowMigrationJobStatus> {
+    const response = await fetch(`${this.baseUrl}/ragflow/migrate-jobs/${job_id}`, {
+      method: 'GET',
+      headers: {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.token || ''}`
+      }
+    });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return await response.json();
+  }
+
   /**
    * 获取RAGFlow datasets列表（用于前端选择）
    */
@@ -502,6 +604,23 @@ export class RAGAPIClient {
     return await response.json();
   }
 
+  /**
+   * 联邦检索：并发检索本地知识库与RAGFlow，融合去重
+   */
+  async federatedRetrieval(req: FederatedRetrievalRequest): Promise<FederatedRetrievalResponse> {
+    const response = await fetch(`${this.baseUrl}/federated/retrieval`, {
+      method: 'POST',
+      headers: {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.token || ''}`
+      },
+      body: JSON.stringify(req)
+    });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return await response.json();
+  }
+
   /**
    * RAGFlow知识库检索
    */
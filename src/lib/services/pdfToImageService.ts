@@ -2,30 +2,47 @@
 // 使用后端API处理PDF转图片，避免前端PDF.js的复杂性
 
 export class PDFToImageService {
-	// 调用后端API将PDF页面转换为图片
+	// 已获取的页面图片（object URL），避免重复请求
+	private pageUrls = new Map<string, string>();
+
+	// 调用后端API将PDF页面转换为图片，返回可直接用于 <img src> 的 URL
 	async convertPageToImage(file: any, pageNumber: number, knowledgeId: string): Promise<string> {
+		const key = `${knowledgeId}:${file.id}:${pageNumber}`;
+		const cached = this.pageUrls.get(key);
+		if (cached) {
+			return cached;
+		}
+
 		try {
-			// 使用知识库API端点
-			const response = await fetch(`/api/v1/knowledge/${knowledgeId}/files/${file.id}/pdf-to-image?page=${pageNumber}`, {
-				method: 'POST',
-				headers: {
-					'Content-Type': 'application/json',
+			// 后端返回二进制 PNG（带 ETag，浏览器可直接走 HTTP 缓存）
+			const response = await fetch(
+				`/api/v1/knowledge/${knowledgeId}/files/${file.id}/pdf-pages/${pageNumber}`,
+				{
+					method: 'GET',
+					credentials: 'include'
 				}
-			});
-			
+			);
+
 			if (!response.ok) {
 				throw new Error(`API调用失败: ${response.status}`);
 			}
-			
-			// 获取base64图片数据
-			const result = await response.json();
-			return result.imageDataUrl;
-			
+
+			const url = URL.createObjectURL(await response.blob());
+			this.pageUrls.set(key, url);
+			return url;
 		} catch (error) {
 			console.error('PDF转图片API调用失败:', error);
 			throw error;
 		}
 	}
+
+	// 释放已缓存的页面图片
+	clear() {
+		for (const url of this.pageUrls.values()) {
+			URL.revokeObjectURL(url);
+		}
+		this.pageUrls.clear();
+	}
 }
 
 // 创建单例实例